@@ -0,0 +1 @@
+"""複数のアプリで使う共通処理。"""
@@ -0,0 +1,246 @@
+"""グラフ用の時系列を軽くするための共通処理。
+
+長い記録をそのまま描くと、再実行のたびに全件を作り直すことになる。
+各アプリはデータの版（保存ファイルの更新状態）をキーに集計結果を
+キャッシュし、表示する期間を切り出してから点数を間引いて描画する。
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+# 折れ線グラフ1本あたりの最大表示点数
+CHART_POINT_BUDGET = 500
+
+# 棒グラフに並べる最大項目数
+CHART_BAR_LIMIT = 30
+
+
+def file_version(*paths):
+    """保存ファイルの更新時刻とサイズからデータの版を返す。"""
+
+    version = []
+
+    for path in paths:
+        try:
+            stat = os.stat(path)
+
+        except OSError:
+            version.append((0, 0))
+            continue
+
+        version.append(
+            (
+                stat.st_mtime_ns,
+                stat.st_size
+            )
+        )
+
+    return tuple(version)
+
+
+def index_values(index):
+    """横軸の値を数値の配列にする。"""
+
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(float)
+
+    return np.arange(
+        len(index),
+        dtype=float
+    )
+
+
+def lttb_positions(
+    x_values,
+    y_values,
+    budget=CHART_POINT_BUDGET
+):
+    """LTTB法で残す点の位置を返す。
+
+    先頭と末尾の点は必ず残し、間を budget - 2 個の区間に分けて、
+    前に選んだ点と次の区間の平均点で作る三角形が最大になる点を選ぶ。
+    """
+
+    length = len(y_values)
+
+    if budget < 3 or length <= budget:
+        return np.arange(length)
+
+    y_values = np.nan_to_num(
+        np.asarray(y_values, dtype=float)
+    )
+
+    edges = np.linspace(
+        1,
+        length - 1,
+        budget - 1
+    ).astype(int)
+
+    selected = [0]
+
+    for bucket in range(budget - 2):
+        start = edges[bucket]
+        end = max(
+            edges[bucket + 1],
+            start + 1
+        )
+
+        next_start = edges[bucket + 1]
+        next_end = (
+            edges[bucket + 2]
+            if bucket + 2 < len(edges)
+            else length
+        )
+        next_end = max(
+            next_end,
+            next_start + 1
+        )
+
+        average_x = x_values[
+            next_start:next_end
+        ].mean()
+        average_y = y_values[
+            next_start:next_end
+        ].mean()
+
+        anchor_x = x_values[selected[-1]]
+        anchor_y = y_values[selected[-1]]
+
+        areas = np.abs(
+            (anchor_x - average_x)
+            * (y_values[start:end] - anchor_y)
+            - (anchor_x - x_values[start:end])
+            * (average_y - anchor_y)
+        )
+
+        selected.append(
+            start + int(areas.argmax())
+        )
+
+    selected.append(length - 1)
+
+    return np.asarray(selected)
+
+
+def downsample_lttb(
+    series,
+    budget=CHART_POINT_BUDGET
+):
+    """形を保ったまま折れ線の点数を減らす。"""
+
+    if len(series) <= budget:
+        return series
+
+    return series.iloc[
+        lttb_positions(
+            index_values(series.index),
+            series.to_numpy(dtype=float),
+            budget
+        )
+    ]
+
+
+def downsample_frame(
+    frame,
+    budget=CHART_POINT_BUDGET
+):
+    """複数列の時系列を列ごとに間引き、選ばれた行をまとめて返す。"""
+
+    if len(frame) <= budget:
+        return frame
+
+    x_values = index_values(frame.index)
+    positions = set()
+
+    for column in frame.columns:
+        positions.update(
+            lttb_positions(
+                x_values,
+                frame[column].to_numpy(dtype=float),
+                budget
+            ).tolist()
+        )
+
+    return frame.iloc[
+        sorted(positions)
+    ]
+
+
+def select_date_window(
+    index,
+    key,
+    label="🔎 表示期間"
+):
+    """並び替え済みの日時インデックスから表示期間を選ぶ。"""
+
+    if len(index) == 0:
+        return None, None
+
+    first_date = index[0].date()
+    last_date = index[-1].date()
+
+    if first_date == last_date:
+        return first_date, last_date
+
+    return st.slider(
+        label,
+        min_value=first_date,
+        max_value=last_date,
+        value=(first_date, last_date),
+        format="YYYY-MM-DD",
+        key=key
+    )
+
+
+def slice_dates(
+    frame,
+    start_date,
+    end_date
+):
+    """日時で並んだデータから期間内だけを切り出す（二分探索）。"""
+
+    if start_date is None:
+        return frame
+
+    return frame.loc[
+        pd.Timestamp(start_date):
+        pd.Timestamp(end_date)
+        + pd.Timedelta(days=1)
+        - pd.Timedelta(microseconds=1)
+    ]
+
+
+def downsample_notice(
+    point_count,
+    budget=CHART_POINT_BUDGET
+):
+    """間引いて表示しているときの注意書きを返す。"""
+
+    if point_count <= budget:
+        return ""
+
+    return (
+        f"{point_count:,}件の記録を"
+        f"{budget}点に間引いて表示しています。"
+        "期間を狭めると細かく確認できます。"
+    )
+
+
+def top_items(
+    series,
+    limit=CHART_BAR_LIMIT,
+    smallest=False
+):
+    """棒グラフ用に値の大きい順（smallest なら小さい順）で上位だけを残す。"""
+
+    if len(series) <= limit:
+        return series
+
+    if smallest:
+        return series.nsmallest(limit)
+
+    return series.nlargest(limit)
@@ -0,0 +1,103 @@
+"""期限系アプリが共通で使う「期限インデックス」。
+
+賞味期限・冷蔵庫・保証書・返却期限・ちょい得メモの各アプリが、自分の記録の期限を
+[期限日, アプリ, レコードID, 名前] の形で登録し、期限日順の1つのリストにまとめる。
+横断ダッシュボードはこのファイルだけを読めばよい。
+
+どのフォルダから起動しても同じファイルを使うよう、リポジトリ直下の data/ に置く。
+各アプリは自分の分だけを差し替えるので、読み込み→差し替え→書き込みの間は
+file_lock で囲み、別のアプリが同時に書いた分を消さないようにする。
+"""
+
+import heapq
+import json
+from datetime import datetime
+from pathlib import Path
+
+from common.file_lock import file_lock, write_json_atomic
+
+
+DEADLINE_INDEX_DIR = Path(__file__).resolve().parent.parent / "data"
+
+DEADLINE_INDEX_FILE = DEADLINE_INDEX_DIR / "deadline_index.json"
+
+
+def create_index():
+    """空のインデックスを作る。"""
+
+    return {
+        "apps": {},
+        "entries": [],
+    }
+
+
+def load_deadline_index(path=DEADLINE_INDEX_FILE):
+    """インデックスを読む。ない・壊れているときは空。"""
+
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            index = json.load(file)
+
+    except (OSError, ValueError):
+        return create_index()
+
+    if not isinstance(index, dict):
+        return create_index()
+
+    index.setdefault("apps", {})
+    index.setdefault("entries", [])
+
+    return index
+
+
+def app_entries(
+    index,
+    app_key
+):
+    """インデックスのうち、そのアプリが登録した分。"""
+
+    return [
+        entry
+        for entry in index["entries"]
+        if entry[1] == app_key
+    ]
+
+
+def register_deadlines(
+    app_key,
+    app_name,
+    entries,
+    path=DEADLINE_INDEX_FILE
+):
+    """そのアプリの分だけを差し替える。変わっていなければ書かない。書いたら True。"""
+
+    entries = sorted(entries)
+
+    # ふだんは変わっていないので、ロックを取る前に読んで確かめる
+    index = load_deadline_index(path)
+
+    if app_key in index["apps"] and app_entries(index, app_key) == entries:
+        return False
+
+    with file_lock(path):
+        # ロックを取るまでに別のアプリが書いているかもしれないので読み直す
+        index = load_deadline_index(path)
+
+        if app_key in index["apps"] and app_entries(index, app_key) == entries:
+            return False
+
+        others = [
+            entry
+            for entry in index["entries"]
+            if entry[1] != app_key
+        ]
+
+        index["entries"] = list(heapq.merge(others, entries))
+        index["apps"][app_key] = {
+            "name": app_name,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+        write_json_atomic(path, index)
+
+    return True
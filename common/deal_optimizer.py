@@ -0,0 +1,436 @@
+"""買い物かごに使えるお得（割引・クーポン・ポイント還元・まとめ買い）の
+いちばん得な組み合わせを探す共通処理。
+
+商品の金額は NumPy 配列にまとめ、選んだお得の組み合わせ（0/1 の行）
+ごとの支払額を一度に計算する。組み合わせは分枝限定法で探し、
+「残りのお得を全部足してもいまの最良に届かない」枝は打ち切る。
+
+お得の種類と適用順：
+    percent  対象商品を○%引き（対象が空なら全商品）
+    bundle   対象商品を min_qty 点以上買うと○%引き
+    coupon   割引後の合計が min_spend 以上なら○円引き
+    points   支払額が min_spend 以上なら○%をポイント還元（1ポイント=1円）
+"""
+
+import time
+
+import numpy as np
+
+
+DEAL_KINDS = [
+    "percent",
+    "bundle",
+    "coupon",
+    "points",
+]
+
+DEAL_KIND_LABELS = {
+    "percent": "割引率",
+    "bundle": "まとめ買い",
+    "coupon": "クーポン",
+    "points": "ポイント還元",
+}
+
+ITEM_KINDS = [
+    "percent",
+    "bundle",
+]
+
+DEFAULT_MAX_NODES = 200000
+
+
+def deal_targets_mask(
+    items,
+    targets
+):
+    """お得の対象（商品名かカテゴリ）に当たる商品の真偽配列を返す。"""
+
+    if not targets:
+        return np.ones(len(items), dtype=bool)
+
+    targets = set(targets)
+
+    return np.array(
+        [
+            item.get("name") in targets
+            or item.get("category") in targets
+            for item in items
+        ],
+        dtype=bool
+    )
+
+
+def build_problem(
+    items,
+    deals
+):
+    """商品とお得のリストから、計算用の配列をまとめて作る。
+
+    items は {"name", "category", "price", "qty"}、deals は
+    {"name", "kind", "value", "targets", "min_spend", "min_qty",
+    "stackable", "group"} の辞書。対象商品がない・点数が足りない
+    お得は使えないものとして除く。
+    """
+
+    prices = np.array(
+        [float(item.get("price", 0)) for item in items],
+        dtype=float
+    )
+    quantities = np.array(
+        [int(item.get("qty", 1)) for item in items],
+        dtype=float
+    )
+
+    usable = []
+    masks = []
+
+    for deal in deals:
+        if deal.get("kind") not in DEAL_KINDS:
+            continue
+
+        mask = deal_targets_mask(
+            items,
+            deal.get("targets")
+        )
+
+        if deal["kind"] in ITEM_KINDS:
+            if not mask.any():
+                continue
+
+            if (
+                deal["kind"] == "bundle"
+                and quantities[mask].sum() < int(deal.get("min_qty", 0))
+            ):
+                continue
+
+        usable.append(deal)
+        masks.append(mask)
+
+    deal_count = len(usable)
+    kinds = [deal["kind"] for deal in usable]
+    values = np.array(
+        [float(deal.get("value", 0)) for deal in usable],
+        dtype=float
+    )
+    is_item = np.array([kind in ITEM_KINDS for kind in kinds], dtype=bool)
+    is_coupon = np.array([kind == "coupon" for kind in kinds], dtype=bool)
+    is_points = np.array([kind == "points" for kind in kinds], dtype=bool)
+
+    target_matrix = (
+        np.array(masks, dtype=bool)
+        if masks
+        else np.zeros((0, len(items)), dtype=bool)
+    )
+
+    # 行＝お得、列＝商品の「掛け率」。商品に関係ないお得は 1
+    factors = np.where(
+        is_item[:, None] & target_matrix,
+        1 - np.clip(values, 0, 100)[:, None] / 100,
+        1.0
+    )
+
+    stackable = np.array(
+        [
+            bool(deal.get("stackable", deal["kind"] == "points"))
+            for deal in usable
+        ],
+        dtype=bool
+    )
+    groups = [deal.get("group") or "" for deal in usable]
+
+    conflicts = np.zeros((deal_count, deal_count), dtype=bool)
+
+    for a in range(deal_count):
+        for b in range(a + 1, deal_count):
+            same_group = groups[a] and groups[a] == groups[b]
+
+            both_fixed = not stackable[a] and not stackable[b]
+
+            overlap = (
+                (is_item[a] and is_item[b] and (target_matrix[a] & target_matrix[b]).any())
+                or (kinds[a] == kinds[b] and not is_item[a])
+            )
+
+            if same_group or (both_fixed and overlap):
+                conflicts[a, b] = conflicts[b, a] = True
+
+    return {
+        "items": items,
+        "deals": usable,
+        "prices": prices,
+        "quantities": quantities,
+        "original_total": float((prices * quantities).sum()),
+        "factors": factors,
+        "coupon_amounts": np.where(is_coupon, values, 0.0),
+        "minimums": np.array(
+            [float(deal.get("min_spend", 0)) for deal in usable]
+        ).reshape(deal_count),
+        "point_rates": np.where(is_points, values / 100, 0.0),
+        "is_item": is_item,
+        "stackable": stackable,
+        "conflicts": conflicts,
+    }
+
+
+def lowest_subtotal(
+    problem,
+    selection
+):
+    """selection の一部を選んだときに、小計が取りうるいちばん低い額を返す。
+
+    重ねられない割引は対象が重なると一緒に使えないので、商品ごとに
+    重ねられる割引は全部掛け、重ねられない割引はいちばん強いものだけ掛ける。
+    """
+
+    factors = problem["factors"]
+    stackable = problem["stackable"]
+
+    stacked = np.prod(
+        factors[selection & stackable],
+        axis=0
+    )
+
+    fixed = factors[selection & ~stackable]
+
+    multipliers = stacked * (
+        fixed.min(axis=0)
+        if len(fixed)
+        else 1.0
+    )
+
+    return (
+        np.round(problem["prices"] * multipliers)
+        * problem["quantities"]
+    ).sum()
+
+
+def stacked_upper(
+    values,
+    stackable,
+    selection
+):
+    """重ねて使える分の合計と、重ねられない分の最大値の和を返す。
+
+    重ねられない同じ種類のお得は1つしか選べないので、選び方の上限になる。
+    """
+
+    fixed = values[selection & ~stackable]
+
+    return (
+        values[selection & stackable].sum()
+        + (fixed.max() if len(fixed) else 0.0)
+    )
+
+
+def evaluate_selections(
+    problem,
+    selections
+):
+    """お得の選び方（行ごとに 0/1）をまとめて評価する。
+
+    単価に掛け率を掛けて1円未満を四捨五入し、数量を掛けて小計を出す。
+    小計からクーポンを引いた額が支払額で、ポイントは支払額から計算する。
+    """
+
+    selections = np.atleast_2d(
+        np.asarray(selections, dtype=bool)
+    )
+
+    multipliers = np.prod(
+        np.where(
+            selections[:, :, None],
+            problem["factors"][None, :, :],
+            1.0
+        ),
+        axis=1
+    )
+
+    line_totals = (
+        np.round(problem["prices"][None, :] * multipliers)
+        * problem["quantities"][None, :]
+    )
+    subtotals = line_totals.sum(axis=1)
+
+    coupons = np.minimum(
+        (
+            selections
+            * (problem["minimums"][None, :] <= subtotals[:, None])
+        ) @ problem["coupon_amounts"],
+        subtotals
+    )
+    paid = subtotals - coupons
+
+    points = np.floor(
+        (
+            selections
+            * (problem["minimums"][None, :] <= paid[:, None])
+        ) @ problem["point_rates"]
+        * paid
+    )
+
+    return {
+        "line_totals": line_totals,
+        "subtotals": subtotals,
+        "coupons": coupons,
+        "paid": paid,
+        "points": points,
+        "savings": problem["original_total"] - paid + points,
+    }
+
+
+def optimize_deals(
+    items,
+    deals,
+    max_nodes=DEFAULT_MAX_NODES
+):
+    """いちばんお得な組み合わせを分枝限定法で探す。
+
+    戻り値の complete が False のときは探索数の上限で打ち切った結果で、
+    それまでに見つかった最良の組み合わせを返す。
+    """
+
+    started = time.perf_counter()
+
+    problem = build_problem(items, deals)
+    deal_count = len(problem["deals"])
+    conflicts = problem["conflicts"]
+
+    # 単独で使ったときのお得額。重ねたときの上乗せ分はこれを超えない
+    alone = (
+        evaluate_selections(problem, np.eye(deal_count, dtype=bool))["savings"]
+        if deal_count
+        else np.zeros(0)
+    )
+
+    order = [
+        int(index)
+        for index in np.argsort(-alone, kind="stable")
+        if alone[index] > 0
+    ]
+
+    empty = np.zeros(deal_count, dtype=bool)
+
+    # 単独のお得額が大きい順に、重ねて得になるものを足した組み合わせを初期解にする
+    best_selection = empty.copy()
+    best_saving = 0.0
+
+    for index in order:
+        if (conflicts[index] & best_selection).any():
+            continue
+
+        trial = best_selection.copy()
+        trial[index] = True
+
+        saving = evaluate_selections(problem, trial)["savings"][0]
+
+        if saving > best_saving:
+            best_selection = trial
+            best_saving = saving
+
+    nodes = 0
+    stack = [(0, empty, empty)]
+
+    while stack and nodes < max_nodes:
+        position, chosen, blocked = stack.pop()
+        nodes += 1
+
+        result = evaluate_selections(problem, chosen)
+
+        saving = result["savings"][0]
+        subtotal = result["subtotals"][0]
+
+        if saving > best_saving:
+            best_selection = chosen
+            best_saving = saving
+
+        # 小計はこの先下がる一方なので、最低金額に届かないクーポン・還元はもう使えない
+        reachable = (
+            ~blocked
+            & ~chosen
+            & (problem["is_item"] | (problem["minimums"] <= subtotal))
+        )
+
+        next_position = next(
+            (
+                offset
+                for offset in range(position, len(order))
+                if reachable[order[offset]]
+            ),
+            None
+        )
+
+        if next_position is None:
+            continue
+
+        candidates = np.zeros(deal_count, dtype=bool)
+        candidates[order[next_position:]] = True
+        union = chosen | (candidates & reachable)
+
+        # 割引を重ねられるだけ重ねた小計・クーポン・還元率から、
+        # この先どう選んでも超えないお得額の上限を出す
+        lowest = lowest_subtotal(problem, union)
+        coupon_max = stacked_upper(
+            problem["coupon_amounts"],
+            problem["stackable"],
+            union
+        )
+        rate_max = stacked_upper(
+            problem["point_rates"],
+            problem["stackable"],
+            union
+        )
+
+        # お得額 = 元合計 - (1 - 還元率) * 支払額 なので、還元率が1未満なら
+        # 支払額の下限で、1以上なら支払額の上限（いまの小計）で上限が決まる
+        if rate_max < 1:
+            bound = (
+                problem["original_total"]
+                - (1 - rate_max) * max(lowest - coupon_max, 0)
+            )
+        else:
+            bound = (
+                problem["original_total"]
+                + (rate_max - 1) * subtotal
+            )
+
+        if bound <= best_saving:
+            continue
+
+        index = order[next_position]
+
+        # 使わない枝を先に積み、使う枝から調べる
+        stack.append((next_position + 1, chosen, blocked))
+
+        included = chosen.copy()
+        included[index] = True
+
+        stack.append(
+            (
+                next_position + 1,
+                included,
+                blocked | conflicts[index]
+            )
+        )
+
+    best = evaluate_selections(problem, best_selection)
+
+    return {
+        "problem": problem,
+        "selection": best_selection,
+        "chosen_deals": [
+            deal
+            for deal, used in zip(problem["deals"], best_selection)
+            if used
+        ],
+        "original_total": problem["original_total"],
+        "line_totals": best["line_totals"][0],
+        "subtotal": float(best["subtotals"][0]),
+        "coupon": float(best["coupons"][0]),
+        "paid": float(best["paid"][0]),
+        "points": float(best["points"][0]),
+        "saving": float(best["savings"][0]),
+        "standalone_savings": alone,
+        "nodes": nodes,
+        "complete": not stack,
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+    }
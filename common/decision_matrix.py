@@ -0,0 +1,248 @@
+"""選択肢×判断基準の評価表をまとめて計算する共通処理。
+
+選択肢ごと・基準ごとの点数を NumPy の2次元配列（行＝選択肢、列＝基準）に
+入れ、重み付き合計・順位・重みの感度・点数のぶれに対する強さを
+まとめて計算する。
+"""
+
+import numpy as np
+
+
+SCORE_MIN = 1
+SCORE_MAX = 5
+DEFAULT_SCORE = 3
+DEFAULT_WEIGHT = 1.0
+
+
+def build_matrix(
+    options,
+    criteria,
+    weights=None,
+    score_key="scores"
+):
+    """選択肢リストから点数の配列と重みの配列を作る。"""
+
+    weights = weights or {}
+
+    scores = np.array(
+        [
+            [
+                option.get(
+                    score_key,
+                    {}
+                ).get(
+                    criterion,
+                    DEFAULT_SCORE
+                )
+                for criterion in criteria
+            ]
+            for option in options
+        ],
+        dtype=float
+    ).reshape(
+        len(options),
+        len(criteria)
+    )
+
+    weight_values = np.array(
+        [
+            weights.get(
+                criterion,
+                DEFAULT_WEIGHT
+            )
+            for criterion in criteria
+        ],
+        dtype=float
+    )
+
+    return scores, weight_values
+
+
+def evaluate_matrix(
+    scores,
+    weights
+):
+    """重み付き合計・重み付き平均・順位をまとめて返す。
+
+    順位は合計点の高い順で、同点のときは先に登録された選択肢を上にする。
+    """
+
+    totals = scores @ weights
+    weight_sum = weights.sum()
+
+    averages = (
+        totals / weight_sum
+        if weight_sum > 0
+        else np.zeros_like(totals)
+    )
+
+    ranking = np.argsort(
+        -totals,
+        kind="stable"
+    )
+
+    ranks = np.empty(
+        len(totals),
+        dtype=int
+    )
+    ranks[ranking] = np.arange(
+        1,
+        len(totals) + 1
+    )
+
+    return {
+        "totals": totals,
+        "averages": averages,
+        "ranking": ranking,
+        "ranks": ranks
+    }
+
+
+def weight_sensitivity(
+    scores,
+    weights
+):
+    """基準ごとに、1位が入れ替わるまでに必要な重みの変化量を返す。
+
+    基準 j の重みだけを delta 変えたとき、1位 w と他の選択肢 k の差は
+    (T_w - T_k) + delta * (S_wj - S_kj) になる。これが0になる delta を
+    全選択肢・全基準について一度に求め、重みが負にならない範囲で
+    絶対値が最小のものを採用する。入れ替わらない基準は NaN になる。
+    """
+
+    option_count, criterion_count = scores.shape
+
+    empty = {
+        "winner": None,
+        "delta": np.full(criterion_count, np.nan),
+        "rival": np.full(criterion_count, -1)
+    }
+
+    if option_count < 2 or criterion_count == 0:
+        return empty
+
+    totals = scores @ weights
+    winner = int(
+        np.argsort(
+            -totals,
+            kind="stable"
+        )[0]
+    )
+
+    rivals = np.delete(
+        np.arange(option_count),
+        winner
+    )
+
+    total_gaps = (
+        totals[winner]
+        - totals[rivals]
+    )[:, None]
+
+    score_gaps = (
+        scores[winner]
+        - scores[rivals]
+    )
+
+    with np.errstate(
+        divide="ignore",
+        invalid="ignore"
+    ):
+        deltas = -total_gaps / score_gaps
+
+    valid = (
+        np.isfinite(deltas)
+        & (weights[None, :] + deltas >= 0)
+    )
+
+    magnitudes = np.where(
+        valid,
+        np.abs(deltas),
+        np.inf
+    )
+
+    best_rows = magnitudes.argmin(axis=0)
+    columns = np.arange(criterion_count)
+    best_magnitudes = magnitudes[
+        best_rows,
+        columns
+    ]
+
+    found = np.isfinite(best_magnitudes)
+
+    return {
+        "winner": winner,
+        "delta": np.where(
+            found,
+            deltas[best_rows, columns] + 0.0,
+            np.nan
+        ),
+        "rival": np.where(
+            found,
+            rivals[best_rows],
+            -1
+        )
+    }
+
+
+def monte_carlo_wins(
+    scores,
+    weights,
+    score_spread=1.0,
+    weight_spread=0.0,
+    trials=2000,
+    seed=None
+):
+    """点数（と重み）のぶれを乱数で試し、各選択肢が1位になる割合を返す。
+
+    点数には ±score_spread の一様なぶれを加えて評価範囲に収め、
+    重みには ±weight_spread の割合のぶれを加える。全試行を
+    (試行, 選択肢, 基準) の配列で一度に計算する。
+    """
+
+    option_count = scores.shape[0]
+
+    if option_count == 0:
+        return np.zeros(0)
+
+    generator = np.random.default_rng(
+        seed
+    )
+
+    noisy_scores = np.clip(
+        scores[None, :, :]
+        + generator.uniform(
+            -score_spread,
+            score_spread,
+            size=(trials, *scores.shape)
+        ),
+        SCORE_MIN,
+        SCORE_MAX
+    )
+
+    noisy_weights = np.clip(
+        weights[None, :]
+        * (
+            1
+            + generator.uniform(
+                -weight_spread,
+                weight_spread,
+                size=(trials, len(weights))
+            )
+        ),
+        0,
+        None
+    )
+
+    totals = np.einsum(
+        "tom,tm->to",
+        noisy_scores,
+        noisy_weights
+    )
+
+    winners = totals.argmax(axis=1)
+
+    return np.bincount(
+        winners,
+        minlength=option_count
+    ) / trials
@@ -0,0 +1,94 @@
+"""複数のアプリから同じファイルを書き換えるときの排他ロック。
+
+読み込み→マージ→書き込みの間を `file_lock` で囲むと、別のアプリ
+（別プロセス）が同じファイルを同時に書き換えて変更が消えるのを防げる。
+ロックは「<ファイル名>.lock」を排他作成する方式なので、OS を問わず動く。
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+
+LOCK_TIMEOUT = 10.0
+
+# これより古いロックファイルは、落ちたプロセスの残りとみなして消す
+STALE_LOCK_SECONDS = 30.0
+
+
+@contextmanager
+def file_lock(
+    path,
+    timeout=LOCK_TIMEOUT
+):
+    """path に対する排他ロックを取る。取れなければ TimeoutError。"""
+
+    lock_path = f"{path}.lock"
+    deadline = time.monotonic() + timeout
+
+    os.makedirs(
+        os.path.dirname(os.path.abspath(lock_path)),
+        exist_ok=True
+    )
+
+    while True:
+        try:
+            handle = os.open(
+                lock_path,
+                os.O_CREAT | os.O_EXCL | os.O_WRONLY
+            )
+            break
+
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+
+            except OSError:
+                continue
+
+            if time.monotonic() > deadline:
+                raise TimeoutError(
+                    f"{path} のロックを取得できませんでした"
+                )
+
+            time.sleep(0.05)
+
+    try:
+        os.write(handle, str(os.getpid()).encode("ascii"))
+        yield
+
+    finally:
+        os.close(handle)
+
+        try:
+            os.remove(lock_path)
+
+        except OSError:
+            pass
+
+
+def write_json_atomic(
+    path,
+    data
+):
+    """一時ファイルに書いてから置き換え、書きかけのファイルを残さない。"""
+
+    os.makedirs(
+        os.path.dirname(os.path.abspath(path)),
+        exist_ok=True
+    )
+
+    temp_path = f"{path}.tmp"
+
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(
+            data,
+            file,
+            ensure_ascii=False,
+            indent=2
+        )
+
+    os.replace(temp_path, path)
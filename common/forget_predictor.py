@@ -0,0 +1,420 @@
+"""忘れ物の起きやすさを、おでかけの種類ごとに見積もる共通処理。
+
+おでかけ1回（trip）ごとに「種類・日付・忘れた持ち物」を反映し、
+種類ごとの回数と、持ち物×種類ごとの忘れた回数を、最近ほど重く数えた値
+（半減期 HALF_LIFE_DAYS 日の指数減衰）で持つ。値は [重み, 基準日] の組で、
+読むときに基準日からの日数ぶんだけ減らすので、日付が進んでも書き直さない。
+
+おでかけを終えたとき・振り返りを直したときは、そのおでかけの分だけを
+引いてから足し直す（持ち物の数ぶんの手間）。全体を数え直すのは、
+モデルがないとき・形式が変わったときだけ。
+
+見積もりは「その種類で忘れた重み ÷ その種類のおでかけの重み」を、
+全体の割合へ PRIOR_WEIGHT 回分だけ寄せたもの。
+"""
+
+from datetime import date
+
+
+MODEL_VERSION = 1
+
+# この日数で重みが半分になる
+HALF_LIFE_DAYS = 90
+
+# 種類ごとの回数が少ないうちは、全体の割合へ寄せる（おでかけ何回分か）
+PRIOR_WEIGHT = 2.0
+
+
+def create_model():
+    """空のモデルを作る。"""
+
+    return {
+        "version": MODEL_VERSION,
+        "trips": {},
+        "uses": {},
+        "uses_all": [0.0, 0],
+        "items": {},
+    }
+
+
+def is_current(model):
+    """保存されたモデルがいまの形式か。"""
+
+    return (
+        isinstance(model, dict)
+        and model.get("version") == MODEL_VERSION
+    )
+
+
+def item_key(name):
+    """持ち物名を比べるためのキー（前後の空白と大文字小文字を無視）。"""
+
+    return str(name).strip().lower()
+
+
+def day_number(day):
+    """date か YYYY-MM-DD を通日にする。読めなければ今日。"""
+
+    if isinstance(day, date):
+        return day.toordinal()
+
+    try:
+        return date.fromisoformat(
+            str(day)[:10]
+        ).toordinal()
+
+    except ValueError:
+        return date.today().toordinal()
+
+
+def decayed(
+    weight,
+    day
+):
+    """[重み, 基準日] の、day 時点の値。"""
+
+    value, reference = weight
+
+    if not value:
+        return 0.0
+
+    return value * 0.5 ** ((day - reference) / HALF_LIFE_DAYS)
+
+
+def add_weight(
+    weight,
+    day,
+    amount
+):
+    """day に amount（引くときは負）を足す。基準日は新しい方にそろえる。"""
+
+    value, reference = weight
+
+    if day >= reference:
+        weight[0] = decayed(weight, day) + amount
+        weight[1] = day
+
+    else:
+        weight[0] = value + amount * 0.5 ** ((reference - day) / HALF_LIFE_DAYS)
+
+    if weight[0] < 1e-9:
+        weight[0] = 0.0
+
+
+def add_forgotten_weight(
+    model,
+    name,
+    kind,
+    day,
+    amount
+):
+    """持ち物の忘れた回数と重み（全体・種類ごと）に amount を足す。"""
+
+    key = item_key(name)
+
+    if not key:
+        return
+
+    item = model["items"].setdefault(
+        key,
+        {
+            "name": str(name).strip(),
+            "count": 0,
+            "all": [0.0, day],
+            "kinds": {},
+        }
+    )
+
+    if amount > 0:
+        item["name"] = str(name).strip()
+
+    item["count"] += amount
+
+    add_weight(
+        item["all"],
+        day,
+        amount
+    )
+
+    add_weight(
+        item["kinds"].setdefault(kind, [0.0, day]),
+        day,
+        amount
+    )
+
+    if item["count"] <= 0:
+        del model["items"][key]
+
+
+def remove_trip(
+    model,
+    trip_id
+):
+    """おでかけ1回分の反映を取り消す。"""
+
+    trip = model["trips"].pop(
+        trip_id,
+        None
+    )
+
+    if not trip:
+        return
+
+    for name in trip["forgotten"]:
+        add_forgotten_weight(
+            model,
+            name,
+            trip["kind"],
+            trip["day"],
+            -1
+        )
+
+    add_weight(
+        model["uses"].setdefault(trip["kind"], [0.0, trip["day"]]),
+        trip["day"],
+        -1
+    )
+
+    add_weight(
+        model["uses_all"],
+        trip["day"],
+        -1
+    )
+
+
+def apply_trip(
+    model,
+    trip_id,
+    kind,
+    day,
+    forgotten_names=()
+):
+    """おでかけ1回分を反映する。同じ trip_id の前の反映は先に取り消す。"""
+
+    remove_trip(
+        model,
+        trip_id
+    )
+
+    # 先の日付のおでかけは今日の分として数える（重みが1を超えないように）
+    day = min(
+        day_number(day),
+        date.today().toordinal()
+    )
+
+    names = list(
+        dict.fromkeys(
+            str(name).strip()
+            for name in forgotten_names
+            if item_key(name)
+        )
+    )
+
+    add_weight(
+        model["uses"].setdefault(kind, [0.0, day]),
+        day,
+        1
+    )
+
+    add_weight(
+        model["uses_all"],
+        day,
+        1
+    )
+
+    for name in names:
+        add_forgotten_weight(
+            model,
+            name,
+            kind,
+            day,
+            1
+        )
+
+    model["trips"][trip_id] = {
+        "kind": kind,
+        "day": day,
+        "forgotten": names,
+    }
+
+
+def set_trip_kind(
+    model,
+    trip_id,
+    kind
+):
+    """反映済みのおでかけ1回分の種類を変える。"""
+
+    trip = model["trips"].get(trip_id)
+
+    if not trip or trip["kind"] == kind:
+        return
+
+    apply_trip(
+        model,
+        trip_id,
+        kind,
+        date.fromordinal(trip["day"]),
+        list(trip["forgotten"])
+    )
+
+
+def add_forgotten(
+    model,
+    trip_id,
+    kind,
+    day,
+    name
+):
+    """おでかけ1回分に忘れ物を1つ足す（まだ反映していないおでかけなら反映する）。"""
+
+    if trip_id not in model["trips"]:
+        apply_trip(
+            model,
+            trip_id,
+            kind,
+            day
+        )
+
+    trip = model["trips"][trip_id]
+
+    trip["forgotten"].append(
+        str(name).strip()
+    )
+
+    add_forgotten_weight(
+        model,
+        name,
+        trip["kind"],
+        trip["day"],
+        1
+    )
+
+
+def remove_forgotten(
+    model,
+    trip_id,
+    name
+):
+    """おでかけ1回分から忘れ物を1つ取り消す。"""
+
+    trip = model["trips"].get(trip_id)
+
+    if not trip:
+        return
+
+    for index, forgotten_name in enumerate(trip["forgotten"]):
+        if item_key(forgotten_name) == item_key(name):
+            del trip["forgotten"][index]
+
+            add_forgotten_weight(
+                model,
+                forgotten_name,
+                trip["kind"],
+                trip["day"],
+                -1
+            )
+
+            return
+
+
+def forgotten_count(
+    model,
+    name
+):
+    """その持ち物を忘れた回数（重みをかけない回数）。"""
+
+    item = model["items"].get(
+        item_key(name)
+    )
+
+    return item["count"] if item else 0
+
+
+def forgotten_counts(model):
+    """{持ち物名: 忘れた回数}。"""
+
+    return {
+        item["name"]: item["count"]
+        for item in model["items"].values()
+    }
+
+
+def likelihood(
+    model,
+    name,
+    kind,
+    today=None
+):
+    """種類 kind のおでかけで、その持ち物を忘れる見込み（0〜1）。"""
+
+    item = model["items"].get(
+        item_key(name)
+    )
+
+    if not item:
+        return 0.0
+
+    day = day_number(today or date.today())
+
+    overall = decayed(item["all"], day) / max(
+        decayed(model["uses_all"], day),
+        1.0
+    )
+
+    kind_forgotten = decayed(
+        item["kinds"].get(kind, [0.0, day]),
+        day
+    )
+
+    kind_uses = decayed(
+        model["uses"].get(kind, [0.0, day]),
+        day
+    )
+
+    return min(
+        (kind_forgotten + PRIOR_WEIGHT * overall)
+        / (kind_uses + PRIOR_WEIGHT),
+        1.0
+    )
+
+
+def rank_items(
+    model,
+    kind,
+    today=None,
+    limit=None,
+    min_likelihood=0.0
+):
+    """忘れやすい順の [{"name", "likelihood", "count"}, ...]。"""
+
+    ranked = []
+
+    for item in model["items"].values():
+        value = likelihood(
+            model,
+            item["name"],
+            kind,
+            today
+        )
+
+        if value <= 0 or value < min_likelihood:
+            continue
+
+        ranked.append(
+            {
+                "name": item["name"],
+                "likelihood": value,
+                "count": item["count"],
+            }
+        )
+
+    ranked.sort(
+        key=lambda row: (
+            -row["likelihood"],
+            -row["count"],
+            row["name"]
+        )
+    )
+
+    return ranked[:limit] if limit else ranked
@@ -0,0 +1,440 @@
+"""お金系アプリの記録を1か所にまとめる共通の家計元帳。
+
+各アプリは自分の記録一覧を `sync_source` に渡すだけでよく、元帳は
+前回との差分だけを月ごとのファイル（data/ledger/YYYY-MM.jsonl）へ
+追記する。変更・削除も「取り消し」の行を追記するので、過去の行を
+書き換えることはない。
+
+追記と同時に、月×アプリ×収支×カテゴリの合計と件数を集計ファイルへ
+差分で反映しておく。横断の予算表示（`spend_by_category` など）は
+この集計ファイルだけを読めばよく、各アプリの JSON を読み直して
+集計し直す必要がない。
+"""
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+
+import pandas as pd
+
+from common.file_lock import file_lock, write_json_atomic
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+LEDGER_DIR = ROOT_DIR / "data" / "ledger"
+
+EXPENSE = "支出"
+INCOME = "収入"
+
+# 元帳へ書き込むアプリと表示名
+LEDGER_SOURCES = {
+    "day145_money_log": "お金つかったログ",
+    "day165_subscription_manager": "サブスク管理帳",
+    "day179_money_log": "所持金・支出ログ",
+    "day189_receipt_manager": "レシート管理帳",
+    "day232_MiniExpenseMemo": "今いくら使った？",
+}
+
+ENTRY_COLUMNS = [
+    "source",
+    "id",
+    "date",
+    "kind",
+    "category",
+    "amount",
+    "title",
+]
+
+# (パス) -> ((更新時刻, サイズ), 読み込んだ内容)。同じファイルを何度も読み直さない
+_read_cache = {}
+
+
+def index_path(ledger_dir=LEDGER_DIR):
+    return Path(ledger_dir) / "index.json"
+
+
+def aggregate_path(ledger_dir=LEDGER_DIR):
+    return Path(ledger_dir) / "aggregates.json"
+
+
+def month_path(
+    month,
+    ledger_dir=LEDGER_DIR
+):
+    return Path(ledger_dir) / f"{month}.jsonl"
+
+
+def make_entry(
+    entry_id,
+    entry_date,
+    amount,
+    category,
+    kind=EXPENSE,
+    title=""
+):
+    """元帳の1行を作る。日付は YYYY-MM-DD の文字列にそろえる。"""
+
+    return {
+        "id": str(entry_id),
+        "date": str(entry_date)[:10],
+        "kind": kind,
+        "category": category or "その他",
+        "amount": int(amount),
+        "title": title or "",
+    }
+
+
+def read_json(
+    path,
+    default
+):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    except (OSError, ValueError):
+        return default
+
+
+def cached_read(
+    path,
+    loader
+):
+    """ファイルの更新時刻が変わっていなければ前回読んだ内容を返す。"""
+
+    try:
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+    except OSError:
+        version = None
+
+    cached = _read_cache.get(str(path))
+
+    if cached and cached[0] == version:
+        return cached[1]
+
+    value = loader(path)
+    _read_cache[str(path)] = (version, value)
+
+    return value
+
+
+def create_aggregates():
+    return {
+        "months": {},
+        "counts": {},
+    }
+
+
+def apply_aggregate(
+    aggregates,
+    source,
+    entry,
+    sign
+):
+    """1行分の金額と件数を集計へ足す（sign=-1 で差し引く）。"""
+
+    month = entry["date"][:7]
+
+    kinds = aggregates["months"].setdefault(month, {}).setdefault(source, {})
+    categories = kinds.setdefault(entry["kind"], {})
+
+    total, count = categories.get(entry["category"], [0, 0])
+    total += sign * entry["amount"]
+    count += sign
+
+    if count > 0:
+        categories[entry["category"]] = [total, count]
+    else:
+        categories.pop(entry["category"], None)
+
+        if not categories:
+            del kinds[entry["kind"]]
+
+        if not kinds:
+            del aggregates["months"][month][source]
+
+        if not aggregates["months"][month]:
+            del aggregates["months"][month]
+
+    aggregates["counts"][source] = aggregates["counts"].get(source, 0) + sign
+
+
+def sync_source(
+    source,
+    entries,
+    remove_missing=True,
+    ledger_dir=LEDGER_DIR
+):
+    """アプリの記録一覧と元帳を突き合わせ、変わった分だけ追記する。
+
+    remove_missing=False のときは、一覧から消えた記録も元帳に残す
+    （解約したサブスクの過去の支払いなど）。追記した行数を返す。
+    """
+
+    entries = {
+        entry["id"]: entry
+        for entry in entries
+    }
+
+    with file_lock(index_path(ledger_dir)):
+        index = read_json(index_path(ledger_dir), {})
+        known = index.setdefault(source, {})
+
+        aggregates = read_json(
+            aggregate_path(ledger_dir),
+            create_aggregates()
+        )
+
+        events = defaultdict(list)
+
+        for entry_id, old in list(known.items()):
+            new = entries.get(entry_id)
+
+            if new == old or (new is None and not remove_missing):
+                continue
+
+            events[old["date"][:7]].append({
+                "op": "delete",
+                "source": source,
+                "id": entry_id,
+            })
+
+            apply_aggregate(aggregates, source, old, -1)
+            del known[entry_id]
+
+        for entry_id, entry in entries.items():
+            if entry_id in known:
+                continue
+
+            events[entry["date"][:7]].append({
+                "op": "put",
+                "source": source,
+                **entry,
+            })
+
+            apply_aggregate(aggregates, source, entry, 1)
+            known[entry_id] = entry
+
+        if not events:
+            return 0
+
+        os.makedirs(ledger_dir, exist_ok=True)
+
+        for month, month_events in events.items():
+            with open(month_path(month, ledger_dir), "a", encoding="utf-8") as file:
+                for event in month_events:
+                    file.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+        write_json_atomic(aggregate_path(ledger_dir), aggregates)
+        write_json_atomic(index_path(ledger_dir), index)
+
+    return sum(len(month_events) for month_events in events.values())
+
+
+def ensure_source(
+    source,
+    entries,
+    remove_missing=True,
+    ledger_dir=LEDGER_DIR
+):
+    """アプリの記録に元帳にない ID があれば同期し直す。
+
+    remove_missing=True なら、元帳にだけ残っている記録があるときも同期する。
+    件数だけでは、解約したサブスクの支払いが残っているときなどに
+    新しい記録を見落とすので、ID で確かめる。索引ファイルは更新時刻が
+    変わるまで読み直さないので、読み込みのたびに呼んでもよい。
+    初めて元帳を使うときの取り込みも兼ねる。
+    """
+
+    known = load_index(ledger_dir).get(source, {})
+    ids = {entry["id"] for entry in entries}
+
+    if ids <= known.keys() and (not remove_missing or len(ids) == len(known)):
+        return 0
+
+    return sync_source(
+        source,
+        entries,
+        remove_missing=remove_missing,
+        ledger_dir=ledger_dir
+    )
+
+
+def load_index(ledger_dir=LEDGER_DIR):
+    return cached_read(
+        index_path(ledger_dir),
+        lambda path: read_json(path, {})
+    )
+
+
+def load_aggregates(ledger_dir=LEDGER_DIR):
+    return cached_read(
+        aggregate_path(ledger_dir),
+        lambda path: read_json(path, create_aggregates())
+    )
+
+
+def spend_by_category(
+    start_month=None,
+    end_month=None,
+    sources=None,
+    kind=EXPENSE,
+    ledger_dir=LEDGER_DIR
+):
+    """月×カテゴリの合計額の表を返す（行＝月、列＝カテゴリ）。
+
+    集計ファイルだけから作るので、記録が何件あっても月数×カテゴリ数の
+    手間で済む。start_month / end_month は "YYYY-MM"（両端を含む）。
+    """
+
+    rows = []
+
+    for month, by_source in load_aggregates(ledger_dir)["months"].items():
+        if start_month and month < start_month:
+            continue
+
+        if end_month and month > end_month:
+            continue
+
+        for source, kinds in by_source.items():
+            if sources is not None and source not in sources:
+                continue
+
+            for category, (total, _) in kinds.get(kind, {}).items():
+                rows.append((month, category, total))
+
+    if not rows:
+        return pd.DataFrame()
+
+    table = (
+        pd.DataFrame(rows, columns=["month", "category", "amount"])
+        .pivot_table(
+            index="month",
+            columns="category",
+            values="amount",
+            aggfunc="sum",
+            fill_value=0
+        )
+        .sort_index()
+    )
+
+    return table[table.sum().sort_values(ascending=False).index]
+
+
+def monthly_totals(
+    start_month=None,
+    end_month=None,
+    sources=None,
+    kind=EXPENSE,
+    ledger_dir=LEDGER_DIR
+):
+    """月ごとの合計額を返す。"""
+
+    table = spend_by_category(
+        start_month,
+        end_month,
+        sources,
+        kind,
+        ledger_dir
+    )
+
+    if table.empty:
+        return pd.Series(dtype="int64")
+
+    return table.sum(axis=1)
+
+
+def source_totals(
+    month,
+    kind=EXPENSE,
+    ledger_dir=LEDGER_DIR
+):
+    """指定した月の、アプリごとの合計額を返す。"""
+
+    by_source = load_aggregates(ledger_dir)["months"].get(month, {})
+
+    return {
+        source: sum(
+            total
+            for total, _ in kinds.get(kind, {}).values()
+        )
+        for source, kinds in by_source.items()
+        if kinds.get(kind)
+    }
+
+
+def replay_month(path):
+    """追記された行を先頭から適用し、いま有効な行を列ごとの表にする。"""
+
+    live = {}
+
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+
+                event = json.loads(line)
+                key = (event["source"], event["id"])
+
+                if event["op"] == "delete":
+                    live.pop(key, None)
+                else:
+                    live[key] = event
+
+    except OSError:
+        pass
+
+    return pd.DataFrame(
+        {
+            column: [event[column] for event in live.values()]
+            for column in ENTRY_COLUMNS
+        }
+    )
+
+
+def read_month(
+    month,
+    sources=None,
+    ledger_dir=LEDGER_DIR
+):
+    """1か月分の明細を返す。"""
+
+    table = cached_read(
+        month_path(month, ledger_dir),
+        replay_month
+    )
+
+    if sources is not None:
+        table = table[table["source"].isin(sources)]
+
+    return table
+
+
+def compact_month(
+    month,
+    ledger_dir=LEDGER_DIR
+):
+    """取り消された行を除いて月のファイルを書き直す。"""
+
+    with file_lock(index_path(ledger_dir)):
+        table = replay_month(month_path(month, ledger_dir))
+        temp_path = f"{month_path(month, ledger_dir)}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for row in table.to_dict(orient="records"):
+                row["amount"] = int(row["amount"])
+
+                file.write(
+                    json.dumps(
+                        {"op": "put", **row},
+                        ensure_ascii=False
+                    )
+                    + "\n"
+                )
+
+        os.replace(temp_path, month_path(month, ledger_dir))
@@ -0,0 +1,325 @@
+"""予定・誕生日などの「次にいつ来るか」をまとめて計算する共通処理。
+
+日付（YYYY-MM-DD）・繰り返し・時刻の列を一度だけ読み、通日（date.toordinal）の
+NumPy 配列にして、次回日・今日からの日数・並び順を配列の演算でまとめて求める。
+
+結果はキー（各アプリのデータファイル）ごとに持ち、日付が変わるか、
+記録の日付・繰り返し・時刻が変わるまでは計算し直さない。
+1件だけ引くときは、表の値が今の記録と一致しているかを確かめてから使い、
+表にない・食い違う記録だけをその場で1行ぶん計算する。
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+REPEAT_NONE = "繰り返しなし"
+
+REPEAT_YEARLY = "毎年"
+
+REPEAT_MONTHLY = "毎月"
+
+REPEAT_WEEKLY = "毎週"
+
+REPEAT_CODES = {
+    REPEAT_NONE: 0,
+    REPEAT_YEARLY: 1,
+    REPEAT_MONTHLY: 2,
+    REPEAT_WEEKLY: 3,
+}
+
+# 日付が読めない記録の次回日（並び順では最後になる）
+NO_DAY = np.iinfo(np.int64).max // 2
+
+MINUTES_PER_DAY = 24 * 60
+
+# 1970-01-01 の通日（NumPy の日付は1970年からの日数）
+EPOCH = date(1970, 1, 1).toordinal()
+
+# キー -> 計算済みの表
+_tables = {}
+
+
+def parse_days(date_texts):
+    """YYYY-MM-DD の列を1970年からの日数にする。読めない日付は NO_DAY。"""
+
+    parsed = pd.to_datetime(
+        pd.Series(date_texts, dtype=object),
+        format="%Y-%m-%d",
+        errors="coerce"
+    )
+
+    days = parsed.to_numpy().astype("datetime64[D]").astype(np.int64)
+
+    return np.where(
+        parsed.isna().to_numpy(),
+        NO_DAY,
+        days
+    )
+
+
+def parse_minutes(time_texts):
+    """HH:MM の列をその日の0時からの分にする。空・読めない時刻は 0。"""
+
+    parsed = pd.to_datetime(
+        pd.Series(time_texts, dtype=object),
+        format="%H:%M",
+        errors="coerce"
+    )
+
+    return (
+        parsed.dt.hour.fillna(0) * 60
+        + parsed.dt.minute.fillna(0)
+    ).to_numpy(dtype=np.int64)
+
+
+def month_start(
+    years,
+    months
+):
+    """年・月の配列から、その月の1日（1970年からの日数）を求める。"""
+
+    return (
+        ((years - 1970) * 12 + months - 1)
+        .astype("datetime64[M]")
+        .astype("datetime64[D]")
+        .astype(np.int64)
+    )
+
+
+def clamp_day(
+    years,
+    months,
+    days
+):
+    """年・月・日の配列を日付にする。月末を超える日は月末にそろえる（2/29 → 2/28）。"""
+
+    start = month_start(years, months)
+
+    length = month_start(
+        years + (months == 12),
+        months % 12 + 1
+    ) - start
+
+    return start + np.minimum(days, length) - 1
+
+
+def next_days(
+    days,
+    repeats,
+    today
+):
+    """元の日付と繰り返しの配列から、今日以降の次回日（1970年からの日数）を求める。"""
+
+    valid = days != NO_DAY
+    safe_days = np.where(valid, days, 0)
+
+    parts = safe_days.astype("datetime64[D]")
+    years = parts.astype("datetime64[Y]").astype(np.int64) + 1970
+    months = parts.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    month_days = (parts - parts.astype("datetime64[M]")).astype(np.int64) + 1
+
+    today_day = today.toordinal() - EPOCH
+    this_year = np.full_like(years, today.year)
+    this_month = np.full_like(months, today.month)
+
+    yearly = clamp_day(this_year, months, month_days)
+    yearly = np.where(
+        yearly < today_day,
+        clamp_day(this_year + 1, months, month_days),
+        yearly
+    )
+
+    monthly = clamp_day(this_year, this_month, month_days)
+    monthly = np.where(
+        monthly < today_day,
+        clamp_day(
+            this_year + (today.month == 12),
+            this_month % 12 + 1,
+            month_days
+        ),
+        monthly
+    )
+
+    # 1970-01-01 は木曜日（月曜日=0 で 3）
+    weekly = today_day + (
+        (safe_days + 3) % 7
+        - (today_day + 3) % 7
+    ) % 7
+
+    result = np.select(
+        [
+            repeats == REPEAT_CODES[REPEAT_YEARLY],
+            repeats == REPEAT_CODES[REPEAT_MONTHLY],
+            repeats == REPEAT_CODES[REPEAT_WEEKLY],
+        ],
+        [
+            yearly,
+            monthly,
+            weekly,
+        ],
+        default=safe_days
+    )
+
+    return np.where(valid, result, NO_DAY)
+
+
+def build_occurrences(
+    ids,
+    dates,
+    repeats=None,
+    times=None,
+    today=None
+):
+    """記録の列から、次回日・日数・並び順の表を作る。"""
+
+    today = today or date.today()
+    count = len(ids)
+
+    repeats = list(repeats) if repeats is not None else [REPEAT_NONE] * count
+    times = list(times) if times is not None else [""] * count
+
+    repeat_codes = np.array(
+        [
+            REPEAT_CODES.get(repeat, 0)
+            for repeat in repeats
+        ],
+        dtype=np.int64
+    )
+
+    days = next_days(
+        parse_days(dates),
+        repeat_codes,
+        today
+    )
+
+    valid = days != NO_DAY
+    minutes = parse_minutes(times)
+
+    # 次回日時の早い順。日付が読めない記録は最後（元の並びのまま）
+    sort_values = np.where(
+        valid,
+        days * MINUTES_PER_DAY + minutes,
+        NO_DAY
+    )
+
+    order = np.argsort(
+        sort_values,
+        kind="stable"
+    )
+
+    return {
+        "today": today.toordinal(),
+        "signature": (
+            tuple(ids),
+            tuple(dates),
+            tuple(repeats),
+            tuple(times),
+        ),
+        "rows": {
+            record_id: index
+            for index, record_id in enumerate(ids)
+        },
+        "valid": valid,
+        "next": np.where(valid, days + EPOCH, NO_DAY),
+        "days": np.where(valid, days - (today.toordinal() - EPOCH), NO_DAY),
+        "sort_values": sort_values,
+        "order": order,
+    }
+
+
+def sync_occurrences(
+    key,
+    ids,
+    dates,
+    repeats=None,
+    times=None,
+    today=None
+):
+    """キーごとの表を返す。日付と記録が前回と同じなら作り直さない。"""
+
+    today = today or date.today()
+    count = len(ids)
+
+    signature = (
+        tuple(ids),
+        tuple(dates),
+        tuple(repeats) if repeats is not None else (REPEAT_NONE,) * count,
+        tuple(times) if times is not None else ("",) * count,
+    )
+
+    table = _tables.get(key)
+
+    if (
+        table
+        and table["today"] == today.toordinal()
+        and table["signature"] == signature
+    ):
+        return table
+
+    table = build_occurrences(
+        *signature,
+        today=today
+    )
+
+    _tables[key] = table
+
+    return table
+
+
+def find_occurrence(
+    key,
+    record_id,
+    date_text,
+    repeat=REPEAT_NONE,
+    time_text="",
+    today=None
+):
+    """1件の（次回日の通日, 今日からの日数, 並べ替えの値）。日付が読めなければ None。
+
+    キーの表にあって、日付・繰り返し・時刻が今の記録と同じならその値を使う。
+    """
+
+    today = today or date.today()
+    table = _tables.get(key)
+    row = table["rows"].get(record_id) if table else None
+
+    if (
+        row is None
+        or table["today"] != today.toordinal()
+        or table["signature"][1][row] != date_text
+        or table["signature"][2][row] != repeat
+        or table["signature"][3][row] != time_text
+    ):
+        table = build_occurrences(
+            [record_id],
+            [date_text],
+            [repeat],
+            [time_text],
+            today
+        )
+
+        row = 0
+
+    if not table["valid"][row]:
+        return None
+
+    return (
+        int(table["next"][row]),
+        int(table["days"][row]),
+        int(table["sort_values"][row]),
+    )
+
+
+def ordered_records(
+    table,
+    records
+):
+    """表を作った記録の一覧を、次回日時の早い順に並べ替える。"""
+
+    return [
+        records[index]
+        for index in table["order"]
+    ]
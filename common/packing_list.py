@@ -0,0 +1,275 @@
+"""持ち物リストを「テンプレートとの差分」とチェックのビット列で保存する共通処理。
+
+テンプレートから作ったリスト（おでかけ、複製したテンプレート）は、持ち物を
+丸ごと写さずに、元のテンプレートの ID と差分だけを保存する。
+
+- removed: 元の持ち物のうち、このリストにはないもの
+- overrides: 元の持ち物から書き換えた項目
+- items: 元にない、このリストで足した持ち物
+
+メモリ上では各リストが持ち物をすべて持ち、差分は保存するときに
+元のテンプレートと見比べて作る。元のテンプレートが後から変わっても、
+次の保存で差分が作り直されるので、作ったリストの中身は変わらない。
+
+チェック状態は「並び順で i 番目の持ち物 = i ビット目」の整数で持つ。
+チェック・全部外す・全部付ける・数えるは整数の演算で済み、チェックだけの
+変更は小さな別ファイルに書くので、テンプレートを含む保存ファイルは書き直さない。
+"""
+
+import json
+import os
+
+from common.file_lock import write_json_atomic
+
+
+# リストごとの状態で、差分や保存ファイルには入れない項目
+STATE_FIELDS = (
+    "checked",
+    "forgotten",
+)
+
+
+def item_key(
+    item,
+    fields
+):
+    """持ち物の中身（fields の値）を比べるためのキー。"""
+
+    return tuple(
+        item.get(field)
+        for field in fields
+    )
+
+
+def link_items(
+    items,
+    base_items,
+    fields
+):
+    """先頭から元の持ち物と同じ中身が並んでいる分を、元の持ち物の ID にそろえる。
+
+    古いデータ（持ち物を丸ごと写していたころ）を差分で保存できるようにする。
+    元の持ち物の一部が外されていてもよい。そろえた件数を返す。
+    """
+
+    position = 0
+    linked = 0
+
+    for base_item in base_items:
+        if position >= len(items):
+            break
+
+        if item_key(items[position], fields) == item_key(base_item, fields):
+            items[position]["id"] = base_item["id"]
+            position += 1
+            linked += 1
+
+    return linked
+
+
+def split_items(
+    items,
+    base_items,
+    fields
+):
+    """持ち物を（元との差分, このリストで足した持ち物）に分ける。
+
+    先頭から、元の持ち物と同じ順番で並んでいる ID の分を「元から来た持ち物」とみなす。
+    """
+
+    base_positions = {
+        item.get("id"): index
+        for index, item in enumerate(base_items)
+    }
+
+    shared = {}
+    last_position = -1
+    count = 0
+
+    for item in items:
+        position = base_positions.get(item.get("id"))
+
+        if position is None or position <= last_position:
+            break
+
+        shared[item["id"]] = item
+        last_position = position
+        count += 1
+
+    overrides = {}
+
+    for base_item in base_items:
+        item = shared.get(base_item.get("id"))
+
+        if not item:
+            continue
+
+        changed = {
+            field: item.get(field)
+            for field in fields
+            if item.get(field) != base_item.get(field)
+        }
+
+        if changed:
+            overrides[base_item["id"]] = changed
+
+    removed = [
+        item.get("id")
+        for item in base_items
+        if item.get("id") not in shared
+    ]
+
+    return (
+        {
+            "removed": removed,
+            "overrides": overrides,
+        },
+        [
+            stored_item(item)
+            for item in items[count:]
+        ]
+    )
+
+
+def resolve_items(
+    base_items,
+    diff,
+    own_items
+):
+    """元の持ち物に差分を当て、足した持ち物を後ろに並べる（どれもコピー）。"""
+
+    removed = set(diff.get("removed", []))
+    overrides = diff.get("overrides", {})
+
+    items = [
+        {
+            **item,
+            **overrides.get(item.get("id"), {}),
+        }
+        for item in base_items
+        if item.get("id") not in removed
+    ]
+
+    items.extend(
+        dict(item)
+        for item in own_items
+    )
+
+    return items
+
+
+def stored_item(item):
+    """保存ファイルに書く持ち物（チェックなどの状態を除く）。"""
+
+    return {
+        key: value
+        for key, value in item.items()
+        if key not in STATE_FIELDS
+    }
+
+
+# =====================================
+# チェック状態のビット列
+# =====================================
+
+def bits_from_flags(items):
+    """持ち物の checked からビット列を作る。"""
+
+    bits = 0
+
+    for index, item in enumerate(items):
+        if item.get("checked", False):
+            bits |= 1 << index
+
+    return bits
+
+
+def apply_bits(
+    items,
+    bits
+):
+    """ビット列を持ち物の checked に写す。"""
+
+    for index, item in enumerate(items):
+        item["checked"] = bool(bits >> index & 1)
+
+
+def set_bit(
+    bits,
+    index,
+    checked
+):
+    """index 番目のチェックを付ける・外す。"""
+
+    if checked:
+        return bits | 1 << index
+
+    return bits & ~(1 << index)
+
+
+def remove_bit(
+    bits,
+    index
+):
+    """index 番目の持ち物を消したあとのビット列（後ろを1つ詰める）。"""
+
+    low = bits & ((1 << index) - 1)
+
+    return low | (bits >> (index + 1)) << index
+
+
+def full_bits(count):
+    """count 件すべてにチェックを付けたビット列。"""
+
+    return (1 << count) - 1
+
+
+def count_bits(bits):
+    """チェック済みの数。"""
+
+    return bin(bits).count("1")
+
+
+def load_checks(path):
+    """チェック状態のファイルを {リストID: ビット列} で読む。"""
+
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(
+            path,
+            "r",
+            encoding="utf-8"
+        ) as file:
+            stored = json.load(file)
+
+        return {
+            list_id: int(text, 16)
+            for list_id, text in stored.items()
+        }
+
+    except (
+        json.JSONDecodeError,
+        OSError,
+        ValueError,
+        AttributeError,
+        TypeError
+    ):
+        return {}
+
+
+def save_checks(
+    path,
+    checks
+):
+    """チェック状態を16進の文字列で保存する（チェックのないリストは書かない）。"""
+
+    write_json_atomic(
+        path,
+        {
+            list_id: format(bits, "x")
+            for list_id, bits in checks.items()
+            if bits
+        }
+    )
@@ -0,0 +1,159 @@
+"""1日1件の記録の、月ごと・年ごとの平均を保存しておく共通処理。
+
+期間ごとに [合計, 件数] を持ち、記録を保存・削除したときにその1件の分だけを
+足し引きする。グラフは期間の数（月なら年に12点）だけの点から作るので、
+記録が何年分あっても再実行のたびに全件を集計し直さない。
+
+全体を数え直すのは、集計がないとき・形式が変わったとき・件数が記録と
+合わないとき（ファイルを手で直したときなど）だけ。
+"""
+
+import pandas as pd
+
+
+SUMMARY_VERSION = 1
+
+# 期間 -> (YYYY-MM-DD の先頭何文字で区切るか, 日付の書式)
+PERIOD_FORMATS = {
+    "month": (7, "%Y-%m"),
+    "year": (4, "%Y"),
+}
+
+
+def create_summaries():
+    """空の集計を作る。"""
+
+    return {
+        "version": SUMMARY_VERSION,
+        "count": 0,
+        "periods": {
+            period: {}
+            for period in PERIOD_FORMATS
+        },
+    }
+
+
+def add_value(
+    summaries,
+    date_text,
+    value,
+    sign=1
+):
+    """1件の値を、その日を含む各期間に足す（sign=-1 で引く）。"""
+
+    date_text = str(date_text)
+
+    if len(date_text) < 10:
+        return
+
+    summaries["count"] += sign
+
+    for period, (length, _) in PERIOD_FORMATS.items():
+        buckets = summaries["periods"][period]
+        key = date_text[:length]
+
+        bucket = buckets.setdefault(
+            key,
+            [0, 0]
+        )
+
+        bucket[0] += sign * int(value)
+        bucket[1] += sign
+
+        if bucket[1] <= 0:
+            del buckets[key]
+
+
+def remove_value(
+    summaries,
+    date_text,
+    value
+):
+    """1件の値を、その日を含む各期間から引く。"""
+
+    add_value(
+        summaries,
+        date_text,
+        value,
+        sign=-1
+    )
+
+
+def build_summaries(
+    records,
+    value_key,
+    date_key="date"
+):
+    """記録全体から集計を作り直す。"""
+
+    summaries = create_summaries()
+
+    for record in records:
+        add_value(
+            summaries,
+            record.get(date_key, ""),
+            record.get(value_key, 0)
+        )
+
+    return summaries
+
+
+def ensure_summaries(
+    data,
+    records,
+    value_key,
+    date_key="date"
+):
+    """data["summaries"] が使えるか確かめ、使えなければ作り直す。作り直したら True。"""
+
+    summaries = data.get("summaries")
+
+    if (
+        isinstance(summaries, dict)
+        and summaries.get("version") == SUMMARY_VERSION
+        and summaries.get("count") == sum(
+            1
+            for record in records
+            if len(str(record.get(date_key, ""))) >= 10
+        )
+    ):
+        return False
+
+    data["summaries"] = build_summaries(
+        records,
+        value_key,
+        date_key
+    )
+
+    return True
+
+
+def summary_series(
+    summaries,
+    period
+):
+    """期間ごとの平均を、期間の初日を横軸にした Series で返す。"""
+
+    _, date_format = PERIOD_FORMATS[period]
+    buckets = summaries["periods"][period]
+
+    keys = sorted(buckets)
+
+    index = pd.to_datetime(
+        keys,
+        format=date_format,
+        errors="coerce"
+    )
+
+    series = pd.Series(
+        [
+            buckets[key][0] / buckets[key][1]
+            for key in keys
+        ],
+        index=index,
+        dtype=float
+    )
+
+    return series[
+        series.index.notna()
+    ]
@@ -0,0 +1,200 @@
+"""貯金の見込みを、たくさんのシナリオでまとめて試算する共通処理。
+
+毎週の積立額のばらつき・積み立てを休む週・利息・サブスク代の
+差し引きを乱数で試し、(シナリオ, 週) の NumPy 配列で残高を一度に
+計算する。目標に届く週の分布から、達成日の目安を幅で返す。
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+
+WEEKS_PER_YEAR = 52
+WEEKS_PER_MONTH = WEEKS_PER_YEAR / 12
+
+DEFAULT_SCENARIOS = 2000
+DEFAULT_HORIZON_WEEKS = 10 * WEEKS_PER_YEAR
+
+PERCENTILES = [
+    10,
+    50,
+    90,
+]
+
+
+def weekly_deposit_stats(
+    dated_amounts,
+    weeks=12,
+    today=None
+):
+    """直近 weeks 週の記録から、1週間あたりの平均額と標準偏差を返す。
+
+    記録のない週は0円の週として数える。
+    """
+
+    today = today or date.today()
+    start = today - timedelta(days=weeks * 7 - 1)
+
+    totals = np.zeros(weeks)
+
+    for record_date, amount in dated_amounts:
+        if record_date is None or not start <= record_date <= today:
+            continue
+
+        totals[(record_date - start).days // 7] += amount
+
+    return (
+        float(totals.mean()),
+        float(totals.std())
+    )
+
+
+def simulate_savings(
+    current_amount,
+    target_amount,
+    weekly_mean,
+    weekly_std=0.0,
+    annual_rate=0.0,
+    miss_rate=0.0,
+    weekly_cost=0.0,
+    horizon_weeks=DEFAULT_HORIZON_WEEKS,
+    scenarios=DEFAULT_SCENARIOS,
+    seed=0
+):
+    """貯金残高の推移をシナリオごとにまとめて計算する。
+
+    週 t の残高は b_t = g * b_(t-1) + d_t（g は週あたりの利率）なので、
+    b_t = g^t * (b_0 + Σ d_s * g^-(s+1)) として累積和1回で求める。
+    戻り値の weeks_to_goal は目標に届いた週数で、届かなければ
+    horizon_weeks + 1 になる。
+    """
+
+    generator = np.random.default_rng(seed)
+
+    deposits = np.maximum(
+        generator.normal(
+            weekly_mean,
+            weekly_std,
+            size=(scenarios, horizon_weeks)
+        ),
+        0
+    )
+
+    if miss_rate > 0:
+        deposits *= (
+            generator.random(
+                (scenarios, horizon_weeks)
+            ) >= miss_rate
+        )
+
+    deposits -= weekly_cost
+
+    growth = (1 + annual_rate) ** (1 / WEEKS_PER_YEAR)
+    steps = np.arange(1, horizon_weeks + 1)
+    discount = growth ** -steps.astype(float)
+
+    balances = (
+        current_amount
+        + np.cumsum(deposits * discount, axis=1)
+    ) / discount
+
+    reached = balances >= target_amount
+    reached_any = reached.any(axis=1)
+
+    weeks_to_goal = np.where(
+        reached_any,
+        reached.argmax(axis=1) + 1,
+        horizon_weeks + 1
+    )
+
+    if current_amount >= target_amount:
+        weeks_to_goal[:] = 0
+
+    return {
+        "horizon_weeks": horizon_weeks,
+        "weeks_to_goal": weeks_to_goal,
+        "balance_percentiles": np.percentile(
+            balances,
+            PERCENTILES,
+            axis=0
+        )
+    }
+
+
+def completion_dates(
+    result,
+    start_date=None,
+    percentiles=PERCENTILES
+):
+    """達成週の分布から、パーセンタイルごとの達成日を返す。
+
+    試算期間内に届かないパーセンタイルは None になる。
+    """
+
+    start_date = start_date or date.today()
+
+    dates = []
+
+    for weeks in np.percentile(
+        result["weeks_to_goal"],
+        percentiles,
+        method="higher"
+    ):
+        if weeks > result["horizon_weeks"]:
+            dates.append(None)
+            continue
+
+        dates.append(
+            start_date
+            + timedelta(weeks=int(np.ceil(weeks)))
+        )
+
+    return dates
+
+
+def reach_probability(
+    result,
+    deadline,
+    start_date=None
+):
+    """期限までに目標へ届くシナリオの割合を返す。"""
+
+    start_date = start_date or date.today()
+
+    weeks = (deadline - start_date).days / 7
+
+    return float(
+        (result["weeks_to_goal"] <= weeks).mean()
+    )
+
+
+def percentile_frame_rows(
+    balance_percentiles,
+    start_date=None,
+    step_weeks=4
+):
+    """残高のパーセンタイル推移を、グラフ用の行リストにする。"""
+
+    start_date = start_date or date.today()
+
+    rows = []
+
+    for week in range(
+        0,
+        balance_percentiles.shape[1],
+        step_weeks
+    ):
+        row = {
+            "日付": start_date + timedelta(weeks=week + 1)
+        }
+
+        for percentile, values in zip(
+            PERCENTILES,
+            balance_percentiles
+        ):
+            row[f"{percentile}%"] = int(values[week])
+
+        rows.append(row)
+
+    return rows
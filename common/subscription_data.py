@@ -0,0 +1,82 @@
+"""サブスク管理帳（Day165）の保存場所と月額換算を、ほかのアプリと共有する。
+
+Day165 は起動したフォルダの data/ に保存するので、ほかのアプリからは
+どこにあるか決まらない。ありそうな場所を順に探し、見つからなければ
+None を返して、呼び出し側で「見つからない」と表示できるようにする。
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Day165 自身が使う保存先（起動したフォルダからの相対パス）
+SUBSCRIPTION_DATA_DIR = "data"
+
+SUBSCRIPTION_DATA_PATH = os.path.join(
+    SUBSCRIPTION_DATA_DIR,
+    "day165_subscription_manager.json"
+)
+
+SUBSCRIPTION_APP_DIR = ROOT_DIR / "day165_subscription_manager"
+
+
+def monthly_cost(sub):
+    """1件の料金の月額換算。年払い・数か月ごとの料金はサイクルの月数で割る。"""
+
+    return int(sub.get("price", 0)) / max(1, int(sub.get("cycle_months", 1)))
+
+
+def subscription_data_paths():
+    """Day165 の保存ファイルがありそうな場所（今のフォルダ・Day165 のフォルダ・リポジトリ直下）。"""
+
+    paths = []
+
+    for base in [Path.cwd(), SUBSCRIPTION_APP_DIR, ROOT_DIR]:
+        path = (base / SUBSCRIPTION_DATA_PATH).resolve()
+
+        if path not in paths:
+            paths.append(path)
+
+    return paths
+
+
+def find_subscription_data():
+    """見つかった保存ファイルのうち、いちばん新しく保存されたもの。なければ None。"""
+
+    found = [
+        path
+        for path in subscription_data_paths()
+        if path.is_file()
+    ]
+
+    if not found:
+        return None
+
+    return max(found, key=lambda path: path.stat().st_mtime_ns)
+
+
+def load_subscription_monthly_cost(path=None):
+    """登録されたサブスクの月額換算の合計。保存ファイルが見つからない・読めなければ None。"""
+
+    path = path or find_subscription_data()
+
+    if path is None:
+        return None
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            subs = json.load(f).get("subs", [])
+
+    except (OSError, ValueError, AttributeError):
+        return None
+
+    return round(
+        sum(
+            monthly_cost(sub)
+            for sub in subs
+            if isinstance(sub, dict)
+        )
+    )
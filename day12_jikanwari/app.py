@@ -2,11 +2,15 @@ import streamlit as st
 from datetime import datetime, timedelta, time
 import pandas as pd
 
+from scheduler import PRIORITY_WEIGHTS, greedy_schedule, optimize_schedule
+
 st.set_page_config(page_title="今日の時間割メーカー", page_icon="⏰", layout="centered")
 
 # セッション初期化
 if "tasks" not in st.session_state:
     st.session_state.tasks = []
+if "appointments" not in st.session_state:
+    st.session_state.appointments = []
 
 st.title("⏰ 今日の時間割メーカー")
 st.write("今日やりたいことを入力して、時間内でのベストな時間割を自動で作るアプリだよ。")
@@ -14,7 +18,8 @@ st.write("今日やりたいことを入力して、時間内でのベストな
 st.sidebar.header("メニュー")
 if st.sidebar.button("🧹 ぜんぶリセット"):
     st.session_state.tasks = []
-    st.sidebar.success("タスクをリセットしたよ！")
+    st.session_state.appointments = []
+    st.sidebar.success("タスクと予定をリセットしたよ！")
 
 st.sidebar.markdown("---")
 st.sidebar.caption("※時間割はその日のうち用。保存はしないシンプル仕様だよ。")
@@ -32,14 +37,27 @@ with st.form("add_task_form"):
     with c3:
         priority = st.selectbox("優先度", ["高", "中", "低"], key="task_priority")
 
+    c6, c7, c8 = st.columns([1, 1, 1])
+    with c6:
+        earliest = st.time_input("いつから（空なら指定なし）", value=None, key="task_earliest")
+    with c7:
+        latest = st.time_input("いつまで（空なら指定なし）", value=None, key="task_latest")
+    with c8:
+        splittable = st.checkbox("分けてやってもOK", key="task_splittable")
+
     submitted = st.form_submit_button("➕ タスクを追加")
     if submitted:
-        if name.strip():
+        if earliest and latest and latest <= earliest:
+            st.warning("「いつまで」は「いつから」より後にしてね！")
+        elif name.strip():
             st.session_state.tasks.append(
                 {
                     "name": name.strip(),
                     "minutes": int(minutes),
                     "priority": priority,
+                    "earliest": earliest.strftime("%H:%M") if earliest else "",
+                    "latest": latest.strftime("%H:%M") if latest else "",
+                    "splittable": bool(splittable),
                 }
             )
             st.success(f"「{name}」を追加したよ！")
@@ -53,14 +71,54 @@ if st.session_state.tasks:
     st.subheader("📋 登録されているタスク")
 
     # DataFrame にして表示
-    df_tasks = pd.DataFrame(st.session_state.tasks)
+    df_tasks = pd.DataFrame(
+        [
+            {
+                "タスク名": t["name"],
+                "分数": t["minutes"],
+                "優先度": t["priority"],
+                "時間帯": f"{t.get('earliest') or ''}〜{t.get('latest') or ''}" if t.get("earliest") or t.get("latest") else "",
+                "分割": "OK" if t.get("splittable") else "",
+            }
+            for t in st.session_state.tasks
+        ]
+    )
     df_tasks.index = df_tasks.index + 1
-    df_tasks.columns = ["タスク名", "分数", "優先度"]
     st.table(df_tasks)
 else:
     st.info("まだタスクがないよ。上のフォームから追加してね。")
 
 
+# --- 動かせない予定 ---
+with st.expander("📌 動かせない予定（授業・ごはん・打ち合わせなど）"):
+    with st.form("add_appointment_form"):
+        a1, a2, a3 = st.columns([2, 1, 1])
+        with a1:
+            appointment_name = st.text_input("予定名", key="appointment_name")
+        with a2:
+            appointment_start = st.time_input("開始", value=time(12, 0), key="appointment_start")
+        with a3:
+            appointment_end = st.time_input("終了", value=time(13, 0), key="appointment_end")
+
+        if st.form_submit_button("📌 予定を追加"):
+            if appointment_end <= appointment_start:
+                st.warning("予定の終了は開始より後にしてね！")
+            else:
+                st.session_state.appointments.append(
+                    {
+                        "name": appointment_name.strip() or "予定",
+                        "start": appointment_start.strftime("%H:%M"),
+                        "end": appointment_end.strftime("%H:%M"),
+                    }
+                )
+
+    if st.session_state.appointments:
+        df_appointments = pd.DataFrame(st.session_state.appointments)
+        df_appointments.index = df_appointments.index + 1
+        df_appointments.columns = ["予定名", "開始", "終了"]
+        st.table(df_appointments)
+
+
 # --- 時間設定 ---
 st.subheader("2️⃣ 今日の時間帯を決める")
 
@@ -74,15 +132,32 @@ with c5:
 if end_time <= start_time:
     st.error("終了時間は開始時間より後にしてね！")
 
+c9, c10, c11 = st.columns(3)
+
+with c9:
+    break_minutes = st.number_input("タスク間の休憩（分）", min_value=0, max_value=60, step=5, value=5)
+with c10:
+    chunk_minutes = st.selectbox("分けるときの単位（分）", [15, 30, 60], index=0)
+with c11:
+    pad_appointments = st.checkbox("予定の前後にも休憩を入れる", value=True)
+
 
 # --- 時間割作成ロジック ---
 st.subheader("3️⃣ 時間割を自動で作る")
 
 make_schedule = st.button("🧮 時間割を作成")
 
-def priority_key(p: str) -> int:
-    mapping = {"高": 0, "中": 1, "低": 2}
-    return mapping.get(p, 1)
+def to_offset(text: str, start_dt: datetime) -> int | None:
+    # "HH:MM" を開始時間からの分に直す（空なら None）
+    if not text:
+        return None
+    clock = datetime.strptime(text, "%H:%M").time()
+    return int((datetime.combine(start_dt.date(), clock) - start_dt).total_seconds() // 60)
+
+
+def to_clock(offset: int, start_dt: datetime) -> str:
+    return (start_dt + timedelta(minutes=offset)).strftime("%H:%M")
+
 
 if make_schedule:
     if not st.session_state.tasks:
@@ -98,57 +173,94 @@ if make_schedule:
         available_minutes = int((end_dt - start_dt).total_seconds() // 60)
         st.write(f"利用可能な時間：**{available_minutes} 分**")
 
-        # 優先度順にソート
-        sorted_tasks = sorted(st.session_state.tasks, key=lambda x: priority_key(x["priority"]))
+        # 時刻はすべて「開始時間から何分後か」にそろえて計算する
+        tasks = [
+            {
+                **t,
+                "earliest": to_offset(t.get("earliest", ""), start_dt),
+                "latest": to_offset(t.get("latest", ""), start_dt),
+            }
+            for t in st.session_state.tasks
+        ]
+        appointments = [
+            {
+                **a,
+                "start": to_offset(a["start"], start_dt),
+                "end": to_offset(a["end"], start_dt),
+            }
+            for a in st.session_state.appointments
+        ]
+
+        result = optimize_schedule(
+            tasks,
+            available_minutes,
+            appointments,
+            break_minutes=int(break_minutes),
+            chunk_minutes=int(chunk_minutes),
+            pad_appointments=pad_appointments,
+        )
 
         schedule_rows = []
-        overflow_tasks = []
-
-        current_dt = start_dt
-        BREAK_MINUTES = 5
-
-        for t in sorted_tasks:
-            task_minutes = int(t["minutes"])
-            task_end_dt = current_dt + timedelta(minutes=task_minutes)
-
-            # 時間内に収まらないなら overflow
-            if task_end_dt > end_dt:
-                overflow_tasks.append(t)
-                continue
 
+        for block in result["blocks"]:
+            t = st.session_state.tasks[block["task"]]
             schedule_rows.append(
                 {
-                    "開始": current_dt.strftime("%H:%M"),
-                    "終了": task_end_dt.strftime("%H:%M"),
-                    "タスク名": t["name"],
-                    "分数": task_minutes,
+                    "開始": to_clock(block["start"], start_dt),
+                    "終了": to_clock(block["end"], start_dt),
+                    "タスク名": t["name"] + (f"（{block['part']}/{block['parts']}）" if block["parts"] > 1 else ""),
+                    "分数": block["minutes"],
                     "優先度": t["priority"],
                 }
             )
 
-            # 次のタスクの開始時間（5分休憩込み）
-            next_start = task_end_dt + timedelta(minutes=BREAK_MINUTES)
-            if next_start >= end_dt:
-                break
-            current_dt = next_start
-
-        if schedule_rows:
+        task_rows = len(schedule_rows)
+
+        for a in appointments:
+            if a["end"] > 0 and a["start"] < available_minutes:
+                schedule_rows.append(
+                    {
+                        "開始": to_clock(max(0, a["start"]), start_dt),
+                        "終了": to_clock(min(available_minutes, a["end"]), start_dt),
+                        "タスク名": f"📌 {a['name']}",
+                        "分数": min(available_minutes, a["end"]) - max(0, a["start"]),
+                        "優先度": "予定",
+                    }
+                )
+
+        if task_rows:
             st.success("時間割を作成したよ！")
-            df_schedule = pd.DataFrame(schedule_rows)
+            df_schedule = pd.DataFrame(schedule_rows).sort_values("開始").reset_index(drop=True)
             st.subheader("✅ 今日の時間割")
             st.dataframe(df_schedule, use_container_width=True)
 
-            total_task_minutes = sum(row["分数"] for row in schedule_rows)
+            total_task_minutes = sum(block["minutes"] for block in result["blocks"])
             st.write(f"- 実働時間：**{total_task_minutes} 分**")
-            st.write(f"- 休憩（最大）：**{max(0, (len(schedule_rows) - 1) * BREAK_MINUTES)} 分**（タスク間 5分想定）")
+            st.write(f"- 休憩（最大）：**{max(0, (task_rows - 1) * int(break_minutes))} 分**（タスク間 {int(break_minutes)}分想定）")
+            st.write(f"- 優先度ポイント（高{PRIORITY_WEIGHTS['高']}・中{PRIORITY_WEIGHTS['中']}・低{PRIORITY_WEIGHTS['低']} × 分）：**{int(result['value'])}**")
+
+            # 予定・時間帯の指定がないときは、以前の「優先度順に前から詰める」と比べられる
+            if not appointments and not any(t["earliest"] is not None or t["latest"] is not None for t in tasks):
+                greedy = greedy_schedule(tasks, available_minutes, break_minutes=int(break_minutes))
+                if result["value"] > greedy["value"]:
+                    st.caption(f"優先度順に前から詰めるだけだと {int(greedy['value'])} ポイントだったよ。")
 
         else:
             st.warning("時間内に入るタスクがなかったよ。タスクの分数か時間帯を見直してみてね。")
 
-        if overflow_tasks:
+        if result["overflow"]:
             st.subheader("⏳ 時間内に入りきらなかったタスク")
-            df_over = pd.DataFrame(overflow_tasks)
+            df_over = pd.DataFrame(
+                [
+                    {
+                        "タスク名": t["name"],
+                        "分数": t["minutes"],
+                        "残り（分）": t["left"],
+                        "優先度": t["priority"],
+                    }
+                    for t in result["overflow"]
+                ]
+            )
             df_over.index = df_over.index + 1
-            df_over.columns = ["タスク名", "分数", "優先度"]
             st.table(df_over)
             st.info("これらは明日用 or 時間延長して再調整してもいいかも！")
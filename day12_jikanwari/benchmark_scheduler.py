@@ -0,0 +1,136 @@
+import itertools
+import random
+import time
+
+from scheduler import build_items, free_gaps, greedy_schedule, optimize_schedule
+
+# 最適化した時間割と、優先度順に前から詰めるだけの時間割を比べる。
+# 前から詰めるやり方は予定や時間帯を見ないので、優先度×分の比較は
+# 予定・時間帯・分割なしのタスクで行い、時間は全部入りの条件で測る。
+# 最後に、予定で区切られた小さな1日で、全部の置き方を試した最大値と一致するかも確かめる。
+# 使い方：python benchmark_scheduler.py
+
+DAY_MINUTES = 16 * 60
+TASK_COUNTS = [20, 50, 100, 200]
+REPEAT = 5
+
+
+def make_tasks(count, seed=0, constrained=True):
+    rng = random.Random(seed)
+    tasks = []
+
+    for i in range(count):
+        task = {
+            "name": f"タスク{i + 1}",
+            "minutes": rng.choice([15, 20, 30, 45, 60, 90, 120]),
+            "priority": rng.choice(["高", "中", "低"]),
+            "splittable": constrained and rng.random() < 0.3,
+        }
+
+        # 3割くらいは「この時間帯にやる」を指定する
+        if constrained and rng.random() < 0.3:
+            earliest = rng.randrange(0, DAY_MINUTES - 120, 15)
+            task["earliest"] = earliest
+            task["latest"] = min(DAY_MINUTES, earliest + rng.choice([120, 180, 240]))
+
+        tasks.append(task)
+
+    return tasks
+
+
+APPOINTMENTS = [
+    {"name": "昼ごはん", "start": 180, "end": 240},
+    {"name": "打ち合わせ", "start": 420, "end": 480},
+    {"name": "夕ごはん", "start": 600, "end": 660},
+]
+
+
+def fits_in_gap(items, gap_start, gap_end, break_minutes):
+    # どれかの順番で、すき間の中に休憩をはさんで全部入るか
+    for order in itertools.permutations(items):
+        current = gap_start
+        for item in order:
+            start = max(current, item["earliest"])
+            if start + item["minutes"] > min(gap_end, item["latest"]):
+                break
+            current = start + item["minutes"] + break_minutes
+        else:
+            return True
+    return False
+
+
+def brute_force_value(tasks, day_minutes, appointments, break_minutes, chunk_minutes):
+    # かたまりごとに「入れない / どのすき間に入れるか」を全部試す
+    blocked = [(a["start"] - break_minutes, a["end"] + break_minutes) for a in appointments]
+    gaps = free_gaps(day_minutes, blocked)
+    items = build_items(tasks, day_minutes, chunk_minutes)
+    best = 0
+
+    for choice in itertools.product(range(len(gaps) + 1), repeat=len(items)):
+        value = sum(item["value"] for item, gap in zip(items, choice) if gap)
+        if value <= best:
+            continue
+        if all(
+            fits_in_gap([item for item, gap in zip(items, choice) if gap == number], start, end, break_minutes)
+            for number, (start, end) in enumerate(gaps, start=1)
+        ):
+            best = value
+
+    return best
+
+
+def check_against_brute_force(trials=100, seed=1):
+    # いつからの指定なし（いつまでは指定あり）なら、全部試した最大値と同じになるはず
+    rng = random.Random(seed)
+
+    for _ in range(trials):
+        day_minutes = rng.choice([90, 120, 150, 180])
+        appointments = []
+        for _ in range(rng.randint(1, 2)):
+            start = rng.randrange(10, day_minutes - 20, 5)
+            appointments.append({"start": start, "end": start + rng.choice([5, 10, 20])})
+
+        tasks = [
+            {
+                "minutes": rng.choice([10, 15, 20, 30, 45, 60]),
+                "priority": rng.choice(["高", "中", "低"]),
+                "splittable": rng.random() < 0.2,
+                "latest": rng.choice([None, None, rng.randrange(30, day_minutes + 1, 5)]),
+            }
+            for _ in range(rng.randint(2, 5))
+        ]
+
+        result = optimize_schedule(tasks, day_minutes, appointments, break_minutes=5, chunk_minutes=20)
+        expected = brute_force_value(tasks, day_minutes, appointments, 5, 20)
+
+        if result["value"] != expected:
+            return f"一致しない：{tasks} {appointments} DP={result['value']} 全探索={expected}"
+
+    return f"{trials}通り、全部の置き方を試した最大値と一致"
+
+
+def main():
+    print(f"{'タスク数':>8} | {'全条件 ms':>9} | {'最適 優先度×分':>14} {'前から詰める':>12}")
+
+    for count in TASK_COUNTS:
+        tasks = make_tasks(count)
+        timings = []
+
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            optimize_schedule(tasks, DAY_MINUTES, APPOINTMENTS, break_minutes=5, chunk_minutes=15)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        plain = make_tasks(count, constrained=False)
+        best = optimize_schedule(plain, DAY_MINUTES, break_minutes=5)
+        greedy = greedy_schedule(plain, DAY_MINUTES, break_minutes=5)
+
+        print(
+            f"{count:>8} | {min(timings):>9.1f} | {int(best['value']):>14} {int(greedy['value']):>12}"
+        )
+
+    print(check_against_brute_force())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+import math
+
+import numpy as np
+
+# 時間割を「優先度 × 分数」の合計が最大になるように組む。
+# 時刻はすべて開始時間からの分（0〜day_minutes）で扱う。
+#
+# やり方：タスクを締め切り（いつまで）の早い順に並べ、
+# dp[t] =「t分までに終わる置き方での、優先度 × 分数の最大値」を
+# 1タスクずつ更新する（分単位のナップサック DP）。
+# 各タスクは「終わる時刻 e」を全部まとめて NumPy で評価するので、
+# 200タスク × 16時間でも一瞬で終わる。
+# 締め切り順に並べるので、いつからの指定がなければ最適解になる。
+#
+# 予定で1日がいくつかのすき間に分かれるときは、並び順を1つに決めると
+# 「どのすき間に入れるか」を選べなくなる。そこで dp の状態を
+# 「すき間ごとに、どこまで埋まったか」の組にして、各タスクを入れるすき間も選ぶ。
+# すき間の中では締め切り順なので、いつからの指定がなければこれも最適解になる。
+# 状態の数 × タスク数が EXACT_DP_LIMIT を超えるときだけ、
+# 1日通しの DP と、すき間ごとに前から詰める DP のよい方を使う。
+
+PRIORITY_WEIGHTS = {"高": 3, "中": 2, "低": 1}
+
+# すき間ごとの DP で持つ状態の数 × かたまりの数の上限（途中の dp を全部持っておく）
+EXACT_DP_LIMIT = 30_000_000
+
+
+def free_run_lengths(day_minutes: int, blocked: list) -> np.ndarray:
+    # run[e] = e分の直前まで何分続けて空いているか（予定の時間は 0 に戻る）
+    free = np.ones(day_minutes, dtype=bool)
+    for start, end in blocked:
+        free[max(0, start):max(0, min(day_minutes, end))] = False
+
+    run = np.zeros(day_minutes + 1, dtype=np.int64)
+    count = 0
+    for minute in range(day_minutes):
+        count = count + 1 if free[minute] else 0
+        run[minute + 1] = count
+    return run
+
+
+def free_gaps(day_minutes: int, blocked: list) -> list:
+    # 予定で区切られた空き時間を [(開始, 終了), ...] で返す
+    run = free_run_lengths(day_minutes, blocked)
+    gaps = []
+    for end in range(1, day_minutes + 1):
+        if run[end] and (end == day_minutes or run[end + 1] == 0):
+            gaps.append((end - int(run[end]), end))
+    return gaps
+
+
+def split_task(task: dict, chunk_minutes: int) -> list:
+    # 分割OKのタスクは chunk_minutes ごとのかたまりにする（最後は残りの分）
+    minutes = int(task["minutes"])
+    if not task.get("splittable") or chunk_minutes <= 0 or minutes <= chunk_minutes:
+        return [minutes]
+
+    parts = [chunk_minutes] * (minutes // chunk_minutes)
+    if minutes % chunk_minutes:
+        parts.append(minutes % chunk_minutes)
+    return parts
+
+
+def build_items(tasks: list, day_minutes: int, chunk_minutes: int) -> list:
+    items = []
+    for index, task in enumerate(tasks):
+        earliest = max(0, int(task.get("earliest") or 0))
+        latest = min(day_minutes, int(task["latest"]) if task.get("latest") is not None else day_minutes)
+        weight = PRIORITY_WEIGHTS.get(task.get("priority"), 2)
+        parts = split_task(task, chunk_minutes)
+
+        for part_no, minutes in enumerate(parts, start=1):
+            items.append(
+                {
+                    "task": index,
+                    "part": part_no,
+                    "parts": len(parts),
+                    "minutes": minutes,
+                    "weight": weight,
+                    "value": weight * minutes,
+                    "earliest": earliest,
+                    "latest": latest,
+                }
+            )
+
+    items.sort(key=item_order)
+    return items
+
+
+def item_order(item: dict) -> tuple:
+    # 締め切りの早い順。同じならいつからが早い順、優先度の高い順。
+    # 並べた順がそのまま1日の中の順番になるので、分けたかたまりは続けて並べる
+    return (item["latest"], item["earliest"], -item["weight"], item["task"], item["part"])
+
+
+def merge_parts(blocks: list, break_minutes: int) -> list:
+    # 同じタスクのかたまりが休憩だけをはさんで続いたら、休憩なしで1つにつなげる
+    # （つなげた分だけ早く終わるので、次のかたまりとの間は元の終了時刻で比べる）
+    merged = []
+    previous_end = None
+    for block in blocks:
+        last = merged[-1] if merged else None
+        if last and last["task"] == block["task"] and block["start"] - previous_end <= break_minutes:
+            last["minutes"] += block["minutes"]
+            last["end"] = last["start"] + last["minutes"]
+        else:
+            merged.append(dict(block))
+        previous_end = block["end"]
+
+    # 何回に分けたかを、実際に入った回数で数え直す
+    counts = {}
+    for block in merged:
+        counts[block["task"]] = counts.get(block["task"], 0) + 1
+        block["part"] = counts[block["task"]]
+    for block in merged:
+        block["parts"] = counts[block["task"]]
+    return merged
+
+
+def pack_in_order(items: list, run: np.ndarray, lo: int, hi: int, break_minutes: int) -> tuple:
+    # 並べた順のまま lo〜hi 分の間に詰める1次元の DP。(優先度×分の合計, 置いたかたまり)
+    ends = np.arange(lo, hi + 1)
+    size = hi - lo
+
+    # この間に入る余地のないかたまりは先に外す
+    longest = int(run[lo:hi + 1].max(initial=0))
+    items = [
+        item
+        for item in items
+        if item["minutes"] <= longest
+        and max(lo, item["earliest"]) + item["minutes"] <= min(hi, item["latest"])
+    ]
+
+    dp = np.zeros(size + 1)
+    layers = []
+
+    for item in items:
+        minutes = item["minutes"]
+        starts = ends - minutes
+
+        # 前のタスクは「開始 - 休憩」までに終わっていればよい（先頭なら休憩なし）
+        before = starts - break_minutes - lo
+        previous = np.where(before >= 0, dp[np.clip(before, 0, size)], 0.0)
+
+        valid = (
+            (starts >= max(lo, item["earliest"]))
+            & (ends <= item["latest"])
+            & (run[lo:hi + 1] >= minutes)
+        )
+
+        placed = np.where(valid, previous + item["value"], -np.inf)
+        new_dp = np.maximum.accumulate(np.maximum(dp, placed))
+
+        layers.append((dp, placed))
+        dp = new_dp
+
+    # 後ろから、どのタスクをどこに置いたかをたどる
+    blocks = []
+    limit = size
+
+    for item, (previous_dp, placed) in zip(reversed(items), reversed(layers)):
+        if limit < 0:
+            break
+
+        best = max(previous_dp[limit], placed[: limit + 1].max(initial=-np.inf))
+        if placed[: limit + 1].max(initial=-np.inf) <= previous_dp[limit] or best <= 0:
+            continue
+
+        # 同じ値なら早く終わる位置を選び、時間割を前に詰める
+        end = int(np.flatnonzero(placed[: limit + 1] == best)[0])
+        start = end - item["minutes"]
+        blocks.append({**item, "start": lo + start, "end": lo + end})
+        limit = start - break_minutes
+
+    return float(dp[-1]), blocks
+
+
+def pack_gap_by_gap(items: list, run: np.ndarray, gaps: list, break_minutes: int) -> tuple:
+    # すき間を前から1つずつ、残ったタスクで詰める（状態が多すぎるときの代わり）
+    value = 0.0
+    blocks = []
+    left = list(items)
+
+    for gap_start, gap_end in gaps:
+        gap_value, gap_blocks = pack_in_order(left, run, gap_start, gap_end, break_minutes)
+        used = {(block["task"], block["part"]) for block in gap_blocks}
+        left = [item for item in left if (item["task"], item["part"]) not in used]
+        value += gap_value
+        blocks += gap_blocks
+
+    return value, blocks
+
+
+def grid_unit(items: list, gaps: list, break_minutes: int) -> int:
+    # 時刻がすべてこの分の倍数になるので、dp のマスをこの幅にまとめる
+    unit = break_minutes
+    for gap_start, gap_end in gaps:
+        unit = math.gcd(unit, gap_start, gap_end)
+    for item in items:
+        unit = math.gcd(unit, item["minutes"], item["earliest"], item["latest"])
+    return unit or 1
+
+
+def gap_moves(item: dict, gap_start: int, gap_end: int, unit: int, break_minutes: int) -> tuple:
+    # すき間の中で「p マス目に終わる」置き方が入るか、前のタスクが何マス目までに終わればよいか
+    ends = gap_start + np.arange((gap_end - gap_start) // unit + 1) * unit
+    starts = ends - item["minutes"]
+
+    valid = (
+        (starts >= max(gap_start, item["earliest"]))
+        & (ends <= min(gap_end, item["latest"]))
+    )
+
+    # 休憩をはさむと前に置けないときは 0 マス目（このすき間ではまだ何も置いていない）
+    before = np.clip((starts - break_minutes - gap_start) // unit, 0, None)
+    return valid, before
+
+
+def place_in_gap(items: list, gap_start: int, gap_end: int, break_minutes: int) -> list | None:
+    # 並べた順のまま、すき間の前から詰める。入りきらなければ None
+    blocks = []
+    current = gap_start
+    for item in items:
+        start = max(current, item["earliest"])
+        end = start + item["minutes"]
+        if end > min(gap_end, item["latest"]):
+            return None
+        blocks.append({**item, "start": start, "end": end})
+        current = end + break_minutes
+    return blocks
+
+
+def pull_forward(blocks: list, gaps: list, break_minutes: int) -> list:
+    # 選んだかたまりは変えずに、入るものは前のすき間へ移して前から詰め直す
+    # （合計は同じまま、朝が空いたり分けたかたまりが離れたりしないようにする）
+    members = [
+        sorted((block for block in blocks if gap_start <= block["start"] < gap_end), key=item_order)
+        for gap_start, gap_end in gaps
+    ]
+
+    for number, (gap_start, gap_end) in enumerate(gaps):
+        for later in members[number + 1:]:
+            for item in list(later):
+                trial = sorted(members[number] + [item], key=item_order)
+                if place_in_gap(trial, gap_start, gap_end, break_minutes) is not None:
+                    members[number] = trial
+                    later.remove(item)
+
+    return [
+        block
+        for items, (gap_start, gap_end) in zip(members, gaps)
+        for block in place_in_gap(items, gap_start, gap_end, break_minutes)
+    ]
+
+
+def pack_by_gap(items: list, gaps: list, break_minutes: int) -> tuple:
+    # dp[p1, p2, ...] =「すき間 g では p_g マス目までに終わる置き方での、優先度 × 分数の最大値」
+    unit = grid_unit(items, gaps, break_minutes)
+    shape = tuple((gap_end - gap_start) // unit + 1 for gap_start, gap_end in gaps)
+
+    # 合計が int16 に収まるなら途中の dp を半分の大きさで持つ
+    total = sum(item["value"] for item in items)
+    dp = np.zeros(shape, dtype=np.int16 if total < np.iinfo(np.int16).max else np.int32)
+    layers = []
+
+    for item in items:
+        moves = [gap_moves(item, gap_start, gap_end, unit, break_minutes) for gap_start, gap_end in gaps]
+        new_dp = dp.copy()
+
+        for axis, (valid, before) in enumerate(moves):
+            positions = np.flatnonzero(valid)
+            if not len(positions):
+                continue
+
+            # 入る位置はひと続きなので、その範囲だけを更新して、そこから先を累積の最大にする
+            first, last = int(positions[0]), int(positions[-1]) + 1
+            index = [slice(None)] * len(gaps)
+            index[axis] = slice(first, last)
+            target = new_dp[tuple(index)]
+            np.maximum(target, np.take(dp, before[first:last], axis=axis) + item["value"], out=target)
+
+            index[axis] = slice(first, None)
+            target = new_dp[tuple(index)]
+            np.maximum.accumulate(target, axis=axis, out=target)
+
+        layers.append((dp, moves))
+        dp = new_dp
+
+    # 後ろから、どのタスクをどのすき間のどこに置いたかをたどる
+    blocks = []
+    limit = [size - 1 for size in shape]
+    best = remaining = int(dp[tuple(limit)])
+
+    for item, (previous_dp, moves) in zip(reversed(items), reversed(layers)):
+        if remaining <= 0:
+            break
+        if int(previous_dp[tuple(limit)]) >= remaining:
+            continue
+
+        # 同じ値なら早く終わる位置を選び、時間割を前に詰める
+        choices = []
+        for axis, (valid, before) in enumerate(moves):
+            for position in np.flatnonzero(valid[: limit[axis] + 1]):
+                point = list(limit)
+                point[axis] = int(before[position])
+                if int(previous_dp[tuple(point)]) + item["value"] == remaining:
+                    choices.append((gaps[axis][0] + int(position) * unit, axis, point))
+                    break
+
+        end, axis, point = min(choices)
+        blocks.append({**item, "start": end - item["minutes"], "end": end})
+        limit = point
+        remaining -= item["value"]
+
+    return float(best), pull_forward(blocks, gaps, break_minutes)
+
+
+def optimize_schedule(
+    tasks: list,
+    day_minutes: int,
+    appointments: list | None = None,
+    break_minutes: int = 5,
+    chunk_minutes: int = 15,
+    pad_appointments: bool = True,
+) -> dict:
+    appointments = appointments or []
+    pad = break_minutes if pad_appointments else 0
+    blocked = [(int(a["start"]) - pad, int(a["end"]) + pad) for a in appointments]
+
+    run = free_run_lengths(day_minutes, blocked)
+    items = build_items(tasks, day_minutes, chunk_minutes)
+    gaps = free_gaps(day_minutes, blocked)
+
+    unit = grid_unit(items, gaps, break_minutes)
+    cells = math.prod((gap_end - gap_start) // unit + 1 for gap_start, gap_end in gaps)
+
+    if len(gaps) <= 1:
+        value, blocks = pack_in_order(items, run, 0, day_minutes, break_minutes)
+    elif len(items) * cells <= EXACT_DP_LIMIT:
+        value, blocks = pack_by_gap(items, gaps, break_minutes)
+    else:
+        value, blocks = max(
+            pack_in_order(items, run, 0, day_minutes, break_minutes),
+            pack_gap_by_gap(items, run, gaps, break_minutes),
+            key=lambda result: result[0],
+        )
+
+    blocks = merge_parts(sorted(blocks, key=lambda x: x["start"]), break_minutes)
+
+    scheduled = {}
+    for block in blocks:
+        scheduled[block["task"]] = scheduled.get(block["task"], 0) + block["minutes"]
+
+    return {
+        "blocks": blocks,
+        "value": value,
+        "scheduled_minutes": scheduled,
+        "overflow": [
+            {**task, "left": int(task["minutes"]) - scheduled.get(index, 0)}
+            for index, task in enumerate(tasks)
+            if scheduled.get(index, 0) < int(task["minutes"])
+        ],
+    }
+
+
+def greedy_schedule(tasks: list, day_minutes: int, break_minutes: int = 5) -> dict:
+    # 比較用：優先度順に前から詰めて、入らないものは飛ばす（以前のやり方）
+    order = sorted(range(len(tasks)), key=lambda i: PRIORITY_WEIGHTS.get(tasks[i].get("priority"), 2), reverse=True)
+    current = 0
+    value = 0
+    blocks = []
+
+    for index in order:
+        minutes = int(tasks[index]["minutes"])
+        if current + minutes > day_minutes:
+            continue
+        blocks.append({"task": index, "start": current, "end": current + minutes})
+        value += PRIORITY_WEIGHTS.get(tasks[index].get("priority"), 2) * minutes
+        current += minutes + break_minutes
+        if current >= day_minutes:
+            break
+
+    return {"blocks": blocks, "value": float(value)}
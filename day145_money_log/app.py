@@ -1,12 +1,22 @@
 import streamlit as st
 import json
 import os
+import sys
 from datetime import datetime, date
 import pandas as pd
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.ledger import ensure_source, make_entry, sync_source  # noqa: E402
 
 APP_TITLE = "Day145：お金つかったログ"
 DATA_DIR = "data"
 DATA_PATH = os.path.join(DATA_DIR, "day145_money_log.json")
+LEDGER_SOURCE = "day145_money_log"
 
 CATEGORIES = [
     "食費",
@@ -41,13 +51,33 @@ def load_data():
     ensure_storage()
 
     with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+        data = json.load(f)
+
+    ensure_source(LEDGER_SOURCE, ledger_entries(data))
+
+    return data
 
 
 def save_data(data):
     with open(DATA_PATH, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+    sync_source(LEDGER_SOURCE, ledger_entries(data))
+
+
+def ledger_entries(data):
+
+    return [
+        make_entry(
+            x["id"],
+            x["date"],
+            x["amount"],
+            x["category"],
+            title=x["title"]
+        )
+        for x in data["logs"]
+    ]
+
 
 def today():
     return date.today().isoformat()
@@ -2,7 +2,17 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import re
+import sys
 from datetime import datetime, date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.deal_optimizer import DEAL_KIND_LABELS, optimize_deals  # noqa: E402
 
 APP_TITLE = "Day163：割引計算シミュレーター"
 DATA_DIR = "data"
@@ -13,6 +23,24 @@ MODES = [
     "② 全品割引",
     "③ 単品・全品 複合割引",
     "④ 複数回割引",
+    "⑤ まとめ買い最適化",
+]
+
+KIND_BY_LABEL = {label: kind for kind, label in DEAL_KIND_LABELS.items()}
+
+SAMPLE_CART = [
+    {"商品": "お米 5kg", "カテゴリ": "食品", "単価": 2480, "数量": 1},
+    {"商品": "洗剤", "カテゴリ": "日用品", "単価": 398, "数量": 3},
+    {"商品": "Tシャツ", "カテゴリ": "服", "単価": 1990, "数量": 2},
+]
+
+SAMPLE_DEALS = [
+    {"名前": "日用品セール", "種類": "割引率", "値": 20.0, "対象": "日用品", "最低金額": 0, "最低点数": 0, "併用可": True, "グループ": ""},
+    {"名前": "服2点で", "種類": "まとめ買い", "値": 15.0, "対象": "服", "最低金額": 0, "最低点数": 2, "併用可": False, "グループ": ""},
+    {"名前": "全品10%OFF", "種類": "割引率", "値": 10.0, "対象": "", "最低金額": 0, "最低点数": 0, "併用可": False, "グループ": ""},
+    {"名前": "500円クーポン", "種類": "クーポン", "値": 500.0, "対象": "", "最低金額": 5000, "最低点数": 0, "併用可": False, "グループ": ""},
+    {"名前": "アプリ決済", "種類": "ポイント還元", "値": 5.0, "対象": "", "最低金額": 0, "最低点数": 0, "併用可": True, "グループ": "支払い"},
+    {"名前": "カード決済", "種類": "ポイント還元", "値": 3.0, "対象": "", "最低金額": 0, "最低点数": 0, "併用可": True, "グループ": "支払い"},
 ]
 
 
@@ -51,6 +79,44 @@ def yen(n):
     return f"{int(n):,} 円"
 
 
+def parse_cart(cart_df):
+    items = []
+    for row in cart_df.fillna("").to_dict(orient="records"):
+        name = str(row.get("商品", "")).strip()
+        try:
+            price = int(float(row.get("単価") or 0))
+            qty = int(float(row.get("数量") or 1))
+        except ValueError:
+            continue
+        if not name or price <= 0 or qty <= 0:
+            continue
+        items.append({"name": name, "category": str(row.get("カテゴリ", "")).strip(), "price": price, "qty": qty})
+    return items
+
+
+def parse_deals(deal_df):
+    deals = []
+    for row in deal_df.fillna("").to_dict(orient="records"):
+        kind = KIND_BY_LABEL.get(row.get("種類"))
+        try:
+            value = float(row.get("値") or 0)
+        except ValueError:
+            continue
+        if kind is None or value <= 0:
+            continue
+        deals.append({
+            "name": str(row.get("名前", "")).strip() or row.get("種類"),
+            "kind": kind,
+            "value": value,
+            "targets": [x.strip() for x in re.split(r"[,、，]", str(row.get("対象", ""))) if x.strip()],
+            "min_spend": float(row.get("最低金額") or 0),
+            "min_qty": int(float(row.get("最低点数") or 0)),
+            "stackable": bool(row.get("併用可")),
+            "group": str(row.get("グループ", "")).strip(),
+        })
+    return deals
+
+
 def to_df(data):
     rows = []
     for x in data["logs"]:
@@ -318,6 +384,106 @@ elif mode == "④ 複数回割引":
         st.success("保存したよ。")
         st.rerun()
 
+# ----------------------------
+# ⑤ まとめ買い最適化
+# ----------------------------
+elif mode == "⑤ まとめ買い最適化":
+    st.subheader("⑤ まとめ買い最適化")
+
+    st.write("買い物かごと使えるお得を入れると、いちばん安くなる組み合わせを探す。")
+    st.caption("割引率・まとめ買い → クーポン → ポイント還元の順に計算。併用可でないお得どうしは、対象が重なると一緒に使えない。同じグループのお得はどれか1つだけ。")
+
+    cart_df = st.data_editor(
+        pd.DataFrame(SAMPLE_CART),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "単価": st.column_config.NumberColumn(min_value=0, step=10),
+            "数量": st.column_config.NumberColumn(min_value=1, step=1),
+        },
+        key="batch_cart"
+    )
+
+    deal_df = st.data_editor(
+        pd.DataFrame(SAMPLE_DEALS),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "種類": st.column_config.SelectboxColumn(options=list(KIND_BY_LABEL)),
+            "値": st.column_config.NumberColumn(help="割引率・還元率は％、クーポンは円"),
+            "対象": st.column_config.TextColumn(help="商品名かカテゴリ。空欄なら全商品"),
+            "最低金額": st.column_config.NumberColumn(min_value=0, step=100),
+            "最低点数": st.column_config.NumberColumn(min_value=0, step=1),
+        },
+        key="batch_deals"
+    )
+
+    items = parse_cart(cart_df)
+    deals = parse_deals(deal_df)
+
+    if not items:
+        st.info("商品を入れてね。")
+    else:
+        result = optimize_deals(items, deals)
+
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("元合計", yen(result["original_total"]))
+        c2.metric("支払額", yen(result["paid"]))
+        c3.metric("ポイント", f"{int(result['points']):,} pt")
+        c4.metric("実質お得額", yen(result["saving"]))
+
+        if result["chosen_deals"]:
+            st.success("使うお得：" + "、".join(x["name"] for x in result["chosen_deals"]))
+        else:
+            st.warning("この買い物で使えるお得はなかったよ。")
+
+        standalone = dict(zip(
+            [id(x) for x in result["problem"]["deals"]],
+            result["standalone_savings"]
+        ))
+
+        st.dataframe(
+            pd.DataFrame([{
+                "お得": x["name"],
+                "種類": DEAL_KIND_LABELS[x["kind"]],
+                "単独で使ったときのお得額": int(standalone[id(x)]),
+                "使う": "✅" if used else "",
+            } for x, used in zip(result["problem"]["deals"], result["selection"])]),
+            use_container_width=True,
+            hide_index=True
+        )
+
+        st.dataframe(
+            pd.DataFrame({
+                "商品": [x["name"] for x in items],
+                "数量": [x["qty"] for x in items],
+                "元の金額": [x["price"] * x["qty"] for x in items],
+                "割引後": [int(x) for x in result["line_totals"]],
+            }),
+            use_container_width=True,
+            hide_index=True
+        )
+
+        note = "" if result["complete"] else "（探索数の上限に達したため、見つかった中で最良の結果）"
+        st.caption(f"{len(result['problem']['deals'])} 件のお得から {result['nodes']:,} 通りを調べて {result['elapsed_ms']:.1f} ms{note}")
+
+        memo = st.text_input("メモ", placeholder="例：週末のまとめ買い")
+
+        if st.button("保存する", type="primary"):
+            data["logs"].append({
+                "id": f"log_{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
+                "created_at": now_str(),
+                "date": today_str(),
+                "mode": mode,
+                "original_total": int(result["original_total"]),
+                "discount_total": int(result["paid"]),
+                "saved": int(result["saving"]),
+                "memo": memo,
+            })
+            save_data(data)
+            st.success("保存したよ。")
+            st.rerun()
+
 st.divider()
 st.subheader("計算履歴")
 
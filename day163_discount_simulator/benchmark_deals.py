@@ -0,0 +1,78 @@
+import random
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.deal_optimizer import DEAL_KINDS, ITEM_KINDS, optimize_deals  # noqa: E402
+
+# まとめ買い最適化（分枝限定法）の速さを、ランダムな買い物かごで測る。
+# 使い方：python benchmark_deals.py
+
+CASES = [
+    (10, 10),
+    (50, 30),
+    (100, 40),
+]
+
+CATEGORIES = ["食品", "日用品", "服", "家電"]
+
+
+def make_case(item_count, deal_count, seed=0):
+    rng = random.Random(seed)
+    items = [
+        {
+            "name": f"商品{i + 1}",
+            "category": rng.choice(CATEGORIES),
+            "price": rng.randint(100, 20000),
+            "qty": rng.randint(1, 3),
+        }
+        for i in range(item_count)
+    ]
+    names = [x["name"] for x in items]
+    deals = []
+
+    for i in range(deal_count):
+        kind = rng.choice(DEAL_KINDS)
+        deals.append({
+            "name": f"お得{i + 1}",
+            "kind": kind,
+            "value": {
+                "coupon": rng.choice([300, 500, 1000, 3000]),
+                "points": rng.choice([1, 2, 5, 10]),
+            }.get(kind, rng.choice([5, 10, 15, 20])),
+            "targets": rng.sample(names + CATEGORIES, rng.randint(1, 3)) if kind in ITEM_KINDS and rng.random() < 0.7 else [],
+            "min_spend": rng.choice([0, 0, 3000, 10000, 50000]),
+            "min_qty": rng.randint(2, 5),
+            "stackable": rng.random() < 0.4,
+            "group": rng.choice(["", "", "", "支払い", "会員"]),
+        })
+
+    return items, deals
+
+
+def main():
+    print(f"{'商品':>6} {'お得':>6} | {'調べた数':>8} {'平均ms':>8} {'最大ms':>8}")
+
+    for item_count, deal_count in CASES:
+        times = []
+        nodes = []
+
+        for seed in range(20):
+            result = optimize_deals(*make_case(item_count, deal_count, seed))
+            assert result["complete"]
+            times.append(result["elapsed_ms"])
+            nodes.append(result["nodes"])
+
+        print(
+            f"{item_count:>6} {deal_count:>6} | "
+            f"{sum(nodes) / len(nodes):>8.0f} "
+            f"{sum(times) / len(times):>8.1f} {max(times):>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
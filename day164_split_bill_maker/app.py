@@ -4,6 +4,9 @@ import json
 import os
 from datetime import datetime, date
 import math
+import re
+
+from settle import compute_balances, naive_settle, round_balances, settle
 
 APP_TITLE = "Day164：割り勘メーカー"
 DATA_DIR = "data"
@@ -30,6 +33,14 @@ PAY_TYPES = [
     "個別調整あり",
 ]
 
+BILL_COLUMNS = [
+    "内容",
+    "立て替えた人",
+    "金額",
+    "対象者",
+    "比率",
+]
+
 
 def ensure_storage():
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -41,7 +52,12 @@ def ensure_storage():
 def load_data():
     ensure_storage()
     with open(DATA_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+        data = json.load(f)
+
+    if "settlements" not in data:
+        data["settlements"] = []
+
+    return data
 
 
 def save_data(data):
@@ -85,6 +101,61 @@ def apply_round(value, unit, method):
     return int(round(value / unit) * unit)
 
 
+def split_names(text):
+    return [x.strip() for x in re.split(r"[,、，\n]", str(text or "")) if x.strip()]
+
+
+def parse_bills(bill_df, names):
+    bills = []
+    errors = []
+
+    for i, row in enumerate(bill_df.fillna("").to_dict(orient="records"), start=1):
+        payer = str(row.get("立て替えた人", "")).strip()
+
+        try:
+            amount = int(float(row.get("金額") or 0))
+        except ValueError:
+            amount = 0
+
+        if not payer and amount == 0:
+            continue
+
+        members = split_names(row.get("対象者")) or list(names)
+        weights_text = split_names(row.get("比率"))
+
+        unknown = [x for x in [payer] + members if x not in names]
+
+        if unknown:
+            errors.append(f"{i}行目：メンバーにいない名前があるよ（{'・'.join(unknown)}）")
+            continue
+
+        if amount <= 0:
+            errors.append(f"{i}行目：金額を入れてね")
+            continue
+
+        weights = None
+
+        if weights_text:
+            try:
+                weights = [float(x) for x in weights_text]
+            except ValueError:
+                weights = []
+
+            if len(weights) != len(members) or sum(weights) <= 0:
+                errors.append(f"{i}行目：比率は対象者と同じ数だけ入れてね")
+                continue
+
+        bills.append({
+            "title": str(row.get("内容", "")).strip(),
+            "payer": payer,
+            "amount": amount,
+            "members": members,
+            "weights": weights,
+        })
+
+    return bills, errors
+
+
 def to_df(data):
     rows = []
     for x in data["logs"]:
@@ -359,3 +430,116 @@ else:
         file_name="day164_split_bill_maker.csv",
         mime="text/csv"
     )
+
+st.divider()
+st.subheader("🧾 グループ精算")
+st.caption("何人かが立て替えた明細をまとめて、いちばん少ない受け渡し回数で精算するよ。")
+
+members_text = st.text_area(
+    "メンバー（1行に1人）",
+    value="A\nB\nC",
+    height=100
+)
+
+members = list(dict.fromkeys(split_names(members_text)))
+
+bill_source = st.radio(
+    "明細の入力方法",
+    ["表に入力", "CSVを読み込む"],
+    horizontal=True
+)
+
+if bill_source == "表に入力":
+    bill_df = st.data_editor(
+        pd.DataFrame(
+            [{"内容": "", "立て替えた人": members[0] if members else "", "金額": 0, "対象者": "", "比率": ""}],
+            columns=BILL_COLUMNS
+        ),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "立て替えた人": st.column_config.SelectboxColumn(options=members),
+            "金額": st.column_config.NumberColumn(min_value=0, step=100),
+            "対象者": st.column_config.TextColumn(help="空欄なら全員。「A、B」のように区切る"),
+            "比率": st.column_config.TextColumn(help="空欄なら均等。「2、1」のように対象者の順で"),
+        },
+        key="group_bills"
+    )
+else:
+    uploaded = st.file_uploader(
+        f"CSV（列：{'・'.join(BILL_COLUMNS)}）",
+        type=["csv"]
+    )
+    bill_df = (
+        pd.read_csv(uploaded, dtype=str)
+        if uploaded is not None
+        else pd.DataFrame(columns=BILL_COLUMNS)
+    )
+
+group_round_option = st.selectbox(
+    "受け渡しの単位",
+    ROUND_OPTIONS,
+    index=1,
+    key="group_round_option"
+)
+
+bills, bill_errors = parse_bills(bill_df, members)
+
+for error in bill_errors[:10]:
+    st.warning(error)
+
+if len(members) < 2:
+    st.info("メンバーを2人以上入れてね。")
+elif not bills:
+    st.info("明細を入れると精算方法が出るよ。")
+else:
+    exact_balances = compute_balances(bills, members)
+    balances = round_balances(exact_balances, round_unit(group_round_option))
+    transfers = settle(balances, members)
+    naive_count = len(naive_settle(bills, members))
+
+    paid = {name: 0 for name in members}
+    for bill in bills:
+        paid[bill["payer"]] += bill["amount"]
+
+    g1, g2, g3 = st.columns(3)
+    g1.metric("明細", f"{len(bills):,} 件")
+    g2.metric("受け渡し回数", f"{len(transfers):,} 回")
+    g3.metric("明細ごとに払う場合", f"{naive_count:,} 回")
+
+    st.markdown("#### 受け渡し")
+    st.dataframe(
+        pd.DataFrame(transfers, columns=["払う人", "受け取る人", "金額"]),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    balance_df = pd.DataFrame({
+        "名前": members,
+        "立て替え": [paid[name] for name in members],
+        "負担": [paid[name] - int(b) for name, b in zip(members, exact_balances)],
+        "精算額": [int(b) for b in balances],
+        "端数": [int(a - b) for a, b in zip(exact_balances, balances)],
+    })
+
+    with st.expander("1人ずつの内訳"):
+        st.dataframe(balance_df, use_container_width=True, hide_index=True)
+        st.caption("精算額がプラスの人は受け取り、マイナスの人は払う。端数は受け渡し単位にそろえたときの差。")
+
+    if st.button("🧾 精算結果を保存"):
+        data["settlements"].append({
+            "id": f"settle_{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
+            "created_at": now_str(),
+            "date": today_str(),
+            "members": members,
+            "bills": bills,
+            "round_option": group_round_option,
+            "transfers": [
+                {"from": a, "to": b, "amount": int(c)}
+                for a, b, c in transfers
+            ],
+        })
+
+        save_data(data)
+        st.success("精算結果を保存したよ。")
+        st.rerun()
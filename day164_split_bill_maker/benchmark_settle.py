@@ -0,0 +1,70 @@
+import random
+import time
+
+from settle import (
+    apply_transfers,
+    compute_balances,
+    naive_settle,
+    round_balances,
+    settle,
+)
+
+# 精算ソルバーと、明細ごとに2人の間で相殺するだけの素朴な精算を比べる。
+# 使い方：python benchmark_settle.py
+
+CASES = [
+    (8, 50),
+    (12, 200),
+    (50, 1000),
+    (200, 3000),
+    (500, 5000),
+]
+
+
+def make_bills(people, bill_count, seed=0):
+    rng = random.Random(seed)
+    names = [f"人{i + 1}" for i in range(people)]
+    bills = []
+
+    for _ in range(bill_count):
+        members = rng.sample(names, rng.randint(2, min(people, 8)))
+        bills.append({
+            "payer": rng.choice(members),
+            "amount": rng.randint(300, 30000),
+            "members": members,
+            "weights": [rng.choice([1, 1, 1, 2]) for _ in members],
+        })
+
+    return names, bills
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    print(f"{'人数':>6} {'明細':>6} | {'ソルバー回数':>10} {'ms':>8} | {'素朴な回数':>10} {'ms':>8}")
+
+    for people, bill_count in CASES:
+        names, bills = make_bills(people, bill_count)
+
+        start = time.perf_counter()
+        balances = round_balances(compute_balances(bills, names), 10)
+        transfers = settle(balances, names)
+        solver_ms = (time.perf_counter() - start) * 1000
+
+        assert not apply_transfers(balances, names, transfers).any()
+
+        naive, naive_ms = timed(naive_settle, bills, names)
+
+        print(
+            f"{people:>6} {bill_count:>6} | "
+            f"{len(transfers):>10} {solver_ms:>8.1f} | "
+            f"{len(naive):>10} {naive_ms:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import heapq
+
+import numpy as np
+
+# 精算（誰が誰にいくら払えば貸し借りがなくなるか）の計算。
+# 残高は「立て替えた額 - 負担すべき額」で、プラスの人が受け取り、マイナスの人が払う。
+
+EXACT_LIMIT = 12
+
+
+def split_amount(amount, weights):
+    # 比率どおりに円単位で分け、端数は小数部分が大きい人から1円ずつ配る
+    weights = np.asarray(weights, dtype=float)
+    total_weight = weights.sum()
+
+    if total_weight <= 0:
+        return np.zeros(len(weights), dtype=np.int64)
+
+    raw = amount * weights / total_weight
+    shares = np.floor(raw).astype(np.int64)
+    rest = int(amount - shares.sum())
+
+    if rest > 0:
+        order = np.argsort(-(raw - shares), kind="stable")
+        shares[order[:rest]] += 1
+
+    return shares
+
+
+def compute_balances(bills, names):
+    index = {name: i for i, name in enumerate(names)}
+    balances = np.zeros(len(names), dtype=np.int64)
+
+    payer_idx = np.array([index[b["payer"]] for b in bills], dtype=np.int64)
+    amounts = np.array([int(b["amount"]) for b in bills], dtype=np.int64)
+    np.add.at(balances, payer_idx, amounts)
+
+    for bill in bills:
+        members = bill.get("members") or names
+        weights = bill.get("weights") or [1] * len(members)
+        member_idx = [index[m] for m in members]
+        np.subtract.at(balances, member_idx, split_amount(int(bill["amount"]), weights))
+
+    return balances
+
+
+def round_balances(balances, unit):
+    # 受け渡しを unit 円単位にそろえる。合計が0のまま保たれるように、
+    # 切り捨てたあと端数の大きい人から unit 円ずつ戻す。
+    balances = np.asarray(balances, dtype=np.int64)
+
+    if unit <= 1:
+        return balances.copy()
+
+    floored = np.floor_divide(balances, unit) * unit
+    remainders = balances - floored
+    missing = int(-floored.sum() // unit)
+
+    rounded = floored.copy()
+
+    if missing > 0:
+        order = np.argsort(-remainders, kind="stable")
+        rounded[order[:missing]] += unit
+
+    return rounded
+
+
+def greedy_settle(balances, names):
+    # いちばん多く受け取る人といちばん多く払う人を組み合わせていく（最大 n-1 回）
+    creditors = [(-int(b), i) for i, b in enumerate(balances) if b > 0]
+    debtors = [(int(b), i) for i, b in enumerate(balances) if b < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+
+    while creditors and debtors:
+        credit, c = heapq.heappop(creditors)
+        debt, d = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+
+        transfers.append((names[d], names[c], amount))
+
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, c))
+
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, d))
+
+    return transfers
+
+
+def zero_sum_groups(values):
+    # 合計0のグループにできるだけ多く分ける（ビットDP）。
+    # 受け渡しの回数は「人数 - グループ数」なので、グループ数が最大なら回数が最小になる。
+    n = len(values)
+    full = (1 << n) - 1
+
+    sums = np.zeros(1 << n, dtype=np.int64)
+    for i, value in enumerate(values):
+        sums[1 << i:1 << (i + 1)] = sums[:1 << i] + value
+
+    best = [0] * (1 << n)
+    for mask in range(1, full + 1):
+        m = mask
+        top = 0
+        while m:
+            low = m & -m
+            top = max(top, best[mask ^ low])
+            m ^= low
+        best[mask] = top + (1 if sums[mask] == 0 else 0)
+
+    groups = []
+    mask = full
+    group_start = full
+
+    while mask:
+        target = best[mask] - (1 if sums[mask] == 0 else 0)
+        m = mask
+        while m:
+            low = m & -m
+            if best[mask ^ low] == target:
+                break
+            m ^= low
+        mask ^= low
+
+        if mask == 0 or sums[mask] == 0:
+            groups.append([i for i in range(n) if (group_start ^ mask) >> i & 1])
+            group_start = mask
+
+    return groups
+
+
+def exact_settle(balances, names):
+    active = [i for i, b in enumerate(balances) if b != 0]
+
+    if len(active) > EXACT_LIMIT:
+        return greedy_settle(balances, names)
+
+    transfers = []
+
+    for group in zero_sum_groups([int(balances[i]) for i in active]):
+        members = [active[i] for i in group]
+        transfers.extend(
+            greedy_settle(
+                [balances[i] for i in members],
+                [names[i] for i in members],
+            )
+        )
+
+    return transfers
+
+
+def settle(balances, names):
+    if np.count_nonzero(balances) <= EXACT_LIMIT:
+        return exact_settle(balances, names)
+
+    return greedy_settle(balances, names)
+
+
+def naive_settle(bills, names):
+    # 比較用：明細ごとに各自が立て替えた人へ直接払い、2人の間だけで相殺する
+    index = {name: i for i, name in enumerate(names)}
+    owed = {}
+
+    for bill in bills:
+        payer = index[bill["payer"]]
+        members = bill.get("members") or names
+        weights = bill.get("weights") or [1] * len(members)
+
+        for member, share in zip(members, split_amount(int(bill["amount"]), weights)):
+            m = index[member]
+            if m == payer or share == 0:
+                continue
+            key = (min(m, payer), max(m, payer))
+            sign = 1 if m < payer else -1
+            owed[key] = owed.get(key, 0) + sign * int(share)
+
+    transfers = []
+
+    for (a, b), amount in owed.items():
+        if amount > 0:
+            transfers.append((names[a], names[b], amount))
+        elif amount < 0:
+            transfers.append((names[b], names[a], -amount))
+
+    return transfers
+
+
+def apply_transfers(balances, names, transfers):
+    index = {name: i for i, name in enumerate(names)}
+    result = np.asarray(balances, dtype=np.int64).copy()
+
+    for sender, receiver, amount in transfers:
+        result[index[sender]] += amount
+        result[index[receiver]] -= amount
+
+    return result
@@ -2,15 +2,44 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, date
+from pathlib import Path
 
-APP_TITLE = "Day165：サブスク管理帳"
-DATA_DIR = "data"
-DATA_PATH = os.path.join(
-    DATA_DIR,
-    "day165_subscription_manager.json"
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.ledger import (  # noqa: E402
+    make_entry,
+    sync_source,
+)
+from common.subscription_data import (  # noqa: E402
+    SUBSCRIPTION_DATA_DIR,
+    SUBSCRIPTION_DATA_PATH,
+    monthly_cost,
+)
+from subscription_engine import (  # noqa: E402
+    CYCLES,
+    add_sub_stats,
+    cycle_label,
+    ensure_stats,
+    projected_month_costs,
+    remove_sub_stats,
+    renewals_between,
+    take_charges,
+    upcoming_renewals,
 )
 
+APP_TITLE = "Day165：サブスク管理帳"
+# 保存先は貯金アプリなどからも探せるよう common.subscription_data と共有する
+DATA_DIR = SUBSCRIPTION_DATA_DIR
+DATA_PATH = SUBSCRIPTION_DATA_PATH
+
+LEDGER_SOURCE = "day165_subscription_manager"
+LEDGER_CATEGORY = "サブスク"
+
 CATEGORIES = [
     "動画",
     "音楽",
@@ -21,6 +50,14 @@ CATEGORIES = [
     "その他",
 ]
 
+ALERT_DAYS = 7
+
+HORIZON_OPTIONS = [
+    12,
+    24,
+    36,
+]
+
 
 def ensure_storage():
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -47,10 +84,18 @@ def load_data():
         "r",
         encoding="utf-8"
     ) as f:
-        return json.load(f)
+        data = json.load(f)
+
+    # 支払日が来た分だけを元帳へ足す（前回送った日より後の支払い）
+    _, charges, changed = ensure_stats(data)
+
+    if changed:
+        save_data(data, charges)
 
+    return data
 
-def save_data(data):
+
+def save_data(data, charges=()):
     with open(
         DATA_PATH,
         "w",
@@ -63,6 +108,27 @@ def save_data(data):
             indent=2
         )
 
+    # 解約したサブスクの過去の支払いは元帳に残す
+    if charges:
+        sync_source(
+            LEDGER_SOURCE,
+            charge_entries(charges),
+            remove_missing=False
+        )
+
+
+def charge_entries(charges):
+    return [
+        make_entry(
+            f"{sub['id']}_{pay_date.strftime('%Y%m')}",
+            pay_date,
+            sub.get("price", 0),
+            LEDGER_CATEGORY,
+            title=sub.get("name", "")
+        )
+        for sub, pay_date in charges
+    ]
+
 
 def today_str():
     return date.today().isoformat()
@@ -99,18 +165,31 @@ with left:
         CATEGORIES
     )
 
+    cycle = st.selectbox(
+        "請求サイクル",
+        list(CYCLES) + ["○か月ごと"]
+    )
+
+    if cycle == "○か月ごと":
+        cycle_months = st.number_input(
+            "何か月ごと？",
+            min_value=1,
+            max_value=60,
+            value=2
+        )
+    else:
+        cycle_months = CYCLES[cycle]
+
     price = st.number_input(
-        "月額料金",
+        "1回の料金",
         min_value=0,
         value=1000,
         step=100
     )
 
-    pay_day = st.number_input(
-        "支払日",
-        min_value=1,
-        max_value=31,
-        value=1
+    start_date = st.date_input(
+        "次の支払日",
+        value=date.today()
     )
 
     memo = st.text_area(
@@ -133,45 +212,94 @@ with left:
                 "name": name,
                 "category": category,
                 "price": int(price),
-                "pay_day": int(pay_day),
+                "cycle_months": int(cycle_months),
+                "start_date": start_date.isoformat(),
+                "pay_day": start_date.day,
                 "memo": memo,
             }
 
             data["subs"].append(item)
 
-            save_data(data)
+            add_sub_stats(
+                data["stats"],
+                item
+            )
+
+            save_data(
+                data,
+                take_charges(
+                    data["stats"],
+                    item,
+                    date.today()
+                )
+            )
 
             st.success("登録したよ！")
             st.rerun()
 
 with right:
 
-    df = pd.DataFrame(
-        data["subs"]
-    )
+    stats = data["stats"]
 
-    if not df.empty:
+    if data["subs"]:
 
-        monthly = df["price"].sum()
-        yearly = monthly * 12
+        monthly = round(stats["monthly_total"])
+        yearly = sum(
+            projected_month_costs(
+                stats,
+                12
+            ).values()
+        )
 
         c1, c2, c3 = st.columns(3)
 
         c1.metric(
-            "月額合計",
+            "月額換算の合計",
             f"{monthly:,}円"
         )
 
         c2.metric(
-            "年間合計",
+            "今月から12か月の支払い",
             f"{yearly:,}円"
         )
 
         c3.metric(
             "サービス数",
-            len(df)
+            len(data["subs"])
         )
 
+        upcoming = upcoming_renewals(
+            stats,
+            date.today(),
+            ALERT_DAYS
+        )
+
+        subs_by_id = {
+            x["id"]: x
+            for x in data["subs"]
+        }
+
+        if upcoming:
+
+            st.warning(
+                f"⏰ {ALERT_DAYS}日以内に更新があるよ"
+            )
+
+            for renew_date, sub_id in upcoming:
+
+                sub = subs_by_id[sub_id]
+
+                st.write(
+                    f"・{renew_date}　{sub['name']}"
+                    f"（{int(sub['price']):,}円）"
+                )
+
+        else:
+
+            st.caption(
+                f"{ALERT_DAYS}日以内の更新はないよ"
+            )
+
     else:
 
         st.info(
@@ -194,16 +322,41 @@ if df.empty:
 
 else:
 
+    df["cycle"] = df["cycle_months"].map(
+        cycle_label
+    )
+
+    df["monthly"] = [
+        round(monthly_cost(x))
+        for x in data["subs"]
+    ]
+
+    df["next"] = df["id"].map(
+        lambda x: data["stats"]["entries"][x]["next"]
+    )
+
     st.dataframe(
         df[
             [
                 "name",
                 "category",
                 "price",
-                "pay_day",
+                "cycle",
+                "monthly",
+                "next",
                 "memo",
             ]
-        ],
+        ].rename(
+            columns={
+                "name": "サービス",
+                "category": "カテゴリ",
+                "price": "1回の料金",
+                "cycle": "サイクル",
+                "monthly": "月額換算",
+                "next": "次の更新日",
+                "memo": "メモ",
+            }
+        ),
         use_container_width=True
     )
 
@@ -222,6 +375,11 @@ else:
             if x["id"] != delete_id
         ]
 
+        remove_sub_stats(
+            data["stats"],
+            delete_id
+        )
+
         save_data(data)
 
         st.success(
@@ -229,3 +387,64 @@ else:
         )
 
         st.rerun()
+
+    st.divider()
+
+    st.subheader("📅 更新カレンダーと支払い見込み")
+
+    horizon = st.selectbox(
+        "見込み期間",
+        HORIZON_OPTIONS,
+        format_func=lambda x: f"{x}か月"
+    )
+
+    month_costs = projected_month_costs(
+        data["stats"],
+        horizon
+    )
+
+    st.bar_chart(
+        pd.Series(
+            month_costs,
+            name="支払い見込み"
+        )
+    )
+
+    st.caption(
+        f"{horizon}か月の合計：{sum(month_costs.values()):,}円"
+    )
+
+    calendar_start = date.today()
+
+    calendar_end = (
+        pd.Timestamp(calendar_start)
+        + pd.DateOffset(months=horizon)
+    ).date()
+
+    calendar_rows = [
+        {
+            "更新日": renew_date.isoformat(),
+            "サービス": sub["name"],
+            "サイクル": cycle_label(
+                sub["cycle_months"]
+            ),
+            "金額": int(sub["price"]),
+        }
+        for sub in data["subs"]
+        for renew_date in renewals_between(
+            sub,
+            calendar_start,
+            calendar_end
+        )
+    ]
+
+    if calendar_rows:
+
+        st.dataframe(
+            pd.DataFrame(calendar_rows).sort_values(
+                "更新日"
+            ),
+            use_container_width=True,
+            height=300,
+            hide_index=True
+        )
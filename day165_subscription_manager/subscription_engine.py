@@ -0,0 +1,285 @@
+import bisect
+import calendar
+from datetime import date, timedelta
+
+from common.subscription_data import monthly_cost
+
+# サブスクの請求サイクルと更新日・見込み費用の計算。
+# 更新日は「基準日から k サイクル後」を月の足し算で直接求めるので、
+# 何年先でも1日ずつ進めたり前回の更新日から積み重ねたりしない。
+# data["stats"] に月額換算の合計・月ごとの見込み額・次回更新日の並びを
+# 保存しておき、登録・削除のたびにその1件分だけ足し引きする。
+# 元帳へ送った最後の支払日も entries に持ち、次回更新日の並びの先頭
+# （今日までに更新日が来たもの）だけを見て、その後の支払いだけを返す。
+
+CYCLES = {
+    "毎月": 1,
+    "3か月ごと": 3,
+    "半年ごと": 6,
+    "毎年": 12,
+}
+
+HORIZON_MONTHS = 36
+
+
+def add_months(day, months, anchor_day=None):
+    # 月末を超える日は、その月の最終日にそろえる（1/31 の1か月後は 2/28）
+    anchor_day = anchor_day or day.day
+    year, month = divmod(day.month - 1 + months, 12)
+    year += day.year
+    month += 1
+    return date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+
+def months_between(start, end):
+    return (end.year - start.year) * 12 + end.month - start.month
+
+
+def month_key(day):
+    return day.strftime("%Y-%m")
+
+
+def parse_date(text):
+    try:
+        return date.fromisoformat(str(text)[:10])
+    except ValueError:
+        return None
+
+
+def first_payment_date(registered, pay_day):
+    # 旧データ用：登録日以降で最初に支払日が来る日
+    candidate = add_months(registered.replace(day=1), 0, pay_day)
+    if candidate < registered:
+        candidate = add_months(registered.replace(day=1), 1, pay_day)
+    return candidate
+
+
+def normalize_sub(sub, today=None):
+    # 請求サイクルと初回支払日のない旧データは「毎月・登録日以降の最初の支払日から」とみなす
+    today = today or date.today()
+    sub["cycle_months"] = max(1, int(sub.get("cycle_months", 1)))
+
+    if not parse_date(sub.get("start_date", "")):
+        registered = parse_date(sub.get("date", "")) or today
+        sub["start_date"] = first_payment_date(
+            registered,
+            int(sub.get("pay_day", registered.day))
+        ).isoformat()
+
+    return sub
+
+
+def cycle_label(cycle_months):
+    for label, months in CYCLES.items():
+        if months == cycle_months:
+            return label
+    return f"{cycle_months}か月ごと"
+
+
+def renewal_date(sub, k):
+    start = parse_date(sub["start_date"])
+    return add_months(start, k * int(sub["cycle_months"]), start.day)
+
+
+def renewals_between(sub, start, end):
+    # start 以上 end 以下の更新日。最初のサイクル番号を割り算で求める
+    first = parse_date(sub["start_date"])
+    cycle = int(sub["cycle_months"])
+
+    if first is None or end < first:
+        return []
+
+    k = max(0, months_between(first, start) // cycle)
+
+    while renewal_date(sub, k) < start:
+        k += 1
+
+    dates = []
+    day = renewal_date(sub, k)
+
+    while day <= end:
+        dates.append(day)
+        k += 1
+        day = renewal_date(sub, k)
+
+    return dates
+
+
+def next_renewal(sub, today):
+    first = parse_date(sub["start_date"])
+    cycle = int(sub["cycle_months"])
+    k = max(0, months_between(first, today) // cycle)
+
+    while renewal_date(sub, k) < today:
+        k += 1
+
+    return renewal_date(sub, k)
+
+
+def horizon_range(start_month):
+    start = date.fromisoformat(f"{start_month}-01")
+    end = add_months(start, HORIZON_MONTHS) - timedelta(days=1)
+    return start, end
+
+
+def create_stats(today):
+    return {
+        "horizon_start": month_key(today),
+        "monthly_total": 0.0,
+        "by_category": {},
+        "month_costs": {},
+        "renewal_queue": [],
+        "entries": {},
+    }
+
+
+def add_amount(counts, key, amount):
+    counts[key] = round(counts.get(key, 0) + amount, 2)
+    if abs(counts[key]) < 0.005:
+        del counts[key]
+
+
+def queue_update(queue, item, sign):
+    if sign > 0:
+        bisect.insort(queue, item)
+        return
+
+    index = bisect.bisect_left(queue, item)
+    if index < len(queue) and queue[index] == item:
+        del queue[index]
+
+
+def sub_entry(sub, stats, today):
+    start, end = horizon_range(stats["horizon_start"])
+
+    return {
+        "monthly": monthly_cost(sub),
+        "category": sub.get("category", "その他"),
+        "price": int(sub.get("price", 0)),
+        "renewals": [month_key(day) for day in renewals_between(sub, start, end)],
+        "next": next_renewal(sub, today).isoformat(),
+        "charged": "",
+    }
+
+
+def apply_entry(stats, sub_id, entry, sign):
+    stats["monthly_total"] = round(stats["monthly_total"] + sign * entry["monthly"], 2)
+    add_amount(stats["by_category"], entry["category"], sign * entry["monthly"])
+
+    for month in entry["renewals"]:
+        add_amount(stats["month_costs"], month, sign * entry["price"])
+
+    queue_update(stats["renewal_queue"], [entry["next"], sub_id], sign)
+
+
+def add_sub_stats(stats, sub, today=None):
+    today = today or date.today()
+    entry = sub_entry(normalize_sub(sub, today), stats, today)
+    apply_entry(stats, sub["id"], entry, 1)
+    stats["entries"][sub["id"]] = entry
+
+
+def remove_sub_stats(stats, sub_id):
+    entry = stats["entries"].pop(sub_id, None)
+    if entry:
+        apply_entry(stats, sub_id, entry, -1)
+
+
+def rebuild_stats(subs, today=None):
+    today = today or date.today()
+    stats = create_stats(today)
+    for sub in subs:
+        add_sub_stats(stats, sub, today)
+    return stats
+
+
+def take_charges(stats, sub, today):
+    # 元帳へまだ送っていない今日までの支払日を返し、送った所まで印をつける
+    entry = stats["entries"].get(sub["id"])
+    if entry is None:
+        return []
+
+    charged = parse_date(entry.get("charged", ""))
+    start = charged + timedelta(days=1) if charged else parse_date(sub["start_date"])
+    days = renewals_between(sub, start, today)
+
+    if days:
+        entry["charged"] = days[-1].isoformat()
+
+    return [(sub, day) for day in days]
+
+
+def due_charges(stats, subs_by_id, today):
+    # 次回更新日が今日までのもの（並びの先頭）だけを見る
+    queue = stats["renewal_queue"]
+    end = bisect.bisect_left(queue, [(today + timedelta(days=1)).isoformat()])
+    charges = []
+
+    for _, sub_id in queue[:end]:
+        sub = subs_by_id.get(sub_id)
+        if sub is not None:
+            charges += take_charges(stats, sub, today)
+
+    return charges
+
+
+def advance_queue(stats, subs_by_id, today):
+    # 更新日が過ぎたものだけ先頭から取り出し、次の更新日で入れ直す
+    queue = stats["renewal_queue"]
+    today_text = today.isoformat()
+    moved = 0
+
+    while queue and queue[0][0] < today_text:
+        _, sub_id = queue.pop(0)
+        moved += 1
+        sub = subs_by_id.get(sub_id)
+        if sub is None:
+            continue
+        next_day = next_renewal(sub, today).isoformat()
+        stats["entries"][sub_id]["next"] = next_day
+        bisect.insort(queue, [next_day, sub_id])
+
+    return moved
+
+
+def ensure_stats(data, today=None):
+    # 保存された集計が登録内容と合わない・見込み期間の月が変わったときだけ作り直す。
+    # 戻り値は（集計, 元帳へ送る新しい支払い [(サブスク, 支払日), ...], 保存し直す必要があるか）
+    today = today or date.today()
+    stats = data.get("stats")
+    subs_by_id = {sub["id"]: sub for sub in data["subs"]}
+
+    if (
+        not isinstance(stats, dict)
+        or set(stats.get("entries", {})) != set(subs_by_id)
+        or stats.get("horizon_start") != month_key(today)
+        or any("charged" not in entry for entry in stats["entries"].values())
+    ):
+        # 作り直しても、元帳へ送った所は引き継ぐ
+        old_entries = stats.get("entries", {}) if isinstance(stats, dict) else {}
+        data["stats"] = rebuild_stats(data["subs"], today)
+
+        charges = []
+        for sub_id, entry in data["stats"]["entries"].items():
+            entry["charged"] = old_entries.get(sub_id, {}).get("charged", "")
+            charges += take_charges(data["stats"], subs_by_id[sub_id], today)
+
+        return data["stats"], charges, True
+
+    charges = due_charges(stats, subs_by_id, today)
+    moved = advance_queue(stats, subs_by_id, today)
+
+    return stats, charges, bool(charges) or moved > 0
+
+
+def upcoming_renewals(stats, today, days):
+    queue = stats["renewal_queue"]
+    start = bisect.bisect_left(queue, [today.isoformat()])
+    end = bisect.bisect_left(queue, [(today + timedelta(days=days + 1)).isoformat()])
+    return queue[start:end]
+
+
+def projected_month_costs(stats, months):
+    start, _ = horizon_range(stats["horizon_start"])
+    keys = [month_key(add_months(start, i)) for i in range(min(months, HORIZON_MONTHS))]
+    return {key: int(round(stats["month_costs"].get(key, 0))) for key in keys}
@@ -2,7 +2,20 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.savings_projection import (  # noqa: E402
+    WEEKS_PER_YEAR,
+    simulate_savings,
+    weekly_deposit_stats,
+)
 
 APP_TITLE = "Day167：1日100円節約チャレンジ"
 DATA_DIR = "data"
@@ -241,6 +254,29 @@ with right:
         else:
             st.info(f"今日の目標まであと {yen(daily_goal - today_total)}")
 
+        weekly_mean, weekly_std = weekly_deposit_stats(
+            [
+                (datetime.strptime(x, "%Y-%m-%d").date(), amount)
+                for x, amount in zip(df["date"], df["amount"])
+            ]
+        )
+
+        if weekly_mean > 0:
+            projection = simulate_savings(
+                current_amount=total,
+                target_amount=float("inf"),
+                weekly_mean=weekly_mean,
+                weekly_std=weekly_std,
+                horizon_weeks=WEEKS_PER_YEAR,
+            )
+
+            low, middle, high = projection["balance_percentiles"][:, -1]
+
+            st.caption(
+                f"直近12週のペース（週 {int(weekly_mean):,} 円）で1年続けると、"
+                f"累計は {yen(low)}〜{yen(high)}（真ん中 {yen(middle)}）くらいになりそう。"
+            )
+
         st.divider()
 
         if not month_df.empty:
@@ -2,12 +2,25 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.deadline_index import register_deadlines  # noqa: E402
 
 APP_TITLE = "Day169：冷蔵庫メモ"
 DATA_DIR = "data"
 DATA_PATH = os.path.join(DATA_DIR, "day169_fridge_memo.json")
 
+# 期限系アプリ共通のインデックス（common/deadline_index.py）に登録するときの名前
+DEADLINE_APP_KEY = "day169_fridge_memo"
+DEADLINE_APP_NAME = "冷蔵庫メモ"
+
 CATEGORIES = [
     "野菜",
     "肉",
@@ -60,6 +73,8 @@ def load_data():
     if "shopping" not in data:
         data["shopping"] = []
 
+    register_deadlines(DEADLINE_APP_KEY, DEADLINE_APP_NAME, deadline_entries(data))
+
     return data
 
 
@@ -69,6 +84,8 @@ def save_data(data):
     with open(DATA_PATH, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+    register_deadlines(DEADLINE_APP_KEY, DEADLINE_APP_NAME, deadline_entries(data))
+
 
 def now_str():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -102,6 +119,21 @@ def expire_label(days):
     return "🟢 余裕"
 
 
+def deadline_entries(data):
+    # [期限日, アプリ, レコードID, 名前] の形で期限インデックスに登録する
+    entries = []
+
+    for x in data["foods"]:
+        try:
+            due = datetime.strptime(x.get("expire_date", ""), "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            continue
+
+        entries.append([due.isoformat(), DEADLINE_APP_KEY, x["id"], x["name"]])
+
+    return entries
+
+
 def to_food_df(data):
     rows = []
 
@@ -2,11 +2,31 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.ledger import (  # noqa: E402
+    EXPENSE,
+    INCOME,
+    LEDGER_SOURCES,
+    ensure_source,
+    make_entry,
+    monthly_totals,
+    source_totals,
+    spend_by_category,
+    sync_source,
+)
 
 APP_TITLE = "Day179：所持金・支出ログ"
 DATA_DIR = "data"
 DATA_PATH = os.path.join(DATA_DIR, "day179_money_log.json")
+LEDGER_SOURCE = "day179_money_log"
 
 EXPENSE_CATEGORIES = [
     "食費",
@@ -68,6 +88,8 @@ def load_data():
     if "start_money" not in data["settings"]:
         data["settings"]["start_money"] = 0
 
+    ensure_source(LEDGER_SOURCE, ledger_entries(data))
+
     return data
 
 
@@ -77,6 +99,22 @@ def save_data(data):
     with open(DATA_PATH, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+    sync_source(LEDGER_SOURCE, ledger_entries(data))
+
+
+def ledger_entries(data):
+    return [
+        make_entry(
+            x["id"],
+            x["date"],
+            x.get("amount", 0),
+            x["category"],
+            kind=x["type"],
+            title=x.get("title", "")
+        )
+        for x in data["logs"]
+    ]
+
 
 def now_str():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -319,9 +357,14 @@ else:
     st.divider()
     st.subheader("月別集計")
 
-    monthly = df.groupby(["month", "type"])["amount"].sum().reset_index()
+    monthly = pd.DataFrame({
+        "収入": monthly_totals(sources=[LEDGER_SOURCE], kind=INCOME),
+        "支出": monthly_totals(sources=[LEDGER_SOURCE], kind=EXPENSE),
+    }).fillna(0).astype(int).sort_index(ascending=False)
 
     if not monthly.empty:
+        monthly["収支"] = monthly["収入"] - monthly["支出"]
+
         st.dataframe(
             monthly,
             use_container_width=True,
@@ -331,13 +374,12 @@ else:
     st.divider()
     st.subheader("支出カテゴリ別")
 
-    expense_df = df[df["type"] == "支出"]
+    expense_table = spend_by_category(sources=[LEDGER_SOURCE], kind=EXPENSE)
 
-    if expense_df.empty:
+    if expense_table.empty:
         st.write("支出データがないよ。")
     else:
-        expense_cat = expense_df.groupby("category")["amount"].sum().reset_index()
-        expense_cat = expense_cat.sort_values("amount", ascending=False)
+        expense_cat = expense_table.sum().rename("amount").rename_axis("category").reset_index()
 
         st.dataframe(
             expense_cat,
@@ -387,3 +429,55 @@ else:
         file_name="day179_money_log.csv",
         mime="text/csv"
     )
+
+st.divider()
+st.subheader("ほかのお金アプリもまとめた支出")
+st.caption("お金つかったログ・レシート管理帳・サブスク管理帳などの記録を、共通の元帳の集計から表示するよ。")
+
+all_sources = list(LEDGER_SOURCES)
+
+selected_sources = st.multiselect(
+    "まとめるアプリ",
+    all_sources,
+    default=all_sources,
+    format_func=lambda x: LEDGER_SOURCES[x]
+)
+
+month_count = st.slider(
+    "さかのぼる月数",
+    min_value=1,
+    max_value=24,
+    value=6
+)
+
+start_month = (pd.Timestamp(date.today()) - pd.DateOffset(months=month_count - 1)).strftime("%Y-%m")
+
+ledger_table = spend_by_category(start_month=start_month, sources=selected_sources)
+
+if ledger_table.empty:
+    st.write("まとめられる支出がまだないよ。")
+else:
+    this_month = source_totals(current_month())
+
+    c1, c2 = st.columns(2)
+    c1.metric("今月の支出（全アプリ）", yen(sum(v for k, v in this_month.items() if k in selected_sources)))
+    c2.metric(f"{month_count}か月の支出合計", yen(ledger_table.to_numpy().sum()))
+
+    st.bar_chart(ledger_table)
+
+    st.dataframe(
+        ledger_table.assign(合計=ledger_table.sum(axis=1)).sort_index(ascending=False),
+        use_container_width=True,
+        height=260
+    )
+
+    if this_month:
+        st.dataframe(
+            pd.DataFrame([
+                {"アプリ": LEDGER_SOURCES.get(k, k), "今月の支出": yen(v)}
+                for k, v in sorted(this_month.items(), key=lambda x: -x[1])
+                if k in selected_sources
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
@@ -2,7 +2,23 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.savings_projection import (  # noqa: E402
+    WEEKS_PER_MONTH,
+    completion_dates,
+    percentile_frame_rows,
+    reach_probability,
+    simulate_savings,
+)
+from common.subscription_data import load_subscription_monthly_cost  # noqa: E402
 
 APP_TITLE = "Day180：貯金目標メーカー"
 DATA_DIR = "data"
@@ -268,6 +284,107 @@ with right:
 
     st.success(status_comment(plan["progress"], plan["remaining"]))
 
+    with st.expander("🎲 いろいろなシナリオで見込みを試す"):
+        st.caption(
+            "積立額のばらつき・休む月・利息・サブスク代を入れて、"
+            "たくさんのパターンをまとめて試算するよ。"
+        )
+
+        monthly_deposit = st.number_input(
+            "毎月の積立額",
+            min_value=0,
+            value=int(round(plan["per_month"], -3)),
+            step=1000
+        )
+
+        s1, s2, s3 = st.columns(3)
+
+        with s1:
+            deposit_spread = st.slider(
+                "積立額のばらつき（±%）",
+                0,
+                100,
+                20,
+                step=5
+            )
+
+        with s2:
+            miss_rate = st.slider(
+                "積み立てを休む確率（%）",
+                0,
+                50,
+                10,
+                step=5
+            )
+
+        with s3:
+            annual_rate = st.slider(
+                "年利（%）",
+                0.0,
+                10.0,
+                0.0,
+                step=0.5
+            )
+
+        subscription_cost = load_subscription_monthly_cost()
+
+        if subscription_cost is None:
+            st.info(
+                "サブスク管理帳（Day165）の保存ファイルが見つからないので、"
+                "サブスク代は差し引けないよ。"
+            )
+
+        use_subscription = st.checkbox(
+            f"サブスク代（月 {subscription_cost or 0:,} 円）を積立から差し引く",
+            value=False,
+            disabled=not subscription_cost
+        )
+
+        weekly_mean = monthly_deposit / WEEKS_PER_MONTH
+
+        projection = simulate_savings(
+            current_amount=int(current_amount),
+            target_amount=int(target_amount),
+            weekly_mean=weekly_mean,
+            weekly_std=weekly_mean * deposit_spread / 100,
+            annual_rate=annual_rate / 100,
+            miss_rate=miss_rate / 100,
+            weekly_cost=(
+                subscription_cost / WEEKS_PER_MONTH
+                if use_subscription
+                else 0
+            ),
+        )
+
+        labels = [
+            x.isoformat() if x else "10年以内は厳しい"
+            for x in completion_dates(projection)
+        ]
+
+        p1, p2, p3 = st.columns(3)
+
+        with p1:
+            st.metric("早ければ", labels[0])
+
+        with p2:
+            st.metric("真ん中", labels[1])
+
+        with p3:
+            st.metric("遅ければ", labels[2])
+
+        probability = reach_probability(projection, target_date)
+        st.info(f"目標日までに届く見込み：{round(probability * 100, 1)}%")
+
+        fan_df = pd.DataFrame(
+            percentile_frame_rows(projection["balance_percentiles"])
+        ).set_index("日付")
+
+        st.line_chart(fan_df)
+        st.caption(
+            "10% / 50% / 90% は、試したパターンのうち"
+            "その割合が下回る残高の線だよ。"
+        )
+
 st.divider()
 st.subheader("貯金目標一覧")
 
@@ -2,11 +2,22 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import base64
+import gzip
+import hashlib
+import heapq
+import mmap
+import secrets
+import tempfile
 from datetime import datetime, date
 
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
 APP_TITLE = "Day186：パスワード管理帳"
 DATA_DIR = "data"
 DATA_PATH = os.path.join(DATA_DIR, "day186_password_manager.json")
+BREACH_INDEX_PATH = os.path.join(DATA_DIR, "breached_sha1.bin")
 
 CATEGORIES = [
     "SNS",
@@ -20,6 +31,26 @@ CATEGORIES = [
     "その他",
 ]
 
+# scrypt（メモリハード）のパラメータ。鍵はセッションごとに1回だけ導出する
+KDF_N = 2 ** 15
+KDF_R = 8
+KDF_P = 1
+VAULT_CHECK = b"day186_vault_check"
+MASKED = "●" * 8
+DECRYPT_FAILED = "（復号できません）"
+
+# 漏えいパスワード一覧は SHA-1（20バイト）を昇順に並べたファイルとして持つ
+SHA1_SIZE = 20
+
+# 漏えいリストの取り込み形式（行ごとには推測しない）
+BREACH_FORMATS = {
+    "SHA-1（HIBP形式：SHA-1:件数）": "sha1",
+    "平文パスワード（1行1件）": "plain",
+}
+
+# 取り込み時に一度に並べ替える件数。超えた分は一時ファイルに書いて後で併合する
+BREACH_CHUNK_SIZE = 500_000
+
 
 def ensure_storage():
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -56,33 +87,146 @@ def today_str():
     return date.today().isoformat()
 
 
-def mask_password(password):
-    if not password:
-        return ""
+def b64e(raw):
+    return base64.b64encode(raw).decode("ascii")
 
-    return "●" * min(len(password), 12)
 
+def b64d(text):
+    return base64.b64decode(text.encode("ascii"))
 
-def strength_label(password):
-    score = 0
 
-    if len(password) >= 8:
-        score += 1
+def derive_key(master_password, vault):
+    n = vault["n"]
+    r = vault["r"]
+    p = vault["p"]
+
+    return hashlib.scrypt(
+        master_password.encode("utf-8"),
+        salt=b64d(vault["salt"]),
+        n=n,
+        r=r,
+        p=p,
+        maxmem=256 * n * r * p,
+        dklen=32
+    )
+
+
+def encrypt_text(key, text, aad):
+    nonce = secrets.token_bytes(12)
+    cipher = AESGCM(key).encrypt(nonce, text.encode("utf-8"), aad.encode("utf-8"))
+
+    return {
+        "nonce": b64e(nonce),
+        "cipher": b64e(cipher),
+    }
+
+
+def decrypt_text(key, secret, aad):
+    plain = AESGCM(key).decrypt(
+        b64d(secret["nonce"]),
+        b64d(secret["cipher"]),
+        aad.encode("utf-8")
+    )
+
+    return plain.decode("utf-8")
+
+
+def create_vault(data, master_password):
+    vault = {
+        "version": 1,
+        "kdf": "scrypt",
+        "salt": b64e(secrets.token_bytes(16)),
+        "n": KDF_N,
+        "r": KDF_R,
+        "p": KDF_P,
+    }
+
+    key = derive_key(master_password, vault)
+    vault["check"] = encrypt_text(key, VAULT_CHECK.decode("utf-8"), "vault")
 
-    if len(password) >= 12:
-        score += 1
+    data["vault"] = vault
+    encrypt_plain_accounts(data, key)
 
-    if any(c.isupper() for c in password):
-        score += 1
+    return key
 
-    if any(c.islower() for c in password):
-        score += 1
 
-    if any(c.isdigit() for c in password):
-        score += 1
+def unlock_vault(data, master_password):
+    vault = data["vault"]
+    key = derive_key(master_password, vault)
+
+    try:
+        decrypt_text(key, vault["check"], "vault")
+    except InvalidTag:
+        return None
+
+    return key
+
+
+def encrypt_plain_accounts(data, key):
+    # 旧形式（平文の password）を1件ずつ暗号化して置き換える
+    count = 0
+
+    for x in data["accounts"]:
+        if "password" not in x:
+            continue
+
+        password = x.pop("password")
+        set_account_password(x, password, key)
+        count += 1
+
+    return count
+
+
+def set_account_password(account, password, key):
+    account["strength"] = strength_label(password)
+    account["secret"] = encrypt_text(key, password, account["id"])
+
+
+def reveal_password(account, key):
+    # 復号できない（データが壊れている・別の鍵で暗号化された）ときは None
+    secret = account.get("secret")
+
+    if not secret:
+        return account.get("password", "")
+
+    try:
+        return decrypt_text(key, secret, account["id"])
+    except InvalidTag:
+        return None
+
+
+def mask_password(password):
+    if not password:
+        return ""
+
+    return "●" * min(len(password), 12)
+
 
-    if any(not c.isalnum() for c in password):
-        score += 1
+def strength_label(password):
+    # 1文字ずつ1回だけ見て文字種を判定する
+    has_upper = False
+    has_lower = False
+    has_digit = False
+    has_symbol = False
+
+    for c in password:
+        if c.isupper():
+            has_upper = True
+        elif c.islower():
+            has_lower = True
+        elif c.isdigit():
+            has_digit = True
+        elif not c.isalnum():
+            has_symbol = True
+
+    score = (
+        (len(password) >= 8)
+        + (len(password) >= 12)
+        + has_upper
+        + has_lower
+        + has_digit
+        + has_symbol
+    )
 
     if score >= 5:
         return "強い"
@@ -93,12 +237,212 @@ def strength_label(password):
     return "弱い"
 
 
-def to_df(data, show_password=False):
+def password_digest(password):
+    return hashlib.sha1(password.encode("utf-8")).digest()
+
+
+def parse_breach_line(line, breach_format):
+    # 形式は取り込むときに選んでもらい、行ごとに推測はしない
+    if breach_format == "sha1":
+        head = line.split(b":", 1)[0].strip()
+
+        if len(head) != SHA1_SIZE * 2:
+            return None
+
+        try:
+            return bytes.fromhex(head.decode("ascii"))
+        except ValueError:
+            return None
+
+    text = line.rstrip(b"\r\n")
+
+    if not text:
+        return None
+
+    return hashlib.sha1(text).digest()
+
+
+def open_breach_lines(uploaded, filename):
+    # .gz も展開しながら1行ずつ読む（全体を展開したコピーは作らない）
+    uploaded.seek(0)
+
+    if filename.endswith(".gz"):
+        return gzip.GzipFile(fileobj=uploaded)
+
+    return uploaded
+
+
+def iter_breach_digests(lines, breach_format):
+    for line in lines:
+        digest = parse_breach_line(line, breach_format)
+
+        if digest:
+            yield digest
+
+
+def read_digests(path):
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(SHA1_SIZE * 4096)
+
+            if not block:
+                return
+
+            for start in range(0, len(block), SHA1_SIZE):
+                yield block[start:start + SHA1_SIZE]
+
+
+def write_unique_digests(digests, f):
+    # 昇順に並んだ SHA-1 を、重複を除いて書き出す
+    count = 0
+    previous = None
+
+    for digest in digests:
+        if digest == previous:
+            continue
+
+        if previous is not None and digest < previous:
+            raise ValueError("SHA-1 が昇順に並んでいないよ。")
+
+        f.write(digest)
+        previous = digest
+        count += 1
+
+    return count
+
+
+def write_sorted_run(digests, directory, number):
+    digests.sort()
+
+    path = os.path.join(directory, f"run{number:05d}.bin")
+
+    with open(path, "wb") as f:
+        write_unique_digests(digests, f)
+
+    return path
+
+
+def build_breach_index(uploaded, filename, breach_format, presorted=False):
+    ensure_storage()
+
+    digests = iter_breach_digests(open_breach_lines(uploaded, filename), breach_format)
+
+    temp_path = BREACH_INDEX_PATH + ".tmp"
+
+    try:
+        with open(temp_path, "wb") as out:
+            if presorted and breach_format == "sha1":
+                # 昇順に並んだ HIBP のファイルはそのまま流して書く
+                count = write_unique_digests(digests, out)
+
+            else:
+                # 一定件数ごとに並べ替えて一時ファイルに書き、最後にまとめて併合する
+                with tempfile.TemporaryDirectory(dir=DATA_DIR) as run_dir:
+                    runs = []
+                    chunk = []
+
+                    for digest in digests:
+                        chunk.append(digest)
+
+                        if len(chunk) >= BREACH_CHUNK_SIZE:
+                            runs.append(write_sorted_run(chunk, run_dir, len(runs)))
+                            chunk = []
+
+                    if chunk:
+                        runs.append(write_sorted_run(chunk, run_dir, len(runs)))
+
+                    count = write_unique_digests(
+                        heapq.merge(*(read_digests(path) for path in runs)),
+                        out
+                    )
+
+        os.replace(temp_path, BREACH_INDEX_PATH)
+
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return count
+
+
+def breach_index_size():
+    if not os.path.exists(BREACH_INDEX_PATH):
+        return 0
+
+    return os.path.getsize(BREACH_INDEX_PATH) // SHA1_SIZE
+
+
+def in_breach_index(index, digest):
+    # mmap した昇順ファイルを二分探索する
+    lo = 0
+    hi = len(index) // SHA1_SIZE
+
+    while lo < hi:
+        mid = (lo + hi) // 2
+        current = index[mid * SHA1_SIZE:(mid + 1) * SHA1_SIZE]
+
+        if current < digest:
+            lo = mid + 1
+        elif current > digest:
+            hi = mid
+        else:
+            return True
+
+    return False
+
+
+def find_breached(digests):
+    if breach_index_size() == 0:
+        return set()
+
+    with open(BREACH_INDEX_PATH, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index:
+            return {
+                digest for digest in digests
+                if in_breach_index(index, digest)
+            }
+
+
+def audit_vault(data, key):
+    # 復号・ハッシュ化は1件につき1回だけ。強度・漏えい・使い回しをまとめて判定する
+    # 復号できなかったものは使い回しに数えず、別に印をつける
+    digests = {}
+    owners = {}
+
+    for x in data["accounts"]:
+        password = reveal_password(x, key)
+
+        if password is None:
+            continue
+
+        digest = password_digest(password)
+
+        digests[x["id"]] = digest
+        owners.setdefault(digest, []).append(x["id"])
+
+    breached = find_breached(owners.keys())
     rows = []
 
     for x in data["accounts"]:
-        password = x.get("password", "")
+        digest = digests.get(x["id"])
+
+        rows.append({
+            "service": x["service"],
+            "login_id": x.get("login_id", ""),
+            "strength": x.get("strength", ""),
+            "breached": digest in breached,
+            "reused": len(owners[digest]) - 1 if digest else 0,
+            "decrypt_failed": digest is None,
+        })
 
+    return pd.DataFrame(rows)
+
+
+def to_df(data):
+    # 復号せずに作れるメタデータだけで一覧を作る
+    rows = []
+
+    for x in data["accounts"]:
         rows.append({
             "id": x["id"],
             "created_at": x["created_at"],
@@ -106,8 +450,8 @@ def to_df(data, show_password=False):
             "service": x["service"],
             "category": x["category"],
             "login_id": x.get("login_id", ""),
-            "password": password if show_password else mask_password(password),
-            "strength": strength_label(password),
+            "password": MASKED,
+            "strength": x.get("strength") or strength_label(x.get("password", "")),
             "url": x.get("url", ""),
             "favorite": bool(x.get("favorite", False)),
             "memo": x.get("memo", ""),
@@ -121,12 +465,18 @@ def to_df(data, show_password=False):
     return df
 
 
-def find_account(data, account_id):
-    for x in data["accounts"]:
-        if x["id"] == account_id:
-            return x
+def reveal_rows(view, accounts_by_id, key):
+    # 表示中の行だけ復号する
+    view = view.copy()
+    view["password"] = [
+        DECRYPT_FAILED if password is None else password
+        for password in (
+            reveal_password(accounts_by_id[x], key)
+            for x in view["id"]
+        )
+    ]
 
-    return None
+    return view
 
 
 st.set_page_config(
@@ -138,10 +488,59 @@ st.set_page_config(
 st.title("🔐 Day186：パスワード管理帳")
 st.caption("サービス名・ID・パスワード・URLをローカルで管理するシンプルなパスワード帳。")
 
-st.warning("注意：この版は暗号化していません。本当に重要なパスワードの保存は、暗号化版を作ってからがおすすめです。")
-
 data = load_data()
 
+if "vault_key" not in st.session_state:
+    st.session_state["vault_key"] = None
+
+if "vault" not in data:
+    st.subheader("マスターパスワードの設定")
+    st.info("パスワードはマスターパスワードから作った鍵で1件ずつ暗号化して保存するよ。マスターパスワードを忘れると復元できないので注意してね。")
+
+    new_master = st.text_input("マスターパスワード", type="password")
+    confirm_master = st.text_input("マスターパスワード（確認）", type="password")
+
+    if st.button("🔐 暗号化を始める", type="primary"):
+        if len(new_master) < 8:
+            st.warning("マスターパスワードは8文字以上にしてね。")
+        elif new_master != confirm_master:
+            st.warning("確認用のパスワードが一致しないよ。")
+        else:
+            st.session_state["vault_key"] = create_vault(data, new_master)
+            save_data(data)
+
+            st.success("暗号化して保存したよ。")
+            st.rerun()
+
+    st.stop()
+
+if st.session_state["vault_key"] is None:
+    st.subheader("ロック中")
+
+    master = st.text_input("マスターパスワード", type="password")
+
+    if st.button("🔓 ロック解除", type="primary"):
+        key = unlock_vault(data, master)
+
+        if key is None:
+            st.error("マスターパスワードが違うよ。")
+        else:
+            st.session_state["vault_key"] = key
+
+            if encrypt_plain_accounts(data, key):
+                save_data(data)
+
+            st.rerun()
+
+    st.stop()
+
+vault_key = st.session_state["vault_key"]
+accounts_by_id = {x["id"]: x for x in data["accounts"]}
+
+if st.button("🔒 ロックする"):
+    st.session_state["vault_key"] = None
+    st.rerun()
+
 left, right = st.columns([1, 1], gap="large")
 
 with left:
@@ -183,6 +582,9 @@ with left:
     if password:
         st.info(f"パスワード強度：{strength_label(password)}")
 
+        if find_breached([password_digest(password)]):
+            st.error("このパスワードは漏えいリストに含まれているよ。別のものにしてね。")
+
     if st.button("🔐 保存する", type="primary"):
         if not service.strip():
             st.warning("サービス名を入れてね。")
@@ -198,12 +600,12 @@ with left:
                 "service": service.strip(),
                 "category": category,
                 "login_id": login_id.strip(),
-                "password": password.strip(),
                 "url": url.strip(),
                 "memo": memo.strip(),
                 "favorite": favorite,
             }
 
+            set_account_password(item, password.strip(), vault_key)
             data["accounts"].append(item)
             save_data(data)
 
@@ -258,7 +660,7 @@ show_passwords = st.checkbox(
 
 st.session_state["show_passwords"] = show_passwords
 
-df = to_df(data, show_password=show_passwords)
+df = to_df(data)
 
 if df.empty:
     st.write("まだ一覧に表示するデータがないよ。")
@@ -305,6 +707,9 @@ else:
     if fav_only:
         view = view[view["favorite"] == True]
 
+    if show_passwords:
+        view = reveal_rows(view, accounts_by_id, vault_key)
+
     st.dataframe(
         view[[
             "service",
@@ -329,23 +734,27 @@ else:
         selected_id = st.selectbox(
             "アカウントを選ぶ",
             view["id"].tolist(),
-            format_func=lambda x: f"{find_account(data, x)['service']} / {find_account(data, x).get('login_id', '')}"
+            format_func=lambda x: f"{accounts_by_id[x]['service']} / {accounts_by_id[x].get('login_id', '')}"
         )
 
-        account = find_account(data, selected_id)
+        account = accounts_by_id.get(selected_id)
 
         if account:
             st.markdown(f"## {account['service']}")
             st.write(f"カテゴリ：{account['category']}")
             st.write(f"ログインID：{account.get('login_id', '')}")
             st.write(f"URL：{account.get('url', '')}")
-            st.write(f"強度：{strength_label(account.get('password', ''))}")
+            st.write(f"強度：{account.get('strength', '')}")
+
+            current_password = reveal_password(account, vault_key)
 
             st.markdown("### パスワード")
-            if show_passwords:
-                st.code(account.get("password", ""), language="text")
+            if current_password is None:
+                st.error("このパスワードは復号できなかったよ。データが壊れているか、別のマスターパスワードで保存されたものかも。")
+            elif show_passwords:
+                st.code(current_password, language="text")
             else:
-                st.code(mask_password(account.get("password", "")), language="text")
+                st.code(mask_password(current_password), language="text")
 
             if account.get("memo"):
                 st.info(account["memo"])
@@ -369,7 +778,7 @@ else:
 
             new_password = st.text_input(
                 "パスワード更新",
-                value=account.get("password", ""),
+                value=current_password or "",
                 type="password",
                 key=f"password_{account['id']}"
             )
@@ -377,7 +786,12 @@ else:
             if st.button("📝 更新する"):
                 account["category"] = new_category
                 account["favorite"] = new_favorite
-                account["password"] = new_password.strip()
+                if current_password is None:
+                    # 復号できないものは、新しく入力したときだけ置き換える
+                    if new_password.strip():
+                        set_account_password(account, new_password.strip(), vault_key)
+                elif new_password.strip() != current_password:
+                    set_account_password(account, new_password.strip(), vault_key)
                 account["updated_at"] = now_str()
 
                 save_data(data)
@@ -395,7 +809,7 @@ else:
                 st.warning("削除したよ。")
                 st.rerun()
 
-    safe_df = to_df(data, show_password=False)
+    safe_df = to_df(data)
     csv = safe_df.to_csv(index=False).encode("utf-8-sig")
 
     st.download_button(
@@ -404,3 +818,74 @@ else:
         file_name="day186_password_manager_safe.csv",
         mime="text/csv"
     )
+
+
+st.divider()
+st.subheader("🔍 セキュリティ監査")
+st.caption("全アカウントを一度だけ復号して、弱いパスワード・漏えいリストとの一致・使い回しをまとめてチェックするよ。")
+
+st.write(f"漏えいリスト：{breach_index_size()} 件")
+
+breach_file = st.file_uploader(
+    "漏えいパスワードリストを取り込む（1行1件の .txt / .gz）",
+    type=["txt", "gz"]
+)
+
+breach_format_label = st.radio("リストの形式", list(BREACH_FORMATS.keys()), horizontal=True)
+breach_format = BREACH_FORMATS[breach_format_label]
+
+breach_presorted = st.checkbox(
+    "SHA-1 の昇順に並んでいる（HIBP の ordered-by-hash 版）",
+    disabled=breach_format != "sha1"
+)
+
+if breach_file is not None and st.button("📥 リストを取り込む"):
+    try:
+        count = build_breach_index(breach_file, breach_file.name, breach_format, breach_presorted)
+
+    except (OSError, ValueError) as e:
+        st.error(f"取り込めなかったよ：{e}")
+
+    else:
+        st.success(f"{count} 件のリストを取り込んだよ。")
+        st.rerun()
+
+if data["accounts"] and st.button("🔍 全件チェック"):
+    audit_df = audit_vault(data, vault_key)
+
+    c1, c2, c3, c4 = st.columns(4)
+
+    with c1:
+        st.metric("弱いパスワード", len(audit_df[audit_df["strength"] == "弱い"]))
+
+    with c2:
+        st.metric("漏えいリストと一致", int(audit_df["breached"].sum()))
+
+    with c3:
+        st.metric("使い回し", len(audit_df[audit_df["reused"] > 0]))
+
+    with c4:
+        st.metric("復号できない", int(audit_df["decrypt_failed"].sum()))
+
+    failed = audit_df[audit_df["decrypt_failed"]]
+
+    if not failed.empty:
+        st.error(
+            "復号できなかったため、チェックできなかったアカウント："
+            + "、".join(failed["service"] + " / " + failed["login_id"])
+        )
+
+    flagged = audit_df[
+        (audit_df["strength"] == "弱い")
+        | audit_df["breached"]
+        | (audit_df["reused"] > 0)
+    ]
+
+    if flagged.empty:
+        st.success("問題のあるパスワードは見つからなかったよ。")
+    else:
+        st.dataframe(
+            flagged,
+            use_container_width=True,
+            height=260
+        )
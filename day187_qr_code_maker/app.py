@@ -1,14 +1,41 @@
 import streamlit as st
 import pandas as pd
-import qrcode
 import json
 import os
 import io
+import hashlib
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, date
 
+from qr_render import QR_FORMATS, QR_OPTIONS, render_qr_bytes
+
 APP_TITLE = "Day187：QRコードメーカー"
 DATA_DIR = "data"
 DATA_PATH = os.path.join(DATA_DIR, "day187_qr_code_maker.json")
+CACHE_DIR = os.path.join(DATA_DIR, "qr_cache")
+
+# キャッシュの上限。超えたら、最後に使った時刻（更新時刻）が古いものから消す
+CACHE_MAX_FILES = 1000
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+# これより少ない件数ならプロセスを立ち上げずにその場で描画する
+# （spawn の子プロセスは qrcode / Pillow の読み込みから始まるので、1つあたり数百ミリ秒かかる）
+BATCH_POOL_MIN = 32
+
+BATCH_COLUMNS = [
+    "type",
+    "title",
+    "value",
+    "email_subject",
+    "email_body",
+    "phone",
+    "ssid",
+    "password",
+    "security",
+    "hidden",
+]
 
 QR_TYPES = [
     "URL",
@@ -98,29 +125,195 @@ def make_qr_text(qr_type, title, value, email_subject="", email_body="", phone="
     return value.strip()
 
 
-def create_qr_image(text):
-    qr = qrcode.QRCode(
-        version=None,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=10,
-        border=4,
+def cache_key(text, fmt):
+    payload = json.dumps(
+        {"text": text, "fmt": fmt, **QR_OPTIONS},
+        ensure_ascii=False,
+        sort_keys=True
     )
 
-    qr.add_data(text)
-    qr.make(fit=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_path(text, fmt):
+    return os.path.join(CACHE_DIR, f"{cache_key(text, fmt)}.{fmt}")
+
+
+def read_cached_qr(text, fmt):
+    path = cache_path(text, fmt)
+
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    # 使った時刻を残しておき、消すときに新しく使ったものを残す
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+    return content
+
+
+def write_cached_qr(text, fmt, content):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    path = cache_path(text, fmt)
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+
+    os.replace(tmp_path, path)
+
+
+def remove_cached_qr(text):
+    # 同じ内容の PNG / SVG をまとめて消す
+    for fmt in QR_FORMATS:
+        try:
+            os.remove(cache_path(text, fmt))
+        except OSError:
+            pass
+
+
+def evict_qr_cache():
+    # 新しく使った順に数え、件数か合計サイズが上限を超えた分を消す
+    try:
+        entries = [
+            x for x in os.scandir(CACHE_DIR)
+            if x.is_file() and not x.name.endswith(".tmp")
+        ]
+    except FileNotFoundError:
+        return 0
+
+    files = []
 
-    img = qr.make_image(
-        fill_color="black",
-        back_color="white"
-    ).convert("RGB")
+    for x in entries:
+        try:
+            stat = x.stat()
+        except OSError:
+            continue
 
-    return img
+        files.append((stat.st_mtime, stat.st_size, x.path))
 
+    files.sort(reverse=True)
+
+    kept_bytes = 0
+    removed = 0
+
+    for i, (_, size, path) in enumerate(files):
+        kept_bytes += size
+
+        if i < CACHE_MAX_FILES and kept_bytes <= CACHE_MAX_BYTES:
+            continue
+
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+
+    return removed
+
+
+def get_qr_bytes(text, fmt="png"):
+    content = read_cached_qr(text, fmt)
+
+    if content is None:
+        content = render_qr_bytes(text, fmt)
+        write_cached_qr(text, fmt, content)
+        evict_qr_cache()
+
+    return content
+
+
+def render_many(texts, fmt):
+    # 件数が多く、CPU が複数あるときだけプロセスプールで並列に描画する。
+    # Streamlit のサーバーはスレッドを持っているので fork は使わず、どの OS でも同じ spawn にする
+    if len(texts) < BATCH_POOL_MIN or (os.cpu_count() or 1) < 2:
+        return [render_qr_bytes(text, fmt) for text in texts]
+
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(
+            render_qr_bytes,
+            texts,
+            [fmt] * len(texts),
+            chunksize=max(1, len(texts) // (os.cpu_count() or 1) // 4)
+        ))
+
+
+def read_batch_csv(raw):
+    df = pd.read_csv(io.BytesIO(raw), dtype=str, encoding="utf-8-sig").fillna("")
+
+    for col in BATCH_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+
+    rows = []
+
+    for x in df.to_dict("records"):
+        qr_type = x["type"].strip() or "URL"
+
+        if qr_type not in QR_TYPES:
+            qr_type = "テキスト"
+
+        qr_text = make_qr_text(
+            qr_type=qr_type,
+            title=x["title"],
+            value=x["value"],
+            email_subject=x["email_subject"],
+            email_body=x["email_body"],
+            phone=x["phone"],
+            ssid=x["ssid"],
+            password=x["password"],
+            security=x["security"].strip() or "WPA",
+            hidden=x["hidden"].strip().lower() in ["true", "1", "yes", "はい"],
+        )
+
+        if qr_text:
+            rows.append({
+                "title": x["title"].strip(),
+                "qr_type": qr_type,
+                "qr_text": qr_text,
+            })
+
+    return rows
+
+
+def safe_file_name(text):
+    name = "".join(c if c.isalnum() or c in "-_" else "_" for c in text)
+    return name[:40] or "qr"
+
+
+def build_batch_zip(rows, fmt):
+    # キャッシュにない内容だけを描画する（同じ内容は1回だけ）
+    contents = {}
+
+    for x in rows:
+        text = x["qr_text"]
+
+        if text not in contents:
+            contents[text] = read_cached_qr(text, fmt)
+
+    missing = [text for text, content in contents.items() if content is None]
+
+    for text, content in zip(missing, render_many(missing, fmt)):
+        write_cached_qr(text, fmt, content)
+        contents[text] = content
+
+    if missing:
+        evict_qr_cache()
 
-def image_to_bytes(img):
     buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    return buffer.getvalue()
+
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, x in enumerate(rows, start=1):
+            name = safe_file_name(x["title"] or x["qr_type"])
+            zf.writestr(f"{i:03d}_{name}.{fmt}", contents[x["qr_text"]])
+
+    return buffer.getvalue(), len(missing)
 
 
 def to_df(data):
@@ -145,14 +338,6 @@ def to_df(data):
     return df
 
 
-def find_log(data, log_id):
-    for x in data["logs"]:
-        if x["id"] == log_id:
-            return x
-
-    return None
-
-
 st.set_page_config(
     page_title=APP_TITLE,
     page_icon="📱",
@@ -163,6 +348,7 @@ st.title("📱 Day187：QRコードメーカー")
 st.caption("URL・テキスト・メール・電話番号・Wi-Fi情報をQRコードに変換するアプリ。")
 
 data = load_data()
+logs_by_id = {x["id"]: x for x in data["logs"]}
 
 left, right = st.columns([1, 1], gap="large")
 
@@ -295,17 +481,28 @@ with right:
         latest = data["logs"][-1]
 
     if latest:
-        img = create_qr_image(latest["qr_text"])
-        png_bytes = image_to_bytes(img)
+        png_bytes = get_qr_bytes(latest["qr_text"], "png")
+        svg_bytes = get_qr_bytes(latest["qr_text"], "svg")
 
-        st.image(img, caption=latest.get("title", latest["qr_type"]))
+        st.image(png_bytes, caption=latest.get("title", latest["qr_type"]))
 
-        st.download_button(
-            "⬇️ PNGダウンロード",
-            data=png_bytes,
-            file_name=f"{latest['qr_type']}_qr.png",
-            mime="image/png"
-        )
+        c1, c2 = st.columns(2)
+
+        with c1:
+            st.download_button(
+                "⬇️ PNGダウンロード",
+                data=png_bytes,
+                file_name=f"{latest['qr_type']}_qr.png",
+                mime="image/png"
+            )
+
+        with c2:
+            st.download_button(
+                "⬇️ SVGダウンロード",
+                data=svg_bytes,
+                file_name=f"{latest['qr_type']}_qr.svg",
+                mime="image/svg+xml"
+            )
 
         st.markdown("### 内容")
         st.code(latest["qr_text"], language="text")
@@ -371,10 +568,10 @@ else:
         selected_id = st.selectbox(
             "履歴を選ぶ",
             view["id"].tolist(),
-            format_func=lambda x: f"{find_log(data, x)['date']} / {find_log(data, x).get('title', '')} / {find_log(data, x)['qr_type']}"
+            format_func=lambda x: f"{logs_by_id[x]['date']} / {logs_by_id[x].get('title', '')} / {logs_by_id[x]['qr_type']}"
         )
 
-        selected = find_log(data, selected_id)
+        selected = logs_by_id.get(selected_id)
 
         if selected:
             st.markdown(f"## {selected.get('title', selected['qr_type'])}")
@@ -391,6 +588,14 @@ else:
                     if x["id"] != selected_id
                 ]
 
+                # キャッシュは内容ごとなので、同じ内容の履歴が残っていなければ消す
+                if not any(x["qr_text"] == selected["qr_text"] for x in data["logs"]):
+                    remove_cached_qr(selected["qr_text"])
+
+                # 表示中のQRなら表示もやめる（そのままだと再表示で描き直してしまう）
+                if st.session_state.get("latest_qr", {}).get("id") == selected_id:
+                    st.session_state.pop("latest_qr")
+
                 save_data(data)
                 st.warning("削除したよ。")
                 st.rerun()
@@ -403,3 +608,34 @@ else:
         file_name="day187_qr_code_maker.csv",
         mime="text/csv"
     )
+
+st.divider()
+st.subheader("まとめて作成（CSV → ZIP）")
+st.caption("列：" + " / ".join(BATCH_COLUMNS) + "（type は " + " / ".join(QR_TYPES) + "、省略時は URL）")
+
+batch_file = st.file_uploader(
+    "CSVファイル",
+    type=["csv"]
+)
+
+batch_format = st.selectbox(
+    "形式",
+    QR_FORMATS
+)
+
+if batch_file is not None:
+    batch_rows = read_batch_csv(batch_file.getvalue())
+
+    st.write(f"{len(batch_rows)} 件のQRコードを作成できるよ。")
+
+    if batch_rows and st.button("📦 ZIPを作成"):
+        zip_bytes, rendered = build_batch_zip(batch_rows, batch_format)
+
+        st.success(f"ZIPを作成したよ（新しく描画：{rendered} 件 / キャッシュ利用：{len(batch_rows) - rendered} 件）。")
+
+        st.download_button(
+            "⬇️ ZIPダウンロード",
+            data=zip_bytes,
+            file_name=f"day187_qr_codes_{batch_format}.zip",
+            mime="application/zip"
+        )
@@ -0,0 +1,62 @@
+import io
+
+import qrcode
+import qrcode.image.svg
+
+# プロセスプールの子プロセスから呼べるように、描画処理だけを別モジュールにしている
+
+QR_FORMATS = [
+    "png",
+    "svg",
+]
+
+# 描画オプションはここだけで決める。アプリ側はこの値をキャッシュキーにも含める
+QR_OPTIONS = {
+    "error_correction": "M",
+    "box_size": 10,
+    "border": 4,
+}
+
+ERROR_CORRECTION_LEVELS = {
+    "L": qrcode.constants.ERROR_CORRECT_L,
+    "M": qrcode.constants.ERROR_CORRECT_M,
+    "Q": qrcode.constants.ERROR_CORRECT_Q,
+    "H": qrcode.constants.ERROR_CORRECT_H,
+}
+
+
+def create_qr_image(text, fmt="png"):
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=ERROR_CORRECTION_LEVELS[QR_OPTIONS["error_correction"]],
+        box_size=QR_OPTIONS["box_size"],
+        border=QR_OPTIONS["border"],
+    )
+
+    qr.add_data(text)
+    qr.make(fit=True)
+
+    if fmt == "svg":
+        return qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+
+    img = qr.make_image(
+        fill_color="black",
+        back_color="white"
+    ).convert("RGB")
+
+    return img
+
+
+def image_to_bytes(img, fmt="png"):
+    buffer = io.BytesIO()
+
+    if fmt == "svg":
+        img.save(buffer)
+    else:
+        img.save(buffer, format="PNG")
+
+    return buffer.getvalue()
+
+
+def render_qr_bytes(text, fmt="png"):
+    return image_to_bytes(create_qr_image(text, fmt), fmt)
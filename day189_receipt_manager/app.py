@@ -2,11 +2,21 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, date
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.ledger import ensure_source, make_entry, sync_source  # noqa: E402
 
 APP_TITLE = "Day189：レシート管理帳"
 DATA_DIR = "data"
 DATA_PATH = os.path.join(DATA_DIR, "day189_receipt_manager.json")
+LEDGER_SOURCE = "day189_receipt_manager"
 
 CATEGORIES = [
     "食費",
@@ -48,6 +58,8 @@ def load_data():
     if "receipts" not in data:
         data["receipts"] = []
 
+    ensure_source(LEDGER_SOURCE, ledger_entries(data))
+
     return data
 
 
@@ -57,6 +69,21 @@ def save_data(data):
     with open(DATA_PATH, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+    sync_source(LEDGER_SOURCE, ledger_entries(data))
+
+
+def ledger_entries(data):
+    return [
+        make_entry(
+            x["id"],
+            x["date"],
+            x.get("amount", 0),
+            x["category"],
+            title=x["shop"]
+        )
+        for x in data["receipts"]
+    ]
+
 
 def now_str():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
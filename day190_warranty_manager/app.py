@@ -2,13 +2,26 @@ import streamlit as st
 import pandas as pd
 import json
 import os
+import sys
 from datetime import datetime, date
+from pathlib import Path
 from dateutil.relativedelta import relativedelta
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.deadline_index import register_deadlines  # noqa: E402
+
 APP_TITLE = "Day190：保証書・購入品管理帳"
 DATA_DIR = "data"
 DATA_PATH = os.path.join(DATA_DIR, "day190_warranty_manager.json")
 
+# 期限系アプリ共通のインデックス（common/deadline_index.py）に登録するときの名前
+DEADLINE_APP_KEY = "day190_warranty_manager"
+DEADLINE_APP_NAME = "保証書管理"
+
 CATEGORIES = [
     "PC",
     "スマホ",
@@ -46,6 +59,8 @@ def load_data():
     if "items" not in data:
         data["items"] = []
 
+    register_deadlines(DEADLINE_APP_KEY, DEADLINE_APP_NAME, deadline_entries(data))
+
     return data
 
 
@@ -55,6 +70,8 @@ def save_data(data):
     with open(DATA_PATH, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
+    register_deadlines(DEADLINE_APP_KEY, DEADLINE_APP_NAME, deadline_entries(data))
+
 
 def now_str():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -111,6 +128,22 @@ def status_icon(status):
     return "⚪"
 
 
+def deadline_entries(data):
+    # [期限日, アプリ, レコードID, 名前] の形で期限インデックスに登録する
+    entries = []
+
+    for x in data["items"]:
+        end_date = calc_warranty_end(
+            x.get("purchase_date", ""),
+            int(x.get("warranty_months", 0))
+        )
+
+        if end_date:
+            entries.append([end_date, DEADLINE_APP_KEY, x["id"], x["name"]])
+
+    return entries
+
+
 def to_df(data):
     rows = []
 
@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
 import json
+import math
 import os
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 APP_TITLE = "Day191：在庫管理アプリ"
 DATA_DIR = "data"
@@ -44,13 +45,19 @@ LOCATIONS = [
     "その他",
 ]
 
+# 使用ペースは半減期つきの指数移動平均で見積もる
+FORECAST_HALF_LIFE_DAYS = 14
+MIN_INTERVAL_DAYS = 1
+REORDER_HORIZON_DAYS = 14
+REORDER_COVER_DAYS = 30
+
 
 def ensure_storage():
     os.makedirs(DATA_DIR, exist_ok=True)
 
     if not os.path.exists(DATA_PATH):
         with open(DATA_PATH, "w", encoding="utf-8") as f:
-            json.dump({"items": [], "logs": []}, f, ensure_ascii=False, indent=2)
+            json.dump({"items": [], "logs": [], "forecast": {}}, f, ensure_ascii=False, indent=2)
 
 
 def load_data():
@@ -65,6 +72,10 @@ def load_data():
     if "logs" not in data:
         data["logs"] = []
 
+    # 予測がない・出庫の間隔を持っていない古いファイルは履歴から作り直す
+    if "forecast" not in data or any("interval" not in x for x in data["forecast"].values()):
+        data["forecast"] = rebuild_forecast(data)
+
     return data
 
 
@@ -93,12 +104,165 @@ def stock_status(current, minimum):
     return "🟢 十分"
 
 
+def parse_dt(text):
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+
+
+def elapsed_days(state, now):
+    return max((now - parse_dt(state["since"])).total_seconds() / 86400, 0)
+
+
+def forecast_rate(state, now=None):
+    # いつもの出庫の間隔を過ぎても出庫がないときだけ、過ぎた日数ぶんペースを減らす
+    # （使わなくなった商品を予測し続けないため。間隔どおりに使っている商品は減らさない）
+    rate = float(state.get("rate", 0))
+
+    if rate <= 0 or "since" not in state:
+        return 0.0
+
+    overdue = elapsed_days(state, now or datetime.now()) - float(state.get("interval", 0))
+
+    if overdue <= 0:
+        return rate
+
+    return rate * 0.5 ** (overdue / FORECAST_HALF_LIFE_DAYS)
+
+
+def update_forecast(forecast, item, log):
+    # 1件の出庫ログでその商品の使用ペースだけを更新する
+    state = forecast.setdefault(item["id"], {
+        "rate": 0.0,
+        "since": item["created_at"],
+        "samples": 0,
+        "interval": 0.0,
+    })
+
+    if log["action"] != "出庫":
+        return state
+
+    used = float(log.get("before", 0)) - float(log.get("after", 0))
+
+    if used <= 0:
+        return state
+
+    days = max(elapsed_days(state, parse_dt(log["created_at"])), MIN_INTERVAL_DAYS)
+    observed = used / days
+
+    if state["samples"] == 0:
+        state["rate"] = observed
+        state["interval"] = days
+    else:
+        # 前回の出庫からの日数ぶん減らしたペースに、今回の分を足す（間隔も同じように）
+        decay = 0.5 ** (days / FORECAST_HALF_LIFE_DAYS)
+        state["rate"] = state["rate"] * decay + (1 - decay) * observed
+        state["interval"] = state["interval"] * decay + (1 - decay) * days
+
+    state["since"] = log["created_at"]
+    state["samples"] += 1
+
+    return state
+
+
+def rebuild_forecast(data):
+    # 予測データがない古いファイル用。履歴を1回だけ順に流し込む
+    forecast = {}
+    items_by_id = {x["id"]: x for x in data["items"]}
+
+    for log in sorted(data["logs"], key=lambda x: x["created_at"]):
+        item = items_by_id.get(log.get("item_id"))
+
+        if item:
+            update_forecast(forecast, item, log)
+
+    return forecast
+
+
+def days_until_empty(current, rate):
+    if current <= 0:
+        return 0.0
+
+    if rate <= 0:
+        return None
+
+    return current / rate
+
+
+def runout_date_str(days_left):
+    if days_left is None:
+        return ""
+
+    return (date.today() + timedelta(days=math.floor(days_left))).isoformat()
+
+
+def build_shopping_list(data):
+    # 同じ商品名・単位は保管場所が違っても1行にまとめる
+    groups = {}
+    now = datetime.now()
+
+    for x in data["items"]:
+        key = (x["name"], x["unit"])
+        state = data["forecast"].get(x["id"], {})
+
+        group = groups.setdefault(key, {
+            "name": x["name"],
+            "unit": x["unit"],
+            "current_stock": 0.0,
+            "minimum_stock": 0.0,
+            "daily_use": 0.0,
+            "locations": [],
+        })
+
+        group["current_stock"] += float(x.get("current_stock", 0))
+        group["minimum_stock"] += float(x.get("minimum_stock", 0))
+        group["daily_use"] += forecast_rate(state, now)
+
+        if x["location"] not in group["locations"]:
+            group["locations"].append(x["location"])
+
+    rows = []
+
+    for group in groups.values():
+        current = group["current_stock"]
+        minimum = group["minimum_stock"]
+        rate = group["daily_use"]
+        days_left = days_until_empty(current, rate)
+
+        if current > minimum and (days_left is None or days_left > REORDER_HORIZON_DAYS):
+            continue
+
+        target = minimum + rate * REORDER_COVER_DAYS
+        quantity = max(math.ceil(target - current), 1)
+
+        if days_left is None:
+            urgency = REORDER_HORIZON_DAYS
+        else:
+            urgency = days_left
+
+        rows.append({
+            "name": group["name"],
+            "buy": quantity,
+            "unit": group["unit"],
+            "current_stock": current,
+            "minimum_stock": minimum,
+            "daily_use": round(rate, 2),
+            "runout_date": runout_date_str(days_left),
+            "locations": " / ".join(group["locations"]),
+            "urgency": urgency,
+        })
+
+    rows.sort(key=lambda x: (x["urgency"], x["name"]))
+
+    return pd.DataFrame(rows)
+
+
 def to_item_df(data):
     rows = []
+    now = datetime.now()
 
     for x in data["items"]:
         current = float(x.get("current_stock", 0))
         minimum = float(x.get("minimum_stock", 0))
+        rate = forecast_rate(data["forecast"].get(x["id"], {}), now)
 
         rows.append({
             "id": x["id"],
@@ -111,6 +275,8 @@ def to_item_df(data):
             "unit": x["unit"],
             "location": x["location"],
             "status": stock_status(current, minimum),
+            "daily_use": round(rate, 2),
+            "runout_date": runout_date_str(days_until_empty(current, rate)),
             "favorite": bool(x.get("favorite", False)),
             "memo": x.get("memo", ""),
         })
@@ -154,14 +320,6 @@ def to_log_df(data):
     return df
 
 
-def find_item(data, item_id):
-    for x in data["items"]:
-        if x["id"] == item_id:
-            return x
-
-    return None
-
-
 st.set_page_config(
     page_title=APP_TITLE,
     page_icon="📦",
@@ -172,8 +330,9 @@ st.title("📦 Day191：在庫管理アプリ")
 st.caption("家にあるものの在庫数・最低在庫・保管場所を管理して、買い忘れを防ぐアプリ。")
 
 data = load_data()
+items_by_id = {x["id"]: x for x in data["items"]}
 
-tab1, tab2, tab3 = st.tabs(["📦 在庫管理", "➕ 入出庫", "📜 履歴"])
+tab1, tab2, tab3, tab4 = st.tabs(["📦 在庫管理", "➕ 入出庫", "📜 履歴", "🛒 買い物リスト"])
 
 with tab1:
     left, right = st.columns([1, 1], gap="large")
@@ -345,6 +504,8 @@ with tab1:
                 "minimum_stock",
                 "location",
                 "status",
+                "daily_use",
+                "runout_date",
                 "favorite",
                 "memo",
             ]],
@@ -361,10 +522,10 @@ with tab1:
             selected_id = st.selectbox(
                 "在庫を選ぶ",
                 view["id"].tolist(),
-                format_func=lambda x: f"{find_item(data, x)['name']} / {find_item(data, x)['location']}"
+                format_func=lambda x: f"{items_by_id[x]['name']} / {items_by_id[x]['location']}"
             )
 
-            item = find_item(data, selected_id)
+            item = items_by_id.get(selected_id)
 
             if item:
                 st.markdown(f"## {item['name']}")
@@ -420,6 +581,7 @@ with tab1:
                         x for x in data["items"]
                         if x["id"] != selected_id
                     ]
+                    data["forecast"].pop(selected_id, None)
 
                     save_data(data)
                     st.warning("在庫を削除したよ。")
@@ -445,11 +607,11 @@ with tab2:
         selected_id = st.selectbox(
             "商品を選ぶ",
             df["id"].tolist(),
-            format_func=lambda x: f"{find_item(data, x)['name']} / 現在 {find_item(data, x)['current_stock']} {find_item(data, x)['unit']}",
+            format_func=lambda x: f"{items_by_id[x]['name']} / 現在 {items_by_id[x]['current_stock']} {items_by_id[x]['unit']}",
             key="movement_item"
         )
 
-        item = find_item(data, selected_id)
+        item = items_by_id.get(selected_id)
 
         if item:
             st.markdown(f"## {item['name']}")
@@ -500,6 +662,7 @@ with tab2:
                 }
 
                 data["logs"].append(log)
+                update_forecast(data["forecast"], item, log)
                 save_data(data)
 
                 st.success(f"{action}を反映したよ。")
@@ -536,3 +699,36 @@ with tab3:
             file_name="day191_inventory_manager_logs.csv",
             mime="text/csv"
         )
+
+with tab4:
+    st.subheader("買い物リスト")
+    st.caption(f"最低在庫を下回っているもの、または{REORDER_HORIZON_DAYS}日以内になくなりそうなものを、なくなる順に並べるよ。購入数は{REORDER_COVER_DAYS}日分の目安。")
+
+    shopping_df = build_shopping_list(data)
+
+    if shopping_df.empty:
+        st.success("今すぐ買い足すものはなさそう。")
+    else:
+        st.dataframe(
+            shopping_df[[
+                "name",
+                "buy",
+                "unit",
+                "current_stock",
+                "minimum_stock",
+                "daily_use",
+                "runout_date",
+                "locations",
+            ]],
+            use_container_width=True,
+            height=320
+        )
+
+        csv = shopping_df.to_csv(index=False).encode("utf-8-sig")
+
+        st.download_button(
+            "⬇️ 買い物リストCSVダウンロード",
+            data=csv,
+            file_name="day191_inventory_manager_shopping.csv",
+            mime="text/csv"
+        )
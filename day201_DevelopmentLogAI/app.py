@@ -1,12 +1,28 @@
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime, timedelta
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.chart_series import (  # noqa: E402
+    downsample_lttb,
+    downsample_notice,
+    file_version,
+    select_date_window,
+    slice_dates
+)
+
+
 st.set_page_config(
     page_title="開発ログAI",
     page_icon="📝",
@@ -221,6 +237,53 @@ def format_minutes(minutes):
     )
 
 
+# =====================================
+# グラフ用データ
+# =====================================
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=16
+)
+def build_daily_hours(
+    data_version,
+    _logs
+):
+    """日ごとの開発時間（時間単位）を日付順の系列にする"""
+
+    dataframe = pd.DataFrame(
+        {
+            "日付": pd.to_datetime(
+                [
+                    log.get("date", "")
+                    for log in _logs
+                ],
+                errors="coerce"
+            ),
+            "開発時間": [
+                int(
+                    log.get(
+                        "development_minutes",
+                        0
+                    )
+                ) / 60
+                for log in _logs
+            ]
+        }
+    )
+
+    return (
+        dataframe
+        .dropna(
+            subset=["日付"]
+        )
+        .groupby("日付")["開発時間"]
+        .sum()
+        .round(2)
+        .sort_index()
+    )
+
+
 # =====================================
 # 振り返りコメント
 # =====================================
@@ -595,50 +658,35 @@ st.divider()
 st.header("📊 開発時間の推移")
 
 if logs:
-    graph_data = []
+    daily_hours = build_daily_hours(
+        file_version(LOG_FILE),
+        logs
+    )
 
-    for log in logs:
-        graph_data.append(
-            {
-                "日付": log.get("date", ""),
-                "開発時間": round(
-                    int(
-                        log.get(
-                            "development_minutes",
-                            0
-                        )
-                    ) / 60,
-                    2
-                )
-            }
+    start_date, end_date = (
+        select_date_window(
+            daily_hours.index,
+            "development_chart_window"
         )
-
-    dataframe = pd.DataFrame(
-        graph_data
     )
 
-    dataframe["日付"] = pd.to_datetime(
-        dataframe["日付"],
-        errors="coerce"
+    window_hours = slice_dates(
+        daily_hours,
+        start_date,
+        end_date
     )
 
-    dataframe = (
-        dataframe
-        .dropna(
-            subset=["日付"]
-        )
-        .groupby(
-            "日付",
-            as_index=False
-        )["開発時間"]
-        .sum()
-        .sort_values("日付")
+    notice = downsample_notice(
+        len(window_hours)
     )
 
+    if notice:
+        st.caption(notice)
+
     st.line_chart(
-        dataframe,
-        x="日付",
-        y="開発時間",
+        downsample_lttb(
+            window_hours
+        ),
         use_container_width=True
     )
 
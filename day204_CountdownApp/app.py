@@ -1,11 +1,25 @@
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime
+from pathlib import Path
 
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.occurrence import (  # noqa: E402
+    find_occurrence,
+    ordered_records,
+    sync_occurrences
+)
+
+
 st.set_page_config(
     page_title="カウントダウン",
     page_icon="⏳",
@@ -116,15 +130,19 @@ def delete_event(
 def parse_event_date(event):
     """イベントの日付をdate型で返す"""
 
-    try:
-        return datetime.strptime(
-            event.get("date", ""),
-            "%Y-%m-%d"
-        ).date()
+    occurrence = find_occurrence(
+        DATA_FILE,
+        event.get("id"),
+        event.get("date", "")
+    )
 
-    except ValueError:
+    if not occurrence:
         return date.max
 
+    return date.fromordinal(
+        occurrence[0]
+    )
+
 
 def calculate_remaining_days(event_date):
     """今日からイベント日までの日数を返す"""
@@ -210,9 +228,22 @@ def get_countdown_message(
 
 events = load_events()
 
-events = sorted(
-    events,
-    key=parse_event_date
+# 日付の読み取りと並べ替えは、日付かイベントが変わったときだけまとめて行う
+schedule = sync_occurrences(
+    DATA_FILE,
+    [
+        event.get("id")
+        for event in events
+    ],
+    [
+        event.get("date", "")
+        for event in events
+    ]
+)
+
+events = ordered_records(
+    schedule,
+    events
 )
 
 
@@ -533,11 +564,6 @@ else:
             ) < 0
         ]
 
-    filtered_events = sorted(
-        filtered_events,
-        key=parse_event_date
-    )
-
     st.write(
         f"表示件数："
         f"**{len(filtered_events)}件**"
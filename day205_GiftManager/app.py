@@ -1,11 +1,27 @@
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime
+from pathlib import Path
 
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.chart_series import file_version  # noqa: E402
+from common.occurrence import (  # noqa: E402
+    REPEAT_YEARLY,
+    find_occurrence,
+    ordered_records,
+    sync_occurrences
+)
+
+
 st.set_page_config(
     page_title="プレゼント管理",
     page_icon="🎁",
@@ -254,76 +270,60 @@ def delete_wishlist_item(data, item_id):
 # 日付計算
 # =====================================
 
-def parse_date(date_text):
-    """文字列をdate型へ変換する"""
-
-    try:
-        return datetime.strptime(
-            date_text,
-            "%Y-%m-%d"
-        ).date()
+def sync_birthdays(people):
+    """全員の次の誕生日と並び順をまとめて計算する（日付か相手が変わったときだけ）"""
 
-    except (
-        ValueError,
-        TypeError
-    ):
-        return None
+    return sync_occurrences(
+        DATA_FILE,
+        [
+            person.get("id")
+            for person in people
+        ],
+        [
+            person.get("birthday", "")
+            for person in people
+        ],
+        [REPEAT_YEARLY] * len(people)
+    )
 
 
-def get_next_birthday(birthday):
-    """次回の誕生日を返す"""
+def birthday_occurrence(person):
+    """（次の誕生日の通日, 誕生日までの日数, 並べ替えの値）を返す"""
 
-    today = date.today()
+    return find_occurrence(
+        DATA_FILE,
+        person.get("id"),
+        person.get("birthday", ""),
+        REPEAT_YEARLY
+    )
 
-    try:
-        next_birthday = date(
-            today.year,
-            birthday.month,
-            birthday.day
-        )
 
-    except ValueError:
-        next_birthday = date(
-            today.year,
-            2,
-            28
-        )
+def get_next_birthday(person):
+    """次回の誕生日を返す"""
 
-    if next_birthday < today:
-        try:
-            next_birthday = date(
-                today.year + 1,
-                birthday.month,
-                birthday.day
-            )
+    occurrence = birthday_occurrence(
+        person
+    )
 
-        except ValueError:
-            next_birthday = date(
-                today.year + 1,
-                2,
-                28
-            )
+    if not occurrence:
+        return None
 
-    return next_birthday
+    return date.fromordinal(
+        occurrence[0]
+    )
 
 
 def get_days_until_birthday(person):
     """次の誕生日までの日数を返す"""
 
-    birthday = parse_date(
-        person.get("birthday", "")
+    occurrence = birthday_occurrence(
+        person
     )
 
-    if birthday is None:
+    if not occurrence:
         return 99999
 
-    next_birthday = get_next_birthday(
-        birthday
-    )
-
-    return (
-        next_birthday - date.today()
-    ).days
+    return occurrence[1]
 
 
 def format_price(price):
@@ -332,17 +332,149 @@ def format_price(price):
     return f"¥{int(price):,}"
 
 
-def get_person_name(data, person_id):
-    """人物IDから名前を取得する"""
+# =====================================
+# 集計インデックス
+# =====================================
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=16
+)
+def build_gift_index(
+    data_version,
+    this_year,
+    _data
+):
+    """相手・プレゼント・欲しいものを1回ずつ読んで、画面で使う集計をまとめる
+
+    保存ファイルが変わるか年が変わるまでは、前回の結果を使う。
+    """
+
+    names = {
+        person.get("id", ""): person.get(
+            "name",
+            "不明"
+        )
+        for person in _data["people"]
+    }
+
+    gifts_by_person = {}
+    spent = {}
+    spent_by_year = {}
+    given_names = {}
+
+    # 新しい順に並べてから振り分けるので、相手ごとの一覧も新しい順になる
+    gifts_sorted = sorted(
+        _data["gifts"],
+        key=lambda gift: gift.get(
+            "gift_date",
+            ""
+        ),
+        reverse=True
+    )
+
+    for gift in gifts_sorted:
+        person_id = gift.get(
+            "person_id",
+            ""
+        )
+
+        price = int(gift.get("price", 0))
+        year = str(gift.get("gift_date", ""))[:4]
+
+        gifts_by_person.setdefault(
+            person_id,
+            []
+        ).append(gift)
+
+        spent[person_id] = (
+            spent.get(person_id, 0)
+            + price
+        )
+
+        person_years = spent_by_year.setdefault(
+            person_id,
+            {}
+        )
+
+        person_years[year] = (
+            person_years.get(year, 0)
+            + price
+        )
+
+        given_names.setdefault(
+            person_id,
+            set()
+        ).add(
+            gift.get(
+                "gift_name",
+                ""
+            ).strip().lower()
+        )
 
-    for person in data["people"]:
-        if person.get("id") == person_id:
-            return person.get(
-                "name",
-                "不明"
+    total_budget = 0
+    spent_this_year = 0
+    over_budget = set()
+
+    for person in _data["people"]:
+        person_id = person.get("id", "")
+        budget = int(person.get("budget", 0))
+        year_amount = spent_by_year.get(
+            person_id,
+            {}
+        ).get(this_year, 0)
+
+        total_budget += budget
+        spent_this_year += year_amount
+
+        if budget and year_amount > budget:
+            over_budget.add(person_id)
+
+    return {
+        "names": names,
+        "ids_by_name": {
+            name: person_id
+            for person_id, name in names.items()
+        },
+        "gifts_sorted": gifts_sorted,
+        "gifts_by_person": gifts_by_person,
+        "spent": spent,
+        "spent_by_year": spent_by_year,
+        "given_names": given_names,
+        "total_spent": sum(spent.values()),
+        "unpurchased": sum(
+            1
+            for item in _data["wishlists"]
+            if not item.get(
+                "purchased",
+                False
             )
+        ),
+        "total_budget": total_budget,
+        "spent_this_year": spent_this_year,
+        "over_budget": over_budget,
+    }
+
+
+def get_person_name(index, person_id):
+    """人物IDから名前を取得する"""
+
+    return index["names"].get(
+        person_id,
+        "不明"
+    )
+
+
+def was_given_before(index, person_id, gift_name):
+    """その相手に同じものを贈ったことがあるか"""
 
-    return "不明"
+    return (
+        gift_name.strip().lower()
+        in index["given_names"].get(
+            person_id,
+            set()
+        )
+    )
 
 
 # =====================================
@@ -351,9 +483,17 @@ def get_person_name(data, person_id):
 
 data = load_data()
 
-people = sorted(
-    data["people"],
-    key=get_days_until_birthday
+people = ordered_records(
+    sync_birthdays(data["people"]),
+    data["people"]
+)
+
+this_year = str(date.today().year)
+
+gift_index = build_gift_index(
+    file_version(DATA_FILE),
+    this_year,
+    data
 )
 
 
@@ -381,19 +521,9 @@ total_gifts = len(
     data["gifts"]
 )
 
-total_spent = sum(
-    int(gift.get("price", 0))
-    for gift in data["gifts"]
-)
+total_spent = gift_index["total_spent"]
 
-unpurchased_items = sum(
-    1
-    for item in data["wishlists"]
-    if not item.get(
-        "purchased",
-        False
-    )
-)
+unpurchased_items = gift_index["unpurchased"]
 
 
 col1, col2, col3, col4 = st.columns(4)
@@ -423,6 +553,31 @@ with col4:
     )
 
 
+budget_col1, budget_col2, budget_col3 = st.columns(3)
+
+with budget_col1:
+    st.metric(
+        f"📅 {this_year}年の金額",
+        format_price(
+            gift_index["spent_this_year"]
+        )
+    )
+
+with budget_col2:
+    st.metric(
+        "🎯 予算の合計",
+        format_price(
+            gift_index["total_budget"]
+        )
+    )
+
+with budget_col3:
+    st.metric(
+        "⚠️ 今年の予算オーバー",
+        f"{len(gift_index['over_budget'])}人"
+    )
+
+
 st.divider()
 
 
@@ -444,15 +599,8 @@ else:
         nearest_person
     )
 
-    birthday = parse_date(
-        nearest_person.get(
-            "birthday",
-            ""
-        )
-    )
-
     next_birthday = get_next_birthday(
-        birthday
+        nearest_person
     )
 
     with st.container(border=True):
@@ -477,6 +625,8 @@ else:
                 next_birthday.strftime(
                     "%Y年%m月%d日"
                 )
+                if next_birthday
+                else "誕生日未登録"
             )
 
         with birthday_col2:
@@ -657,17 +807,14 @@ with person_tab:
             person
         )
 
-        person_gifts = [
-            gift
-            for gift in data["gifts"]
-            if gift.get(
-                "person_id"
-            ) == person_id
-        ]
+        spent_amount = gift_index["spent"].get(
+            person_id,
+            0
+        )
 
-        spent_amount = sum(
-            int(gift.get("price", 0))
-            for gift in person_gifts
+        year_amounts = gift_index["spent_by_year"].get(
+            person_id,
+            {}
         )
 
         with st.container(border=True):
@@ -729,6 +876,43 @@ with person_tab:
                     )
                 )
 
+            if year_amounts:
+                st.caption(
+                    "年ごとの金額："
+                    + "／".join(
+                        f"{year}年 {format_price(amount)}"
+                        for year, amount in sorted(
+                            year_amounts.items(),
+                            reverse=True
+                        )
+                    )
+                )
+
+            if person_id in gift_index["over_budget"]:
+                st.warning(
+                    f"{this_year}年の金額が"
+                    "予算を超えています。"
+                )
+
+            given_gifts = gift_index["gifts_by_person"].get(
+                person_id,
+                []
+            )
+
+            if given_gifts:
+                st.caption(
+                    "🎁 これまでに贈ったもの（重ならないように）："
+                    + "、".join(
+                        dict.fromkeys(
+                            gift.get(
+                                "gift_name",
+                                ""
+                            )
+                            for gift in given_gifts
+                        )
+                    )
+                )
+
             favorite_things = person.get(
                 "favorite_things",
                 ""
@@ -1049,7 +1233,7 @@ with wishlist_tab:
                 )
 
                 person_name = get_person_name(
-                    data,
+                    gift_index,
                     item.get(
                         "person_id",
                         ""
@@ -1086,6 +1270,21 @@ with wishlist_tab:
                             f"{item.get('priority', '')}"
                         )
 
+                        if was_given_before(
+                            gift_index,
+                            item.get(
+                                "person_id",
+                                ""
+                            ),
+                            item.get(
+                                "item_name",
+                                ""
+                            )
+                        ):
+                            st.warning(
+                                "以前に同じものを贈っています。"
+                            )
+
                     with item_col2:
                         st.metric(
                             "予想金額",
@@ -1162,36 +1361,16 @@ with history_tab:
             ["すべて"] + person_names
         )
 
-        filtered_gifts = data["gifts"]
+        filtered_gifts = gift_index["gifts_sorted"]
 
         if history_filter != "すべて":
-            selected_person_id = next(
-                (
-                    person.get("id")
-                    for person in data["people"]
-                    if person.get("name")
-                    == history_filter
+            filtered_gifts = gift_index["gifts_by_person"].get(
+                gift_index["ids_by_name"].get(
+                    history_filter
                 ),
-                None
+                []
             )
 
-            filtered_gifts = [
-                gift
-                for gift in data["gifts"]
-                if gift.get(
-                    "person_id"
-                ) == selected_person_id
-            ]
-
-        filtered_gifts = sorted(
-            filtered_gifts,
-            key=lambda gift: gift.get(
-                "gift_date",
-                ""
-            ),
-            reverse=True
-        )
-
         for gift in filtered_gifts:
             gift_id = gift.get(
                 "id",
@@ -1199,7 +1378,7 @@ with history_tab:
             )
 
             person_name = get_person_name(
-                data,
+                gift_index,
                 gift.get(
                     "person_id",
                     ""
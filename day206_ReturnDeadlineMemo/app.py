@@ -1,11 +1,21 @@
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime, timedelta
+from pathlib import Path
 
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.deadline_index import register_deadlines  # noqa: E402
+
+
 # =====================================
 # ページ設定
 # =====================================
@@ -23,6 +33,10 @@ DATA_FILE = os.path.join(
     "borrowed_items.json"
 )
 
+# 期限系アプリ共通のインデックス（common/deadline_index.py）に登録するときの名前
+DEADLINE_APP_KEY = "day206_ReturnDeadlineMemo"
+DEADLINE_APP_NAME = "返却期限メモ"
+
 
 CATEGORIES = [
     "本",
@@ -58,6 +72,12 @@ def save_items(items):
             indent=2
         )
 
+    register_deadlines(
+        DEADLINE_APP_KEY,
+        DEADLINE_APP_NAME,
+        deadline_entries(items)
+    )
+
 
 def load_items():
     """JSONから借りたもののデータを読み込む。"""
@@ -92,6 +112,41 @@ def load_items():
     return []
 
 
+# =====================================
+# 期限インデックス
+# =====================================
+
+def deadline_entries(
+    items,
+):
+    """[期限日, アプリ, ID, 名前] の形で登録データを作る。"""
+
+    entries = []
+
+    for item in items:
+        if item.get("returned"):
+            continue
+
+        deadline = parse_date(
+            item.get(
+                "return_deadline",
+                ""
+            )
+        )
+
+        if deadline is None:
+            continue
+
+        entries.append([
+            deadline.isoformat(),
+            DEADLINE_APP_KEY,
+            item.get("id", ""),
+            item.get("item_name", ""),
+        ])
+
+    return entries
+
+
 # =====================================
 # 登録・更新・削除
 # =====================================
@@ -256,6 +311,12 @@ def get_category_icon(category):
 
 items = load_items()
 
+register_deadlines(
+    DEADLINE_APP_KEY,
+    DEADLINE_APP_NAME,
+    deadline_entries(items)
+)
+
 
 # =====================================
 # タイトル
@@ -1,12 +1,28 @@
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.chart_series import (  # noqa: E402
+    downsample_lttb,
+    downsample_notice,
+    file_version,
+    select_date_window,
+    slice_dates
+)
+
+
 # =====================================
 # ページ設定
 # =====================================
@@ -458,6 +474,103 @@ def calculate_average(
     )
 
 
+# =====================================
+# グラフ用データ
+# =====================================
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=32
+)
+def build_fuel_chart_frames(
+    data_version,
+    vehicle_id,
+    _records
+):
+    """グラフ用の時系列と月別集計を作る。"""
+
+    graph_df = pd.DataFrame(
+        {
+            "給油日": pd.to_datetime(
+                [
+                    record.get(
+                        "fuel_date",
+                        ""
+                    )
+                    for record in _records
+                ],
+                errors="coerce"
+            ),
+            "燃費": [
+                float(
+                    record.get(
+                        "fuel_economy",
+                        0
+                    )
+                )
+                for record in _records
+            ],
+            "ガソリン単価": [
+                float(
+                    record.get(
+                        "unit_price",
+                        0
+                    )
+                )
+                for record in _records
+            ],
+            "給油代": [
+                int(
+                    record.get(
+                        "total_price",
+                        0
+                    )
+                )
+                for record in _records
+            ],
+            "給油量": [
+                float(
+                    record.get(
+                        "fuel_amount",
+                        0
+                    )
+                )
+                for record in _records
+            ],
+            "走行距離": [
+                float(
+                    record.get(
+                        "distance",
+                        0
+                    )
+                )
+                for record in _records
+            ]
+        }
+    )
+
+    graph_df = (
+        graph_df.dropna(
+            subset=["給油日"]
+        )
+        .sort_values(
+            "給油日",
+            kind="stable"
+        )
+        .set_index("給油日")
+    )
+
+    monthly_summary = graph_df[
+        ["給油代", "給油量", "走行距離"]
+    ].groupby(
+        graph_df.index.strftime("%Y-%m")
+    ).sum()
+
+    monthly_summary.index.name = "年月"
+
+    return graph_df, monthly_summary
+
+
 # =====================================
 # データ読み込み
 # =====================================
@@ -1494,62 +1607,48 @@ with graph_tab:
         )
 
     else:
-        sorted_records = sorted(
-            selected_records,
-            key=lambda record: record.get(
-                "fuel_date",
-                ""
+        graph_df, monthly_summary = (
+            build_fuel_chart_frames(
+                file_version(DATA_FILE),
+                selected_vehicle_id,
+                selected_records
             )
         )
 
-        graph_rows = []
+        start_date, end_date = (
+            select_date_window(
+                graph_df.index,
+                "fuel_chart_window"
+            )
+        )
 
-        for record in sorted_records:
-            graph_rows.append(
-                {
-                    "給油日": pd.to_datetime(
-                        record.get(
-                            "fuel_date",
-                            ""
-                        )
-                    ),
-                    "燃費": float(
-                        record.get(
-                            "fuel_economy",
-                            0
-                        )
-                    ),
-                    "ガソリン単価": float(
-                        record.get(
-                            "unit_price",
-                            0
-                        )
-                    ),
-                    "給油代": int(
-                        record.get(
-                            "total_price",
-                            0
-                        )
-                    ),
-                    "走行距離": float(
-                        record.get(
-                            "distance",
-                            0
-                        )
-                    )
-                }
+        window_df = slice_dates(
+            graph_df,
+            start_date,
+            end_date
+        )
+
+        if start_date is not None:
+            monthly_summary = (
+                monthly_summary.loc[
+                    start_date.strftime("%Y-%m"):
+                    end_date.strftime("%Y-%m")
+                ]
             )
 
-        graph_df = pd.DataFrame(
-            graph_rows
+        notice = downsample_notice(
+            len(window_df)
         )
 
+        if notice:
+            st.caption(notice)
+
         st.subheader("🚗 燃費の推移")
 
         st.line_chart(
-            graph_df.set_index(
-                "給油日"
-            )[["燃費"]]
+            downsample_lttb(
+                window_df["燃費"]
+            )
         )
 
         st.subheader(
@@ -1557,67 +1656,17 @@ with graph_tab:
         )
 
         st.line_chart(
-            graph_df.set_index(
-                "給油日"
-            )[["ガソリン単価"]]
+            downsample_lttb(
+                window_df["ガソリン単価"]
+            )
         )
 
         st.subheader(
             "💰 月ごとの給油代"
         )
 
-        monthly_rows = []
-
-        for record in selected_records:
-            month = get_record_month(
-                record
-            )
-
-            monthly_rows.append(
-                {
-                    "年月": month,
-                    "給油代": int(
-                        record.get(
-                            "total_price",
-                            0
-                        )
-                    ),
-                    "給油量": float(
-                        record.get(
-                            "fuel_amount",
-                            0
-                        )
-                    ),
-                    "走行距離": float(
-                        record.get(
-                            "distance",
-                            0
-                        )
-                    )
-                }
-            )
-
-        monthly_df = pd.DataFrame(
-            monthly_rows
-        )
-
-        monthly_summary = (
-            monthly_df.groupby(
-                "年月",
-                as_index=False
-            ).sum()
-        )
-
-        monthly_summary = (
-            monthly_summary.sort_values(
-                "年月"
-            )
-        )
-
         st.bar_chart(
-            monthly_summary.set_index(
-                "年月"
-            )[["給油代"]]
+            monthly_summary[["給油代"]]
         )
 
         st.subheader(
@@ -1625,9 +1674,7 @@ with graph_tab:
         )
 
         st.bar_chart(
-            monthly_summary.set_index(
-                "年月"
-            )[["走行距離"]]
+            monthly_summary[["走行距離"]]
         )
 
         st.subheader(
@@ -1635,7 +1682,7 @@ with graph_tab:
         )
 
         display_monthly_df = (
-            monthly_summary.copy()
+            monthly_summary.reset_index()
         )
 
         display_monthly_df[
@@ -1,12 +1,29 @@
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.chart_series import (  # noqa: E402
+    downsample_lttb,
+    downsample_notice,
+    file_version,
+    select_date_window,
+    slice_dates,
+    top_items
+)
+
+
 # =====================================
 # ページ設定
 # =====================================
@@ -763,6 +780,126 @@ def get_latest_record(
     )[0]
 
 
+# =====================================
+# グラフ用データ
+# =====================================
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=32
+)
+def build_price_chart_frame(
+    data_version,
+    product_id,
+    _data
+):
+    """商品の価格記録を日付順の時系列にする。"""
+
+    store_names = {
+        store.get("id"): store.get(
+            "name",
+            "名称未設定"
+        )
+        for store in _data["stores"]
+    }
+
+    records = get_product_records(
+        _data,
+        product_id
+    )
+
+    graph_df = pd.DataFrame(
+        {
+            "記録日": pd.to_datetime(
+                [
+                    record.get(
+                        "record_date",
+                        ""
+                    )
+                    for record in records
+                ],
+                errors="coerce"
+            ),
+            "販売価格": [
+                int(
+                    record.get(
+                        "price",
+                        0
+                    )
+                )
+                for record in records
+            ],
+            "比較単価": [
+                float(
+                    record.get(
+                        "comparison_price",
+                        0
+                    )
+                )
+                for record in records
+            ],
+            "店舗": [
+                store_names.get(
+                    record.get(
+                        "store_id",
+                        ""
+                    ),
+                    "不明な店舗"
+                )
+                for record in records
+            ]
+        }
+    )
+
+    return (
+        graph_df.dropna(
+            subset=["記録日"]
+        )
+        .sort_values(
+            "記録日",
+            kind="stable"
+        )
+        .set_index("記録日")
+    )
+
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=64
+)
+def build_store_summary(
+    data_version,
+    product_id,
+    start_date,
+    end_date,
+    _graph_df
+):
+    """表示期間内の店舗別平均価格を集計する。"""
+
+    window_df = slice_dates(
+        _graph_df,
+        start_date,
+        end_date
+    )
+
+    store_summary = (
+        window_df.groupby(
+            "店舗",
+            as_index=False
+        )
+        .agg(
+            {
+                "販売価格": "mean",
+                "比較単価": "mean"
+            }
+        )
+    )
+
+    return store_summary.sort_values(
+        "比較単価"
+    )
+
+
 # =====================================
 # データ読み込み
 # =====================================
@@ -2189,59 +2326,44 @@ with graph_tab:
         )
 
     else:
-        sorted_records = sorted(
-            selected_records,
-            key=lambda record: record.get(
-                "record_date",
-                ""
-            )
+        data_version = file_version(
+            DATA_FILE
         )
 
-        graph_rows = []
+        graph_df = build_price_chart_frame(
+            data_version,
+            selected_product_id,
+            data
+        )
 
-        for record in sorted_records:
-            graph_rows.append(
-                {
-                    "記録日": pd.to_datetime(
-                        record.get(
-                            "record_date",
-                            ""
-                        )
-                    ),
-                    "販売価格": int(
-                        record.get(
-                            "price",
-                            0
-                        )
-                    ),
-                    "比較単価": float(
-                        record.get(
-                            "comparison_price",
-                            0
-                        )
-                    ),
-                    "店舗": get_store_name(
-                        data,
-                        record.get(
-                            "store_id",
-                            ""
-                        )
-                    )
-                }
+        start_date, end_date = (
+            select_date_window(
+                graph_df.index,
+                "price_chart_window"
             )
+        )
 
-        graph_df = pd.DataFrame(
-            graph_rows
+        window_df = slice_dates(
+            graph_df,
+            start_date,
+            end_date
         )
 
+        notice = downsample_notice(
+            len(window_df)
+        )
+
+        if notice:
+            st.caption(notice)
+
         st.subheader(
             "💰 販売価格の推移"
         )
 
         st.line_chart(
-            graph_df.set_index(
-                "記録日"
-            )[["販売価格"]]
+            downsample_lttb(
+                window_df["販売価格"]
+            )
         )
 
         st.subheader(
@@ -2249,38 +2371,30 @@ with graph_tab:
         )
 
         st.line_chart(
-            graph_df.set_index(
-                "記録日"
-            )[["比較単価"]]
+            downsample_lttb(
+                window_df["比較単価"]
+            )
         )
 
         st.subheader(
             "🏪 店舗別平均価格"
         )
 
-        store_summary = (
-            graph_df.groupby(
-                "店舗",
-                as_index=False
-            )
-            .agg(
-                {
-                    "販売価格": "mean",
-                    "比較単価": "mean"
-                }
-            )
-        )
-
-        store_summary = (
-            store_summary.sort_values(
-                "比較単価"
-            )
+        store_summary = build_store_summary(
+            data_version,
+            selected_product_id,
+            start_date,
+            end_date,
+            graph_df
         )
 
         st.bar_chart(
-            store_summary.set_index(
-                "店舗"
-            )[["比較単価"]]
+            top_items(
+                store_summary.set_index(
+                    "店舗"
+                )["比較単価"],
+                smallest=True
+            )
         )
 
         display_store_summary = (
@@ -1,13 +1,51 @@
-import copy
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.chart_series import (  # noqa: E402
+    file_version,
+    select_date_window,
+    slice_dates,
+    top_items
+)
+from common.forget_predictor import (  # noqa: E402
+    add_forgotten,
+    apply_trip,
+    create_model,
+    forgotten_count,
+    is_current,
+    rank_items,
+    remove_forgotten,
+    remove_trip,
+    set_trip_kind
+)
+from common.packing_list import (  # noqa: E402
+    apply_bits,
+    bits_from_flags,
+    count_bits,
+    full_bits,
+    remove_bit,
+    resolve_items,
+    save_checks,
+    load_checks,
+    set_bit,
+    split_items,
+    stored_item
+)
+
+
 # =====================================
 # ページ設定
 # =====================================
@@ -25,6 +63,21 @@ DATA_FILE = os.path.join(
     "packing_data.json"
 )
 
+# チェック状態だけを書く小さなファイル（チェックのたびに全体を書き直さない）
+CHECKS_FILE = os.path.join(
+    DATA_DIR,
+    "packing_checks.json"
+)
+
+# 複製元との差分として比べる持ち物の項目
+ITEM_FIELDS = (
+    "name",
+    "priority",
+    "quantity",
+    "person",
+    "memo"
+)
+
 
 CATEGORIES = [
     "子どもとの外出",
@@ -64,7 +117,76 @@ def create_empty_data():
 
     return {
         "templates": [],
-        "forgotten_records": []
+        "forgotten_records": [],
+        "forget_model": create_model()
+    }
+
+
+def stored_template(
+    template,
+    templates_by_id
+):
+    """保存ファイルに書くテンプレート。複製したものは複製元との差分だけにする。"""
+
+    stored = {
+        key: value
+        for key, value in template.items()
+        if key not in [
+            "items",
+            "checks"
+        ]
+    }
+
+    base = templates_by_id.get(
+        template.get(
+            "base_template_id",
+            ""
+        )
+    )
+
+    if base and base is not template:
+        (
+            stored["template_diff"],
+            stored["items"]
+        ) = split_items(
+            template.get(
+                "items",
+                []
+            ),
+            base["items"],
+            ITEM_FIELDS
+        )
+
+    else:
+        stored["base_template_id"] = ""
+        stored["items"] = [
+            stored_item(item)
+            for item in template.get(
+                "items",
+                []
+            )
+        ]
+
+    return stored
+
+
+def stored_data(data):
+    """保存ファイルに書く形へ変換する。"""
+
+    templates_by_id = {
+        template["id"]: template
+        for template in data["templates"]
+    }
+
+    return {
+        **data,
+        "templates": [
+            stored_template(
+                template,
+                templates_by_id
+            )
+            for template in data["templates"]
+        ]
     }
 
 
@@ -82,12 +204,107 @@ def save_data(data):
         encoding="utf-8"
     ) as file:
         json.dump(
-            data,
+            stored_data(data),
             file,
             ensure_ascii=False,
             indent=2
         )
 
+    save_check_state(data)
+
+
+def save_check_state(data):
+    """チェック状態だけを保存する（テンプレート本体は書き直さない）。"""
+
+    save_checks(
+        CHECKS_FILE,
+        {
+            template["id"]: template.get(
+                "checks",
+                0
+            )
+            for template in data["templates"]
+        }
+    )
+
+
+def expand_templates(
+    data,
+    checks
+):
+    """複製したテンプレートを、複製元の持ち物に差分を当てた形に戻す。"""
+
+    templates_by_id = {
+        template.get("id"): template
+        for template in data["templates"]
+    }
+
+    expanded = set()
+
+    def expand(template, visiting):
+        if template["id"] in expanded:
+            return
+
+        diff = template.pop(
+            "template_diff",
+            None
+        )
+
+        base = templates_by_id.get(
+            template.get(
+                "base_template_id",
+                ""
+            )
+        )
+
+        if (
+            base
+            and isinstance(diff, dict)
+            and base["id"] not in visiting
+        ):
+            expand(
+                base,
+                visiting | {template["id"]}
+            )
+
+            template["items"] = resolve_items(
+                base["items"],
+                diff,
+                template["items"]
+            )
+
+        elif isinstance(diff, dict):
+            template["base_template_id"] = ""
+
+        expanded.add(template["id"])
+
+    for template in data["templates"]:
+        expand(template, set())
+
+    for template in data["templates"]:
+        if template["id"] in checks:
+            bits = checks[template["id"]]
+
+        elif isinstance(
+            template.get("checks"),
+            int
+        ):
+            bits = template["checks"]
+
+        else:
+            bits = bits_from_flags(
+                template["items"]
+            )
+
+        template["checks"] = bits & full_bits(
+            len(template["items"])
+        )
+
+        apply_bits(
+            template["items"],
+            template["checks"]
+        )
+
 
 def load_data():
     """JSONファイルからデータを読み込む。"""
@@ -136,6 +353,11 @@ def load_data():
                 ""
             )
 
+            template.setdefault(
+                "base_template_id",
+                ""
+            )
+
             for item in template["items"]:
                 item.setdefault(
                     "checked",
@@ -157,6 +379,25 @@ def load_data():
                     ""
                 )
 
+        expand_templates(
+            data,
+            load_checks(
+                CHECKS_FILE
+            )
+        )
+
+        data.pop(
+            "forgotten_counts",
+            None
+        )
+
+        if not is_current(
+            data.get(
+                "forget_model"
+            )
+        ):
+            rebuild_forget_model(data)
+
         return data
 
     except (
@@ -216,23 +457,34 @@ def get_item_by_id(
     return None
 
 
+def get_item_index(
+    template,
+    item_id
+):
+    """IDから持ち物の並び順（チェックのビットの位置）を取得する。"""
+
+    for index, item in enumerate(
+        template.get(
+            "items",
+            []
+        )
+    ):
+        if item.get("id") == item_id:
+            return index
+
+    return None
+
+
 def count_checked_items(
     template
 ):
     """チェック済み持ち物数を取得する。"""
 
-    return len(
-        [
-            item
-            for item in template.get(
-                "items",
-                []
-            )
-            if item.get(
-                "checked",
-                False
-            )
-        ]
+    return count_bits(
+        template.get(
+            "checks",
+            0
+        )
     )
 
 
@@ -241,18 +493,16 @@ def count_unchecked_items(
 ):
     """未チェック持ち物数を取得する。"""
 
-    return len(
-        [
-            item
-            for item in template.get(
+    return (
+        len(
+            template.get(
                 "items",
                 []
             )
-            if not item.get(
-                "checked",
-                False
-            )
-        ]
+        )
+        - count_checked_items(
+            template
+        )
     )
 
 
@@ -341,6 +591,8 @@ def add_template(
         "destination": destination,
         "memo": memo,
         "items": [],
+        "checks": 0,
+        "base_template_id": "",
         "last_used": "",
         "created_at": now_text()
     }
@@ -376,6 +628,16 @@ def update_template(
     template["memo"] = memo
     template["updated_at"] = now_text()
 
+    for trip_id in template_trip_ids(
+        data,
+        template_id
+    ):
+        set_trip_kind(
+            data["forget_model"],
+            trip_id,
+            category
+        )
+
     save_data(data)
 
 
@@ -393,6 +655,15 @@ def delete_template(
         ) != template_id
     ]
 
+    for trip_id in template_trip_ids(
+        data,
+        template_id
+    ):
+        remove_trip(
+            data["forget_model"],
+            trip_id
+        )
+
     data["forgotten_records"] = [
         record
         for record in data["forgotten_records"]
@@ -409,7 +680,7 @@ def duplicate_template(
     template_id,
     new_name
 ):
-    """テンプレートを複製する。"""
+    """テンプレートを複製する（保存するときは複製元との差分だけになる）。"""
 
     original = get_template_by_id(
         data,
@@ -419,23 +690,33 @@ def duplicate_template(
     if not original:
         return
 
-    copied_template = copy.deepcopy(
-        original
-    )
+    copied_template = {
+        key: value
+        for key, value in original.items()
+        if key != "items"
+    }
 
     copied_template["id"] = create_id()
     copied_template["name"] = new_name
     copied_template["created_at"] = now_text()
     copied_template["updated_at"] = ""
     copied_template["last_used"] = ""
+    copied_template["base_template_id"] = template_id
+    copied_template["checks"] = 0
 
-    for item in copied_template.get(
-        "items",
+    copied_template["items"] = resolve_items(
+        original.get(
+            "items",
+            []
+        ),
+        {},
         []
-    ):
-        item["id"] = create_id()
-        item["checked"] = False
-        item["created_at"] = now_text()
+    )
+
+    apply_bits(
+        copied_template["items"],
+        0
+    )
 
     data["templates"].append(
         copied_template
@@ -538,16 +819,23 @@ def delete_item(
     if not template:
         return
 
-    template["items"] = [
-        item
-        for item in template.get(
-            "items",
-            []
-        )
-        if item.get(
-            "id"
-        ) != item_id
-    ]
+    index = get_item_index(
+        template,
+        item_id
+    )
+
+    if index is None:
+        return
+
+    del template["items"][index]
+
+    template["checks"] = remove_bit(
+        template.get(
+            "checks",
+            0
+        ),
+        index
+    )
 
     save_data(data)
 
@@ -568,23 +856,31 @@ def update_item_check(
     if not template:
         return
 
-    item = get_item_by_id(
+    index = get_item_index(
         template,
         item_id
     )
 
-    if not item:
+    if index is None:
         return
 
-    item["checked"] = bool(
+    template["checks"] = set_bit(
+        template.get(
+            "checks",
+            0
+        ),
+        index,
         checked
     )
 
-    template["last_used"] = str(
-        date.today()
+    template["items"][index]["checked"] = bool(
+        checked
     )
 
-    save_data(data)
+    save_checks_and_last_used(
+        data,
+        template
+    )
 
 
 def reset_all_checks(
@@ -601,13 +897,17 @@ def reset_all_checks(
     if not template:
         return
 
-    for item in template.get(
-        "items",
-        []
-    ):
-        item["checked"] = False
+    template["checks"] = 0
 
-    save_data(data)
+    apply_bits(
+        template.get(
+            "items",
+            []
+        ),
+        0
+    )
+
+    save_check_state(data)
 
 
 def check_all_items(
@@ -624,17 +924,54 @@ def check_all_items(
     if not template:
         return
 
-    for item in template.get(
-        "items",
-        []
-    ):
-        item["checked"] = True
+    template["checks"] = full_bits(
+        len(
+            template.get(
+                "items",
+                []
+            )
+        )
+    )
+
+    apply_bits(
+        template.get(
+            "items",
+            []
+        ),
+        template["checks"]
+    )
+
+    save_checks_and_last_used(
+        data,
+        template
+    )
+
 
-    template["last_used"] = str(
+def save_checks_and_last_used(
+    data,
+    template
+):
+    """チェックの変更を保存する。最終使用日が変わる日だけ本体も書き直す。"""
+
+    today = str(
         date.today()
     )
 
-    save_data(data)
+    if template.get(
+        "last_used"
+    ) != today:
+        template["last_used"] = today
+
+        record_template_use(
+            data,
+            template,
+            today
+        )
+
+        save_data(data)
+
+    else:
+        save_check_state(data)
 
 
 # =====================================
@@ -678,6 +1015,22 @@ def add_forgotten_record(
         record
     )
 
+    add_forgotten(
+        data["forget_model"],
+        template_trip_id(
+            template_id,
+            record["forgotten_date"]
+        ),
+        template.get(
+            "category",
+            "その他"
+        )
+        if template
+        else "その他",
+        record["forgotten_date"],
+        item_name
+    )
+
     save_data(data)
 
 
@@ -687,6 +1040,28 @@ def delete_forgotten_record(
 ):
     """忘れ物記録を削除する。"""
 
+    for record in data["forgotten_records"]:
+        if record.get(
+            "id"
+        ) == record_id:
+            remove_forgotten(
+                data["forget_model"],
+                template_trip_id(
+                    record.get(
+                        "template_id",
+                        ""
+                    ),
+                    record.get(
+                        "forgotten_date",
+                        ""
+                    )
+                ),
+                record.get(
+                    "item_name",
+                    ""
+                )
+            )
+
     data["forgotten_records"] = [
         record
         for record in data[
@@ -700,29 +1075,267 @@ def delete_forgotten_record(
     save_data(data)
 
 
+def template_trip_id(
+    template_id,
+    day
+):
+    """忘れ物の予測で「テンプレートを使った1回」を表すID（テンプレート＋日付）。"""
+
+    return f"{template_id}:{day}"
+
+
+def template_trip_ids(
+    data,
+    template_id
+):
+    """そのテンプレートを使った回のID一覧。"""
+
+    prefix = f"{template_id}:"
+
+    return [
+        trip_id
+        for trip_id in data["forget_model"]["trips"]
+        if trip_id.startswith(prefix)
+    ]
+
+
+def record_template_use(
+    data,
+    template,
+    day
+):
+    """テンプレートを使った日を忘れ物の予測へ反映する（同じ日は1回だけ）。"""
+
+    trip_id = template_trip_id(
+        template["id"],
+        day
+    )
+
+    if trip_id not in data["forget_model"]["trips"]:
+        apply_trip(
+            data["forget_model"],
+            trip_id,
+            template.get(
+                "category",
+                "その他"
+            ),
+            day
+        )
+
+
+def rebuild_forget_model(data):
+    """最終使用日と忘れ物記録から、忘れ物の予測を作り直す。"""
+
+    data["forget_model"] = create_model()
+
+    templates_by_id = {
+        template["id"]: template
+        for template in data["templates"]
+    }
+
+    for template in data["templates"]:
+        if template.get(
+            "last_used"
+        ):
+            record_template_use(
+                data,
+                template,
+                template["last_used"]
+            )
+
+    for record in data["forgotten_records"]:
+        template = templates_by_id.get(
+            record.get(
+                "template_id",
+                ""
+            ),
+            {}
+        )
+
+        add_forgotten(
+            data["forget_model"],
+            template_trip_id(
+                record.get(
+                    "template_id",
+                    ""
+                ),
+                record.get(
+                    "forgotten_date",
+                    ""
+                )
+            ),
+            template.get(
+                "category",
+                "その他"
+            ),
+            record.get(
+                "forgotten_date",
+                ""
+            ),
+            record.get(
+                "item_name",
+                ""
+            )
+        )
+
+
 def get_forgotten_count(
     data,
     item_name
 ):
     """持ち物名ごとの忘れた回数を取得する。"""
 
-    normalized_name = item_name.strip().lower()
+    return forgotten_count(
+        data["forget_model"],
+        item_name
+    )
 
-    return len(
+
+# =====================================
+# 集計用データ
+# =====================================
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=16
+)
+def build_template_summary(
+    data_version,
+    _templates
+):
+    """テンプレート別の持ち物数を集計する。"""
+
+    return pd.DataFrame(
         [
-            record
-            for record in data[
-                "forgotten_records"
-            ]
-            if record.get(
-                "item_name",
-                ""
-            ).strip().lower()
-            == normalized_name
+            {
+                "テンプレート": template.get(
+                    "name",
+                    ""
+                ),
+                "カテゴリー": template.get(
+                    "category",
+                    ""
+                ),
+                "持ち物数": len(
+                    template.get(
+                        "items",
+                        []
+                    )
+                ),
+                "必須品数": sum(
+                    1
+                    for item in template.get(
+                        "items",
+                        []
+                    )
+                    if item.get(
+                        "priority"
+                    ) == "必須"
+                ),
+                "最終使用日": template.get(
+                    "last_used",
+                    ""
+                )
+            }
+            for template in _templates
+        ],
+        columns=[
+            "テンプレート",
+            "カテゴリー",
+            "持ち物数",
+            "必須品数",
+            "最終使用日"
         ]
     )
 
 
+@st.cache_data(
+    show_spinner=False,
+    max_entries=16
+)
+def build_forgotten_frame(
+    data_version,
+    _forgotten_records
+):
+    """忘れ物記録を日付順の表にする。"""
+
+    forgotten_df = pd.DataFrame(
+        {
+            "持ち物": [
+                record.get(
+                    "item_name",
+                    ""
+                )
+                for record in _forgotten_records
+            ],
+            "テンプレート": [
+                record.get(
+                    "template_name",
+                    ""
+                )
+                for record in _forgotten_records
+            ],
+            "忘れた日": pd.to_datetime(
+                [
+                    record.get(
+                        "forgotten_date",
+                        ""
+                    )
+                    for record in _forgotten_records
+                ],
+                errors="coerce"
+            )
+        }
+    )
+
+    return (
+        forgotten_df.dropna(
+            subset=["忘れた日"]
+        )
+        .sort_values(
+            "忘れた日",
+            kind="stable"
+        )
+        .set_index("忘れた日")
+    )
+
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=64
+)
+def build_forgotten_summary(
+    data_version,
+    start_date,
+    end_date,
+    _forgotten_df
+):
+    """表示期間内の持ち物ごとの忘れた回数を集計する。"""
+
+    window_df = slice_dates(
+        _forgotten_df,
+        start_date,
+        end_date
+    )
+
+    return (
+        window_df.groupby(
+            "持ち物",
+            as_index=False
+        )
+        .size()
+        .rename(
+            columns={
+                "size": "忘れた回数"
+            }
+        )
+        .sort_values(
+            "忘れた回数",
+            ascending=False
+        )
+    )
+
+
 # =====================================
 # データ読み込み
 # =====================================
@@ -961,6 +1574,25 @@ else:
                 "気をつけていってらっしゃい！🎉"
             )
 
+        likely_items = rank_items(
+            data["forget_model"],
+            selected_template.get(
+                "category",
+                "その他"
+            ),
+            limit=5
+        )
+
+        if likely_items:
+            st.caption(
+                "⚠️ この種類のおでかけで忘れやすい持ち物："
+                + "、".join(
+                    f"{likely_item['name']}"
+                    f"（{likely_item['likelihood'] * 100:.0f}%）"
+                    for likely_item in likely_items
+                )
+            )
+
 
 # =====================================
 # タブ
@@ -1018,6 +1650,18 @@ with check_tab:
                     selected_template_id
                 )
 
+                # チェックボックスに残った前の値で付け直さないよう消しておく
+                for item in selected_template.get(
+                    "items",
+                    []
+                ):
+                    st.session_state.pop(
+                        f"check_item_"
+                        f"{selected_template_id}_"
+                        f"{item.get('id')}",
+                        None
+                    )
+
                 st.rerun()
 
         with button_col2:
@@ -1030,6 +1674,18 @@ with check_tab:
                     selected_template_id
                 )
 
+                # チェックボックスに残った前の値で付け直さないよう消しておく
+                for item in selected_template.get(
+                    "items",
+                    []
+                ):
+                    st.session_state.pop(
+                        f"check_item_"
+                        f"{selected_template_id}_"
+                        f"{item.get('id')}",
+                        None
+                    )
+
                 st.rerun()
 
         st.divider()
@@ -1133,6 +1789,7 @@ with check_tab:
                             ),
                             key=(
                                 f"check_item_"
+                                f"{selected_template_id}_"
                                 f"{item_id}"
                             ),
                             label_visibility=(
@@ -1464,6 +2121,7 @@ with item_tab:
                             ),
                             key=(
                                 f"edit_item_name_"
+                                f"{selected_template_id}_"
                                 f"{item_id}"
                             )
                         )
@@ -1494,6 +2152,7 @@ with item_tab:
                             ),
                             key=(
                                 f"edit_priority_"
+                                f"{selected_template_id}_"
                                 f"{item_id}"
                             )
                         )
@@ -1512,6 +2171,7 @@ with item_tab:
                             step=1,
                             key=(
                                 f"edit_quantity_"
+                                f"{selected_template_id}_"
                                 f"{item_id}"
                             )
                         )
@@ -1526,6 +2186,7 @@ with item_tab:
                             ),
                             key=(
                                 f"edit_person_"
+                                f"{selected_template_id}_"
                                 f"{item_id}"
                             )
                         )
@@ -1540,6 +2201,7 @@ with item_tab:
                             ),
                             key=(
                                 f"edit_item_memo_"
+                                f"{selected_template_id}_"
                                 f"{item_id}"
                             )
                         )
@@ -1549,6 +2211,7 @@ with item_tab:
                         "変更を保存",
                         key=(
                             f"save_item_"
+                            f"{selected_template_id}_"
                             f"{item_id}"
                         ),
                         use_container_width=True
@@ -1600,6 +2263,7 @@ with item_tab:
                             "削除を確認しました",
                             key=(
                                 f"confirm_item_"
+                                f"{selected_template_id}_"
                                 f"{item_id}"
                             )
                         )
@@ -1609,6 +2273,7 @@ with item_tab:
                         "持ち物を削除",
                         key=(
                             f"delete_item_"
+                            f"{selected_template_id}_"
                             f"{item_id}"
                         ),
                         disabled=(
@@ -2312,46 +2977,13 @@ with analysis_tab:
         )
 
     else:
-        template_rows = []
-
-        for template in templates:
-            template_rows.append(
-                {
-                    "テンプレート": template.get(
-                        "name",
-                        ""
-                    ),
-                    "カテゴリー": template.get(
-                        "category",
-                        ""
-                    ),
-                    "持ち物数": len(
-                        template.get(
-                            "items",
-                            []
-                        )
-                    ),
-                    "必須品数": len(
-                        [
-                            item
-                            for item in template.get(
-                                "items",
-                                []
-                            )
-                            if item.get(
-                                "priority"
-                            ) == "必須"
-                        ]
-                    ),
-                    "最終使用日": template.get(
-                        "last_used",
-                        ""
-                    )
-                }
-            )
+        data_version = file_version(
+            DATA_FILE
+        )
 
-        template_df = pd.DataFrame(
-            template_rows
+        template_df = build_template_summary(
+            data_version,
+            templates
         )
 
         st.subheader(
@@ -2360,9 +2992,11 @@ with analysis_tab:
 
         if not template_df.empty:
             st.bar_chart(
-                template_df.set_index(
-                    "テンプレート"
-                )[["持ち物数"]]
+                top_items(
+                    template_df.set_index(
+                        "テンプレート"
+                    )["持ち物数"]
+                )
             )
 
             st.dataframe(
@@ -2383,47 +3017,33 @@ with analysis_tab:
             )
 
         else:
-            forgotten_df = pd.DataFrame(
-                [
-                    {
-                        "持ち物": record.get(
-                            "item_name",
-                            ""
-                        ),
-                        "テンプレート": record.get(
-                            "template_name",
-                            ""
-                        ),
-                        "忘れた日": record.get(
-                            "forgotten_date",
-                            ""
-                        )
-                    }
-                    for record in forgotten_records
-                ]
+            forgotten_df = build_forgotten_frame(
+                data_version,
+                forgotten_records
             )
 
-            forgotten_summary = (
-                forgotten_df.groupby(
-                    "持ち物",
-                    as_index=False
-                )
-                .size()
-                .rename(
-                    columns={
-                        "size": "忘れた回数"
-                    }
+            start_date, end_date = (
+                select_date_window(
+                    forgotten_df.index,
+                    "forgotten_chart_window"
                 )
-                .sort_values(
-                    "忘れた回数",
-                    ascending=False
+            )
+
+            forgotten_summary = (
+                build_forgotten_summary(
+                    data_version,
+                    start_date,
+                    end_date,
+                    forgotten_df
                 )
             )
 
             st.bar_chart(
-                forgotten_summary.set_index(
-                    "持ち物"
-                )[["忘れた回数"]]
+                top_items(
+                    forgotten_summary.set_index(
+                        "持ち物"
+                    )["忘れた回数"]
+                )
             )
 
             st.dataframe(
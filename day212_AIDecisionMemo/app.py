@@ -1,12 +1,27 @@
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime, timedelta
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.decision_matrix import (  # noqa: E402
+    build_matrix,
+    evaluate_matrix,
+    monte_carlo_wins,
+    weight_sensitivity
+)
+
+
 # =====================================
 # ページ設定
 # =====================================
@@ -103,6 +118,15 @@ SCORE_LABELS = {
 }
 
 
+# 判断基準の重み（0＝考慮しない）
+WEIGHT_MIN = 0
+WEIGHT_MAX = 5
+DEFAULT_WEIGHT = 1
+
+# ぶれの試算で試す回数
+MONTE_CARLO_TRIALS = 2000
+
+
 # =====================================
 # データ管理
 # =====================================
@@ -230,6 +254,11 @@ def load_data():
                 []
             )
 
+            decision.setdefault(
+                "weights",
+                {}
+            )
+
             decision.setdefault(
                 "final_choice",
                 ""
@@ -437,45 +466,85 @@ def get_deadline_message(
     return f"あと{days_left}日"
 
 
-def calculate_option_score(
-    option,
-    criteria
+def get_criterion_weights(
+    decision
 ):
-    """選択肢の合計点と平均点を計算する。"""
+    """判断基準ごとの重みを取得する。"""
 
-    scores = option.get(
-        "scores",
+    weights = decision.get(
+        "weights",
         {}
     )
 
-    valid_scores = [
-        int(
-            scores.get(
-                criterion,
-                3
-            )
+    return {
+        criterion: weights.get(
+            criterion,
+            DEFAULT_WEIGHT
         )
-        for criterion in criteria
-    ]
+        for criterion in decision.get(
+            "criteria",
+            []
+        )
+    }
 
-    if not valid_scores:
+
+def calculate_option_score(
+    option,
+    criteria,
+    weights=None
+):
+    """選択肢の重み付き合計点と平均点を計算する。"""
+
+    if not criteria:
         return 0, 0.0
 
-    total_score = sum(
-        valid_scores
+    scores, weight_values = build_matrix(
+        [option],
+        criteria,
+        weights
     )
 
-    average_score = (
-        total_score
-        / len(valid_scores)
+    result = evaluate_matrix(
+        scores,
+        weight_values
     )
 
     return (
-        total_score,
-        average_score
+        float(result["totals"][0]),
+        float(result["averages"][0])
     )
 
 
+def evaluate_decision(
+    decision
+):
+    """決断メモの評価表（選択肢×判断基準）をまとめて計算する。"""
+
+    scores, weights = build_matrix(
+        decision.get(
+            "options",
+            []
+        ),
+        decision.get(
+            "criteria",
+            []
+        ),
+        get_criterion_weights(
+            decision
+        )
+    )
+
+    result = evaluate_matrix(
+        scores,
+        weights
+    )
+
+    result["scores"] = scores
+    result["weights"] = weights
+
+    return result
+
+
 def get_best_option(
     decision
 ):
@@ -494,32 +563,32 @@ def get_best_option(
     if not options or not criteria:
         return None
 
-    scored_options = []
+    result = evaluate_decision(
+        decision
+    )
 
-    for option in options:
-        total_score, average_score = (
-            calculate_option_score(
-                option,
-                criteria
-            )
-        )
+    best_index = int(
+        result["ranking"][0]
+    )
 
-        scored_options.append(
-            {
-                "option": option,
-                "total": total_score,
-                "average": average_score
-            }
+    return {
+        "option": options[best_index],
+        "total": float(
+            result["totals"][best_index]
+        ),
+        "average": float(
+            result["averages"][best_index]
         )
+    }
 
-    scored_options.sort(
-        key=lambda item: item[
-            "total"
-        ],
-        reverse=True
-    )
 
-    return scored_options[0]
+def format_score(value):
+    """重み付きの点数を表示用に整える。"""
+
+    if float(value).is_integer():
+        return f"{int(value)}"
+
+    return f"{value:.1f}"
 
 
 def count_this_month_decisions(
@@ -642,6 +711,10 @@ def add_decision(
         "anxiety": anxiety,
         "intuition": intuition,
         "criteria": criteria,
+        "weights": {
+            criterion: DEFAULT_WEIGHT
+            for criterion in criteria
+        },
         "options": options,
         "final_choice": "",
         "decision_reason": "",
@@ -727,6 +800,19 @@ def update_criteria(
 
     decision["criteria"] = criteria
 
+    old_weights = decision.get(
+        "weights",
+        {}
+    )
+
+    decision["weights"] = {
+        criterion: old_weights.get(
+            criterion,
+            DEFAULT_WEIGHT
+        )
+        for criterion in criteria
+    }
+
     for option in decision.get(
         "options",
         []
@@ -749,6 +835,37 @@ def update_criteria(
     save_data(data)
 
 
+def update_weights(
+    data,
+    decision_id,
+    weights
+):
+    """判断基準の重みを更新する。"""
+
+    decision = get_decision_by_id(
+        data,
+        decision_id
+    )
+
+    if not decision:
+        return
+
+    decision["weights"] = {
+        criterion: weights.get(
+            criterion,
+            DEFAULT_WEIGHT
+        )
+        for criterion in decision.get(
+            "criteria",
+            []
+        )
+    }
+
+    decision["updated_at"] = now_text()
+
+    save_data(data)
+
+
 def add_option(
     data,
     decision_id,
@@ -1997,6 +2114,70 @@ with compare_tab:
 
                     st.rerun()
 
+            with st.expander(
+                "🎚️ 判断基準の重み",
+                expanded=False
+            ):
+                st.caption(
+                    "大切な基準ほど重みを大きくします。"
+                    "0にするとその基準は点数に含めません。"
+                )
+
+                current_weights = (
+                    get_criterion_weights(
+                        selected_decision
+                    )
+                )
+
+                updated_weights = {}
+
+                for criterion in selected_decision.get(
+                    "criteria",
+                    []
+                ):
+                    updated_weights[
+                        criterion
+                    ] = st.slider(
+                        criterion,
+                        min_value=WEIGHT_MIN,
+                        max_value=WEIGHT_MAX,
+                        value=int(
+                            current_weights.get(
+                                criterion,
+                                DEFAULT_WEIGHT
+                            )
+                        ),
+                        key=(
+                            f"weight_{decision_id}_{criterion}"
+                        )
+                    )
+
+                if st.button(
+                    "重みを保存",
+                    key=(
+                        f"save_weights_{decision_id}"
+                    )
+                ):
+                    if not any(
+                        updated_weights.values()
+                    ):
+                        st.error(
+                            "1つ以上の基準に重みを付けてください。"
+                        )
+
+                    else:
+                        update_weights(
+                            data,
+                            decision_id,
+                            updated_weights
+                        )
+
+                        st.success(
+                            "重みを更新しました！"
+                        )
+
+                        st.rerun()
+
             st.divider()
 
             st.subheader(
@@ -2070,45 +2251,37 @@ with compare_tab:
                 )
 
             else:
-                score_rows = []
+                evaluation = evaluate_decision(
+                    selected_decision
+                )
 
-                for option in options:
-                    total_score, average_score = (
-                        calculate_option_score(
-                            option,
-                            criteria
-                        )
-                    )
+                score_df = pd.DataFrame(
+                    evaluation["scores"].astype(int),
+                    columns=criteria
+                )
 
-                    row = {
-                        "選択肢": option.get(
+                score_df.insert(
+                    0,
+                    "選択肢",
+                    [
+                        option.get(
                             "name",
                             ""
-                        ),
-                        "合計点": total_score,
-                        "平均点": round(
-                            average_score,
-                            2
-                        )
-                    }
-
-                    for criterion in criteria:
-                        row[criterion] = (
-                            option.get(
-                                "scores",
-                                {}
-                            ).get(
-                                criterion,
-                                3
-                            )
                         )
+                        for option in options
+                    ]
+                )
 
-                    score_rows.append(
-                        row
-                    )
+                score_df.insert(
+                    1,
+                    "合計点",
+                    evaluation["totals"].round(2)
+                )
 
-                score_df = pd.DataFrame(
-                    score_rows
+                score_df.insert(
+                    2,
+                    "平均点",
+                    evaluation["averages"].round(2)
                 )
 
                 score_df = score_df.sort_values(
@@ -2159,6 +2332,151 @@ with compare_tab:
                     "直感や家族との話し合いも大切にしてください。"
                 )
 
+                if len(options) >= 2 and criteria:
+                    st.subheader(
+                        "🔬 重みを変えたら1位は変わる？"
+                    )
+
+                    sensitivity = weight_sensitivity(
+                        evaluation["scores"],
+                        evaluation["weights"]
+                    )
+
+                    sensitivity_rows = []
+
+                    for index, criterion in enumerate(
+                        criteria
+                    ):
+                        delta = sensitivity["delta"][
+                            index
+                        ]
+                        rival = int(
+                            sensitivity["rival"][
+                                index
+                            ]
+                        )
+
+                        if rival < 0:
+                            sensitivity_rows.append(
+                                {
+                                    "判断基準": criterion,
+                                    "今の重み": format_score(
+                                        evaluation["weights"][
+                                            index
+                                        ]
+                                    ),
+                                    "1位が入れ替わる重み": "入れ替わらない",
+                                    "入れ替わる相手": ""
+                                }
+                            )
+                            continue
+
+                        sensitivity_rows.append(
+                            {
+                                "判断基準": criterion,
+                                "今の重み": format_score(
+                                    evaluation["weights"][
+                                        index
+                                    ]
+                                ),
+                                "1位が入れ替わる重み": (
+                                    f"{evaluation['weights'][index] + delta:.2f}"
+                                    f"（{delta:+.2f}）"
+                                ),
+                                "入れ替わる相手": options[
+                                    rival
+                                ].get(
+                                    "name",
+                                    ""
+                                )
+                            }
+                        )
+
+                    st.dataframe(
+                        pd.DataFrame(
+                            sensitivity_rows
+                        ),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
+                    st.caption(
+                        "その基準の重みだけを変えたとき、"
+                        "1位が別の選択肢と並ぶ重みです。"
+                        "変化が小さいほど、今の結論は重みの付け方に左右されやすいです。"
+                    )
+
+                    st.subheader(
+                        "🎲 点数のぶれに強い選択肢"
+                    )
+
+                    spread_col1, spread_col2 = (
+                        st.columns(2)
+                    )
+
+                    with spread_col1:
+                        score_spread = st.slider(
+                            "点数のぶれ（±点）",
+                            min_value=0.0,
+                            max_value=2.0,
+                            value=1.0,
+                            step=0.5,
+                            key=(
+                                f"score_spread_{decision_id}"
+                            )
+                        )
+
+                    with spread_col2:
+                        weight_spread = st.slider(
+                            "重みのぶれ（±%）",
+                            min_value=0,
+                            max_value=50,
+                            value=0,
+                            step=10,
+                            key=(
+                                f"weight_spread_{decision_id}"
+                            )
+                        )
+
+                    win_rates = monte_carlo_wins(
+                        evaluation["scores"],
+                        evaluation["weights"],
+                        score_spread=score_spread,
+                        weight_spread=weight_spread / 100,
+                        trials=MONTE_CARLO_TRIALS,
+                        seed=0
+                    )
+
+                    win_df = pd.DataFrame(
+                        {
+                            "選択肢": [
+                                option.get(
+                                    "name",
+                                    ""
+                                )
+                                for option in options
+                            ],
+                            "1位になる割合": (
+                                win_rates * 100
+                            ).round(1)
+                        }
+                    ).sort_values(
+                        "1位になる割合",
+                        ascending=False
+                    )
+
+                    st.bar_chart(
+                        win_df.set_index(
+                            "選択肢"
+                        )
+                    )
+
+                    st.caption(
+                        f"点数が迷っている分だけぶれると考えて"
+                        f"{MONTE_CARLO_TRIALS:,}回試したとき、"
+                        "それぞれが1位になった割合（%）です。"
+                    )
+
                 st.divider()
 
                 st.subheader(
@@ -2267,15 +2585,16 @@ with compare_tab:
                                 )
                             )
 
-                        total_score = sum(
-                            updated_scores.values()
-                        )
-
-                        average_score = (
-                            total_score
-                            / len(updated_scores)
-                            if updated_scores
-                            else 0
+                        total_score, average_score = (
+                            calculate_option_score(
+                                {
+                                    "scores": updated_scores
+                                },
+                                criteria,
+                                get_criterion_weights(
+                                    selected_decision
+                                )
+                            )
                         )
 
                         score_col1, score_col2 = (
@@ -2285,7 +2604,9 @@ with compare_tab:
                         with score_col1:
                             st.metric(
                                 "合計点",
-                                total_score
+                                format_score(
+                                    total_score
+                                )
                             )
 
                         with score_col2:
@@ -2,11 +2,22 @@ import json
 import os
 import random
 import uuid
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
 import pandas as pd
 import streamlit as st
 
+from reading_stats import (
+    RECENT_DAYS,
+    ensure_stats,
+    finished_in_month,
+    forecast_finish,
+    global_rate,
+    monthly_rollup,
+    pages_between,
+    yearly_rollup,
+)
+
 
 # =====================================
 # ページ設定
@@ -421,34 +432,6 @@ def calculate_progress(
     )
 
 
-def count_finished_this_month(
-    books
-):
-    """今月読了した冊数を数える。"""
-
-    today = date.today()
-    count = 0
-
-    for book in books:
-        finish_date = parse_date_text(
-            book.get(
-                "finish_date",
-                ""
-            )
-        )
-
-        if (
-            finish_date
-            and finish_date.year
-            == today.year
-            and finish_date.month
-            == today.month
-        ):
-            count += 1
-
-    return count
-
-
 def get_average_rating(
     books
 ):
@@ -844,6 +827,14 @@ data = load_data()
 
 books = data["books"]
 
+# 変わった本の分だけ読書ペース・月別集計を更新する
+reading_stats, stats_changed = ensure_stats(
+    data
+)
+
+if stats_changed:
+    save_data(data)
+
 
 # =====================================
 # タイトル
@@ -914,11 +905,44 @@ reread_count = len(
 )
 
 monthly_finished_count = (
-    count_finished_this_month(
-        books
+    finished_in_month(
+        reading_stats,
+        date.today().strftime(
+            "%Y-%m"
+        )
     )
 )
 
+recent_rate = global_rate(
+    reading_stats
+)
+
+weekly_pages = pages_between(
+    reading_stats,
+    date.today() - timedelta(
+        days=6
+    ),
+    date.today()
+)
+
+this_year = str(
+    date.today().year
+)
+
+this_year_summary = next(
+    (
+        row
+        for row in yearly_rollup(
+            reading_stats
+        )
+        if row["年"] == this_year
+    ),
+    {
+        "ページ数": 0,
+        "読了冊数": 0
+    }
+)
+
 average_rating = get_average_rating(
     books
 )
@@ -990,6 +1014,35 @@ with metric_col8:
     )
 
 
+metric_col9, metric_col10, metric_col11, metric_col12 = (
+    st.columns(4)
+)
+
+with metric_col9:
+    st.metric(
+        f"読書ペース（直近{RECENT_DAYS}日）",
+        f"{recent_rate:.1f}ページ/日"
+    )
+
+with metric_col10:
+    st.metric(
+        "直近7日",
+        f"{weekly_pages}ページ"
+    )
+
+with metric_col11:
+    st.metric(
+        "今年の読了",
+        f"{this_year_summary['読了冊数']}冊"
+    )
+
+with metric_col12:
+    st.metric(
+        "今年読んだページ",
+        f"{this_year_summary['ページ数']}ページ"
+    )
+
+
 # =====================================
 # 読書中の本
 # =====================================
@@ -1062,6 +1115,21 @@ if reading_books:
                 f"／ {book.get('total_pages', 0)}ページ"
             )
 
+            forecast = forecast_finish(
+                book,
+                reading_stats
+            )
+
+            if forecast:
+                finish_day, rate, basis = forecast
+
+                st.caption(
+                    f"📅 読了予想："
+                    f"{finish_day.strftime('%Y年%m月%d日')}"
+                    f"（あと{(finish_day - date.today()).days}日・"
+                    f"{basis} {rate:.1f}ページ/日）"
+                )
+
 
 # =====================================
 # 今日の学び
@@ -2781,49 +2849,28 @@ with analysis_tab:
         st.divider()
 
         st.subheader(
-            "🗓️ 月別読了数"
+            "🗓️ 月別の読書量・読了数"
         )
 
-        finished_rows = []
-
-        for book in books:
-            finish_date = parse_date_text(
-                book.get(
-                    "finish_date",
-                    ""
-                )
-            )
-
-            if finish_date:
-                finished_rows.append(
-                    {
-                        "月": finish_date.strftime(
-                            "%Y-%m"
-                        ),
-                        "冊数": 1
-                    }
-                )
+        monthly_rows = monthly_rollup(
+            reading_stats
+        )
 
-        if finished_rows:
-            finished_df = pd.DataFrame(
-                finished_rows
+        if monthly_rows:
+            monthly_summary = pd.DataFrame(
+                monthly_rows
             )
 
-            monthly_summary = (
-                finished_df.groupby(
-                    "月",
-                    as_index=False
-                )["冊数"]
-                .sum()
-                .sort_values(
+            st.bar_chart(
+                monthly_summary.set_index(
                     "月"
-                )
+                )[["ページ数"]]
             )
 
             st.bar_chart(
                 monthly_summary.set_index(
                     "月"
-                )[["冊数"]]
+                )[["読了冊数"]]
             )
 
             st.dataframe(
@@ -2832,9 +2879,23 @@ with analysis_tab:
                 hide_index=True
             )
 
+            st.subheader(
+                "📆 年別の読書量・読了数"
+            )
+
+            st.dataframe(
+                pd.DataFrame(
+                    yearly_rollup(
+                        reading_stats
+                    )
+                ),
+                use_container_width=True,
+                hide_index=True
+            )
+
         else:
             st.info(
-                "読了日の記録がありません。"
+                "読書ログや読了日の記録がありません。"
             )
 
         st.divider()
@@ -0,0 +1,363 @@
+import bisect
+import math
+from datetime import date, datetime, timedelta
+
+# 読書ログから、本ごと・全体の読書ペースと月別・年別の集計を作る。
+#
+# 本ごとに「日付ごとに進んだページ数」を求め、全体では
+# [日付, 本ID, ページ数] を日付順に並べた1本の索引と、月ごとの
+# ページ数・読了冊数の合計を data["stats"] に保存しておく。
+# 本が変わったとき（ログの追加・削除、編集、読了）は、その本の分だけを
+# 差し引いてから足し直すので、再実行のたびに全ログの日付を読み直さない。
+
+STATS_VERSION = 1
+
+RECENT_DAYS = 30
+
+
+def parse_day(
+    date_text
+):
+    """YYYY-MM-DD の文字列を date 型にする。"""
+
+    try:
+        return datetime.strptime(
+            str(date_text)[:10],
+            "%Y-%m-%d"
+        ).date()
+
+    except (
+        ValueError,
+        TypeError
+    ):
+        return None
+
+
+def book_signature(
+    book
+):
+    """集計に関わる項目が変わったかどうかを見分けるための値。"""
+
+    return [
+        book.get("updated_at", ""),
+        len(book.get("logs", [])),
+        book.get("status", ""),
+        book.get("start_date", ""),
+        book.get("finish_date", ""),
+    ]
+
+
+def book_entries(
+    book
+):
+    """ログを日付順に並べ、日ごとに進んだページ数を返す。"""
+
+    logs = sorted(
+        book.get("logs", []),
+        key=lambda log: (
+            str(log.get("log_date", "")),
+            log.get("created_at", "")
+        )
+    )
+
+    best_page = 0
+    pages_by_day = {}
+
+    for log in logs:
+        day = str(log.get("log_date", ""))[:10]
+        page = int(log.get("page", 0))
+
+        if not parse_day(day) or page <= best_page:
+            continue
+
+        pages_by_day[day] = (
+            pages_by_day.get(day, 0)
+            + page
+            - best_page
+        )
+        best_page = page
+
+    return [
+        [day, pages]
+        for day, pages in sorted(pages_by_day.items())
+    ]
+
+
+def book_summary(
+    book
+):
+    """本1冊分の集計（日ごとのページ数・読み始め・読了月）を作る。"""
+
+    entries = book_entries(book)
+
+    start = book.get("start_date", "")
+
+    if entries and (
+        not parse_day(start)
+        or start > entries[0][0]
+    ):
+        start = entries[0][0]
+
+    return {
+        "signature": book_signature(book),
+        "entries": entries,
+        "pages": sum(pages for _, pages in entries),
+        "start": start if parse_day(start) else "",
+        "last": entries[-1][0] if entries else "",
+        "finish_month": (
+            book.get("finish_date", "")[:7]
+            if parse_day(book.get("finish_date", ""))
+            else ""
+        ),
+    }
+
+
+def create_stats():
+    """空の集計を作る。"""
+
+    return {
+        "version": STATS_VERSION,
+        "books": {},
+        "index": [],
+        "months": {},
+        "finished": {},
+    }
+
+
+def add_count(
+    counts,
+    key,
+    amount
+):
+    counts[key] = counts.get(key, 0) + amount
+
+    if counts[key] == 0:
+        del counts[key]
+
+
+def apply_book(
+    stats,
+    book_id,
+    summary,
+    sign
+):
+    """本1冊分を集計へ足す（sign=-1 で差し引く）。"""
+
+    index = stats["index"]
+
+    for day, pages in summary["entries"]:
+        item = [day, book_id, pages]
+
+        if sign > 0:
+            bisect.insort(index, item)
+
+        else:
+            position = bisect.bisect_left(index, item)
+
+            if position < len(index) and index[position] == item:
+                del index[position]
+
+        month = stats["months"].setdefault(
+            day[:7],
+            {"pages": 0, "entries": 0}
+        )
+        month["pages"] += sign * pages
+        month["entries"] += sign
+
+        if month["entries"] <= 0:
+            del stats["months"][day[:7]]
+
+    if summary["finish_month"]:
+        add_count(
+            stats["finished"],
+            summary["finish_month"],
+            sign
+        )
+
+
+def ensure_stats(
+    data
+):
+    """変わった本の分だけ集計を更新する。2つめの戻り値は保存が必要かどうか。"""
+
+    stats = data.get("stats")
+    changed = False
+
+    if (
+        not isinstance(stats, dict)
+        or stats.get("version") != STATS_VERSION
+    ):
+        stats = create_stats()
+        data["stats"] = stats
+        changed = True
+
+    books_by_id = {
+        book["id"]: book
+        for book in data["books"]
+    }
+
+    for book_id in list(stats["books"]):
+        if book_id not in books_by_id:
+            apply_book(stats, book_id, stats["books"].pop(book_id), -1)
+            changed = True
+
+    for book_id, book in books_by_id.items():
+        old = stats["books"].get(book_id)
+
+        if old and old["signature"] == book_signature(book):
+            continue
+
+        if old:
+            apply_book(stats, book_id, old, -1)
+
+        summary = book_summary(book)
+        apply_book(stats, book_id, summary, 1)
+        stats["books"][book_id] = summary
+        changed = True
+
+    return stats, changed
+
+
+def pages_between(
+    stats,
+    start,
+    end
+):
+    """start 〜 end（両端を含む）に読んだページ数。"""
+
+    index = stats["index"]
+
+    low = bisect.bisect_left(index, [str(start)])
+    high = bisect.bisect_left(index, [str(end + timedelta(days=1))])
+
+    return sum(
+        item[2]
+        for item in index[low:high]
+    )
+
+
+def global_rate(
+    stats,
+    today=None,
+    days=RECENT_DAYS
+):
+    """直近 days 日（記録を始めて日が浅ければその日数）の1日あたりページ数。"""
+
+    today = today or date.today()
+
+    if not stats["index"]:
+        return 0.0
+
+    first = parse_day(stats["index"][0][0])
+    window_start = max(
+        today - timedelta(days=days - 1),
+        first
+    )
+
+    if window_start > today:
+        return 0.0
+
+    span = (today - window_start).days + 1
+
+    return pages_between(stats, window_start, today) / span
+
+
+def book_rate(
+    summary
+):
+    """読み始めから最後のログまでの1日あたりページ数。2日分以上ないときは None。"""
+
+    start = parse_day(summary["start"])
+    last = parse_day(summary["last"])
+
+    if not start or not last or last <= start:
+        return None
+
+    return summary["pages"] / ((last - start).days + 1)
+
+
+def forecast_finish(
+    book,
+    stats,
+    today=None
+):
+    """読了予定日を見積もる。(予定日, 1日あたりページ数, 根拠) か None を返す。"""
+
+    today = today or date.today()
+
+    remaining = (
+        int(book.get("total_pages", 0))
+        - int(book.get("current_page", 0))
+    )
+
+    if int(book.get("total_pages", 0)) <= 0 or remaining <= 0:
+        return None
+
+    summary = stats["books"].get(book["id"])
+    rate = book_rate(summary) if summary else None
+    basis = "この本のペース"
+
+    if not rate:
+        rate = global_rate(stats, today)
+        basis = f"直近{RECENT_DAYS}日のペース"
+
+    if not rate:
+        return None
+
+    return (
+        today + timedelta(days=math.ceil(remaining / rate)),
+        rate,
+        basis,
+    )
+
+
+def finished_in_month(
+    stats,
+    month
+):
+    """その月（YYYY-MM）に読了した冊数。"""
+
+    return stats["finished"].get(month, 0)
+
+
+def monthly_rollup(
+    stats
+):
+    """月ごとの読んだページ数・記録数（本×日）・読了冊数。"""
+
+    months = sorted(
+        set(stats["months"])
+        | set(stats["finished"])
+    )
+
+    return [
+        {
+            "月": month,
+            "ページ数": stats["months"].get(month, {}).get("pages", 0),
+            "記録数": stats["months"].get(month, {}).get("entries", 0),
+            "読了冊数": stats["finished"].get(month, 0),
+        }
+        for month in months
+    ]
+
+
+def yearly_rollup(
+    stats
+):
+    """年ごとの読んだページ数・読了冊数。月の集計を足し合わせる。"""
+
+    years = {}
+
+    for row in monthly_rollup(stats):
+        year = years.setdefault(
+            row["月"][:4],
+            {"年": row["月"][:4], "ページ数": 0, "記録数": 0, "読了冊数": 0}
+        )
+        year["ページ数"] += row["ページ数"]
+        year["記録数"] += row["記録数"]
+        year["読了冊数"] += row["読了冊数"]
+
+    return [
+        years[year]
+        for year in sorted(years)
+    ]
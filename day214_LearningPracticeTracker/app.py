@@ -7,6 +7,13 @@ from datetime import date, datetime, timedelta
 import pandas as pd
 import streamlit as st
 
+from review_scheduler import (
+    due_cards,
+    ensure_reviews,
+    remove_card,
+    update_card,
+)
+
 
 # =========================================================
 # ページ設定
@@ -94,6 +101,9 @@ CATEGORIES = [
     "その他",
 ]
 
+# 今日の復習に一度に並べる件数
+REVIEW_LIST_LIMIT = 20
+
 DECISIONS = [
     "未決定",
     "このまま続ける",
@@ -664,6 +674,11 @@ def add_learning(
         learning
     )
 
+    update_card(
+        data["reviews"],
+        learning
+    )
+
     save_data(data)
 
 
@@ -693,6 +708,11 @@ def update_learning(
         now_text()
     )
 
+    update_card(
+        data["reviews"],
+        learning
+    )
+
     save_data(data)
 
 
@@ -709,6 +729,11 @@ def delete_learning(
         != learning_id
     ]
 
+    remove_card(
+        data["reviews"],
+        learning_id
+    )
+
     save_data(data)
 
 
@@ -764,6 +789,11 @@ def add_practice_log(
         now_text()
     )
 
+    update_card(
+        data["reviews"],
+        learning
+    )
+
     save_data(data)
 
 
@@ -819,6 +849,11 @@ def delete_practice_log(
         now_text()
     )
 
+    update_card(
+        data["reviews"],
+        learning
+    )
+
     save_data(data)
 
 
@@ -878,6 +913,19 @@ learnings = data[
     "learnings"
 ]
 
+# 復習の予定は1件ずつ更新しているので、ふだんは件数の確認だけで済む
+reviews, reviews_changed = ensure_reviews(
+    data
+)
+
+if reviews_changed:
+    save_data(data)
+
+todays_reviews = due_cards(
+    reviews,
+    limit=REVIEW_LIST_LIMIT + 1
+)
+
 
 # =========================================================
 # ヘッダー
@@ -1026,6 +1074,18 @@ metric_row2[3].metric(
     f"{improving_count}件"
 )
 
+metric_row3 = st.columns(4)
+
+metric_row3[0].metric(
+    "今日の復習",
+    (
+        f"{REVIEW_LIST_LIMIT}件以上"
+        if len(todays_reviews)
+        > REVIEW_LIST_LIMIT
+        else f"{len(todays_reviews)}件"
+    )
+)
+
 
 # =========================================================
 # 今日の候補・期限アラート
@@ -1177,6 +1237,98 @@ if active_learnings:
                     )
 
 
+# =========================================================
+# 今日の復習
+# =========================================================
+
+if todays_reviews:
+    st.divider()
+
+    st.subheader(
+        "🔁 今日の復習"
+    )
+
+    st.caption(
+        "実践ログの手応えから、次に振り返る日を自動で決めています。"
+        "手応えが高いほど次の復習までの間隔が伸びます。"
+    )
+
+    for due_text, ease, learning_id in todays_reviews[
+        :REVIEW_LIST_LIMIT
+    ]:
+        review_learning = get_learning_by_id(
+            data,
+            learning_id
+        )
+
+        if not review_learning:
+            continue
+
+        card = reviews["cards"][
+            learning_id
+        ]
+
+        with st.container(
+            border=True
+        ):
+            review_column1, review_column2, review_column3 = (
+                st.columns(
+                    [3, 2, 1]
+                )
+            )
+
+            with review_column1:
+                st.markdown(
+                    f"**{display_name(review_learning)}**"
+                )
+
+                st.caption(
+                    f"予定日：{format_date(due_text)} ／ "
+                    f"間隔：{card['interval']}日 ／ "
+                    f"易しさ：{ease:.2f}"
+                )
+
+            with review_column2:
+                review_level = st.slider(
+                    "今回の手応え",
+                    min_value=1,
+                    max_value=5,
+                    value=3,
+                    key=(
+                        f"review_level_"
+                        f"{learning_id}"
+                    )
+                )
+
+            with review_column3:
+                if st.button(
+                    "✅ 復習した",
+                    key=(
+                        f"review_done_"
+                        f"{learning_id}"
+                    ),
+                    use_container_width=True
+                ):
+                    add_practice_log(
+                        data,
+                        learning_id,
+                        {
+                            "log_date": str(
+                                date.today()
+                            ),
+                            "action": "復習",
+                            "result": "",
+                            "insight": "",
+                            "next_improvement": "",
+                            "success_level": (
+                                review_level
+                            ),
+                        }
+                    )
+
+                    st.rerun()
+
+
 # =========================================================
 # ランダム学び
 # =========================================================
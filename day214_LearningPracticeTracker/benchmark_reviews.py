@@ -0,0 +1,86 @@
+import random
+import time
+from datetime import date, timedelta
+
+from review_scheduler import (
+    due_cards,
+    ensure_reviews,
+    update_card,
+)
+
+# 5万件の学びで、今日の復習リストの取り出しとログ追加時の更新にかかる時間を測る。
+# 使い方：python benchmark_reviews.py
+
+CARD_COUNT = 50000
+LIST_LIMIT = 21
+UPDATES = 1000
+
+
+def make_data(count, seed=0):
+    rng = random.Random(seed)
+    today = date.today()
+    learnings = []
+
+    for i in range(count):
+        day = today - timedelta(days=rng.randint(0, 365))
+        logs = []
+
+        for k in range(rng.randint(0, 8)):
+            day += timedelta(days=rng.randint(1, 20))
+            logs.append({
+                "id": f"{i}-{k}",
+                "log_date": str(day),
+                "success_level": rng.randint(1, 5),
+                "created_at": "",
+            })
+
+        learnings.append({
+            "id": f"learning-{i}",
+            "status": "実践中",
+            "start_date": str(today - timedelta(days=rng.randint(0, 365))),
+            "logs": logs,
+            "updated_at": "",
+        })
+
+    return {"learnings": learnings}
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    data = make_data(CARD_COUNT)
+
+    (reviews, _), build_ms = timed(ensure_reviews, data)
+    _, check_ms = timed(ensure_reviews, data)
+    due, due_ms = timed(due_cards, reviews, limit=LIST_LIMIT)
+
+    rng = random.Random(1)
+    start = time.perf_counter()
+
+    for step in range(UPDATES):
+        learning = rng.choice(data["learnings"])
+        learning["logs"].append({
+            "id": f"new-{step}",
+            "log_date": str(date.today()),
+            "success_level": rng.randint(1, 5),
+            "created_at": str(step),
+        })
+        learning["updated_at"] = str(step)
+        update_card(reviews, learning)
+        due_cards(reviews, limit=LIST_LIMIT)
+
+    update_ms = (time.perf_counter() - start) * 1000 / UPDATES
+
+    print(f"学び {CARD_COUNT}件")
+    print(f"  最初の計算           {build_ms:8.1f} ms")
+    print(f"  再実行時の確認       {check_ms:8.2f} ms")
+    print(f"  今日の復習 {len(due)}件      {due_ms:8.2f} ms")
+    print(f"  ログ追加 + リスト更新 {update_ms:8.3f} ms / 回")
+
+
+if __name__ == "__main__":
+    main()
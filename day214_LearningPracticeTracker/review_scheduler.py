@@ -0,0 +1,320 @@
+import heapq
+from datetime import date, timedelta
+
+# 実践ログの手応え（success_level 1〜5）から、学びごとの次の復習日を
+# SM-2 方式で決める。
+#
+# 学びごとの状態（連続成功回数・間隔・易しさ・次の復習日）は
+# data["reviews"]["cards"] に保存し、復習日が近い順の優先度付きキュー
+# （ヒープ）を data["reviews"]["queue"] に持つ。ログが増えたり消えたり
+# したときは、その学び1件の状態を計算し直してキューへ積むだけにする。
+# 古くなったキューの要素はその場では消さず、取り出すときに読み飛ばす。
+
+INITIAL_EASE = 2.5
+
+MIN_EASE = 1.3
+
+# この手応え以上なら「覚えていた（うまくできた）」として間隔を伸ばす
+PASS_LEVEL = 3
+
+# 復習しない状態
+EXCLUDED_STATUSES = [
+    "中止",
+]
+
+REVIEWS_VERSION = 1
+
+
+def parse_day(date_text):
+    """日付文字列をdate型へ変換する。"""
+
+    try:
+        return date.fromisoformat(
+            str(date_text)[:10]
+        )
+
+    except (
+        ValueError,
+        TypeError
+    ):
+        return None
+
+
+def sm2_step(
+    state,
+    level,
+    review_day
+):
+    """1回分の手応えで状態を更新する（SM-2）。"""
+
+    quality = min(
+        max(int(level), 0),
+        5
+    )
+
+    if quality >= PASS_LEVEL:
+        if state["reps"] == 0:
+            interval = 1
+        elif state["reps"] == 1:
+            interval = 6
+        else:
+            interval = round(
+                state["interval"]
+                * state["ease"]
+            )
+
+        reps = state["reps"] + 1
+
+    else:
+        interval = 1
+        reps = 0
+
+    ease = max(
+        MIN_EASE,
+        state["ease"]
+        + 0.1
+        - (5 - quality)
+        * (0.08 + (5 - quality) * 0.02)
+    )
+
+    return {
+        "reps": reps,
+        "interval": interval,
+        "ease": round(ease, 3),
+        "last_review": str(review_day),
+        "due": str(
+            review_day
+            + timedelta(days=interval)
+        ),
+    }
+
+
+def card_state(
+    learning,
+    today=None
+):
+    """学び1件のログを日付順にたどって、いまの状態を求める。"""
+
+    today = today or date.today()
+
+    state = {
+        "reps": 0,
+        "interval": 0,
+        "ease": INITIAL_EASE,
+        "last_review": "",
+        "due": str(
+            parse_day(learning.get("start_date", ""))
+            or parse_day(learning.get("created_at", ""))
+            or today
+        ),
+    }
+
+    logs = sorted(
+        learning.get("logs", []),
+        key=lambda log: (
+            str(log.get("log_date", "")),
+            log.get("created_at", "")
+        )
+    )
+
+    for log in logs:
+        review_day = parse_day(
+            log.get("log_date", "")
+        )
+
+        if review_day:
+            state = sm2_step(
+                state,
+                log.get("success_level", 3),
+                review_day
+            )
+
+    state["signature"] = card_signature(learning)
+
+    return state
+
+
+def card_signature(learning):
+    """状態の計算に関わる項目が変わったかを見分けるための値。"""
+
+    return [
+        len(learning.get("logs", [])),
+        learning.get("updated_at", ""),
+        learning.get("status", ""),
+    ]
+
+
+def create_reviews():
+    """空の復習データを作る。"""
+
+    return {
+        "version": REVIEWS_VERSION,
+        "cards": {},
+        "queue": [],
+    }
+
+
+def update_card(
+    reviews,
+    learning,
+    today=None
+):
+    """学び1件の状態を計算し直し、キューへ積む。"""
+
+    if learning.get("status") in EXCLUDED_STATUSES:
+        remove_card(
+            reviews,
+            learning["id"]
+        )
+        return
+
+    state = card_state(
+        learning,
+        today
+    )
+
+    reviews["cards"][learning["id"]] = state
+
+    heapq.heappush(
+        reviews["queue"],
+        [state["due"], state["ease"], learning["id"]]
+    )
+
+    compact_queue(reviews)
+
+
+def remove_card(
+    reviews,
+    learning_id
+):
+    """学びを復習対象から外す（キューの要素は取り出すときに読み飛ばす）。"""
+
+    reviews["cards"].pop(
+        learning_id,
+        None
+    )
+
+    compact_queue(reviews)
+
+
+def is_current(
+    reviews,
+    item
+):
+    """キューの要素が、いまの状態と一致しているか。"""
+
+    card = reviews["cards"].get(item[2])
+
+    return bool(
+        card
+        and card["due"] == item[0]
+        and card["ease"] == item[1]
+    )
+
+
+def compact_queue(reviews):
+    """古い要素がカードの数の2倍を超えたら、キューを作り直す。"""
+
+    if len(reviews["queue"]) <= 2 * len(reviews["cards"]) + 16:
+        return
+
+    reviews["queue"] = [
+        [card["due"], card["ease"], card_id]
+        for card_id, card in reviews["cards"].items()
+    ]
+
+    heapq.heapify(reviews["queue"])
+
+
+def ensure_reviews(
+    data,
+    today=None
+):
+    """保存済みの状態と学びの一覧を突き合わせる。2つめの戻り値は保存が必要かどうか。
+
+    ログの追加・削除では update_card で1件ずつ更新しているので、
+    ふだんは件数を比べるだけで済む。食い違ったときだけ変わった学びを計算し直す。
+    """
+
+    reviews = data.get("reviews")
+    changed = False
+
+    if (
+        not isinstance(reviews, dict)
+        or reviews.get("version") != REVIEWS_VERSION
+    ):
+        reviews = create_reviews()
+        data["reviews"] = reviews
+        changed = True
+
+    targets = [
+        learning
+        for learning in data["learnings"]
+        if learning.get("status") not in EXCLUDED_STATUSES
+    ]
+
+    if not changed and len(targets) == len(reviews["cards"]):
+        return reviews, False
+
+    target_ids = {learning["id"] for learning in targets}
+
+    for card_id in list(reviews["cards"]):
+        if card_id not in target_ids:
+            del reviews["cards"][card_id]
+
+    for learning in targets:
+        card = reviews["cards"].get(learning["id"])
+
+        if card and card["signature"] == card_signature(learning):
+            continue
+
+        reviews["cards"][learning["id"]] = card_state(
+            learning,
+            today
+        )
+
+    reviews["queue"] = [
+        [card["due"], card["ease"], card_id]
+        for card_id, card in reviews["cards"].items()
+    ]
+
+    heapq.heapify(reviews["queue"])
+
+    return reviews, True
+
+
+def due_cards(
+    reviews,
+    today=None,
+    limit=None
+):
+    """今日までに復習する学びを、復習日が早い順に返す。[(復習日, 易しさ, ID), ...]
+
+    ヒープの先頭から取り出し、読み終えたら積み直すので、
+    全体の件数ではなく取り出した件数ぶんの手間で済む。
+    """
+
+    today = str(today or date.today())
+    queue = reviews["queue"]
+
+    popped = []
+    result = []
+    seen = set()
+
+    while queue and queue[0][0] <= today:
+        if limit is not None and len(result) >= limit:
+            break
+
+        item = heapq.heappop(queue)
+
+        if item[2] in seen or not is_current(reviews, item):
+            continue
+
+        seen.add(item[2])
+        popped.append(item)
+        result.append(tuple(item))
+
+    for item in popped:
+        heapq.heappush(queue, item)
+
+    return result
@@ -1,3 +1,4 @@
+import bisect
 import json
 import os
 import uuid
@@ -66,6 +67,12 @@ PRIORITY_ICONS = {
     3: "🥉",
 }
 
+SUMMARY_PERIODS = {
+    "日ごと": "D",
+    "週ごと": "W-SUN",
+    "月ごと": "MS",
+}
+
 
 # =========================================================
 # データ管理
@@ -257,6 +264,10 @@ def normalize_data(data):
                 ""
             )
 
+    sort_days(
+        data["days"]
+    )
+
     return data
 
 
@@ -368,6 +379,56 @@ def format_date(date_text):
     )
 
 
+def day_key(day_data):
+    """並び替え・検索に使う日付文字列を返す。"""
+
+    return day_data.get(
+        "target_date",
+        ""
+    )
+
+
+def sort_days(days):
+    """日付の昇順に並んでいなければ並べ直す。"""
+
+    if any(
+        day_key(days[i])
+        > day_key(days[i + 1])
+        for i in range(
+            len(days) - 1
+        )
+    ):
+        days.sort(
+            key=day_key
+        )
+
+    return days
+
+
+def days_between(
+    days,
+    start_date,
+    end_date
+):
+    """指定期間の日データを二分探索で取り出す。"""
+
+    start = bisect.bisect_left(
+        days,
+        str(start_date),
+        key=day_key
+    )
+
+    end = bisect.bisect_right(
+        days,
+        str(end_date),
+        key=day_key
+    )
+
+    return days[
+        start:end
+    ]
+
+
 def get_day_data(
     data,
     target_date
@@ -378,14 +439,28 @@ def get_day_data(
         target_date
     )
 
-    for day_data in data["days"]:
-        if (
-            day_data.get(
-                "target_date"
-            )
-            == target_text
-        ):
-            return day_data
+    days = data["days"]
+
+    # 今日のデータはほぼ末尾にあるので先に見る
+    if (
+        days
+        and day_key(days[-1])
+        == target_text
+    ):
+        return days[-1]
+
+    position = bisect.bisect_left(
+        days,
+        target_text,
+        key=day_key
+    )
+
+    if (
+        position < len(days)
+        and day_key(days[position])
+        == target_text
+    ):
+        return days[position]
 
     return None
 
@@ -421,9 +496,21 @@ def get_or_create_day(
         "updated_at": "",
     }
 
-    data["days"].append(
-        day_data
-    )
+    if (
+        not data["days"]
+        or day_key(data["days"][-1])
+        < day_data["target_date"]
+    ):
+        data["days"].append(
+            day_data
+        )
+
+    else:
+        bisect.insort(
+            data["days"],
+            day_data,
+            key=day_key
+        )
 
     save_data(data)
 
@@ -542,35 +629,30 @@ def calculate_full_completion_streak(
     if not days:
         return 0
 
-    date_map = {
-        parse_date(
-            day_data.get(
-                "target_date",
-                ""
-            )
-        ): day_data
-        for day_data in days
-        if parse_date(
-            day_data.get(
-                "target_date",
-                ""
-            )
-        )
+    data = {
+        "days": days
     }
 
     current_date = date.today()
 
-    if current_date not in date_map:
+    if not get_day_data(
+        data,
+        current_date
+    ):
         current_date -= timedelta(
             days=1
         )
 
     streak = 0
 
-    while current_date in date_map:
-        day_data = date_map[
+    while True:
+        day_data = get_day_data(
+            data,
             current_date
-        ]
+        )
+
+        if not day_data:
+            break
 
         tasks = day_data.get(
             "tasks",
@@ -606,27 +688,18 @@ def weekly_completion_rate(days):
 
     weekly_tasks = []
 
-    for day_data in days:
-        target_date = parse_date(
+    for day_data in days_between(
+        days,
+        start_date,
+        date.today()
+    ):
+        weekly_tasks.extend(
             day_data.get(
-                "target_date",
-                ""
+                "tasks",
+                []
             )
         )
 
-        if (
-            target_date
-            and start_date
-            <= target_date
-            <= date.today()
-        ):
-            weekly_tasks.extend(
-                day_data.get(
-                    "tasks",
-                    []
-                )
-            )
-
     if not weekly_tasks:
         return 0
 
@@ -2003,13 +2076,8 @@ with history_tab:
                 "target_date",
                 ""
             )
-            for day_data in sorted(
-                recorded_days,
-                key=lambda item: item.get(
-                    "target_date",
-                    ""
-                ),
-                reverse=True
+            for day_data in reversed(
+                recorded_days
             )
         }
 
@@ -2581,14 +2649,39 @@ with analysis_tab:
 
         day_summary_df = pd.DataFrame(
             day_rows
-        ).sort_values(
-            "日付"
+        )
+
+        period_label = st.radio(
+            "まとめ方",
+            list(
+                SUMMARY_PERIODS.keys()
+            ),
+            horizontal=True
+        )
+
+        # 長い期間は週・月ごとの平均に間引いて描く
+        rate_series = (
+            day_summary_df.assign(
+                日付=pd.to_datetime(
+                    day_summary_df["日付"],
+                    errors="coerce"
+                )
+            )
+            .dropna(
+                subset=["日付"]
+            )
+            .set_index("日付")["達成率"]
+            .resample(
+                SUMMARY_PERIODS[
+                    period_label
+                ]
+            )
+            .mean()
+            .dropna()
         )
 
         st.line_chart(
-            day_summary_df.set_index(
-                "日付"
-            )[["達成率"]]
+            rate_series
         )
 
         st.dataframe(
@@ -1,13 +1,27 @@
-import calendar
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime, time, timedelta
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.occurrence import (  # noqa: E402
+    NO_DAY,
+    find_occurrence,
+    ordered_records,
+    sync_occurrences
+)
+
+
 # =========================================================
 # ページ設定
 # =========================================================
@@ -371,172 +385,98 @@ def format_date(date_text):
     )
 
 
-def safe_replace_year(
-    target_date,
-    year
-):
-    """うるう日を考慮して年を変更する。"""
+def schedule_time_text(event):
+    """並び順に使う時刻（時刻なしのイベントは空）。"""
 
-    try:
-        return target_date.replace(
-            year=year
+    if event.get(
+        "has_time",
+        False
+    ):
+        return event.get(
+            "event_time",
+            ""
         )
 
-    except ValueError:
-        return target_date.replace(
-            year=year,
-            day=28
-        )
+    return ""
 
 
-def safe_replace_month(
-    target_date,
-    year,
-    month
-):
-    """月末日を考慮して年月を変更する。"""
+def sync_schedule(events):
+    """全イベントの次回日・残り日数・並び順をまとめて計算する。
 
-    last_day = calendar.monthrange(
-        year,
-        month
-    )[1]
+    日付が変わるか、イベントの日付・繰り返し・時刻が変わるまでは前回の結果を使う。
+    """
 
-    return date(
-        year,
-        month,
-        min(
-            target_date.day,
-            last_day
-        )
+    return sync_occurrences(
+        DATA_FILE,
+        [
+            event.get("id")
+            for event in events
+        ],
+        [
+            event.get(
+                "event_date",
+                ""
+            )
+            for event in events
+        ],
+        [
+            event.get(
+                "repeat_type",
+                "繰り返しなし"
+            )
+            for event in events
+        ],
+        [
+            schedule_time_text(event)
+            for event in events
+        ]
     )
 
 
-def get_next_occurrence(event):
-    """繰り返し設定を考慮した次回日を返す。"""
+def event_occurrence(event):
+    """イベントの（次回日の通日, 残り日数, 並べ替えの値）を返す。"""
 
-    original_date = parse_date(
+    return find_occurrence(
+        DATA_FILE,
+        event.get("id"),
         event.get(
             "event_date",
             ""
-        )
-    )
-
-    if not original_date:
-        return None
-
-    repeat_type = event.get(
-        "repeat_type",
-        "繰り返しなし"
+        ),
+        event.get(
+            "repeat_type",
+            "繰り返しなし"
+        ),
+        schedule_time_text(event)
     )
 
-    today = date.today()
-
-    if repeat_type == "繰り返しなし":
-        return original_date
-
-    if repeat_type == "毎年":
-        candidate = safe_replace_year(
-            original_date,
-            today.year
-        )
-
-        if candidate < today:
-            candidate = safe_replace_year(
-                original_date,
-                today.year + 1
-            )
-
-        return candidate
-
-    if repeat_type == "毎月":
-        candidate = safe_replace_month(
-            original_date,
-            today.year,
-            today.month
-        )
-
-        if candidate < today:
-            if today.month == 12:
-                next_year = today.year + 1
-                next_month = 1
-
-            else:
-                next_year = today.year
-                next_month = today.month + 1
-
-            candidate = safe_replace_month(
-                original_date,
-                next_year,
-                next_month
-            )
 
-        return candidate
-
-    if repeat_type == "毎週":
-        days_difference = (
-            original_date.weekday()
-            - today.weekday()
-        ) % 7
-
-        candidate = (
-            today
-            + timedelta(
-                days=days_difference
-            )
-        )
-
-        return candidate
-
-    return original_date
-
-
-def event_datetime(event):
-    """イベントの次回日時を返す。"""
+def get_next_occurrence(event):
+    """繰り返し設定を考慮した次回日を返す。"""
 
-    next_date = get_next_occurrence(
+    occurrence = event_occurrence(
         event
     )
 
-    if not next_date:
+    if not occurrence:
         return None
 
-    if event.get(
-        "has_time",
-        False
-    ):
-        event_time = parse_time(
-            event.get(
-                "event_time",
-                ""
-            )
-        )
-
-        if event_time:
-            return datetime.combine(
-                next_date,
-                event_time
-            )
-
-    return datetime.combine(
-        next_date,
-        time.min
+    return date.fromordinal(
+        occurrence[0]
     )
 
 
 def countdown_days(event):
     """イベントまでの日数を返す。"""
 
-    next_date = get_next_occurrence(
+    occurrence = event_occurrence(
         event
     )
 
-    if not next_date:
+    if not occurrence:
         return None
 
-    return (
-        next_date
-        - date.today()
-    ).days
+    return occurrence[1]
 
 
 def countdown_text(event):
@@ -682,17 +622,16 @@ def preparation_checked_count(event):
 
 
 def event_sort_key(event):
-    """イベント一覧の並び替えキーを返す。"""
+    """イベント一覧の並び替えキーを返す（次回日時の早い順）。"""
 
-    next_datetime = event_datetime(
+    occurrence = event_occurrence(
         event
     )
 
-    return (
-        next_datetime
-        if next_datetime
-        else datetime.max
-    )
+    if not occurrence:
+        return NO_DAY
+
+    return occurrence[2]
 
 
 # =========================================================
@@ -1019,6 +958,10 @@ events = data[
     "events"
 ]
 
+schedule = sync_schedule(
+    events
+)
+
 
 # =========================================================
 # ヘッダー
@@ -2317,9 +2260,9 @@ with preparation_tab:
                 f"{event.get('title', '')}"
                 f"｜{countdown_text(event)}"
             ): event["id"]
-            for event in sorted(
-                events,
-                key=event_sort_key
+            for event in ordered_records(
+                schedule,
+                events
             )
         }
 
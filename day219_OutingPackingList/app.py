@@ -1,13 +1,44 @@
 import json
 import os
+import sys
 import uuid
 from collections import Counter
 from datetime import date, datetime, timedelta
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.forget_predictor import (  # noqa: E402
+    apply_trip,
+    create_model,
+    forgotten_counts,
+    is_current,
+    rank_items,
+    remove_trip,
+)
+from common.packing_list import (  # noqa: E402
+    apply_bits,
+    bits_from_flags,
+    count_bits,
+    full_bits,
+    link_items,
+    load_checks,
+    remove_bit,
+    resolve_items,
+    save_checks,
+    set_bit,
+    split_items,
+    stored_item,
+)
+
+
 # =========================================================
 # ページ設定
 # =========================================================
@@ -29,6 +60,26 @@ DATA_FILE = os.path.join(
     "outing_data.json"
 )
 
+# チェック状態だけを書く小さなファイル（チェックのたびに全体を書き直さない）
+CHECKS_FILE = os.path.join(
+    DATA_DIR,
+    "outing_checks.json"
+)
+
+# 新しいおでかけへ「過去の忘れ物」として足す持ち物の、忘れる見込みの下限と最大件数
+FORGET_SUGGEST_LIKELIHOOD = 0.2
+
+FORGET_SUGGEST_LIMIT = 10
+
+# テンプレートとの差分として比べる持ち物の項目
+ITEM_FIELDS = (
+    "name",
+    "owner",
+    "group",
+    "priority",
+    "memo",
+)
+
 OUTING_TYPES = [
     "旅行",
     "日帰りレジャー",
@@ -172,6 +223,7 @@ def create_empty_data():
     return {
         "templates": [],
         "outings": [],
+        "forget_model": create_model(),
     }
 
 
@@ -235,6 +287,86 @@ def create_default_templates():
     return templates
 
 
+def stored_outing(
+    outing,
+    templates_by_id,
+):
+    """保存ファイルに書くおでかけ。テンプレートから来た持ち物は差分だけにする。"""
+
+    stored = {
+        key: value
+        for key, value in outing.items()
+        if key not in [
+            "items",
+            "checks",
+        ]
+    }
+
+    template = templates_by_id.get(
+        outing.get(
+            "template_id",
+            ""
+        )
+    )
+
+    if template:
+        (
+            stored["template_diff"],
+            stored["items"],
+        ) = split_items(
+            outing.get(
+                "items",
+                []
+            ),
+            template["items"],
+            ITEM_FIELDS,
+        )
+
+    else:
+        stored["template_id"] = ""
+        stored["items"] = [
+            stored_item(item)
+            for item in outing.get(
+                "items",
+                []
+            )
+        ]
+
+    return stored
+
+
+def stored_data(data):
+    """保存ファイルに書く形へ変換する。"""
+
+    templates_by_id = {
+        template["id"]: template
+        for template in data["templates"]
+    }
+
+    return {
+        **data,
+        "outings": [
+            stored_outing(
+                outing,
+                templates_by_id,
+            )
+            for outing in data["outings"]
+        ],
+    }
+
+
+def outing_checks(data):
+    """おでかけごとのチェック状態（ビット列）。"""
+
+    return {
+        outing["id"]: outing.get(
+            "checks",
+            0
+        )
+        for outing in data["outings"]
+    }
+
+
 def save_data(data):
     """JSONファイルへ保存する。"""
 
@@ -249,12 +381,23 @@ def save_data(data):
         encoding="utf-8"
     ) as file:
         json.dump(
-            data,
+            stored_data(data),
             file,
             ensure_ascii=False,
             indent=2
         )
 
+    save_check_state(data)
+
+
+def save_check_state(data):
+    """チェック状態だけを保存する（テンプレートやおでかけの本体は書き直さない）。"""
+
+    save_checks(
+        CHECKS_FILE,
+        outing_checks(data)
+    )
+
 
 def normalize_item(item):
     """持ち物データへ不足項目を追加する。"""
@@ -315,7 +458,108 @@ def normalize_item(item):
     )
 
 
-def normalize_data(data):
+def expand_outing(
+    outing,
+    templates_by_id,
+    templates_by_name,
+    checks,
+):
+    """保存ファイルのおでかけを、持ち物をすべて持つ形に戻す。"""
+
+    diff = outing.pop(
+        "template_diff",
+        None
+    )
+
+    template = templates_by_id.get(
+        outing.get(
+            "template_id",
+            ""
+        )
+    )
+
+    if template and isinstance(
+        diff,
+        dict
+    ):
+        outing["items"] = resolve_items(
+            template["items"],
+            diff,
+            outing["items"],
+        )
+
+    else:
+        # 持ち物を丸ごと持っている古いデータ・バックアップ
+        template = template or templates_by_name.get(
+            outing.get(
+                "template_name",
+                ""
+            )
+        )
+
+        outing["template_id"] = (
+            template["id"]
+            if template
+            and link_items(
+                outing["items"],
+                template["items"],
+                ITEM_FIELDS,
+            )
+            else ""
+        )
+
+    if outing["id"] in checks:
+        bits = checks[
+            outing["id"]
+        ]
+
+    elif isinstance(
+        outing.get(
+            "checks"
+        ),
+        int
+    ):
+        bits = outing["checks"]
+
+    else:
+        bits = bits_from_flags(
+            outing["items"]
+        )
+
+    outing["checks"] = bits & full_bits(
+        len(outing["items"])
+    )
+
+    apply_bits(
+        outing["items"],
+        outing["checks"]
+    )
+
+    forgotten_names = set(
+        outing.get(
+            "forgotten_items",
+            []
+        )
+    )
+
+    for item in outing["items"]:
+        item["forgotten"] = (
+            item.get(
+                "name",
+                ""
+            )
+            in forgotten_names
+        )
+
+    update_outing_status(
+        outing
+    )
+
+
+def normalize_data(
+    data,
+    checks=None,
+):
     """古いデータへ不足項目を追加する。"""
 
     if not isinstance(data, dict):
@@ -401,6 +645,11 @@ def normalize_data(data):
             ""
         )
 
+        outing.setdefault(
+            "template_id",
+            ""
+        )
+
         outing.setdefault(
             "memo",
             ""
@@ -434,6 +683,45 @@ def normalize_data(data):
         for item in outing["items"]:
             normalize_item(item)
 
+    templates_by_id = {
+        template["id"]: template
+        for template in data["templates"]
+    }
+
+    templates_by_name = {}
+
+    for template in data["templates"]:
+        templates_by_name.setdefault(
+            template["name"],
+            template
+        )
+
+    for outing in data["outings"]:
+        expand_outing(
+            outing,
+            templates_by_id,
+            templates_by_name,
+            checks or {},
+        )
+
+    data.pop(
+        "forgotten_counts",
+        None
+    )
+
+    if not is_current(
+        data.get(
+            "forget_model"
+        )
+    ):
+        data["forget_model"] = create_model()
+
+        for outing in data["outings"]:
+            update_forget_model(
+                data,
+                outing
+            )
+
     return data
 
 
@@ -465,14 +753,29 @@ def load_data():
         ) as file:
             data = json.load(file)
 
-        data = normalize_data(data)
+        original = json.dumps(
+            data,
+            sort_keys=True
+        )
+
+        data = normalize_data(
+            data,
+            load_checks(
+                CHECKS_FILE
+            )
+        )
 
         if not data["templates"]:
             data["templates"] = (
                 create_default_templates()
             )
 
-        save_data(data)
+        # 補完・移し替えた項目があるときだけ書き戻す（毎回は保存しない）
+        if json.dumps(
+            stored_data(data),
+            sort_keys=True
+        ) != original:
+            save_data(data)
 
         return data
 
@@ -590,17 +893,17 @@ def get_outing_by_id(
     return None
 
 
-def get_item_by_id(
+def get_item_index(
     item_list,
     item_id,
 ):
-    """IDから持ち物を取得する。"""
+    """IDから持ち物の並び順（チェックのビットの位置）を取得する。"""
 
-    for item in item_list:
+    for index, item in enumerate(item_list):
         if item.get(
             "id"
         ) == item_id:
-            return item
+            return index
 
     return None
 
@@ -616,19 +919,10 @@ def preparation_rate(outing):
     if not items:
         return 0
 
-    checked_count = len(
-        [
-            item
-            for item in items
-            if item.get(
-                "checked",
-                False
-            )
-        ]
-    )
-
     return (
-        checked_count
+        checked_count(
+            outing
+        )
         / len(items)
         * 100
     )
@@ -637,18 +931,11 @@ def preparation_rate(outing):
 def checked_count(outing):
     """準備済み数を返す。"""
 
-    return len(
-        [
-            item
-            for item in outing.get(
-                "items",
-                []
-            )
-            if item.get(
-                "checked",
-                False
-            )
-        ]
+    return count_bits(
+        outing.get(
+            "checks",
+            0
+        )
     )
 
 
@@ -716,63 +1003,61 @@ def update_outing_status(
 def copy_template_items(
     template,
 ):
-    """テンプレートから持ち物を複製する。"""
+    """テンプレートの持ち物を使う（保存するときはテンプレートとの差分だけになる）。"""
 
-    copied_items = []
-
-    for item in template.get(
-        "items",
+    return resolve_items(
+        template.get(
+            "items",
+            []
+        ),
+        {},
         []
-    ):
-        copied_items.append(
-            create_item(
-                name=item.get(
-                    "name",
-                    ""
-                ),
-                owner=item.get(
-                    "owner",
-                    "共通"
-                ),
-                group=item.get(
-                    "group",
-                    "必須"
-                ),
-                priority=item.get(
-                    "priority",
-                    "中"
-                ),
-                checked=False,
-                source_template=(
-                    template.get(
-                        "name",
-                        ""
-                    )
-                ),
+    )
+
+
+def update_forget_model(
+    data,
+    outing,
+):
+    """おでかけ1回分を忘れ物の予測へ反映し直す（おでかけ済みでなければ外す）。"""
+
+    if outing.get(
+        "status"
+    ) == "おでかけ済み":
+        apply_trip(
+            data["forget_model"],
+            outing["id"],
+            outing.get(
+                "outing_type",
+                "その他"
+            ),
+            outing.get(
+                "outing_date",
+                ""
+            ),
+            outing.get(
+                "forgotten_items",
+                []
             )
         )
 
-    return copied_items
+    else:
+        remove_trip(
+            data["forget_model"],
+            outing["id"]
+        )
 
 
 def frequent_forgotten_items(
-    outings,
+    data,
 ):
     """忘れ物ランキングを返す。"""
 
-    counter = Counter()
-
-    for outing in outings:
-        for item_name in outing.get(
-            "forgotten_items",
-            []
-        ):
-            if item_name.strip():
-                counter[
-                    item_name.strip()
-                ] += 1
-
-    return counter
+    return Counter(
+        forgotten_counts(
+            data["forget_model"]
+        )
+    )
 
 
 # =========================================================
@@ -901,6 +1186,8 @@ def add_outing(
 
     template_name = ""
 
+    template_id = ""
+
     if values["template_id"]:
         template = get_template_by_id(
             data,
@@ -919,10 +1206,16 @@ def add_outing(
                 )
             )
 
-            forgotten_counter = (
-                frequent_forgotten_items(
-                    data["outings"]
-                )
+            template_id = template["id"]
+
+            # この種類のおでかけで忘れやすい持ち物を、見込みの高い順に足す
+            likely_items = rank_items(
+                data["forget_model"],
+                values["outing_type"],
+                limit=FORGET_SUGGEST_LIMIT,
+                min_likelihood=(
+                    FORGET_SUGGEST_LIKELIHOOD
+                ),
             )
 
             existing_names = {
@@ -933,15 +1226,14 @@ def add_outing(
                 for item in items
             }
 
-            for forgotten_name, count in forgotten_counter.items():
+            for likely_item in likely_items:
                 if (
-                    count > 0
-                    and forgotten_name.lower()
+                    likely_item["name"].lower()
                     not in existing_names
                 ):
                     items.append(
                         create_item(
-                            name=forgotten_name,
+                            name=likely_item["name"],
                             owner="共通",
                             group="必須",
                             priority="高",
@@ -967,10 +1259,12 @@ def add_outing(
         "template_name": (
             template_name
         ),
+        "template_id": template_id,
         "memo": values["memo"],
         "improvement_memo": "",
         "forgotten_items": [],
         "items": items,
+        "checks": 0,
         "created_at": now_text(),
         "updated_at": "",
     }
@@ -1012,6 +1306,11 @@ def update_outing(
         now_text()
     )
 
+    update_forget_model(
+        data,
+        outing
+    )
+
     save_data(data)
 
 
@@ -1021,6 +1320,17 @@ def delete_outing(
 ):
     """おでかけ予定を削除する。"""
 
+    outing = get_outing_by_id(
+        data,
+        outing_id
+    )
+
+    if outing:
+        remove_trip(
+            data["forget_model"],
+            outing_id
+        )
+
     data["outings"] = [
         outing
         for outing in data[
@@ -1085,7 +1395,7 @@ def update_item_check(
     if not outing:
         return
 
-    item = get_item_by_id(
+    index = get_item_index(
         outing.get(
             "items",
             []
@@ -1093,27 +1403,27 @@ def update_item_check(
         item_id,
     )
 
-    if not item:
+    if index is None:
         return
 
-    item["checked"] = bool(
+    outing["checks"] = set_bit(
+        outing.get(
+            "checks",
+            0
+        ),
+        index,
         checked
     )
 
-    item["updated_at"] = (
-        now_text()
+    outing["items"][index]["checked"] = bool(
+        checked
     )
 
-    update_outing_status(
+    save_checks_and_status(
+        data,
         outing
     )
 
-    outing["updated_at"] = (
-        now_text()
-    )
-
-    save_data(data)
-
 
 def delete_outing_item(
     data,
@@ -1130,16 +1440,26 @@ def delete_outing_item(
     if not outing:
         return
 
-    outing["items"] = [
-        item
-        for item in outing.get(
+    index = get_item_index(
+        outing.get(
             "items",
             []
-        )
-        if item.get(
-            "id"
-        ) != item_id
-    ]
+        ),
+        item_id,
+    )
+
+    if index is None:
+        return
+
+    del outing["items"][index]
+
+    outing["checks"] = remove_bit(
+        outing.get(
+            "checks",
+            0
+        ),
+        index
+    )
 
     update_outing_status(
         outing
@@ -1166,24 +1486,43 @@ def reset_outing_checks(
     if not outing:
         return
 
-    for item in outing.get(
-        "items",
-        []
-    ):
-        item["checked"] = False
-        item["updated_at"] = (
-            now_text()
-        )
+    outing["checks"] = 0
 
-    update_outing_status(
+    apply_bits(
+        outing.get(
+            "items",
+            []
+        ),
+        0
+    )
+
+    save_checks_and_status(
+        data,
         outing
     )
 
-    outing["updated_at"] = (
-        now_text()
+
+def save_checks_and_status(
+    data,
+    outing,
+):
+    """チェックの変更を保存する。状態が変わったときだけ本体も書き直す。"""
+
+    previous_status = outing.get(
+        "status"
     )
 
-    save_data(data)
+    update_outing_status(
+        outing
+    )
+
+    if outing.get(
+        "status"
+    ) != previous_status:
+        save_data(data)
+
+    else:
+        save_check_state(data)
 
 
 def complete_outing(
@@ -1208,6 +1547,11 @@ def complete_outing(
         now_text()
     )
 
+    update_forget_model(
+        data,
+        outing
+    )
+
     save_data(data)
 
 
@@ -1233,6 +1577,11 @@ def save_outing_review(
         )
     )
 
+    update_forget_model(
+        data,
+        outing
+    )
+
     outing["improvement_memo"] = (
         improvement_memo
     )
@@ -1430,7 +1779,7 @@ average_preparation_rate = (
 
 forgotten_counter = (
     frequent_forgotten_items(
-        outings
+        data
     )
 )
 
@@ -1906,6 +2255,25 @@ with checklist_tab:
                     "準備完了！気をつけていってらっしゃい！"
                 )
 
+            likely_items = rank_items(
+                data["forget_model"],
+                selected_outing.get(
+                    "outing_type",
+                    "その他"
+                ),
+                limit=5,
+            )
+
+            if likely_items:
+                st.caption(
+                    "⚠️ この種類のおでかけで忘れやすい持ち物："
+                    + "、".join(
+                        f"{likely_item['name']}"
+                        f"（{likely_item['likelihood'] * 100:.0f}%）"
+                        for likely_item in likely_items
+                    )
+                )
+
         with st.form(
             f"add_outing_item_{selected_outing_id}",
             clear_on_submit=True
@@ -2109,6 +2477,7 @@ with checklist_tab:
                                 ),
                                 key=(
                                     f"check_item_"
+                                    f"{selected_outing_id}_"
                                     f"{item_id}"
                                 )
                             )
@@ -2141,6 +2510,7 @@ with checklist_tab:
                                 "削除",
                                 key=(
                                     f"delete_item_"
+                                    f"{selected_outing_id}_"
                                     f"{item_id}"
                                 )
                             ):
@@ -2166,6 +2536,18 @@ with checklist_tab:
                         selected_outing_id
                     )
 
+                    # チェックボックスに残った前の値で付け直さないよう消しておく
+                    for item in selected_outing.get(
+                        "items",
+                        []
+                    ):
+                        st.session_state.pop(
+                            f"check_item_"
+                            f"{selected_outing_id}_"
+                            f"{item.get('id')}",
+                            None
+                        )
+
                     st.rerun()
 
             with action_columns[1]:
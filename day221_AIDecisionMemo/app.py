@@ -1,14 +1,42 @@
 import json
 import os
 import random
+import sys
 import uuid
 from collections import Counter
 from datetime import date, datetime, timedelta
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.decision_matrix import (  # noqa: E402
+    build_matrix,
+    evaluate_matrix,
+    monte_carlo_wins,
+)
+from decision_stats import (  # noqa: E402
+    ACTIVE_STATUSES,
+    average_latency,
+    count_overdue,
+    count_statuses,
+    create_stats,
+    ensure_stats,
+    execution_rate,
+    latency_histogram,
+    next_decision_id,
+    rebuild_stats,
+    refresh_decision_stats,
+    remove_decision_stats,
+)
+
+
 # =========================================================
 # ページ設定
 # =========================================================
@@ -120,6 +148,12 @@ PRIORITY_ICONS = {
     "低": "🔵",
 }
 
+OPTION_CRITERIA = [
+    "総合評価",
+]
+
+MONTE_CARLO_TRIALS = 2000
+
 
 # =========================================================
 # データ管理
@@ -144,6 +178,7 @@ def create_empty_data():
 
     return {
         "decisions": [],
+        "stats": create_stats(),
     }
 
 
@@ -425,6 +460,12 @@ def load_data():
             data = json.load(file)
 
         data = normalize_data(data)
+
+        ensure_stats(
+            data,
+            PRIORITY_ORDER,
+        )
+
         save_data(data)
 
         return data
@@ -587,37 +628,99 @@ def is_overdue(
     )
 
 
+def option_matrix(
+    decision,
+):
+    """選択肢の評価を（選択肢×評価項目）の配列にする。"""
+
+    options = decision.get(
+        "options",
+        [],
+    )
+
+    return build_matrix(
+        [
+            {
+                "scores": {
+                    OPTION_CRITERIA[0]: int(
+                        option.get(
+                            "score",
+                            0,
+                        )
+                    ),
+                },
+            }
+            for option in options
+        ],
+        OPTION_CRITERIA,
+    )
+
+
+def ranked_options(
+    decision,
+):
+    """選択肢を評価の高い順に並べて返す。"""
+
+    options = decision.get(
+        "options",
+        [],
+    )
+
+    if not options:
+        return []
+
+    scores, weights = option_matrix(
+        decision,
+    )
+
+    ranking = evaluate_matrix(
+        scores,
+        weights,
+    )["ranking"]
+
+    return [
+        options[index]
+        for index in ranking
+    ]
+
+
 def option_average_score(
     decision,
 ):
     """選択肢の平均点を返す。"""
 
-    scores = [
-        int(
-            option.get(
-                "score",
-                0,
-            )
-        )
-        for option in decision.get(
-            "options",
-            [],
-        )
-        if int(
-            option.get(
-                "score",
-                0,
-            )
-        )
-        > 0
+    scores, _ = option_matrix(
+        decision,
+    )
+
+    scored = scores[
+        scores > 0
     ]
 
-    if not scores:
+    if not scored.size:
         return 0
 
-    return (
-        sum(scores)
-        / len(scores)
+    return float(
+        scored.mean()
+    )
+
+
+def option_win_rates(
+    decision,
+    score_spread,
+):
+    """評価が±score_spread ぶれたとき、各選択肢が1位になる割合を返す。"""
+
+    scores, weights = option_matrix(
+        decision,
+    )
+
+    return monte_carlo_wins(
+        scores,
+        weights,
+        score_spread=score_spread,
+        trials=MONTE_CARLO_TRIALS,
+        seed=0,
     )
 
 
@@ -645,53 +748,6 @@ def selected_option_name(
     return ""
 
 
-def execution_rate(
-    decisions,
-):
-    """決断済みのうち実行へ移せた割合を返す。"""
-
-    decided = [
-        decision
-        for decision in decisions
-        if decision.get(
-            "status",
-        )
-        in [
-            "決断済み",
-            "実行中",
-            "完了",
-        ]
-    ]
-
-    if not decided:
-        return 0
-
-    executed = [
-        decision
-        for decision in decided
-        if decision.get(
-            "status",
-        )
-        in [
-            "実行中",
-            "完了",
-        ]
-        or int(
-            decision.get(
-                "execution_progress",
-                0,
-            )
-        )
-        > 0
-    ]
-
-    return (
-        len(executed)
-        / len(decided)
-        * 100
-    )
-
-
 def decision_days(
     decision,
 ):
@@ -834,6 +890,12 @@ def add_decision(
         decision,
     )
 
+    refresh_decision_stats(
+        data["stats"],
+        decision,
+        PRIORITY_ORDER,
+    )
+
     save_data(data)
 
 
@@ -883,6 +945,12 @@ def update_decision(
         now_text()
     )
 
+    refresh_decision_stats(
+        data["stats"],
+        decision,
+        PRIORITY_ORDER,
+    )
+
     save_data(data)
 
 
@@ -903,6 +971,11 @@ def delete_decision(
         != decision_id
     ]
 
+    remove_decision_stats(
+        data["stats"],
+        decision_id,
+    )
+
     save_data(data)
 
 
@@ -949,6 +1022,12 @@ def add_option(
         now_text()
     )
 
+    refresh_decision_stats(
+        data["stats"],
+        decision,
+        PRIORITY_ORDER,
+    )
+
     save_data(data)
 
 
@@ -1116,65 +1195,41 @@ st.markdown(
 # ダッシュボード
 # =========================================================
 
+stats = data["stats"]
+
 total_count = len(
     decisions,
 )
 
-considering_count = len(
-    [
-        decision
-        for decision in decisions
-        if decision.get(
-            "status",
-        )
-        in [
-            "検討前",
-            "検討中",
-        ]
-    ]
+considering_count = count_statuses(
+    stats,
+    ACTIVE_STATUSES,
 )
 
-decided_count = len(
+decided_count = count_statuses(
+    stats,
     [
-        decision
-        for decision in decisions
-        if decision.get(
-            "status",
-        )
-        == "決断済み"
-    ]
+        "決断済み",
+    ],
 )
 
-executing_count = len(
+executing_count = count_statuses(
+    stats,
     [
-        decision
-        for decision in decisions
-        if decision.get(
-            "status",
-        )
-        == "実行中"
-    ]
+        "実行中",
+    ],
 )
 
-completed_count = len(
+completed_count = count_statuses(
+    stats,
     [
-        decision
-        for decision in decisions
-        if decision.get(
-            "status",
-        )
-        == "完了"
-    ]
+        "完了",
+    ],
 )
 
-overdue_count = len(
-    [
-        decision
-        for decision in decisions
-        if is_overdue(
-            decision,
-        )
-    ]
+overdue_count = count_overdue(
+    stats,
+    date.today(),
 )
 
 current_month = (
@@ -1183,22 +1238,16 @@ current_month = (
     )
 )
 
-monthly_decision_count = len(
-    [
-        decision
-        for decision in decisions
-        if decision.get(
-            "decided_date",
-            "",
-        ).startswith(
-            current_month,
-        )
-    ]
+monthly_decision_count = (
+    stats["decided_months"].get(
+        current_month,
+        0,
+    )
 )
 
 execution_percentage = (
     execution_rate(
-        decisions,
+        stats,
     )
 )
 
@@ -1251,45 +1300,16 @@ metric_row2[3].metric(
 # 次に決めること
 # =========================================================
 
-active_decisions = [
-    decision
-    for decision in decisions
-    if decision.get(
-        "status",
-    )
-    in [
-        "検討前",
-        "検討中",
-    ]
-]
+next_decision = get_decision_by_id(
+    data,
+    next_decision_id(
+        stats,
+    ),
+)
 
-if active_decisions:
+if next_decision:
     st.divider()
 
-    active_decisions.sort(
-        key=lambda decision: (
-            PRIORITY_ORDER.get(
-                decision.get(
-                    "priority",
-                    "中",
-                ),
-                99,
-            ),
-            deadline_days(
-                decision,
-            )
-            if deadline_days(
-                decision,
-            )
-            is not None
-            else 999999,
-        )
-    )
-
-    next_decision = (
-        active_decisions[0]
-    )
-
     st.subheader(
         "🎯 次に決めること"
     )
@@ -1886,18 +1906,8 @@ with options_tab:
 
         st.divider()
 
-        options = sorted(
-            selected_decision.get(
-                "options",
-                [],
-            ),
-            key=lambda option: int(
-                option.get(
-                    "score",
-                    0,
-                )
-            ),
-            reverse=True,
+        options = ranked_options(
+            selected_decision,
         )
 
         if not options:
@@ -1913,6 +1923,62 @@ with options_tab:
                 f"**{option_average_score(selected_decision):.1f}/5**"
             )
 
+            if len(options) >= 2:
+                with st.expander(
+                    "🎲 評価のぶれに強い選択肢",
+                    expanded=False,
+                ):
+                    score_spread = st.slider(
+                        "評価のぶれ（±点）",
+                        min_value=0.0,
+                        max_value=2.0,
+                        value=1.0,
+                        step=0.5,
+                        key=(
+                            f"score_spread_"
+                            f"{decision_id}"
+                        ),
+                    )
+
+                    win_rates = option_win_rates(
+                        selected_decision,
+                        score_spread,
+                    )
+
+                    win_df = pd.DataFrame(
+                        {
+                            "選択肢": [
+                                option.get(
+                                    "name",
+                                    "",
+                                )
+                                for option in selected_decision.get(
+                                    "options",
+                                    [],
+                                )
+                            ],
+                            "1位になる割合": (
+                                win_rates
+                                * 100
+                            ).round(1),
+                        }
+                    ).sort_values(
+                        "1位になる割合",
+                        ascending=False,
+                    )
+
+                    st.bar_chart(
+                        win_df.set_index(
+                            "選択肢"
+                        )
+                    )
+
+                    st.caption(
+                        f"今の評価が迷っている分だけぶれると考えて"
+                        f"{MONTE_CARLO_TRIALS:,}回試したとき、"
+                        "それぞれが1位になった割合（%）です。"
+                    )
+
             for option in options:
                 option_id = option[
                     "id"
@@ -3602,7 +3668,22 @@ with analysis_tab:
         else:
             st.metric(
                 "平均決断日数",
-                f"{decided_days_df['決断日数'].mean():.1f}日",
+                f"{average_latency(stats):.1f}日",
+            )
+
+            st.bar_chart(
+                pd.DataFrame(
+                    latency_histogram(
+                        stats,
+                    ),
+                    columns=[
+                        "決断までの日数",
+                        "件数",
+                    ],
+                ).set_index(
+                    "決断までの日数"
+                ),
+                horizontal=True,
             )
 
             st.dataframe(
@@ -3805,6 +3886,15 @@ with data_tab:
                     )
                 )
 
+                imported_data["stats"] = (
+                    rebuild_stats(
+                        imported_data[
+                            "decisions"
+                        ],
+                        PRIORITY_ORDER,
+                    )
+                )
+
                 st.warning(
                     "復元すると現在のデータが上書きされます。"
                 )
@@ -0,0 +1,493 @@
+"""決断データの集計を、変更があった決断の分だけ更新する処理。
+
+data["stats"] に状態別の件数・月別の決断数・決断までの日数の分布・
+期限順の待ち行列を保存しておき、決断を追加・更新・削除したときは
+その1件の寄与だけを差し引きする。ダッシュボードは全件を走査せずに
+この集計を読むだけで表示できる。
+"""
+
+import bisect
+from datetime import datetime
+
+
+ACTIVE_STATUSES = [
+    "検討前",
+    "検討中",
+]
+
+DECIDED_STATUSES = [
+    "決断済み",
+    "実行中",
+    "完了",
+]
+
+EXECUTED_STATUSES = [
+    "実行中",
+    "完了",
+]
+
+# 決断までの日数の区切り（下限日数, 表示名）
+LATENCY_BUCKETS = [
+    (0, "当日"),
+    (1, "1〜2日"),
+    (3, "3〜6日"),
+    (7, "1〜2週間"),
+    (14, "2週間〜1か月"),
+    (30, "1〜2か月"),
+    (60, "2か月以上"),
+]
+
+NO_DEADLINE = "9999-12-31"
+NO_PRIORITY = 99
+
+
+def parse_date(date_text):
+    """日付文字列をdate型へ変換する。"""
+
+    if not date_text:
+        return None
+
+    try:
+        return datetime.strptime(
+            date_text,
+            "%Y-%m-%d",
+        ).date()
+
+    except (
+        TypeError,
+        ValueError,
+    ):
+        return None
+
+
+def latency_label(days):
+    """決断までの日数が入る区切りの表示名を返す。"""
+
+    lower_bounds = [
+        lower
+        for lower, _ in LATENCY_BUCKETS
+    ]
+
+    index = bisect.bisect_right(
+        lower_bounds,
+        max(days, 0),
+    ) - 1
+
+    return LATENCY_BUCKETS[index][1]
+
+
+def create_stats():
+    """空の集計を作る。"""
+
+    return {
+        "status_counts": {},
+        "decided_months": {},
+        "latency_counts": {},
+        "latency_total": 0,
+        "decided_total": 0,
+        "executed_total": 0,
+        "active_queue": [],
+        "deadline_queue": [],
+        "entries": {},
+    }
+
+
+def decision_entry(
+    decision,
+    priority_order,
+):
+    """1件の決断が集計へ与える寄与を返す。"""
+
+    status = decision.get(
+        "status",
+        "",
+    )
+
+    deadline = parse_date(
+        decision.get(
+            "deadline",
+            "",
+        )
+    )
+
+    registered = parse_date(
+        decision.get(
+            "registered_date",
+            "",
+        )
+    )
+
+    decided = parse_date(
+        decision.get(
+            "decided_date",
+            "",
+        )
+    )
+
+    decided_flag = status in DECIDED_STATUSES
+
+    return {
+        "status": status,
+        "priority": priority_order.get(
+            decision.get(
+                "priority",
+                "中",
+            ),
+            NO_PRIORITY,
+        ),
+        "deadline": (
+            str(deadline)
+            if deadline
+            else ""
+        ),
+        "decided_month": (
+            decided.strftime(
+                "%Y-%m",
+            )
+            if decided
+            else ""
+        ),
+        "latency": (
+            (decided - registered).days
+            if decided and registered
+            else None
+        ),
+        "decided": decided_flag,
+        "executed": bool(
+            decided_flag
+            and (
+                status in EXECUTED_STATUSES
+                or int(
+                    decision.get(
+                        "execution_progress",
+                        0,
+                    )
+                )
+                > 0
+            )
+        ),
+    }
+
+
+def add_count(
+    counts,
+    key,
+    amount,
+):
+    """件数の辞書を増減し、0になった項目は消す。"""
+
+    counts[key] = counts.get(
+        key,
+        0,
+    ) + amount
+
+    if counts[key] <= 0:
+        del counts[key]
+
+
+def update_queue(
+    queue,
+    item,
+    amount,
+):
+    """並び順を保った待ち行列へ追加・削除する。"""
+
+    if amount > 0:
+        bisect.insort(
+            queue,
+            item,
+        )
+        return
+
+    index = bisect.bisect_left(
+        queue,
+        item,
+    )
+
+    if (
+        index < len(queue)
+        and queue[index] == item
+    ):
+        del queue[index]
+
+
+def apply_entry(
+    stats,
+    decision_id,
+    entry,
+    amount,
+):
+    """1件分の寄与を集計へ足す（amount=-1 で差し引く）。"""
+
+    add_count(
+        stats["status_counts"],
+        entry["status"],
+        amount,
+    )
+
+    if entry["decided_month"]:
+        add_count(
+            stats["decided_months"],
+            entry["decided_month"],
+            amount,
+        )
+
+    if entry["latency"] is not None:
+        add_count(
+            stats["latency_counts"],
+            latency_label(
+                entry["latency"],
+            ),
+            amount,
+        )
+
+        stats["latency_total"] += (
+            entry["latency"]
+            * amount
+        )
+
+    if entry["decided"]:
+        stats["decided_total"] += amount
+
+    if entry["executed"]:
+        stats["executed_total"] += amount
+
+    if entry["status"] in ACTIVE_STATUSES:
+        update_queue(
+            stats["active_queue"],
+            [
+                entry["priority"],
+                entry["deadline"]
+                or NO_DEADLINE,
+                decision_id,
+            ],
+            amount,
+        )
+
+        if entry["deadline"]:
+            update_queue(
+                stats["deadline_queue"],
+                [
+                    entry["deadline"],
+                    decision_id,
+                ],
+                amount,
+            )
+
+
+def refresh_decision_stats(
+    stats,
+    decision,
+    priority_order,
+):
+    """決断1件の変更を集計へ反映する。"""
+
+    decision_id = decision.get(
+        "id",
+        "",
+    )
+
+    entry = decision_entry(
+        decision,
+        priority_order,
+    )
+
+    old_entry = stats["entries"].get(
+        decision_id,
+    )
+
+    if old_entry == entry:
+        return
+
+    if old_entry:
+        apply_entry(
+            stats,
+            decision_id,
+            old_entry,
+            -1,
+        )
+
+    apply_entry(
+        stats,
+        decision_id,
+        entry,
+        1,
+    )
+
+    stats["entries"][decision_id] = entry
+
+
+def remove_decision_stats(
+    stats,
+    decision_id,
+):
+    """削除した決断の寄与を集計から差し引く。"""
+
+    old_entry = stats["entries"].pop(
+        decision_id,
+        None,
+    )
+
+    if old_entry:
+        apply_entry(
+            stats,
+            decision_id,
+            old_entry,
+            -1,
+        )
+
+
+def rebuild_stats(
+    decisions,
+    priority_order,
+):
+    """全件から集計を作り直す。"""
+
+    stats = create_stats()
+
+    for decision in decisions:
+        refresh_decision_stats(
+            stats,
+            decision,
+            priority_order,
+        )
+
+    return stats
+
+
+def ensure_stats(
+    data,
+    priority_order,
+):
+    """保存された集計が決断データと対応していなければ作り直す。"""
+
+    stats = data.get(
+        "stats",
+    )
+
+    if (
+        not isinstance(
+            stats,
+            dict,
+        )
+        or set(
+            stats.get(
+                "entries",
+                {},
+            )
+        )
+        != {
+            decision.get(
+                "id",
+                "",
+            )
+            for decision in data[
+                "decisions"
+            ]
+        }
+    ):
+        data["stats"] = rebuild_stats(
+            data["decisions"],
+            priority_order,
+        )
+
+    return data["stats"]
+
+
+def count_statuses(
+    stats,
+    statuses,
+):
+    """指定した状態の件数を返す。"""
+
+    return sum(
+        stats["status_counts"].get(
+            status,
+            0,
+        )
+        for status in statuses
+    )
+
+
+def overdue_ids(
+    stats,
+    today,
+):
+    """期限を過ぎた検討中の決断IDを期限の古い順に返す。"""
+
+    queue = stats["deadline_queue"]
+
+    end = bisect.bisect_left(
+        queue,
+        [str(today)],
+    )
+
+    return [
+        decision_id
+        for _, decision_id in queue[:end]
+    ]
+
+
+def count_overdue(
+    stats,
+    today,
+):
+    """期限を過ぎた検討中の決断の件数を返す。"""
+
+    return bisect.bisect_left(
+        stats["deadline_queue"],
+        [str(today)],
+    )
+
+
+def next_decision_id(stats):
+    """重要度が高く期限が近い、次に決めるべき決断IDを返す。"""
+
+    if not stats["active_queue"]:
+        return ""
+
+    return stats["active_queue"][0][2]
+
+
+def execution_rate(stats):
+    """決断済みのうち実行へ移せた割合を返す。"""
+
+    if not stats["decided_total"]:
+        return 0
+
+    return (
+        stats["executed_total"]
+        / stats["decided_total"]
+        * 100
+    )
+
+
+def latency_histogram(stats):
+    """決断までの日数の分布を区切り順に返す。"""
+
+    return [
+        (
+            label,
+            stats["latency_counts"].get(
+                label,
+                0,
+            ),
+        )
+        for _, label in LATENCY_BUCKETS
+    ]
+
+
+def average_latency(stats):
+    """決断までの平均日数を返す。記録がなければ None。"""
+
+    count = sum(
+        stats["latency_counts"].values()
+    )
+
+    if not count:
+        return None
+
+    return (
+        stats["latency_total"]
+        / count
+    )
@@ -1,13 +1,28 @@
 import json
 import os
+import sys
 import uuid
 from collections import Counter
 from datetime import date, datetime, timedelta
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.savings_projection import (  # noqa: E402
+    completion_dates,
+    reach_probability,
+    simulate_savings,
+    weekly_deposit_stats,
+)
+
+
 # =========================================================
 # ページ設定
 # =========================================================
@@ -571,6 +586,49 @@ def purchased_later_rate(
     )
 
 
+def weekly_saving_pace(
+    records,
+):
+    """直近12週の記録から、1週間あたりの節約額の平均と標準偏差を返す。"""
+
+    return weekly_deposit_stats(
+        [
+            (
+                parse_date(
+                    record.get(
+                        "record_date",
+                        "",
+                    )
+                ),
+                effective_saving_amount(
+                    record,
+                ),
+            )
+            for record in records
+        ],
+    )
+
+
+@st.cache_data(
+    show_spinner=False,
+    max_entries=64,
+)
+def project_goal(
+    savings_amount,
+    target_amount,
+    weekly_mean,
+    weekly_std,
+):
+    """今のペースが続いた場合の達成見込みをまとめて試算する。"""
+
+    return simulate_savings(
+        current_amount=savings_amount,
+        target_amount=target_amount,
+        weekly_mean=weekly_mean,
+        weekly_std=weekly_std,
+    )
+
+
 # =========================================================
 # データ操作
 # =========================================================
@@ -2132,6 +2190,12 @@ with goal_tab:
             "貯金目標はまだありません。"
         )
 
+    weekly_mean, weekly_std = (
+        weekly_saving_pace(
+            records,
+        )
+    )
+
     for goal in goals:
         goal_id = goal["id"]
 
@@ -2194,6 +2258,84 @@ with goal_tab:
                     )
                 )
 
+            if progress < 100:
+                with st.expander(
+                    "📈 今のペースでの達成見込み"
+                ):
+                    if weekly_mean <= 0:
+                        st.info(
+                            "直近12週に買わなかった記録がないため、"
+                            "見込みを計算できません。"
+                        )
+
+                    else:
+                        projection = project_goal(
+                            all_savings,
+                            int(
+                                goal.get(
+                                    "target_amount",
+                                    0,
+                                )
+                            ),
+                            weekly_mean,
+                            weekly_std,
+                        )
+
+                        projection_labels = [
+                            (
+                                format_date(
+                                    str(
+                                        projected_date
+                                    )
+                                )
+                                if projected_date
+                                else "10年以上先"
+                            )
+                            for projected_date in completion_dates(
+                                projection,
+                            )
+                        ]
+
+                        projection_columns = (
+                            st.columns(3)
+                        )
+
+                        projection_columns[0].metric(
+                            "早ければ",
+                            projection_labels[0],
+                        )
+
+                        projection_columns[1].metric(
+                            "標準",
+                            projection_labels[1],
+                        )
+
+                        projection_columns[2].metric(
+                            "遅ければ",
+                            projection_labels[2],
+                        )
+
+                        goal_deadline = parse_date(
+                            goal.get(
+                                "deadline",
+                                "",
+                            )
+                        )
+
+                        if goal_deadline:
+                            st.write(
+                                f"期限までに届く見込み："
+                                f"**{reach_probability(projection, goal_deadline) * 100:.0f}%**"
+                            )
+
+                        st.caption(
+                            f"直近12週の平均 "
+                            f"{weekly_mean:,.0f}円／週"
+                            f"（ばらつき ±{weekly_std:,.0f}円）"
+                            "で節約が続いた場合を、"
+                            "たくさんのパターンで試算しています。"
+                        )
+
             with st.expander(
                 "✏️ 目標を編集"
             ):
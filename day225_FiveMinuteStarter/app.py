@@ -1,12 +1,25 @@
 import json
 import os
-import time
 import uuid
-from collections import Counter
 from datetime import date, datetime, timedelta
 
 import pandas as pd
 import streamlit as st
+import streamlit.components.v1 as components
+
+from session_store import (
+    average_minutes,
+    calculate_streak,
+    continuation_rate,
+    mood_changes,
+    most_common_category,
+    most_common_hour,
+    session_frame,
+    sessions_between,
+    sync_store,
+    task_hour_heatmap,
+    weekday_hour_heatmap,
+)
 
 
 # =========================================================
@@ -64,6 +77,11 @@ RESULT_ICONS = {
     "そのまま続けた": "🔥",
 }
 
+TIMER_MINUTES = 5
+
+# 終了時刻を過ぎてから終了を検知するまでの余裕（秒）
+TIMER_GRACE_SECONDS = 1
+
 
 # =========================================================
 # データ管理
@@ -249,8 +267,19 @@ def load_data():
         ) as file:
             data = json.load(file)
 
+        original = json.dumps(
+            data,
+            sort_keys=True,
+        )
+
         data = normalize_data(data)
-        save_data(data)
+
+        # 補完した項目があるときだけ書き戻す（毎回は保存しない）
+        if json.dumps(
+            data,
+            sort_keys=True,
+        ) != original:
+            save_data(data)
 
         return data
 
@@ -286,19 +315,6 @@ def load_data():
 # 補助関数
 # =========================================================
 
-def parse_datetime(text):
-    if not text:
-        return None
-
-    try:
-        return datetime.fromisoformat(
-            text
-        )
-
-    except ValueError:
-        return None
-
-
 def get_task_by_id(
     data,
     task_id,
@@ -312,111 +328,25 @@ def get_task_by_id(
     return None
 
 
-def calculate_streak(
-    sessions,
-):
-    recorded_dates = {
-        session.get(
-            "session_date"
-        )
-        for session in sessions
-        if session.get(
-            "session_date"
-        )
-    }
-
-    if not recorded_dates:
-        return 0
-
-    current = date.today()
-
-    if str(current) not in recorded_dates:
-        current -= timedelta(
-            days=1
-        )
-
-        if str(current) not in recorded_dates:
-            return 0
-
-    streak = 0
-
-    while str(current) in recorded_dates:
-        streak += 1
-
-        current -= timedelta(
-            days=1
-        )
-
-    return streak
-
-
-def continuation_rate(
-    sessions,
-):
-    if not sessions:
-        return 0
-
-    continued = len(
-        [
-            session
-            for session in sessions
-            if session.get(
-                "result"
-            )
-            in [
-                "もう5分続けた",
-                "そのまま続けた",
-            ]
-        ]
-    )
-
-    return (
-        continued
-        / len(sessions)
-        * 100
-    )
-
-
-def average_minutes(
-    sessions,
+def style_heatmap(
+    rate_df,
 ):
-    if not sessions:
-        return 0
-
-    values = [
-        int(
-            session.get(
-                "total_minutes",
-                0,
+    # 続けた率が高いマスほど濃い色にする（記録のないマスは空欄のまま）
+    return rate_df.style.map(
+        lambda rate: (
+            ""
+            if pd.isna(rate)
+            else (
+                "background-color: "
+                f"rgba(90, 150, 255, {0.1 + rate / 100 * 0.8:.2f})"
             )
         )
-        for session in sessions
-    ]
-
-    if not values:
-        return 0
-
-    return (
-        sum(values)
-        / len(values)
+    ).format(
+        "{:.0f}",
+        na_rep="",
     )
 
 
-def mood_value(
-    mood,
-):
-    try:
-        return (
-            MOODS.index(
-                mood
-            )
-            + 1
-        )
-
-    except ValueError:
-        return 3
-
-
 # =========================================================
 # データ操作
 # =========================================================
@@ -548,6 +478,81 @@ def delete_session(
     save_data(data)
 
 
+# =========================================================
+# タイマー表示
+# =========================================================
+
+def render_countdown(
+    end_time,
+):
+    # 残り時間の表示はブラウザ側で1秒ごとに更新する。
+    # サーバー側のスクリプトは毎秒は動かない
+    end_ms = int(
+        end_time.timestamp()
+        * 1000
+    )
+
+    components.html(
+        f"""
+        <div id="clock" style="
+            font-family: sans-serif;
+            font-size: 4rem;
+            font-weight: 700;
+            text-align: center;
+            padding: 12px;
+            color: #3c6fd8;
+        ">--:--</div>
+        <script>
+        const end = {end_ms};
+        const clock = document.getElementById("clock");
+
+        function tick() {{
+            const left = Math.max(
+                0,
+                Math.ceil((end - Date.now()) / 1000)
+            );
+            const minutes = String(Math.floor(left / 60)).padStart(2, "0");
+            const seconds = String(left % 60).padStart(2, "0");
+            clock.textContent = minutes + ":" + seconds;
+        }}
+
+        tick();
+        setInterval(tick, 250);
+        </script>
+        """,
+        height=120,
+    )
+
+
+def finish_timer():
+    st.session_state[
+        "timer_running"
+    ] = False
+
+    st.session_state[
+        "timer_finished"
+    ] = True
+
+
+def watch_timer_end():
+    # 終了時刻に一度だけ起きて、アプリ全体を描き直して記録フォームを出す
+    if not st.session_state[
+        "timer_running"
+    ]:
+        return
+
+    remaining = (
+        st.session_state[
+            "timer_end_time"
+        ]
+        - datetime.now()
+    ).total_seconds()
+
+    if remaining <= TIMER_GRACE_SECONDS:
+        finish_timer()
+        st.rerun()
+
+
 # =========================================================
 # デザイン
 # =========================================================
@@ -588,13 +593,6 @@ st.markdown(
         margin: 0;
         opacity: 0.78;
     }
-
-    .timer {
-        font-size: 4rem;
-        font-weight: 700;
-        text-align: center;
-        padding: 25px;
-    }
     </style>
     """,
     unsafe_allow_html=True,
@@ -615,6 +613,13 @@ sessions = data[
     "sessions"
 ]
 
+# 記録を列ごとの配列にまとめた集計（1件増えたときは足した分だけ更新する）
+store = sync_store(
+    DATA_FILE,
+    sessions,
+    MOODS,
+)
+
 if (
     "timer_running"
     not in st.session_state
@@ -686,78 +691,30 @@ st.markdown(
 # ダッシュボード
 # =========================================================
 
-today_sessions = [
-    session
-    for session in sessions
-    if session.get(
-        "session_date"
-    )
-    == str(
-        date.today()
-    )
-]
+today_count = sessions_between(
+    store,
+    date.today(),
+    date.today(),
+)
 
-week_start = (
+weekly_count = sessions_between(
+    store,
     date.today()
     - timedelta(
         days=6
-    )
-)
-
-weekly_sessions = [
-    session
-    for session in sessions
-    if (
-        session.get(
-            "session_date"
-        )
-        and week_start
-        <= datetime.strptime(
-            session.get(
-                "session_date"
-            ),
-            "%Y-%m-%d"
-        ).date()
-        <= date.today()
-    )
-]
-
-category_counter = Counter(
-    session.get(
-        "category",
-        "その他"
-    )
-    for session in sessions
+    ),
+    date.today(),
 )
 
 top_category = (
-    category_counter.most_common(
-        1
-    )[0][0]
-    if category_counter
-    else "なし"
-)
-
-hour_counter = Counter()
-
-for session in sessions:
-    started_at = parse_datetime(
-        session.get(
-            "started_at"
-        )
+    most_common_category(
+        store
     )
+    or "なし"
+)
 
-    if started_at:
-        hour_counter[
-            started_at.hour
-        ] += 1
-
-top_hour = (
-    hour_counter.most_common(
-        1
-    )[0][0]
-    if hour_counter
-    else None
+top_hour = most_common_hour(
+    store
 )
 
 
@@ -767,12 +724,12 @@ metric_row1 = st.columns(
 
 metric_row1[0].metric(
     "今日のチャレンジ",
-    f"{len(today_sessions)}回"
+    f"{today_count}回"
 )
 
 metric_row1[1].metric(
     "今週の実行",
-    f"{len(weekly_sessions)}回"
+    f"{weekly_count}回"
 )
 
 metric_row1[2].metric(
@@ -782,7 +739,7 @@ metric_row1[2].metric(
 
 metric_row1[3].metric(
     "連続実行",
-    f"{calculate_streak(sessions)}日"
+    f"{calculate_streak(store)}日"
 )
 
 
@@ -792,12 +749,12 @@ metric_row2 = st.columns(
 
 metric_row2[0].metric(
     "5分後も続けた率",
-    f"{continuation_rate(sessions):.1f}%"
+    f"{continuation_rate(store):.1f}%"
 )
 
 metric_row2[1].metric(
     "平均継続時間",
-    f"{average_minutes(sessions):.1f}分"
+    f"{average_minutes(store):.1f}分"
 )
 
 metric_row2[2].metric(
@@ -954,7 +911,7 @@ else:
             ] = (
                 datetime.now()
                 + timedelta(
-                    minutes=5
+                    minutes=TIMER_MINUTES
                 )
             )
 
@@ -973,38 +930,22 @@ else:
         ).total_seconds()
 
         if remaining <= 0:
-            st.session_state[
-                "timer_running"
-            ] = False
-
-            st.session_state[
-                "timer_finished"
-            ] = True
-
+            finish_timer()
             st.rerun()
 
-        remaining = int(
-            remaining
-        )
-
-        minutes = (
-            remaining
-            // 60
-        )
-
-        seconds = (
-            remaining
-            % 60
+        render_countdown(
+            end_time
         )
 
-        st.markdown(
-            f"""
-            <div class="timer">
-                {minutes:02d}:{seconds:02d}
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        # 終了時刻を見張る部分だけを fragment にして、終了時刻に一度だけ動かす
+        st.fragment(
+            run_every=(
+                remaining
+                + TIMER_GRACE_SECONDS
+            )
+        )(
+            watch_timer_end
+        )()
 
         current_task = (
             get_task_by_id(
@@ -1031,22 +972,9 @@ else:
             "⏹️ 途中で終了",
             use_container_width=True
         ):
-            st.session_state[
-                "timer_running"
-            ] = False
-
-            st.session_state[
-                "timer_finished"
-            ] = True
-
+            finish_timer()
             st.rerun()
 
-        time.sleep(
-            1
-        )
-
-        st.rerun()
-
     if st.session_state[
         "timer_finished"
     ]:
@@ -1650,60 +1578,13 @@ with mood_tab:
         )
 
     else:
-        improved = 0
-        same = 0
-        declined = 0
-
-        mood_rows = []
-
-        for session in sessions:
-            before = mood_value(
-                session.get(
-                    "before_mood",
-                    "😐 普通"
-                )
-            )
-
-            after = mood_value(
-                session.get(
-                    "after_mood",
-                    "😐 普通"
-                )
-            )
-
-            difference = (
-                after
-                - before
-            )
-
-            if difference > 0:
-                improved += 1
-
-            elif difference == 0:
-                same += 1
-
-            else:
-                declined += 1
+        improved, same, declined = mood_changes(
+            store
+        )
 
-            mood_rows.append(
-                {
-                    "日付": (
-                        session.get(
-                            "session_date",
-                            ""
-                        )
-                    ),
-                    "タスク": (
-                        session.get(
-                            "task_name",
-                            ""
-                        )
-                    ),
-                    "開始前": before,
-                    "終了後": after,
-                    "変化": difference,
-                }
-            )
+        mood_df = session_frame(
+            store
+        )
 
         mood_columns = (
             st.columns(3)
@@ -1724,10 +1605,6 @@ with mood_tab:
             f"{declined}回"
         )
 
-        mood_df = pd.DataFrame(
-            mood_rows
-        )
-
         st.line_chart(
             mood_df.set_index(
                 "日付"
@@ -1767,60 +1644,8 @@ with analysis_tab:
         )
 
     else:
-        analysis_rows = []
-
-        for session in sessions:
-            started_at = (
-                parse_datetime(
-                    session.get(
-                        "started_at",
-                        ""
-                    )
-                )
-            )
-
-            analysis_rows.append(
-                {
-                    "日付": (
-                        session.get(
-                            "session_date",
-                            ""
-                        )
-                    ),
-                    "カテゴリー": (
-                        session.get(
-                            "category",
-                            ""
-                        )
-                    ),
-                    "タスク": (
-                        session.get(
-                            "task_name",
-                            ""
-                        )
-                    ),
-                    "結果": (
-                        session.get(
-                            "result",
-                            ""
-                        )
-                    ),
-                    "時間": int(
-                        session.get(
-                            "total_minutes",
-                            0
-                        )
-                    ),
-                    "開始時刻": (
-                        started_at.hour
-                        if started_at
-                        else None
-                    ),
-                }
-            )
-
-        analysis_df = pd.DataFrame(
-            analysis_rows
+        analysis_df = session_frame(
+            store
         )
 
         st.subheader(
@@ -2033,6 +1858,55 @@ with analysis_tab:
             hide_index=True
         )
 
+        st.divider()
+
+        st.subheader(
+            "続けやすいタスク × 時間帯"
+        )
+
+        st.caption(
+            "5分後も続けた率（%）です。"
+            "記録のない組み合わせは空欄になります。"
+        )
+
+        task_heatmap = task_hour_heatmap(
+            store
+        )
+
+        if task_heatmap.empty:
+            st.info(
+                "開始時刻を分析できません。"
+            )
+
+        else:
+            st.dataframe(
+                style_heatmap(
+                    task_heatmap
+                ),
+                use_container_width=True
+            )
+
+        st.subheader(
+            "続けやすい曜日 × 時間帯"
+        )
+
+        weekday_heatmap = weekday_hour_heatmap(
+            store
+        )
+
+        if weekday_heatmap.empty:
+            st.info(
+                "開始時刻を分析できません。"
+            )
+
+        else:
+            st.dataframe(
+                style_heatmap(
+                    weekday_heatmap
+                ),
+                use_container_width=True
+            )
+
 
 # =========================================================
 # データ管理
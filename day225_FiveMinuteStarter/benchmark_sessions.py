@@ -0,0 +1,132 @@
+import random
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from session_store import (
+    build_store,
+    calculate_streak,
+    continuation_rate,
+    mood_changes,
+    sync_store,
+    task_hour_heatmap,
+    weekday_hour_heatmap,
+)
+
+# ダッシュボードの集計にかかる時間を比べる。
+# 以前：再実行のたびに全記録を読み、開始時刻を fromisoformat、気分を
+#       MOODS.index で1件ずつ変換していた。
+# 今：列ごとの配列と集計を持ち、1件増えたときは足した分だけ更新する。
+# 使い方：python benchmark_sessions.py [記録の件数]
+
+MOODS = [
+    "😩 やる気なし",
+    "😕 少し重い",
+    "😐 普通",
+    "🙂 少しやる気あり",
+    "🔥 やる気あり",
+]
+
+RESULTS = [
+    "5分で終了",
+    "もう5分続けた",
+    "そのまま続けた",
+]
+
+RUNS = 20
+
+
+def make_sessions(count, seed=0):
+    rng = random.Random(seed)
+    sessions = []
+
+    for i in range(count):
+        day = date.today() - timedelta(days=rng.randint(0, 730))
+        started = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randint(0, 1439))
+        sessions.append({
+            "id": f"session{i}",
+            "task_name": f"タスク{rng.randint(0, 49)}",
+            "category": rng.choice(["勉強", "運動", "家事", "読書"]),
+            "session_date": str(day),
+            "started_at": started.isoformat(timespec="seconds"),
+            "before_mood": rng.choice(MOODS),
+            "after_mood": rng.choice(MOODS),
+            "result": rng.choice(RESULTS),
+            "total_minutes": rng.choice([5, 10, 20]),
+        })
+
+    sessions.sort(key=lambda session: session["started_at"])
+    return sessions
+
+
+def old_dashboard(sessions):
+    # 以前のダッシュボードと気分タブの集計（毎回全件を読む）
+    today = date.today()
+    week_start = today - timedelta(days=6)
+    recorded = {session["session_date"] for session in sessions}
+
+    today_count = len([s for s in sessions if s["session_date"] == str(today)])
+    weekly_count = len([
+        s for s in sessions
+        if week_start <= datetime.strptime(s["session_date"], "%Y-%m-%d").date() <= today
+    ])
+
+    current = today if str(today) in recorded else today - timedelta(days=1)
+    streak = 0
+    while str(current) in recorded:
+        streak += 1
+        current -= timedelta(days=1)
+
+    continued = len([s for s in sessions if s["result"] in RESULTS[1:]])
+    minutes = sum(int(s["total_minutes"]) for s in sessions)
+    categories = Counter(s["category"] for s in sessions)
+    hours = Counter(datetime.fromisoformat(s["started_at"]).hour for s in sessions)
+    improved = sum(MOODS.index(s["after_mood"]) > MOODS.index(s["before_mood"]) for s in sessions)
+
+    return today_count, weekly_count, streak, continued, minutes, categories, hours, improved
+
+
+def new_dashboard(store):
+    return (
+        calculate_streak(store),
+        continuation_rate(store),
+        mood_changes(store),
+        task_hour_heatmap(store),
+        weekday_hour_heatmap(store),
+    )
+
+
+def average_ms(function, *args):
+    started = time.perf_counter()
+
+    for _ in range(RUNS):
+        function(*args)
+
+    return (time.perf_counter() - started) / RUNS * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    sessions = make_sessions(count + 1)
+    existing = sessions[:count]
+
+    print(f"記録 {count} 件")
+    print(f"以前の集計（毎回）        : {average_ms(old_dashboard, existing):8.2f} ms")
+
+    started = time.perf_counter()
+    build_store(existing, MOODS)
+    print(f"列ストアを作る（起動時1回）: {(time.perf_counter() - started) * 1000:8.2f} ms")
+
+    sync_store("benchmark", existing, MOODS)
+    print(f"再実行（変化なし）        : {average_ms(sync_store, 'benchmark', existing, MOODS):8.3f} ms")
+
+    started = time.perf_counter()
+    store = sync_store("benchmark", sessions, MOODS)
+    print(f"1件追加したときの更新      : {(time.perf_counter() - started) * 1000:8.3f} ms")
+
+    print(f"指標とヒートマップを作る  : {average_ms(new_dashboard, store):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
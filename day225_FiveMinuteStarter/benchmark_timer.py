@@ -0,0 +1,102 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+# タイマー動作中に、サーバー側でどれだけ CPU を使うかを比べる。
+# 以前：1秒ごとに time.sleep(1) → st.rerun() でアプリ全体を実行していた。
+# 今：時計はブラウザ側で動き、サーバーは開始時・終了時刻の見張り・終了後の
+#     描き直しの数回だけ動く。
+# 使い方：python benchmark_timer.py [記録の件数]
+
+APP_PATH = Path(__file__).resolve().parent / "app.py"
+
+TIMER_SECONDS = 5 * 60
+RUNS = 5
+
+
+def make_data(session_count, seed=0):
+    rng = random.Random(seed)
+    tasks = [
+        {"id": f"task{i}", "name": f"タスク{i}", "category": "勉強", "memo": "", "active": True, "created_at": ""}
+        for i in range(30)
+    ]
+    sessions = []
+
+    for i in range(session_count):
+        day = date.today() - timedelta(days=rng.randint(0, 365))
+        started = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randint(0, 1439))
+        task = rng.choice(tasks)
+        sessions.append({
+            "id": f"session{i}",
+            "task_id": task["id"],
+            "task_name": task["name"],
+            "category": task["category"],
+            "session_date": str(day),
+            "started_at": started.isoformat(timespec="seconds"),
+            "ended_at": started.isoformat(timespec="seconds"),
+            "before_mood": "😐 普通",
+            "after_mood": "🙂 少しやる気あり",
+            "result": rng.choice(["5分で終了", "もう5分続けた", "そのまま続けた"]),
+            "total_minutes": rng.choice([5, 10, 20]),
+            "memo": "",
+            "created_at": started.isoformat(timespec="seconds"),
+        })
+
+    return {"tasks": tasks, "sessions": sessions}
+
+
+def full_run_cpu_ms(app):
+    # タイマー動作中の状態で、アプリ全体を1回実行したときの CPU 時間
+    app.session_state["timer_running"] = True
+    app.session_state["timer_finished"] = False
+    app.session_state["timer_end_time"] = datetime.now() + timedelta(seconds=TIMER_SECONDS)
+    app.session_state["current_task_id"] = "task0"
+
+    samples = []
+
+    for _ in range(RUNS):
+        start = time.process_time()
+        app.run()
+        samples.append((time.process_time() - start) * 1000)
+
+    return sorted(samples)[len(samples) // 2]
+
+
+def main():
+    session_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        os.makedirs("data")
+
+        with open("data/five_minute_data.json", "w", encoding="utf-8") as file:
+            json.dump(make_data(session_count), file, ensure_ascii=False)
+
+        app = AppTest.from_file(str(APP_PATH), default_timeout=60)
+        app.run()
+
+        run_ms = full_run_cpu_ms(app)
+        data_mtime = os.stat("data/five_minute_data.json").st_mtime_ns
+        app.run()
+        saved = os.stat("data/five_minute_data.json").st_mtime_ns != data_mtime
+
+    # 以前：1秒に1回アプリ全体（＋毎回の保存）。今：5分のうち開始・見張り・終了の3回
+    old_per_second = run_ms
+    new_per_second = run_ms * 3 / TIMER_SECONDS
+
+    print(f"記録 {session_count:,} 件")
+    print(f"アプリ全体1回の CPU 時間：{run_ms:.1f} ms")
+    print(f"タイマー中の保存：{'あり' if saved else 'なし'}")
+    print(f"以前（毎秒 rerun）：タイマー1つあたり {old_per_second:.1f} ms/秒（{old_per_second / 10:.1f}% CPU）")
+    print(f"今（ブラウザ側の時計）：タイマー1つあたり {new_per_second:.2f} ms/秒（{new_per_second / 10:.3f}% CPU）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,457 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# 5分チャレンジの記録を「列ごとの配列」にまとめて持つ。
+#
+# 日付（通日）・開始時刻の時・曜日・タスク・カテゴリー・前後の気分・
+# 続けたかどうか・時間を NumPy 配列に入れ、件数・続けた回数・合計時間、
+# 日ごとの回数、タスク×時間帯／曜日×時間帯の回数と続けた回数も一緒に持つ。
+# 記録が1件増えたときは配列の末尾に書き足し、集計のマスを1つずつ足すだけで、
+# 全件を読み直さない。記録は追記だけで書き換えないので、削除や復元で
+# 並びが変わったときだけ作り直す。
+#
+# 作った配列はプロセスの中で使い回す（再実行のたびに作り直さない）。
+
+CONTINUED_RESULTS = [
+    "もう5分続けた",
+    "そのまま続けた",
+]
+
+WEEKDAY_LABELS = [
+    "月",
+    "火",
+    "水",
+    "木",
+    "金",
+    "土",
+    "日",
+]
+
+HOURS = 24
+
+NO_HOUR = -1
+
+DEFAULT_MOOD = 3
+
+INITIAL_CAPACITY = 256
+
+COLUMNS = {
+    "day": np.int32,
+    "hour": np.int8,
+    "weekday": np.int8,
+    "task": np.int32,
+    "category": np.int32,
+    "result": np.int32,
+    "before": np.int8,
+    "after": np.int8,
+    "continued": bool,
+    "minutes": np.int32,
+}
+
+# データファイルごとの列ストア
+_stores = {}
+
+
+def create_store(moods):
+    return {
+        "size": 0,
+        "ids": [],
+        "columns": {
+            name: np.zeros(INITIAL_CAPACITY, dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        },
+        "mood_codes": {
+            mood: index + 1
+            for index, mood in enumerate(moods)
+        },
+        "task_codes": {},
+        "task_names": [],
+        "category_codes": {},
+        "category_names": [],
+        "result_codes": {},
+        "result_names": [],
+        "count": 0,
+        "continued": 0,
+        "minutes": 0,
+        "mood_changes": np.zeros(3, dtype=np.int64),
+        "day_counts": {},
+        "hour_counts": np.zeros(HOURS, dtype=np.int64),
+        "category_counts": np.zeros(0, dtype=np.int64),
+        "task_hour_total": np.zeros((0, HOURS), dtype=np.int64),
+        "task_hour_continued": np.zeros((0, HOURS), dtype=np.int64),
+        "weekday_hour_total": np.zeros((7, HOURS), dtype=np.int64),
+        "weekday_hour_continued": np.zeros((7, HOURS), dtype=np.int64),
+    }
+
+
+def code_for(
+    store,
+    kind,
+    name,
+):
+    # タスク名・カテゴリー名・結果に番号を振る。初めての名前なら集計の行も増やす
+    codes = store[f"{kind}_codes"]
+
+    if name in codes:
+        return codes[name]
+
+    codes[name] = len(codes)
+    store[f"{kind}_names"].append(name)
+
+    if kind == "task":
+        for key in ["task_hour_total", "task_hour_continued"]:
+            store[key] = np.vstack(
+                [
+                    store[key],
+                    np.zeros((1, HOURS), dtype=np.int64),
+                ]
+            )
+
+    elif kind == "category":
+        store["category_counts"] = np.append(
+            store["category_counts"],
+            0,
+        )
+
+    return codes[name]
+
+
+def start_hour(text):
+    # "YYYY-MM-DDTHH:MM:SS" の時の部分だけを取り出す（日時として読み直さない）
+    text = str(text or "")
+
+    if len(text) >= 13 and text[10] in "T " and text[11:13].isdigit():
+        hour = int(text[11:13])
+
+        if hour < HOURS:
+            return hour
+
+    return NO_HOUR
+
+
+def session_row(
+    store,
+    session,
+):
+    try:
+        day = date.fromisoformat(
+            str(session.get("session_date", ""))[:10]
+        ).toordinal()
+
+    except ValueError:
+        day = date.today().toordinal()
+
+    mood_codes = store["mood_codes"]
+
+    return {
+        "day": day,
+        "hour": start_hour(session.get("started_at")),
+        # 0001-01-01（通日1）は月曜日
+        "weekday": (day - 1) % 7,
+        "task": code_for(store, "task", session.get("task_name", "")),
+        "category": code_for(store, "category", session.get("category", "その他")),
+        "result": code_for(store, "result", session.get("result", "")),
+        "before": mood_codes.get(session.get("before_mood"), DEFAULT_MOOD),
+        "after": mood_codes.get(session.get("after_mood"), DEFAULT_MOOD),
+        "continued": session.get("result") in CONTINUED_RESULTS,
+        "minutes": int(session.get("total_minutes", 0)),
+    }
+
+
+def reserve(
+    store,
+    size,
+):
+    # 足りなくなったら容量を倍にする（1件ずつ書き足しても平均して一定の手間）
+    capacity = len(store["columns"]["day"])
+
+    if size <= capacity:
+        return
+
+    while capacity < size:
+        capacity *= 2
+
+    for name, values in store["columns"].items():
+        grown = np.zeros(capacity, dtype=values.dtype)
+        grown[:store["size"]] = values[:store["size"]]
+        store["columns"][name] = grown
+
+
+def append_session(
+    store,
+    session,
+):
+    # 1件を末尾に書き足し、集計のマスを1つずつ足す
+    row = session_row(store, session)
+    index = store["size"]
+
+    reserve(store, index + 1)
+
+    for name, value in row.items():
+        store["columns"][name][index] = value
+
+    store["size"] += 1
+    store["ids"].append(session.get("id"))
+
+    store["count"] += 1
+    store["continued"] += int(row["continued"])
+    store["minutes"] += row["minutes"]
+    store["mood_changes"][int(np.sign(row["after"] - row["before"])) + 1] += 1
+    store["day_counts"][row["day"]] = store["day_counts"].get(row["day"], 0) + 1
+    store["category_counts"][row["category"]] += 1
+
+    if row["hour"] != NO_HOUR:
+        store["hour_counts"][row["hour"]] += 1
+        store["task_hour_total"][row["task"], row["hour"]] += 1
+        store["task_hour_continued"][row["task"], row["hour"]] += int(row["continued"])
+        store["weekday_hour_total"][row["weekday"], row["hour"]] += 1
+        store["weekday_hour_continued"][row["weekday"], row["hour"]] += int(row["continued"])
+
+
+def build_store(
+    sessions,
+    moods,
+):
+    # 全件から作り直す。集計は配列からまとめて数える
+    store = create_store(moods)
+    rows = [session_row(store, session) for session in sessions]
+    size = len(rows)
+
+    reserve(store, max(size, 1))
+
+    for name in COLUMNS:
+        store["columns"][name][:size] = [row[name] for row in rows]
+
+    store["size"] = size
+    store["ids"] = [session.get("id") for session in sessions]
+
+    column = view(store)
+    continued = column["continued"].astype(np.int64)
+    timed = column["hour"] != NO_HOUR
+    hours = column["hour"][timed].astype(np.int64)
+
+    store["count"] = size
+    store["continued"] = int(continued.sum())
+    store["minutes"] = int(column["minutes"].sum())
+    store["mood_changes"] = np.bincount(
+        np.sign(column["after"].astype(np.int64) - column["before"]) + 1,
+        minlength=3,
+    )
+
+    days, counts = np.unique(column["day"], return_counts=True)
+    store["day_counts"] = dict(zip(days.tolist(), counts.tolist()))
+
+    store["hour_counts"] = np.bincount(hours, minlength=HOURS)
+    store["category_counts"] = np.bincount(
+        column["category"],
+        minlength=len(store["category_names"]),
+    )
+
+    for prefix, rows_of in [
+        ("task", column["task"][timed]),
+        ("weekday", column["weekday"][timed]),
+    ]:
+        row_count = len(store["task_names"]) if prefix == "task" else 7
+        total = np.zeros((row_count, HOURS), dtype=np.int64)
+        kept = np.zeros((row_count, HOURS), dtype=np.int64)
+
+        np.add.at(total, (rows_of, hours), 1)
+        np.add.at(kept, (rows_of, hours), continued[timed])
+
+        store[f"{prefix}_hour_total"] = total
+        store[f"{prefix}_hour_continued"] = kept
+
+    return store
+
+
+def sync_store(
+    key,
+    sessions,
+    moods,
+):
+    # 保存済みの列ストアと記録一覧を突き合わせる。
+    # 末尾に足されただけなら足された分を書き足し、それ以外は作り直す
+    store = _stores.get(key)
+    size = store["size"] if store else 0
+
+    appended_only = (
+        store is not None
+        and len(sessions) >= size
+        and (
+            size == 0
+            or (
+                sessions[0].get("id") == store["ids"][0]
+                and sessions[size - 1].get("id") == store["ids"][-1]
+            )
+        )
+    )
+
+    if not appended_only:
+        store = build_store(sessions, moods)
+        _stores[key] = store
+        return store
+
+    for session in sessions[size:]:
+        append_session(store, session)
+
+    return store
+
+
+def view(store):
+    # 使っている部分だけの配列
+    size = store["size"]
+
+    return {
+        name: values[:size]
+        for name, values in store["columns"].items()
+    }
+
+
+def continuation_rate(store):
+    if not store["count"]:
+        return 0
+
+    return store["continued"] / store["count"] * 100
+
+
+def average_minutes(store):
+    if not store["count"]:
+        return 0
+
+    return store["minutes"] / store["count"]
+
+
+def sessions_between(
+    store,
+    start,
+    end,
+):
+    # start 〜 end（両端を含む）の実行回数。日ごとの回数を足すだけ
+    return sum(
+        store["day_counts"].get(day, 0)
+        for day in range(start.toordinal(), end.toordinal() + 1)
+    )
+
+
+def calculate_streak(
+    store,
+    today=None,
+):
+    day = (today or date.today()).toordinal()
+    counts = store["day_counts"]
+
+    if day not in counts:
+        day -= 1
+
+    streak = 0
+
+    while day in counts:
+        streak += 1
+        day -= 1
+
+    return streak
+
+
+def most_common_category(store):
+    if not store["count"]:
+        return None
+
+    return store["category_names"][int(np.argmax(store["category_counts"]))]
+
+
+def most_common_hour(store):
+    if not store["hour_counts"].any():
+        return None
+
+    return int(np.argmax(store["hour_counts"]))
+
+
+def mood_changes(store):
+    # (気分アップ, 変化なし, 気分ダウン) の回数
+    declined, same, improved = store["mood_changes"].tolist()
+    return improved, same, declined
+
+
+def names_of(
+    store,
+    kind,
+    codes,
+):
+    names = np.array(store[f"{kind}_names"] or [""], dtype=object)
+    return names[codes]
+
+
+def session_frame(store):
+    # 分析用の表。日付・名前は番号から配列でまとめて引く
+    column = view(store)
+    epoch = date(1970, 1, 1).toordinal()
+
+    return pd.DataFrame(
+        {
+            "日付": (
+                (column["day"].astype(np.int64) - epoch)
+                .astype("datetime64[D]")
+                .astype(str)
+            ),
+            "カテゴリー": names_of(store, "category", column["category"]),
+            "タスク": names_of(store, "task", column["task"]),
+            "結果": names_of(store, "result", column["result"]),
+            "続けた": column["continued"],
+            "時間": column["minutes"],
+            "開始時刻": np.where(
+                column["hour"] == NO_HOUR,
+                np.nan,
+                column["hour"],
+            ),
+            "開始前": column["before"],
+            "終了後": column["after"],
+            "変化": column["after"].astype(np.int64) - column["before"],
+        }
+    )
+
+
+def rate_table(
+    total,
+    continued,
+    row_labels,
+    sort_rows=False,
+):
+    # 回数のある時間帯だけを列にし、続けた率（%）の表にする。回数0のマスは空欄
+    used_hours = np.flatnonzero(total.sum(axis=0))
+    row_totals = total.sum(axis=1)
+    used_rows = np.flatnonzero(row_totals)
+
+    if sort_rows:
+        # 回数の多い順に並べる（曜日のように順番に意味がある行は並べ替えない）
+        used_rows = used_rows[np.argsort(-row_totals[used_rows], kind="stable")]
+
+    total = total[np.ix_(used_rows, used_hours)]
+    continued = continued[np.ix_(used_rows, used_hours)]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(total > 0, continued / total * 100, np.nan)
+
+    return pd.DataFrame(
+        np.round(rates, 1),
+        index=[row_labels[row] for row in used_rows],
+        columns=[f"{hour}時" for hour in used_hours],
+    )
+
+
+def task_hour_heatmap(store):
+    return rate_table(
+        store["task_hour_total"],
+        store["task_hour_continued"],
+        store["task_names"],
+        sort_rows=True,
+    )
+
+
+def weekday_hour_heatmap(store):
+    return rate_table(
+        store["weekday_hour_total"],
+        store["weekday_hour_continued"],
+        WEEKDAY_LABELS,
+    )
@@ -7,6 +7,14 @@ from datetime import date, datetime, timedelta
 import pandas as pd
 import streamlit as st
 
+from rotation_planner import (
+    ANYONE,
+    empty_plan,
+    member_loads,
+    next_assignees,
+    refresh_plan,
+)
+
 
 # =========================================================
 # ページ設定
@@ -78,6 +86,14 @@ DEFAULT_MEMBERS = [
     "誰でも",
 ]
 
+ROTATION_WEEK_OPTIONS = [
+    1,
+    2,
+    4,
+    6,
+    8,
+]
+
 
 # =========================================================
 # データ管理
@@ -97,6 +113,7 @@ def create_empty_data():
     return {
         "chores": [],
         "history": [],
+        "rotation": {},
     }
 
 
@@ -136,6 +153,11 @@ def normalize_data(data):
         [],
     )
 
+    data.setdefault(
+        "rotation",
+        {},
+    )
+
     for chore in data["chores"]:
         chore.setdefault(
             "id",
@@ -806,6 +828,42 @@ current_month = (
 )
 
 
+# =========================================================
+# 担当の振り分け
+# =========================================================
+
+# 保存済みの計画と家事・実績を突き合わせ、変わった家事の分だけ割り当て直す
+rotation_plan, rotation_changed = refresh_plan(
+    data["rotation"],
+    active_chores,
+    history,
+    data["rotation"].get(
+        "members",
+        [
+            member
+            for member in DEFAULT_MEMBERS
+            if member != ANYONE
+        ],
+    ),
+    data["rotation"].get(
+        "weeks",
+        4,
+    ),
+    data["rotation"].get(
+        "rebalance_fixed",
+        False,
+    ),
+)
+
+if rotation_changed:
+    data["rotation"] = rotation_plan
+    save_data(data)
+
+planned_assignees = next_assignees(
+    rotation_plan
+)
+
+
 # =========================================================
 # ヘッダー
 # =========================================================
@@ -1035,6 +1093,11 @@ else:
                     f"{IMPORTANCE_ICONS.get(chore.get('importance', ''), '')} "
                     f"{chore.get('importance', '')} ／ "
                     f"担当：{chore.get('assignee', '')}"
+                    + (
+                        f" ／ 今回：{planned_assignees[chore_id]}"
+                        if chore_id in planned_assignees
+                        else ""
+                    )
                 )
 
                 st.write(
@@ -1105,9 +1168,12 @@ else:
                 completion_assignee = (
                     st.text_input(
                         "実際にやった人",
-                        value=chore.get(
-                            "assignee",
-                            "",
+                        value=planned_assignees.get(
+                            chore_id,
+                            chore.get(
+                                "assignee",
+                                "",
+                            ),
                         ),
                         key=(
                             f"done_assignee_"
@@ -1768,6 +1834,226 @@ with schedule_tab:
                 hide_index=True,
             )
 
+        st.divider()
+
+        st.subheader(
+            "⚖️ 担当の振り分け"
+        )
+
+        st.caption(
+            "先の予定を、直近4週間の実績時間も含めて"
+            "メンバーの合計時間がそろうように振り分けます。"
+            "完了や変更があった家事だけ自動で割り当て直します。"
+        )
+
+        with st.form(
+            "rotation_settings_form"
+        ):
+            rotation_column1, rotation_column2 = (
+                st.columns(2)
+            )
+
+            with rotation_column1:
+                members_text = st.text_input(
+                    "メンバー（、区切り）",
+                    value="、".join(
+                        rotation_plan[
+                            "members"
+                        ]
+                    ),
+                )
+
+            with rotation_column2:
+                rotation_weeks = st.selectbox(
+                    "計画する週数",
+                    ROTATION_WEEK_OPTIONS,
+                    index=(
+                        ROTATION_WEEK_OPTIONS.index(
+                            rotation_plan[
+                                "weeks"
+                            ]
+                        )
+                        if rotation_plan[
+                            "weeks"
+                        ]
+                        in ROTATION_WEEK_OPTIONS
+                        else 2
+                    ),
+                    format_func=lambda weeks: (
+                        f"{weeks}週間"
+                    ),
+                )
+
+            rebalance_fixed = st.checkbox(
+                "担当が決まっている家事も振り分け直す",
+                value=rotation_plan[
+                    "rebalance_fixed"
+                ],
+            )
+
+            if st.form_submit_button(
+                "🔄 この設定で組み直す",
+                use_container_width=True,
+            ):
+                rotation_members = [
+                    member.strip()
+                    for member in (
+                        members_text.replace(
+                            ",",
+                            "、",
+                        ).split(
+                            "、"
+                        )
+                    )
+                    if member.strip()
+                    and member.strip() != ANYONE
+                ]
+
+                if not rotation_members:
+                    st.error(
+                        "メンバーを1人以上入力してください。"
+                    )
+
+                else:
+                    data["rotation"], _ = refresh_plan(
+                        empty_plan(
+                            rotation_members,
+                            rotation_weeks,
+                            rebalance_fixed,
+                        ),
+                        active_chores,
+                        history,
+                        rotation_members,
+                        rotation_weeks,
+                        rebalance_fixed,
+                    )
+
+                    save_data(data)
+                    st.rerun()
+
+        assignments = rotation_plan[
+            "assignments"
+        ]
+
+        if not assignments:
+            st.info(
+                "計画する期間に予定されている家事はありません。"
+            )
+
+        else:
+            loads = member_loads(
+                rotation_plan,
+                history,
+            )
+
+            totals = [
+                load["total"]
+                for load in loads.values()
+            ]
+
+            rotation_metrics = st.columns(
+                3
+            )
+
+            rotation_metrics[0].metric(
+                "計画した回数",
+                f"{len(assignments)}回"
+            )
+
+            rotation_metrics[1].metric(
+                "予定時間の合計",
+                f"{sum(item['minutes'] for item in assignments)}分"
+            )
+
+            rotation_metrics[2].metric(
+                "合計時間の差（最大−最小）",
+                f"{max(totals) - min(totals)}分"
+            )
+
+            load_df = pd.DataFrame(
+                [
+                    {
+                        "メンバー": member,
+                        "直近4週の実績（分）": load[
+                            "actual"
+                        ],
+                        "予定（分）": load[
+                            "planned"
+                        ],
+                        "合計（分）": load[
+                            "total"
+                        ],
+                    }
+                    for member, load in loads.items()
+                ]
+            )
+
+            st.dataframe(
+                load_df,
+                use_container_width=True,
+                hide_index=True,
+            )
+
+            plan_df = pd.DataFrame(
+                [
+                    {
+                        "日付": item["date"],
+                        "家事": item[
+                            "chore_name"
+                        ],
+                        "担当": item[
+                            "member"
+                        ],
+                        "時間": item[
+                            "minutes"
+                        ],
+                        "固定": (
+                            "📌"
+                            if item.get(
+                                "fixed"
+                            )
+                            else ""
+                        ),
+                    }
+                    for item in assignments
+                ]
+            )
+
+            weekly_df = (
+                plan_df.assign(
+                    週=(
+                        (
+                            pd.to_datetime(
+                                plan_df["日付"]
+                            )
+                            - pd.Timestamp(
+                                rotation_plan["start"]
+                            )
+                        ).dt.days
+                        // 7
+                        + 1
+                    ).astype(str)
+                    + "週目"
+                )
+                .pivot_table(
+                    index="週",
+                    columns="担当",
+                    values="時間",
+                    aggfunc="sum",
+                    fill_value=0,
+                )
+            )
+
+            st.bar_chart(
+                weekly_df,
+            )
+
+            st.dataframe(
+                plan_df,
+                use_container_width=True,
+                hide_index=True,
+            )
+
 
 # =========================================================
 # 実行履歴
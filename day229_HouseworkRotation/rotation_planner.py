@@ -0,0 +1,349 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from statistics import median
+
+import numpy as np
+
+# 家事の担当を、メンバーごとの合計時間がなるべくそろうように振り分ける。
+#
+# 先の N 週間に来る家事（1回ずつ）を週ごとに時間の長い順に並べ、
+# メンバーの人数ずつ「誰がどれをやるか」を最小コストの割り当て問題として解く。
+# 1人が同じ回に何件も受け持てるように、列は「メンバー × 何件目か」にする。
+# コストは「その人の負担（分）の2乗がどれだけ増えるか」で、
+# 直近の実績時間と、すでに決まった分の予定時間を負担に含める。
+# 前回と同じ人には少し上乗せして、同じ家事が同じ人に続かないようにする。
+#
+# 計画は data["rotation"] に保存し、家事の完了・変更があったときは
+# その家事の予定だけを外して割り当て直す（全体は解き直さない）。
+
+ANYONE = "誰でも"
+
+# 実績の負担として数える期間
+HISTORY_DAYS = 28
+
+# 目安時間の代わりに、直近何回分の実績時間（中央値）を使うか
+RECENT_RECORDS = 5
+
+# 前回と同じ人に割り当てるときの上乗せ（分）
+REPEAT_PENALTY_MINUTES = 15
+
+
+def solve_assignment(cost):
+    # ハンガリー法（ポテンシャル付き）。行 <= 列 の長方形でもよい。
+    # 戻り値は (行番号の配列, 列番号の配列)
+    cost = np.asarray(cost, dtype=float)
+
+    if cost.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    transposed = cost.shape[0] > cost.shape[1]
+
+    if transposed:
+        cost = cost.T
+
+    rows, cols = cost.shape
+    u = np.zeros(rows + 1)
+    v = np.zeros(cols + 1)
+    match = np.zeros(cols + 1, dtype=int)
+    way = np.zeros(cols + 1, dtype=int)
+
+    for row in range(1, rows + 1):
+        match[0] = row
+        col0 = 0
+        min_values = np.full(cols + 1, np.inf)
+        used = np.zeros(cols + 1, dtype=bool)
+
+        while True:
+            used[col0] = True
+            row0 = match[col0]
+
+            free = ~used[1:]
+            reduced = cost[row0 - 1] - u[row0] - v[1:]
+            better = free & (reduced < min_values[1:])
+            min_values[1:][better] = reduced[better]
+            way[1:][better] = col0
+
+            candidates = np.where(free, min_values[1:], np.inf)
+            col1 = int(np.argmin(candidates)) + 1
+            delta = candidates[col1 - 1]
+
+            u[match[used]] += delta
+            v[used] -= delta
+            min_values[~used] -= delta
+
+            col0 = col1
+
+            if match[col0] == 0:
+                break
+
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+
+    assigned = np.flatnonzero(match[1:]) + 1
+    row_index = match[assigned] - 1
+    col_index = assigned - 1
+
+    if transposed:
+        row_index, col_index = col_index, row_index
+
+    order = np.argsort(row_index)
+    return row_index[order], col_index[order]
+
+
+def parse_day(text):
+    try:
+        return date.fromisoformat(str(text)[:10])
+    except ValueError:
+        return None
+
+
+def history_by_chore(history):
+    grouped = defaultdict(list)
+
+    for record in history:
+        grouped[record.get("chore_id", "")].append(record)
+
+    for records in grouped.values():
+        records.sort(key=lambda record: (record.get("done_date", ""), record.get("created_at", "")))
+
+    return grouped
+
+
+def expected_minutes(chore, records):
+    # 実績があれば直近の実績時間の中央値、なければ目安時間
+    actual = [
+        int(record.get("actual_minutes", 0))
+        for record in records[-RECENT_RECORDS:]
+        if int(record.get("actual_minutes", 0)) > 0
+    ]
+
+    if actual:
+        return int(round(median(actual)))
+
+    return int(chore.get("estimated_minutes", 10))
+
+
+def chore_occurrences(chore, start, end):
+    # start 〜 end（両端を含む）に来る予定日。期限を過ぎていれば最初の1回は start
+    interval = max(int(chore.get("interval_days", 7)), 1)
+    last_done = parse_day(chore.get("last_done_date", ""))
+    due = last_done + timedelta(days=interval) if last_done else start
+
+    if due < start:
+        due = start
+
+    days = []
+
+    while due <= end:
+        days.append(due)
+        due += timedelta(days=interval)
+
+    return days
+
+
+def history_loads(history, members, today):
+    # 直近 HISTORY_DAYS 日の実績時間をメンバーごとに足す
+    since = str(today - timedelta(days=HISTORY_DAYS))
+    loads = dict.fromkeys(members, 0)
+
+    for record in history:
+        if record.get("assignee") in loads and record.get("done_date", "") >= since:
+            loads[record["assignee"]] += int(record.get("actual_minutes", 0))
+
+    return loads
+
+
+def chore_signature(chore, minutes):
+    return [
+        chore.get("last_done_date", ""),
+        int(chore.get("interval_days", 7)),
+        chore.get("assignee", ""),
+        minutes,
+    ]
+
+
+def assign_occurrences(occurrences, members, loads, last_member):
+    # occurrences は {"chore_id", "date", "minutes", "fixed"}。
+    # fixed（担当が決まっている家事）はその人に、それ以外を週ごと・人数ずつ割り当てる
+    loads = dict(loads)
+    assigned = []
+
+    for item in sorted(occurrences, key=lambda item: item["date"]):
+        if item["fixed"]:
+            loads[item["fixed"]] += item["minutes"]
+            last_member[item["chore_id"]] = item["fixed"]
+            assigned.append({**item, "member": item["fixed"]})
+
+    weeks = defaultdict(list)
+
+    for item in occurrences:
+        if not item["fixed"]:
+            weeks[item["week"]].append(item)
+
+    member_count = len(members)
+
+    for week in sorted(weeks):
+        items = sorted(weeks[week], key=lambda item: (-item["minutes"], item["date"]))
+
+        for offset in range(0, len(items), member_count):
+            batch = items[offset:offset + member_count]
+            slots = len(batch)
+            minutes = np.array([item["minutes"] for item in batch], dtype=float)
+            current = np.array([loads[member] for member in members], dtype=float)
+
+            # k 件目の枠は、同じ回にすでに k 件（平均の長さ）受け持った負担として数える
+            slot_loads = (current[:, None] + np.arange(slots)[None, :] * minutes.mean()).ravel()
+
+            repeat = np.array(
+                [
+                    [last_member.get(item["chore_id"]) == member for member in members]
+                    for item in batch
+                ]
+            )
+            effective = slot_loads[None, :] + np.repeat(repeat, slots, axis=1) * REPEAT_PENALTY_MINUTES
+
+            # 負担の2乗の増え方 (L + p)^2 - L^2
+            cost = minutes[:, None] * (2 * effective + minutes[:, None])
+
+            for row, col in zip(*solve_assignment(cost)):
+                item = batch[row]
+                member = members[col // slots]
+                loads[member] += item["minutes"]
+                last_member[item["chore_id"]] = member
+                assigned.append({**item, "member": member})
+
+    assigned.sort(key=lambda item: (item["date"], -item["minutes"], item["chore_name"]))
+    return assigned, loads
+
+
+def empty_plan(members, weeks, rebalance_fixed):
+    return {
+        "members": list(members),
+        "weeks": int(weeks),
+        "rebalance_fixed": bool(rebalance_fixed),
+        "start": "",
+        "chore_keys": {},
+        "assignments": [],
+    }
+
+
+def refresh_plan(plan, chores, history, members, weeks, rebalance_fixed, today=None):
+    # 変わった家事の予定だけを割り当て直す。戻り値の2つめは、保存し直す必要があるかどうか。
+    # メンバー・週数・設定が変わったときや計画がないときは、最初から組む
+    today = today or date.today()
+    members = [member for member in members if member]
+
+    if (
+        not isinstance(plan, dict)
+        or plan.get("members") != members
+        or plan.get("weeks") != int(weeks)
+        or plan.get("rebalance_fixed") != bool(rebalance_fixed)
+    ):
+        plan = empty_plan(members, weeks, rebalance_fixed)
+
+    if not members:
+        return plan, False
+
+    end = today + timedelta(days=int(weeks) * 7 - 1)
+    grouped = history_by_chore(history)
+
+    signatures = {}
+    minutes_by_chore = {}
+
+    for chore in chores:
+        minutes = expected_minutes(chore, grouped.get(chore["id"], []))
+        minutes_by_chore[chore["id"]] = minutes
+        signatures[chore["id"]] = chore_signature(chore, minutes)
+
+    if plan["start"] == str(today) and plan["chore_keys"] == signatures:
+        return plan, False
+
+    # 今日以降で、家事の中身が変わっていない予定はそのまま残す
+    kept = [
+        item
+        for item in plan["assignments"]
+        if item["date"] >= str(today)
+        and item["date"] <= str(end)
+        and plan["chore_keys"].get(item["chore_id"]) == signatures.get(item["chore_id"])
+        and item["member"] in members
+    ]
+    covered = {(item["chore_id"], item["date"]) for item in kept}
+
+    needed = []
+
+    for chore in chores:
+        assignee = chore.get("assignee", "")
+        fixed = assignee if assignee in members and not rebalance_fixed else ""
+
+        for day in chore_occurrences(chore, today, end):
+            if (chore["id"], str(day)) in covered:
+                continue
+
+            needed.append(
+                {
+                    "chore_id": chore["id"],
+                    "chore_name": chore.get("name", ""),
+                    "date": str(day),
+                    "week": (day - today).days // 7,
+                    "minutes": minutes_by_chore[chore["id"]],
+                    "fixed": fixed,
+                }
+            )
+
+    loads = history_loads(history, members, today)
+    last_member = {}
+
+    for records in grouped.values():
+        for record in records:
+            if record.get("assignee") in loads:
+                last_member[record["chore_id"]] = record["assignee"]
+
+    for item in sorted(kept, key=lambda item: item["date"]):
+        loads[item["member"]] += item["minutes"]
+        last_member[item["chore_id"]] = item["member"]
+
+    assigned, _ = assign_occurrences(needed, members, loads, last_member)
+
+    plan["start"] = str(today)
+    plan["chore_keys"] = signatures
+    plan["assignments"] = sorted(
+        kept + assigned,
+        key=lambda item: (item["date"], -item["minutes"], item["chore_name"]),
+    )
+
+    return plan, True
+
+
+def member_loads(plan, history, today=None):
+    # メンバーごとの直近の実績・計画・合計（分）
+    today = today or date.today()
+    members = plan.get("members", [])
+    actual = history_loads(history, members, today)
+    planned = dict.fromkeys(members, 0)
+
+    for item in plan.get("assignments", []):
+        if item["member"] in planned:
+            planned[item["member"]] += item["minutes"]
+
+    return {
+        member: {
+            "actual": actual[member],
+            "planned": planned[member],
+            "total": actual[member] + planned[member],
+        }
+        for member in members
+    }
+
+
+def next_assignees(plan, today=None):
+    # 家事ごとの、いちばん近い予定の担当
+    today = str(today or date.today())
+    result = {}
+
+    for item in plan.get("assignments", []):
+        if item["date"] >= today and item["chore_id"] not in result:
+            result[item["chore_id"]] = item["member"]
+
+    return result
@@ -1,12 +1,25 @@
 import json
 import os
+import sys
 import uuid
 from collections import Counter
 from datetime import date, datetime
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.deal_optimizer import (  # noqa: E402
+    DEAL_KIND_LABELS,
+    optimize_deals,
+)
+from common.deadline_index import register_deadlines  # noqa: E402
+
 
 # =========================================================
 # ページ設定
@@ -29,6 +42,10 @@ DATA_FILE = os.path.join(
     "deal_data.json",
 )
 
+# 期限系アプリ共通のインデックス（common/deadline_index.py）に登録するときの名前
+DEADLINE_APP_KEY = "day230_TinyDealMemo"
+DEADLINE_APP_NAME = "ちょい得メモ"
+
 DEAL_TYPES = [
     "クーポン",
     "ポイント還元",
@@ -68,6 +85,13 @@ PRIORITY_ORDER = {
     "低": 2,
 }
 
+# 組み合わせ計算で「他のお得と重ねて使える」とみなす種類
+STACKABLE_DEAL_TYPES = [
+    "ポイント還元",
+    "キャッシュバック",
+    "期間限定ポイント",
+]
+
 PRIORITY_ICONS = {
     "高": "🔥",
     "普通": "🟡",
@@ -113,6 +137,14 @@ def save_data(data):
             indent=2,
         )
 
+    register_deadlines(
+        DEADLINE_APP_KEY,
+        DEADLINE_APP_NAME,
+        deadline_entries(
+            data
+        )
+    )
+
 
 def normalize_data(data):
     if not isinstance(
@@ -284,6 +316,50 @@ def load_data():
         return data
 
 
+# =========================================================
+# 期限インデックス
+# =========================================================
+
+def deadline_entries(
+    data,
+):
+    entries = []
+
+    for deal in data.get(
+        "deals",
+        [],
+    ):
+        if deal.get(
+            "status"
+        ) != "未使用":
+            continue
+
+        expiry_date = parse_date(
+            deal.get(
+                "expiry_date",
+                "",
+            )
+        )
+
+        if not expiry_date:
+            continue
+
+        entries.append([
+            expiry_date.isoformat(),
+            DEADLINE_APP_KEY,
+            deal.get(
+                "id",
+                "",
+            ),
+            deal.get(
+                "title",
+                "",
+            ),
+        ])
+
+    return entries
+
+
 # =========================================================
 # 補助関数
 # =========================================================
@@ -549,6 +625,72 @@ def benefit_text(
     )
 
 
+def deal_option(
+    deal,
+    item_keys,
+):
+    """登録したお得を、組み合わせ計算用のお得に変換する。"""
+
+    kind = {
+        "金額": "coupon",
+        "割引率": "percent",
+        "還元率": "points",
+    }.get(
+        deal.get(
+            "benefit_type",
+            "",
+        )
+    )
+
+    if kind is None:
+        return None
+
+    # 対象が買い物かごの商品名かカテゴリと一致すればそれだけ、
+    # そうでなければ全商品を対象にする
+    target = str(
+        deal.get(
+            "target",
+            "",
+        )
+    ).strip()
+
+    return {
+        "id": deal.get(
+            "id",
+            "",
+        ),
+        "name": deal.get(
+            "title",
+            "",
+        ),
+        "kind": kind,
+        "value": float(
+            deal.get(
+                "benefit_value",
+                0,
+            )
+        ),
+        "targets": (
+            [target]
+            if target in item_keys
+            else []
+        ),
+        "min_spend": int(
+            deal.get(
+                "minimum_spend",
+                0,
+            )
+        ),
+        "stackable": (
+            deal.get(
+                "deal_type",
+                "",
+            )
+            in STACKABLE_DEAL_TYPES
+        ),
+    }
+
+
 # =========================================================
 # データ操作
 # =========================================================
@@ -1178,6 +1320,7 @@ st.divider()
     list_tab,
     used_tab,
     favorite_tab,
+    combo_tab,
     analysis_tab,
     data_tab,
 ) = st.tabs(
@@ -1186,6 +1329,7 @@ st.divider()
         "🎫 お得一覧",
         "✅ 利用履歴",
         "⭐ お気に入り",
+        "🛒 組み合わせ",
         "📈 お得分析",
         "💾 データ管理",
     ]
@@ -2384,6 +2528,219 @@ with favorite_tab:
                     )
 
 
+# =========================================================
+# 組み合わせ
+# =========================================================
+
+with combo_tab:
+    st.header(
+        "🛒 いちばんお得な使い方"
+    )
+
+    st.caption(
+        "買い物かごを入れると、使えるお得の中から"
+        "いちばん安くなる組み合わせを探します。"
+        "金額・割引率・還元率のお得が対象です。"
+    )
+
+    combo_shops = sorted(
+        {
+            deal.get(
+                "shop",
+                "",
+            )
+            for deal in usable
+            if deal.get(
+                "shop",
+                "",
+            )
+        }
+    )
+
+    combo_shop = st.selectbox(
+        "店舗",
+        ["すべて"] + combo_shops,
+        key="combo_shop",
+    )
+
+    cart_df = st.data_editor(
+        pd.DataFrame(
+            [
+                {
+                    "商品": "",
+                    "カテゴリ": "",
+                    "単価": 0,
+                    "数量": 1,
+                }
+            ]
+        ),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "単価": st.column_config.NumberColumn(
+                min_value=0,
+                step=10,
+            ),
+            "数量": st.column_config.NumberColumn(
+                min_value=1,
+                step=1,
+            ),
+        },
+        key="combo_cart",
+    )
+
+    cart_items = [
+        {
+            "name": str(
+                row["商品"]
+            ).strip(),
+            "category": str(
+                row["カテゴリ"]
+            ).strip(),
+            "price": int(
+                row["単価"]
+            ),
+            "qty": int(
+                row["数量"]
+            ),
+        }
+        for row in cart_df.fillna(
+            {
+                "商品": "",
+                "カテゴリ": "",
+                "単価": 0,
+                "数量": 1,
+            }
+        ).to_dict(
+            orient="records"
+        )
+        if str(
+            row["商品"]
+        ).strip()
+        and int(
+            row["単価"]
+        )
+        > 0
+        and int(
+            row["数量"]
+        )
+        > 0
+    ]
+
+    item_keys = {
+        key
+        for item in cart_items
+        for key in (
+            item["name"],
+            item["category"],
+        )
+        if key
+    }
+
+    combo_options = [
+        option
+        for option in (
+            deal_option(
+                deal,
+                item_keys,
+            )
+            for deal in usable
+            if combo_shop == "すべて"
+            or deal.get(
+                "shop",
+                "",
+            )
+            == combo_shop
+        )
+        if option
+    ]
+
+    if not cart_items:
+        st.info(
+            "商品名と単価を入れてください。"
+        )
+
+    elif not combo_options:
+        st.info(
+            "この店舗で使える金額・割引率・還元率のお得がありません。"
+        )
+
+    else:
+        combo = optimize_deals(
+            cart_items,
+            combo_options,
+        )
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        col1.metric(
+            "元の合計",
+            f"{combo['original_total']:,.0f}円",
+        )
+
+        col2.metric(
+            "支払額",
+            f"{combo['paid']:,.0f}円",
+        )
+
+        col3.metric(
+            "ポイント",
+            f"{combo['points']:,.0f}pt",
+        )
+
+        col4.metric(
+            "実質のお得",
+            f"{combo['saving']:,.0f}円",
+        )
+
+        if combo["chosen_deals"]:
+            st.success(
+                "使うお得："
+                + "、".join(
+                    option["name"]
+                    for option in combo[
+                        "chosen_deals"
+                    ]
+                )
+            )
+
+            st.dataframe(
+                pd.DataFrame(
+                    [
+                        {
+                            "特典": option["name"],
+                            "計算上の種類": (
+                                DEAL_KIND_LABELS[
+                                    option["kind"]
+                                ]
+                            ),
+                            "他と併用": (
+                                "可"
+                                if option["stackable"]
+                                else "不可"
+                            ),
+                        }
+                        for option in combo[
+                            "chosen_deals"
+                        ]
+                    ]
+                ),
+                use_container_width=True,
+                hide_index=True,
+            )
+
+        else:
+            st.warning(
+                "この買い物の条件を満たすお得はありません。"
+            )
+
+        st.caption(
+            f"{len(combo_options)}件のお得から"
+            f"{combo['nodes']:,}通りを調べました"
+            f"（{combo['elapsed_ms']:.1f}ms）"
+        )
+
+
 # =========================================================
 # 分析
 # =========================================================
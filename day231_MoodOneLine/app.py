@@ -1,11 +1,28 @@
+import bisect
 import json
 import os
+import sys
 from datetime import date, datetime, timedelta
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.period_summary import (  # noqa: E402
+    add_value,
+    create_summaries,
+    ensure_summaries,
+    remove_value,
+    summary_series,
+)
+
+
 # =========================================================
 # ページ設定
 # =========================================================
@@ -35,6 +52,11 @@ MOODS = {
     "😄 とても良い": 5,
 }
 
+SUMMARY_PERIODS = {
+    "月ごと": "month",
+    "年ごと": "year",
+}
+
 
 # =========================================================
 # データ管理
@@ -42,7 +64,8 @@ MOODS = {
 
 def create_empty_data():
     return {
-        "records": []
+        "records": [],
+        "summaries": create_summaries(),
     }
 
 
@@ -84,7 +107,26 @@ def load_data():
             "r",
             encoding="utf-8",
         ) as file:
-            return json.load(file)
+            data = json.load(file)
+
+        data.setdefault(
+            "records",
+            [],
+        )
+
+        sort_records(
+            data["records"]
+        )
+
+        # 月ごと・年ごとの平均は保存しておき、ないときだけ数え直す
+        if ensure_summaries(
+            data,
+            data["records"],
+            "score",
+        ):
+            save_data(data)
+
+        return data
 
     except (
         json.JSONDecodeError,
@@ -104,18 +146,21 @@ def save_today_record(
         date.today()
     )
 
-    existing = next(
-        (
-            record
-            for record in data["records"]
-            if record.get(
-                "date"
-            ) == today_text
-        ),
-        None,
+    existing = find_record(
+        data["records"],
+        today_text,
     )
 
     if existing:
+        remove_value(
+            data["summaries"],
+            today_text,
+            existing.get(
+                "score",
+                0,
+            ),
+        )
+
         existing["mood"] = mood
         existing["score"] = MOODS[
             mood
@@ -130,7 +175,8 @@ def save_today_record(
         )
 
     else:
-        data["records"].append(
+        insert_record(
+            data["records"],
             {
                 "date": today_text,
                 "mood": mood,
@@ -146,6 +192,14 @@ def save_today_record(
             }
         )
 
+    add_value(
+        data["summaries"],
+        today_text,
+        MOODS[
+            mood
+        ],
+    )
+
     save_data(data)
 
 
@@ -153,19 +207,140 @@ def delete_record(
     data,
     target_date,
 ):
-    data["records"] = [
-        record
-        for record in data[
-            "records"
-        ]
-        if record.get(
-            "date"
-        ) != target_date
-    ]
+    record = find_record(
+        data["records"],
+        target_date,
+    )
+
+    if record:
+        data["records"].remove(
+            record
+        )
+
+        remove_value(
+            data["summaries"],
+            target_date,
+            record.get(
+                "score",
+                0,
+            ),
+        )
 
     save_data(data)
 
 
+# =========================================================
+# 日付インデックス
+# =========================================================
+
+# records は常に日付の昇順に並べておき、日付での検索は二分探索で行う
+
+def record_date(record):
+    return record.get(
+        "date",
+        "",
+    )
+
+
+def sort_records(records):
+    if any(
+        record_date(
+            records[i]
+        )
+        > record_date(
+            records[i + 1]
+        )
+        for i in range(
+            len(records) - 1
+        )
+    ):
+        records.sort(
+            key=record_date,
+        )
+
+    return records
+
+
+def find_record(
+    records,
+    date_text,
+):
+    # 今日の記録はほぼ末尾にあるので先に見る
+    if (
+        records
+        and record_date(
+            records[-1]
+        )
+        == date_text
+    ):
+        return records[-1]
+
+    position = bisect.bisect_left(
+        records,
+        date_text,
+        key=record_date,
+    )
+
+    if (
+        position < len(records)
+        and record_date(
+            records[position]
+        )
+        == date_text
+    ):
+        return records[position]
+
+    return None
+
+
+def insert_record(
+    records,
+    record,
+):
+    if (
+        not records
+        or record_date(
+            records[-1]
+        )
+        < record_date(
+            record
+        )
+    ):
+        records.append(
+            record
+        )
+
+        return
+
+    bisect.insort(
+        records,
+        record,
+        key=record_date,
+    )
+
+
+def records_between(
+    records,
+    start_text,
+    end_text,
+):
+    start = bisect.bisect_left(
+        records,
+        start_text,
+        key=record_date,
+    )
+
+    end = bisect.bisect_right(
+        records,
+        end_text,
+        key=record_date,
+    )
+
+    return records[
+        start:end
+    ]
+
+
 # =========================================================
 # 読み込み
 # =========================================================
@@ -180,15 +355,9 @@ today_text = str(
     date.today()
 )
 
-today_record = next(
-    (
-        record
-        for record in records
-        if record.get(
-            "date"
-        ) == today_text
-    ),
-    None,
+today_record = find_record(
+    records,
+    today_text,
 )
 
 
@@ -317,47 +486,24 @@ week_start = (
     )
 )
 
-weekly_records = []
-
-for record in records:
-    try:
-        record_date = (
-            datetime.strptime(
-                record.get(
-                    "date",
-                    "",
-                ),
-                "%Y-%m-%d",
-            ).date()
-        )
-
-        if (
-            week_start
-            <= record_date
-            <= today
-        ):
-            weekly_records.append(
-                record
-            )
-
-    except ValueError:
-        pass
+weekly_records = records_between(
+    records,
+    str(
+        week_start
+    ),
+    today_text,
+)
 
 
 current_month = today.strftime(
     "%Y-%m"
 )
 
-monthly_records = [
-    record
-    for record in records
-    if record.get(
-        "date",
-        "",
-    ).startswith(
-        current_month
-    )
-]
+monthly_records = records_between(
+    records,
+    f"{current_month}-01",
+    f"{current_month}-31",
+)
 
 
 weekly_average = (
@@ -422,6 +568,13 @@ if weekly_records:
 
     graph_rows = []
 
+    weekly_by_date = {
+        record_date(
+            record
+        ): record
+        for record in weekly_records
+    }
+
     for i in range(
         7
     ):
@@ -432,19 +585,10 @@ if weekly_records:
             )
         )
 
-        matching = next(
-            (
-                record
-                for record
-                in weekly_records
-                if record.get(
-                    "date"
-                )
-                == str(
-                    target_date
-                )
-            ),
-            None,
+        matching = weekly_by_date.get(
+            str(
+                target_date
+            )
         )
 
         graph_rows.append(
@@ -480,6 +624,39 @@ if weekly_records:
     )
 
 
+# =========================================================
+# 長期の推移
+# =========================================================
+
+if records:
+    st.divider()
+
+    st.subheader(
+        "🗓️ 長期の推移"
+    )
+
+    period_label = st.radio(
+        "まとめ方",
+        list(
+            SUMMARY_PERIODS.keys()
+        ),
+        horizontal=True,
+    )
+
+    summary = summary_series(
+        data["summaries"],
+        SUMMARY_PERIODS[
+            period_label
+        ],
+    )
+
+    st.line_chart(
+        summary.rename(
+            "平均の気分"
+        )
+    )
+
+
 # =========================================================
 # 履歴
 # =========================================================
@@ -496,15 +673,10 @@ if not records:
     )
 
 else:
-    sorted_records = sorted(
-        records,
-        key=lambda record: (
-            record.get(
-                "date",
-                "",
-            )
-        ),
-        reverse=True,
+    sorted_records = list(
+        reversed(
+            records
+        )
     )
 
     for record in sorted_records:
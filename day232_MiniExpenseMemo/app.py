@@ -1,11 +1,24 @@
 import json
 import os
+import sys
 import uuid
 from datetime import date, datetime
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.ledger import (  # noqa: E402
+    ensure_source,
+    make_entry,
+    sync_source,
+)
+
 
 # =========================================================
 # ページ設定
@@ -29,6 +42,9 @@ DATA_FILE = os.path.join(
     "expense_data.json",
 )
 
+# 共通の家計元帳でこのアプリを表す名前
+LEDGER_SOURCE = "day232_MiniExpenseMemo"
+
 CATEGORIES = [
     "食費",
     "外食",
@@ -84,6 +100,42 @@ def save_data(data):
         )
 
 
+def ledger_entries(data):
+    return [
+        make_entry(
+            expense.get(
+                "id"
+            ),
+            expense.get(
+                "date"
+            ),
+            expense.get(
+                "amount",
+                0,
+            ),
+            expense.get(
+                "category"
+            ),
+            title=expense.get(
+                "memo",
+                "",
+            ),
+        )
+        for expense in data[
+            "expenses"
+        ]
+    ]
+
+
+def sync_ledger(data):
+    sync_source(
+        LEDGER_SOURCE,
+        ledger_entries(
+            data
+        ),
+    )
+
+
 def normalize_data(data):
     if not isinstance(
         data,
@@ -171,6 +223,13 @@ def load_data():
             data
         )
 
+        ensure_source(
+            LEDGER_SOURCE,
+            ledger_entries(
+                data
+            ),
+        )
+
         return data
 
     except (
@@ -260,6 +319,10 @@ def add_expense(
         data
     )
 
+    sync_ledger(
+        data
+    )
+
 
 def update_expense(
     data,
@@ -296,6 +359,10 @@ def update_expense(
         data
     )
 
+    sync_ledger(
+        data
+    )
+
 
 def delete_expense(
     data,
@@ -319,6 +386,10 @@ def delete_expense(
         data
     )
 
+    sync_ledger(
+        data
+    )
+
 
 # =========================================================
 # デザイン
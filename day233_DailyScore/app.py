@@ -1,11 +1,28 @@
+import bisect
 import json
 import os
+import sys
 from datetime import date, datetime, timedelta
+from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
 
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.period_summary import (  # noqa: E402
+    add_value,
+    create_summaries,
+    ensure_summaries,
+    remove_value,
+    summary_series,
+)
+
+
 # =========================================================
 # ページ設定
 # =========================================================
@@ -28,6 +45,11 @@ DATA_FILE = os.path.join(
     "score_data.json",
 )
 
+SUMMARY_PERIODS = {
+    "月ごと": "month",
+    "年ごと": "year",
+}
+
 
 # =========================================================
 # データ管理
@@ -35,7 +57,8 @@ DATA_FILE = os.path.join(
 
 def create_empty_data():
     return {
-        "records": []
+        "records": [],
+        "summaries": create_summaries(),
     }
 
 
@@ -92,6 +115,18 @@ def load_data():
             [],
         )
 
+        sort_records(
+            data["records"]
+        )
+
+        # 月ごと・年ごとの平均は保存しておき、ないときだけ数え直す
+        if ensure_summaries(
+            data,
+            data["records"],
+            "score",
+        ):
+            save_data(data)
+
         return data
 
     except (
@@ -104,6 +139,118 @@ def load_data():
         return data
 
 
+# =========================================================
+# 日付インデックス
+# =========================================================
+
+# records は常に日付の昇順に並べておき、日付での検索は二分探索で行う
+
+def record_date(record):
+    return record.get(
+        "date",
+        "",
+    )
+
+
+def sort_records(records):
+    if any(
+        record_date(
+            records[i]
+        )
+        > record_date(
+            records[i + 1]
+        )
+        for i in range(
+            len(records) - 1
+        )
+    ):
+        records.sort(
+            key=record_date,
+        )
+
+    return records
+
+
+def find_record(
+    records,
+    date_text,
+):
+    # 今日の記録はほぼ末尾にあるので先に見る
+    if (
+        records
+        and record_date(
+            records[-1]
+        )
+        == date_text
+    ):
+        return records[-1]
+
+    position = bisect.bisect_left(
+        records,
+        date_text,
+        key=record_date,
+    )
+
+    if (
+        position < len(records)
+        and record_date(
+            records[position]
+        )
+        == date_text
+    ):
+        return records[position]
+
+    return None
+
+
+def insert_record(
+    records,
+    record,
+):
+    if (
+        not records
+        or record_date(
+            records[-1]
+        )
+        < record_date(
+            record
+        )
+    ):
+        records.append(
+            record
+        )
+
+        return
+
+    bisect.insort(
+        records,
+        record,
+        key=record_date,
+    )
+
+
+def records_between(
+    records,
+    start_text,
+    end_text,
+):
+    start = bisect.bisect_left(
+        records,
+        start_text,
+        key=record_date,
+    )
+
+    end = bisect.bisect_right(
+        records,
+        end_text,
+        key=record_date,
+    )
+
+    return records[
+        start:end
+    ]
+
+
 # =========================================================
 # 補助関数
 # =========================================================
@@ -162,20 +309,21 @@ def save_today_record(
         date.today()
     )
 
-    existing_record = next(
-        (
-            record
-            for record
-            in data["records"]
-            if record.get(
-                "date"
-            )
-            == today_text
-        ),
-        None,
+    existing_record = find_record(
+        data["records"],
+        today_text,
     )
 
     if existing_record:
+        remove_value(
+            data["summaries"],
+            today_text,
+            existing_record.get(
+                "score",
+                0,
+            ),
+        )
+
         existing_record[
             "score"
         ] = int(
@@ -195,9 +343,10 @@ def save_today_record(
         )
 
     else:
-        data[
-            "records"
-        ].append(
+        insert_record(
+            data[
+                "records"
+            ],
             {
                 "date": today_text,
                 "score": int(
@@ -212,6 +361,14 @@ def save_today_record(
             }
         )
 
+    add_value(
+        data["summaries"],
+        today_text,
+        int(
+            score
+        ),
+    )
+
     save_data(
         data
     )
@@ -221,19 +378,26 @@ def delete_record(
     data,
     target_date,
 ):
-    data[
-        "records"
-    ] = [
-        record
-        for record
-        in data[
+    record = find_record(
+        data["records"],
+        target_date,
+    )
+
+    if record:
+        data[
             "records"
-        ]
-        if record.get(
-            "date"
+        ].remove(
+            record
+        )
+
+        remove_value(
+            data["summaries"],
+            target_date,
+            record.get(
+                "score",
+                0,
+            ),
         )
-        != target_date
-    ]
 
     save_data(
         data
@@ -320,16 +484,9 @@ current_month = today.strftime(
     "%Y-%m"
 )
 
-today_record = next(
-    (
-        record
-        for record in records
-        if record.get(
-            "date"
-        )
-        == today_text
-    ),
-    None,
+today_record = find_record(
+    records,
+    today_text,
 )
 
 
@@ -435,43 +592,20 @@ week_start = (
     )
 )
 
-weekly_records = []
-
-for record in records:
-    try:
-        record_date = (
-            datetime.strptime(
-                record.get(
-                    "date",
-                    "",
-                ),
-                "%Y-%m-%d",
-            ).date()
-        )
-
-        if (
-            week_start
-            <= record_date
-            <= today
-        ):
-            weekly_records.append(
-                record
-            )
-
-    except ValueError:
-        pass
+weekly_records = records_between(
+    records,
+    str(
+        week_start
+    ),
+    today_text,
+)
 
 
-monthly_records = [
-    record
-    for record in records
-    if record.get(
-        "date",
-        "",
-    ).startswith(
-        current_month
-    )
-]
+monthly_records = records_between(
+    records,
+    f"{current_month}-01",
+    f"{current_month}-31",
+)
 
 
 weekly_average = (
@@ -601,6 +735,13 @@ st.subheader(
 
 graph_rows = []
 
+weekly_by_date = {
+    record_date(
+        record
+    ): record
+    for record in weekly_records
+}
+
 for i in range(
     7
 ):
@@ -611,19 +752,10 @@ for i in range(
         )
     )
 
-    matching_record = next(
-        (
-            record
-            for record
-            in records
-            if record.get(
-                "date"
-            )
-            == str(
-                target_date
-            )
-        ),
-        None,
+    matching_record = weekly_by_date.get(
+        str(
+            target_date
+        )
     )
 
     graph_rows.append(
@@ -662,6 +794,39 @@ st.caption(
 )
 
 
+# =========================================================
+# 長期の推移
+# =========================================================
+
+if records:
+    st.divider()
+
+    st.subheader(
+        "🗓️ 長期の推移"
+    )
+
+    period_label = st.radio(
+        "まとめ方",
+        list(
+            SUMMARY_PERIODS.keys()
+        ),
+        horizontal=True,
+    )
+
+    summary = summary_series(
+        data["summaries"],
+        SUMMARY_PERIODS[
+            period_label
+        ],
+    )
+
+    st.line_chart(
+        summary.rename(
+            "平均点"
+        )
+    )
+
+
 # =========================================================
 # 今月の記録
 # =========================================================
@@ -678,15 +843,10 @@ if not monthly_records:
     )
 
 else:
-    monthly_sorted = sorted(
-        monthly_records,
-        key=lambda record: (
-            record.get(
-                "date",
-                "",
-            )
-        ),
-        reverse=True,
+    monthly_sorted = list(
+        reversed(
+            monthly_records
+        )
     )
 
     for record in monthly_sorted:
@@ -775,15 +935,10 @@ with st.expander(
     else:
         history_rows = []
 
-        sorted_records = sorted(
-            records,
-            key=lambda record: (
-                record.get(
-                    "date",
-                    "",
-                )
-            ),
-            reverse=True,
+        sorted_records = list(
+            reversed(
+                records
+            )
         )
 
         for record in sorted_records:
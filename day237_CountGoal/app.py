@@ -1,8 +1,9 @@
 import json
 import os
 import uuid
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
+import pandas as pd
 import streamlit as st
 
 
@@ -28,6 +29,17 @@ DATA_FILE = os.path.join(
     "counter_data.json",
 )
 
+# ＋1／−1は1行ずつ追記するだけにして、ある程度たまったら本体に畳み込む
+EVENT_FILE = os.path.join(
+    DATA_DIR,
+    "counter_events.jsonl",
+)
+
+COMPACT_BYTES = 32 * 1024
+
+HISTORY_DAYS = 30
+HISTORY_WEEKS = 12
+
 ICONS = [
     "💪",
     "📚",
@@ -60,18 +72,25 @@ def now_text():
 
 def create_empty_data():
     return {
-        "counters": []
+        "counters": [],
+        "last_seq": 0,
     }
 
 
 def save_data(data):
+    # 本体を書き込んだら、反映済みのイベントログは空にする
     os.makedirs(
         DATA_DIR,
         exist_ok=True,
     )
 
+    tmp_file = (
+        DATA_FILE
+        + ".tmp"
+    )
+
     with open(
-        DATA_FILE,
+        tmp_file,
         "w",
         encoding="utf-8",
     ) as file:
@@ -82,6 +101,180 @@ def save_data(data):
             indent=2,
         )
 
+    os.replace(
+        tmp_file,
+        DATA_FILE,
+    )
+
+    with open(
+        EVENT_FILE,
+        "w",
+        encoding="utf-8",
+    ):
+        pass
+
+
+def read_events():
+    if not os.path.exists(
+        EVENT_FILE
+    ):
+        return []
+
+    events = []
+
+    with open(
+        EVENT_FILE,
+        "r",
+        encoding="utf-8",
+    ) as file:
+        for line in file:
+            try:
+                events.append(
+                    json.loads(
+                        line
+                    )
+                )
+
+            except json.JSONDecodeError:
+                # 書き込み途中で止まった最後の行は捨てる
+                continue
+
+    return events
+
+
+def apply_event(
+    counter,
+    event,
+):
+    counter[
+        "count"
+    ] = (
+        int(
+            counter.get(
+                "count",
+                0,
+            )
+        )
+        + event["d"]
+    )
+
+    counter[
+        "updated_at"
+    ] = event["t"]
+
+    if event.get(
+        "r"
+    ):
+        return
+
+    day = event["t"][:10]
+    daily = counter.setdefault(
+        "daily",
+        {},
+    )
+
+    daily[day] = (
+        daily.get(
+            day,
+            0,
+        )
+        + event["d"]
+    )
+
+
+def replay_events(
+    data,
+):
+    # 本体に畳み込まれていないイベントだけを反映する
+    counters_by_id = {
+        counter["id"]: counter
+        for counter in data[
+            "counters"
+        ]
+    }
+
+    for event in read_events():
+        if event.get(
+            "s",
+            0,
+        ) <= data[
+            "last_seq"
+        ]:
+            continue
+
+        data[
+            "last_seq"
+        ] = event["s"]
+
+        counter = counters_by_id.get(
+            event.get(
+                "c"
+            )
+        )
+
+        if counter:
+            apply_event(
+                counter,
+                event,
+            )
+
+
+def append_event(
+    data,
+    counter,
+    delta,
+    reset=False,
+):
+    data[
+        "last_seq"
+    ] += 1
+
+    event = {
+        "s": data[
+            "last_seq"
+        ],
+        "c": counter["id"],
+        "d": delta,
+        "t": now_text(),
+    }
+
+    if reset:
+        event["r"] = 1
+
+    apply_event(
+        counter,
+        event,
+    )
+
+    os.makedirs(
+        DATA_DIR,
+        exist_ok=True,
+    )
+
+    with open(
+        EVENT_FILE,
+        "a",
+        encoding="utf-8",
+    ) as file:
+        file.write(
+            json.dumps(
+                event,
+                ensure_ascii=False,
+                separators=(
+                    ",",
+                    ":",
+                ),
+            )
+            + "\n"
+        )
+
+    if os.path.getsize(
+        EVENT_FILE
+    ) >= COMPACT_BYTES:
+        save_data(
+            data
+        )
+
 
 def load_data():
     os.makedirs(
@@ -121,6 +314,11 @@ def load_data():
             [],
         )
 
+        data.setdefault(
+            "last_seq",
+            0,
+        )
+
         for counter in data[
             "counters"
         ]:
@@ -159,6 +357,15 @@ def load_data():
                 now_text(),
             )
 
+            counter.setdefault(
+                "daily",
+                {},
+            )
+
+        replay_events(
+            data
+        )
+
         return data
 
     except (
@@ -217,6 +424,62 @@ def get_remaining(
     )
 
 
+def daily_series(
+    counter,
+    days=HISTORY_DAYS,
+):
+    today = date.today()
+
+    index = pd.date_range(
+        end=today,
+        periods=days,
+        freq="D",
+    )
+
+    daily = counter.get(
+        "daily",
+        {},
+    )
+
+    return pd.Series(
+        [
+            daily.get(
+                day.strftime(
+                    "%Y-%m-%d"
+                ),
+                0,
+            )
+            for day in index
+        ],
+        index=index,
+        name="回数",
+    )
+
+
+def weekly_series(
+    counter,
+    weeks=HISTORY_WEEKS,
+):
+    # 週は月曜始まりで集計する
+    today = date.today()
+    start = (
+        today
+        - timedelta(
+            days=today.weekday()
+            + 7 * (weeks - 1)
+        )
+    )
+
+    series = daily_series(
+        counter,
+        days=(today - start).days + 1,
+    )
+
+    return series.resample(
+        "W-SUN"
+    ).sum()
+
+
 # =========================================================
 # データ操作
 # =========================================================
@@ -256,65 +519,54 @@ def add_counter(
 
 def change_count(
     data,
-    counter_id,
+    counter,
     amount,
 ):
-    counter = get_counter(
-        data,
-        counter_id,
-    )
-
-    if not counter:
-        return
-
-    new_count = (
-        int(
-            counter.get(
-                "count",
-                0,
-            )
+    count = int(
+        counter.get(
+            "count",
+            0,
         )
-        + amount
     )
 
-    counter[
-        "count"
-    ] = max(
-        new_count,
-        0,
+    # 0未満にはしないので、実際に変わった分だけを記録する
+    delta = (
+        max(
+            count + amount,
+            0,
+        )
+        - count
     )
 
-    counter[
-        "updated_at"
-    ] = now_text()
+    if delta == 0:
+        return
 
-    save_data(
-        data
+    append_event(
+        data,
+        counter,
+        delta,
     )
 
 
 def reset_counter(
     data,
-    counter_id,
+    counter,
 ):
-    counter = get_counter(
-        data,
-        counter_id,
+    count = int(
+        counter.get(
+            "count",
+            0,
+        )
     )
 
-    if not counter:
+    if count == 0:
         return
 
-    counter[
-        "count"
-    ] = 0
-
-    counter[
-        "updated_at"
-    ] = now_text()
-
-    save_data(
-        data
+    append_event(
+        data,
+        counter,
+        -count,
+        reset=True,
     )
 
 
@@ -746,7 +998,7 @@ else:
                 ):
                     change_count(
                         data,
-                        counter_id,
+                        counter,
                         -1,
                     )
 
@@ -764,7 +1016,7 @@ else:
                 ):
                     change_count(
                         data,
-                        counter_id,
+                        counter,
                         1,
                     )
 
@@ -781,12 +1033,39 @@ else:
                 ):
                     change_count(
                         data,
-                        counter_id,
+                        counter,
                         5,
                     )
 
                     st.rerun()
 
+            # ---------------------------------------------
+            # 記録
+            # ---------------------------------------------
+
+            with st.expander(
+                "📈 記録"
+            ):
+                st.caption(
+                    f"日別（直近{HISTORY_DAYS}日）"
+                )
+
+                st.bar_chart(
+                    daily_series(
+                        counter
+                    )
+                )
+
+                st.caption(
+                    f"週別（直近{HISTORY_WEEKS}週）"
+                )
+
+                st.bar_chart(
+                    weekly_series(
+                        counter
+                    )
+                )
+
             # ---------------------------------------------
             # 編集
             # ---------------------------------------------
@@ -890,7 +1169,7 @@ else:
                 ):
                     reset_counter(
                         data,
-                        counter_id,
+                        counter,
                     )
 
                     st.rerun()
@@ -0,0 +1,323 @@
+import bisect
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+if str(ROOT_DIR) not in sys.path:
+    sys.path.append(str(ROOT_DIR))
+
+from common.deadline_index import load_deadline_index  # noqa: E402
+
+
+# =========================================================
+# ページ設定
+# =========================================================
+
+st.set_page_config(
+    page_title="期限まとめボード",
+    page_icon="⏳",
+    layout="wide",
+)
+
+
+# =========================================================
+# 定数
+# =========================================================
+
+APP_ICONS = {
+    "day169_fridge_memo": "🧊",
+    "day190_warranty_manager": "🧾",
+    "day193_expiration_manager": "🥫",
+    "day206_ReturnDeadlineMemo": "📚",
+    "day230_TinyDealMemo": "💡",
+}
+
+
+# =========================================================
+# 検索
+# =========================================================
+
+def entry_due(
+    entry,
+):
+    return entry[0]
+
+
+def entries_between(
+    entries,
+    start_text,
+    end_text,
+):
+    # entries は期限日順に並んでいるので、二分探索で範囲の両端だけ探す
+    start = bisect.bisect_left(
+        entries,
+        start_text,
+        key=entry_due,
+    )
+
+    end = bisect.bisect_right(
+        entries,
+        end_text,
+        key=entry_due,
+    )
+
+    return entries[
+        start:end
+    ]
+
+
+def entries_before(
+    entries,
+    end_text,
+):
+    end = bisect.bisect_left(
+        entries,
+        end_text,
+        key=entry_due,
+    )
+
+    return entries[
+        :end
+    ]
+
+
+def to_df(
+    entries,
+    apps,
+):
+    today = date.today()
+    rows = []
+
+    for due_text, app_key, record_id, name in entries:
+        app_name = apps.get(
+            app_key,
+            {},
+        ).get(
+            "name",
+            app_key,
+        )
+
+        rows.append(
+            {
+                "期限": due_text,
+                "残り日数": (
+                    date.fromisoformat(
+                        due_text
+                    )
+                    - today
+                ).days,
+                "アプリ": f"{APP_ICONS.get(app_key, '📌')} {app_name}",
+                "名前": name,
+                "id": record_id,
+            }
+        )
+
+    return pd.DataFrame(
+        rows
+    )
+
+
+# =========================================================
+# データ読み込み
+# =========================================================
+
+index = load_deadline_index()
+
+entries = index[
+    "entries"
+]
+
+apps = index[
+    "apps"
+]
+
+today_text = date.today().isoformat()
+
+
+# =========================================================
+# ヘッダー
+# =========================================================
+
+st.title(
+    "⏳ 期限まとめボード"
+)
+
+st.caption(
+    "賞味期限・保証期限・返却期限・クーポン期限を、"
+    "アプリをまたいでまとめて確認します。"
+)
+
+if not apps:
+    st.info(
+        "まだ期限データがありません。"
+        "賞味期限管理・冷蔵庫メモ・保証書管理・返却期限メモ・ちょい得メモを"
+        "同じフォルダで一度開くと登録されます。"
+    )
+
+    st.stop()
+
+
+# =========================================================
+# 期間
+# =========================================================
+
+days = st.slider(
+    "何日先まで見る？",
+    min_value=1,
+    max_value=90,
+    value=7,
+)
+
+end_text = (
+    date.today()
+    + timedelta(
+        days=days
+    )
+).isoformat()
+
+upcoming = entries_between(
+    entries,
+    today_text,
+    end_text,
+)
+
+overdue = entries_before(
+    entries,
+    today_text,
+)
+
+today_count = len(
+    entries_between(
+        entries,
+        today_text,
+        today_text,
+    )
+)
+
+
+# =========================================================
+# 集計
+# =========================================================
+
+columns = st.columns(
+    4
+)
+
+columns[0].metric(
+    "登録アプリ",
+    f"{len(apps)}個",
+)
+
+columns[1].metric(
+    "期限切れ",
+    f"{len(overdue)}件",
+)
+
+columns[2].metric(
+    "今日まで",
+    f"{today_count}件",
+)
+
+columns[3].metric(
+    f"{days}日以内",
+    f"{len(upcoming)}件",
+)
+
+
+# =========================================================
+# 期限が近いもの
+# =========================================================
+
+st.divider()
+
+st.subheader(
+    f"📅 {days}日以内に期限が来るもの"
+)
+
+if upcoming:
+    st.dataframe(
+        to_df(
+            upcoming,
+            apps,
+        ).drop(
+            columns=[
+                "id",
+            ]
+        ),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+else:
+    st.success(
+        "この期間に期限が来るものはありません。"
+    )
+
+
+# =========================================================
+# 期限切れ
+# =========================================================
+
+with st.expander(
+    f"⚫ 期限切れ（{len(overdue)}件）"
+):
+    if overdue:
+        st.dataframe(
+            to_df(
+                overdue,
+                apps,
+            ).drop(
+                columns=[
+                    "id",
+                ]
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    else:
+        st.write(
+            "期限切れはありません。"
+        )
+
+
+# =========================================================
+# アプリ別
+# =========================================================
+
+st.divider()
+
+st.subheader(
+    "🗂️ 登録アプリ"
+)
+
+for app_key, app in apps.items():
+    count = sum(
+        1
+        for entry in upcoming
+        if entry[1] == app_key
+    )
+
+    st.write(
+        f"{APP_ICONS.get(app_key, '📌')} "
+        f"{app.get('name', app_key)}："
+        f"{days}日以内 {count}件"
+        f"（更新：{app.get('updated_at', '')}）"
+    )
+
+
+# =========================================================
+# フッター
+# =========================================================
+
+st.divider()
+
+st.caption(
+    "期限は各アプリで保存したときに自動で更新されます。⏳"
+)